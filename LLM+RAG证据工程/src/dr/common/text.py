@@ -4,9 +4,16 @@
 - canonicalize_name: 5份重复 → 1份
 - normalize_basic: 7份重复 → 1份
 - safe_filename: 3份重复 → 1份
+
+名称规范化函数的正则在导入时预编译, 结果按输入字符串 LRU 缓存;
+对 pandas Series 使用 map_unique / canonicalize_names 等批量接口,
+每个唯一值只计算一次。
 """
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Optional
+
+_NAME_CACHE_SIZE = 1 << 17
 
 # 停用词（从configs/stop_words.yaml加载，暂时硬编码）
 STOP_WORDS = {
@@ -20,7 +27,13 @@ STOP_WORDS = {
 
 PMID_DIGITS_RE = re.compile(r"\b(\d{6,9})\b")
 
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[\(\)\[\]\{\},;:/\\]")
+_DOSE_RE = re.compile(r"\b\d+(\.\d+)?\s*(mg|g|mcg|ug|iu|ml)\b", re.I)
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
 
+
+@lru_cache(maxsize=_NAME_CACHE_SIZE)
 def normalize_basic(x: str) -> str:
     """基础标准化：小写、去标点、去多余空格
 
@@ -37,11 +50,12 @@ def normalize_basic(x: str) -> str:
         'drug multiple spaces'
     """
     s = str(x).lower().strip()
-    s = re.sub(r"[\(\)\[\]\{\},;:/\\]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _PUNCT_RE.sub(" ", s)
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 
+@lru_cache(maxsize=_NAME_CACHE_SIZE)
 def canonicalize_name(x: str) -> str:
     """药物名称规范化：去剂量、去停用词、统一希腊字母
 
@@ -76,23 +90,23 @@ def canonicalize_name(x: str) -> str:
     s = s.replace("α", "alpha").replace("β", "beta")
 
     # 去剂量（如100mg, 50ug, 2.5ml）
-    s = re.sub(r"\b\d+(\.\d+)?\s*(mg|g|mcg|ug|iu|ml)\b", " ", s, flags=re.I)
+    s = _DOSE_RE.sub(" ", s)
 
     # 去所有数字（避免"aspirin 100"变成"aspirin"）
-    s = re.sub(r"\b\d+(\.\d+)?\b", " ", s)
+    s = _NUMBER_RE.sub(" ", s)
 
     # 去连字符（interferon-alpha → interferon alpha）
     s = s.replace("-", " ")
 
     # 分词
-    toks = [t for t in re.split(r"\s+", s) if t]
+    toks = [t for t in _WS_RE.split(s) if t]
 
     # 去停用词
     toks = [t for t in toks if t not in STOP_WORDS]
 
     # 最终清理
     joined = " ".join(toks)
-    joined = re.sub(r"\s+", " ", joined).strip()
+    joined = _WS_RE.sub(" ", joined).strip()
 
     return joined
 
@@ -119,6 +133,7 @@ _SALT_PATTERN = re.compile(
 )
 
 
+@lru_cache(maxsize=_NAME_CACHE_SIZE)
 def strip_salt_form(name: str) -> str:
     """去除药物名称中的盐形式后缀，返回母体药物名。
 
@@ -140,10 +155,40 @@ def strip_salt_form(name: str) -> str:
     """
     s = str(name).strip().lower()
     s = _SALT_PATTERN.sub("", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 
+def map_unique(values, fn: Callable[[str], str]):
+    """对 pandas Series 的每个唯一值只调用一次 fn，再映射回原位置
+
+    结果与 values.apply(fn) 相同；药物名称重复越多（同一药物出现在多个
+    试验/证据行中）节省越多。调用方负责先处理缺失值（如 astype(str)）。
+
+    Example:
+        >>> import pandas as pd
+        >>> map_unique(pd.Series(["A", "b", "A"]), str.lower).tolist()
+        ['a', 'b', 'a']
+    """
+    uniq = values.unique()
+    return values.map(dict(zip(uniq, map(fn, uniq))))
+
+
+def normalize_basic_series(values):
+    """normalize_basic 的 Series 版本"""
+    return map_unique(values, normalize_basic)
+
+
+def canonicalize_names(values):
+    """canonicalize_name 的 Series 版本"""
+    return map_unique(values, canonicalize_name)
+
+
+def strip_salt_forms(values):
+    """strip_salt_form 的 Series 版本"""
+    return map_unique(values, strip_salt_form)
+
+
 def safe_filename(s: str, max_len: int = 80) -> str:
     """转换为安全的文件名（用于缓存路径、dossier文件名）
 
@@ -16,7 +16,9 @@ from pathlib import Path
 
 import pandas as pd
 
-from ..common.text import canonicalize_name, normalize_basic, safe_join_unique, parse_min_pval
+from ..common.text import (
+    canonicalize_name, canonicalize_names, normalize_basic_series, safe_join_unique, parse_min_pval,
+)
 from ..logger import get_logger
 
 logger = get_logger(__name__)
@@ -161,12 +163,12 @@ class DrugAggregator:
 
         # drug_normalized（基础标准化）
         if "drug_normalized" in df.columns:
-            df["drug_normalized"] = df["drug_normalized"].astype(str).apply(normalize_basic)
+            df["drug_normalized"] = normalize_basic_series(df["drug_normalized"].astype(str))
         else:
-            df["drug_normalized"] = df["drug_raw"].apply(normalize_basic)
+            df["drug_normalized"] = normalize_basic_series(df["drug_raw"])
 
         # canonical_name（激进规范化）
-        df["canonical_name"] = df["drug_raw"].apply(canonicalize_name)
+        df["canonical_name"] = canonicalize_names(df["drug_raw"])
 
         # 如果canonical为空，回退到drug_normalized
         df["canonical_name"] = df["canonical_name"].where(
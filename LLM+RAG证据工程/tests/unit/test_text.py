@@ -7,6 +7,10 @@ from src.dr.common.text import (
     normalize_pmid,
     safe_join_unique,
     parse_min_pval,
+    strip_salt_form,
+    canonicalize_names,
+    normalize_basic_series,
+    strip_salt_forms,
 )
 
 
@@ -59,6 +63,27 @@ class TestCanonicalizeName:
         assert canonicalize_name(input) == expected
 
 
+class TestSeriesHelpers:
+    """测试批量（Series）规范化接口"""
+
+    NAMES = ["Aspirin 100mg Tablet", "Interferon-α 2b Injection", "aspirin 100mg tablet",
+             "Tofacitinib Citrate", "Aspirin 100mg Tablet", "", "nan"]
+
+    def test_match_apply(self):
+        pd = pytest.importorskip("pandas")
+        s = pd.Series(self.NAMES, index=range(10, 10 + len(self.NAMES)))
+        assert canonicalize_names(s).equals(s.apply(canonicalize_name))
+        assert normalize_basic_series(s).equals(s.apply(normalize_basic))
+        assert strip_salt_forms(s).equals(s.apply(strip_salt_form))
+
+    def test_cached(self):
+        canonicalize_name.cache_clear()
+        canonicalize_name("Aspirin 100mg Tablet")
+        canonicalize_name("Aspirin 100mg Tablet")
+        info = canonicalize_name.cache_info()
+        assert info.hits == 1 and info.misses == 1
+
+
 class TestSafeFilename:
     """测试文件名安全化"""
 
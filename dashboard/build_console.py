@@ -21,6 +21,13 @@ from pathlib import Path
 SCRIPT_DIR = Path(__file__).resolve().parent
 ROOT_DIR = SCRIPT_DIR.parent
 
+try:
+    import sys
+    sys.path.insert(0, str(ROOT_DIR / "kg_explain" / "src"))
+    from kg_explain.evidence_pack import EvidencePackStore
+except ImportError:  # kg_explain 依赖未安装时仍可生成控制台
+    EvidencePackStore = None
+
 # ── Data Collection ──────────────────────────────────────────────────
 
 
@@ -194,6 +201,21 @@ def load_active_runners():
     return runners
 
 
+def _evidence_pack_entry(out_dir):
+    """Summarize the evidence pack store (files / jsonl index / sqlite) of a KG output dir."""
+    if EvidencePackStore is None:
+        return None
+    try:
+        with EvidencePackStore.open(out_dir) as store:
+            n, fmt, size = len(store), store.fmt, store.nbytes
+            path = str(store.path)
+    except Exception:
+        return None
+    if n == 0:
+        return None
+    return {"name": f"evidence packs ({fmt}, {n} pairs)", "path": path, "size": size}
+
+
 def load_kg_outputs():
     """Load KG output file info for each disease."""
     kg_outputs = {}
@@ -209,6 +231,9 @@ def load_kg_outputs():
         fp = kg_out_dir / f
         if fp.exists():
             root_files.append({"name": f, "path": str(fp), "size": fp.stat().st_size})
+    packs = _evidence_pack_entry(kg_out_dir)
+    if packs:
+        root_files.append(packs)
     kg_outputs["_root"] = root_files
 
     # Per-disease
@@ -218,6 +243,9 @@ def load_kg_outputs():
             for f in d.iterdir():
                 if f.is_file() and f.suffix in (".csv", ".json", ".jsonl", ".tsv"):
                     files.append({"name": f.name, "path": str(f), "size": f.stat().st_size})
+            packs = _evidence_pack_entry(d)
+            if packs:
+                files.append(packs)
             if files:
                 kg_outputs[d.name] = files
     return kg_outputs
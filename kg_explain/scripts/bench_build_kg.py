@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Benchmark: row-wise vs bulk KG construction (kg_explain.graph).
+
+Generates a synthetic data_dir with ~1M edges spread across the six edge
+CSVs that ``build_kg`` reads, then times both builders and checks that they
+produce identical graphs.
+
+Usage:
+    python scripts/bench_build_kg.py                 # 1M edges
+    python scripts/bench_build_kg.py --n-edges 200000 --skip-rowwise
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.config import Config
+from kg_explain.graph import build_kg, _build_kg_rowwise
+
+# Share of total edges per edge file
+_SHARES = {
+    "edge_drug_target.csv": 0.05,
+    "edge_target_pathway_all.csv": 0.15,
+    "edge_pathway_disease.csv": 0.35,
+    "edge_drug_ae_faers.csv": 0.30,
+    "edge_disease_phenotype.csv": 0.05,
+    "edge_trial_ae.csv": 0.10,
+}
+
+
+def _ids(rng: np.random.Generator, prefix: str, universe: int, n: int) -> np.ndarray:
+    return np.char.add(prefix, rng.integers(0, universe, n).astype(str))
+
+
+def make_fixture(data_dir: Path, n_edges: int, seed: int = 0) -> None:
+    """Write a synthetic data_dir with roughly ``n_edges`` edge rows."""
+    rng = np.random.default_rng(seed)
+    n = {name: max(1, int(n_edges * share)) for name, share in _SHARES.items()}
+    n_drug, n_target, n_pathway, n_disease = 5000, 3000, 2500, 4000
+
+    k = n["edge_drug_target.csv"]
+    pd.DataFrame({
+        "drug_normalized": _ids(rng, "drug", n_drug, k),
+        "target_chembl_id": _ids(rng, "CHEMBL", n_target, k),
+        "mechanism_of_action": rng.choice(["INHIBITOR", "AGONIST", "ANTAGONIST"], k),
+    }).to_csv(data_dir / "edge_drug_target.csv", index=False)
+
+    k = n["edge_target_pathway_all.csv"]
+    pw = _ids(rng, "R-HSA-", n_pathway, k)
+    pd.DataFrame({
+        "target_chembl_id": _ids(rng, "CHEMBL", n_target, k),
+        "reactome_stid": pw,
+        "reactome_name": np.char.add("Pathway ", pw),
+    }).to_csv(data_dir / "edge_target_pathway_all.csv", index=False)
+
+    k = n["edge_pathway_disease.csv"]
+    dis = _ids(rng, "EFO_", n_disease, k)
+    pd.DataFrame({
+        "reactome_stid": _ids(rng, "R-HSA-", n_pathway, k),
+        "diseaseId": dis,
+        "diseaseName": np.char.add("Disease ", dis),
+        "pathway_score": rng.random(k).round(4),
+        "support_genes": rng.integers(1, 30, k),
+    }).to_csv(data_dir / "edge_pathway_disease.csv", index=False)
+
+    k = n["edge_drug_ae_faers.csv"]
+    pd.DataFrame({
+        "drug_normalized": _ids(rng, "drug", n_drug, k),
+        "ae_term": _ids(rng, "ae_", 20000, k),
+        "report_count": rng.integers(1, 5000, k),
+        "prr": (rng.random(k) * 10).round(6),
+    }).to_csv(data_dir / "edge_drug_ae_faers.csv", index=False)
+
+    k = n["edge_disease_phenotype.csv"]
+    pd.DataFrame({
+        "diseaseId": _ids(rng, "EFO_", n_disease, k),
+        "phenotypeId": _ids(rng, "HP_", 8000, k),
+        "phenotypeName": "phenotype",
+        "score": rng.random(k).round(4),
+    }).to_csv(data_dir / "edge_disease_phenotype.csv", index=False)
+
+    k = n["edge_trial_ae.csv"]
+    pd.DataFrame({
+        "drug_normalized": _ids(rng, "drug", n_drug, k),
+        "nctId": _ids(rng, "NCT", 90000, k),
+        "is_safety_stop": rng.choice(["0", "1"], k),
+        "is_efficacy_stop": rng.choice(["0", "1"], k),
+        "overallStatus": rng.choice(["TERMINATED", "WITHDRAWN"], k),
+    }).to_csv(data_dir / "edge_trial_ae.csv", index=False)
+
+
+def _timed(fn, cfg):
+    t0 = time.perf_counter()
+    G = fn(cfg)
+    return G, time.perf_counter() - t0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-edges", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-rowwise", action="store_true", help="只计时批量构建")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        make_fixture(data_dir, args.n_edges, args.seed)
+        cfg = Config(raw={"paths": {"data_dir": str(data_dir)}})
+
+        G_bulk, t_bulk = _timed(build_kg, cfg)
+        print(f"bulk    : {t_bulk:8.2f}s  ({G_bulk.number_of_nodes()} nodes, "
+              f"{G_bulk.number_of_edges()} edges)")
+
+        if not args.skip_rowwise:
+            G_row, t_row = _timed(_build_kg_rowwise, cfg)
+            print(f"rowwise : {t_row:8.2f}s  speedup x{t_row / max(t_bulk, 1e-9):.1f}")
+            same = (list(G_row.nodes(data=True)) == list(G_bulk.nodes(data=True))
+                    and list(G_row.edges(data=True)) == list(G_bulk.edges(data=True)))
+            print(f"identical graphs: {same}")
+            if not same:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
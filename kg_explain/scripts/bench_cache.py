@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark: HTTPCache backends (files vs single-file SQLite).
+
+Fills each backend with synthetic ChEMBL-like JSON responses, then times
+concurrent cache hits through ``concurrent_map``, ``summary()`` and
+``cleanup_expired()`` (half the entries backdated past the TTL):
+
+  - files:       one http_json/<sha1>.json per response (mtime TTL, glob walks)
+  - sqlite:      http_cache.sqlite, WAL, thread-local connections, indexed expiry
+  - sqlite+zlib: same, with compressed bodies
+
+Usage:
+    python scripts/bench_cache.py
+    python scripts/bench_cache.py --n-entries 50000 --workers 16
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.cache import HTTPCache, SQLITE_NAME, sha1
+from kg_explain.utils import concurrent_map
+
+
+def make_payload(i: int) -> dict:
+    return {"molecules": [{"molecule_chembl_id": f"CHEMBL{i}{j}", "pref_name": f"DRUG {i}-{j}",
+                           "max_phase": j % 5, "synonyms": ["x" * 20] * 5} for j in range(8)]}
+
+
+def backdate(cache: HTTPCache, keys: list[str], seconds: float) -> None:
+    """把一半条目推到 TTL 之外 (files: utime, sqlite: created 列)"""
+    if cache.backend == "files":
+        t = time.time() - seconds
+        for k in keys:
+            os.utime(cache._path(k), (t, t))
+        return
+    con = sqlite3.connect(cache.root / SQLITE_NAME)
+    with con:
+        con.executemany("UPDATE entries SET created = created - ? WHERE key = ?",
+                        [(seconds, sha1(k)) for k in keys])
+    con.close()
+
+
+def bench(label: str, root: Path, keys: list[str], reads: list[str], workers: int, **kw) -> None:
+    cache = HTTPCache(root, max_workers=workers, ttl_seconds=3600, **kw)
+    t0 = time.perf_counter()
+    for i, k in enumerate(keys):
+        cache.set(k, make_payload(i))
+    t_fill = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    hits = concurrent_map(cache.get, reads, max_workers=workers)
+    t_read = time.perf_counter() - t0
+    assert all(h is not None for h in hits)
+
+    t0 = time.perf_counter()
+    summary = cache.summary()
+    t_summary = time.perf_counter() - t0
+
+    backdate(cache, keys[::2], 7200)
+    t0 = time.perf_counter()
+    cleaned = cache.cleanup_expired()
+    t_cleanup = time.perf_counter() - t0
+    cache.close()
+    print(f"{label:<12}: fill {t_fill:6.2f}s  reads {len(reads) / t_read:9.0f}/s  "
+          f"summary {t_summary * 1e3:7.1f} ms  cleanup {t_cleanup * 1e3:7.1f} ms ({cleaned})  "
+          f"size {summary['total_size_mb']:.1f} MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-entries", type=int, default=10000)
+    parser.add_argument("--n-reads", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=12)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    keys = [f"https://www.ebi.ac.uk/chembl/api/data/molecule/CHEMBL{i}.json" for i in range(args.n_entries)]
+    reads = [keys[i] for i in rng.integers(0, len(keys), args.n_reads)]
+    print(f"entries: {len(keys)}, reads: {len(reads)}, {args.workers} workers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("files", Path(tmp) / "files", keys, reads, args.workers)
+        bench("sqlite", Path(tmp) / "sqlite", keys, reads, args.workers, backend="sqlite")
+        bench("sqlite+zlib", Path(tmp) / "zlib", keys, reads, args.workers, backend="sqlite", compress="zlib")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
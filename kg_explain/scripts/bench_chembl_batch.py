@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark: ChEMBL request counts, per-ID vs __in batching.
+
+Runs fetch_drug_targets → fetch_target_xrefs → fetch_drug_target_affinities
+against an in-process synthetic ChEMBL API (list endpoints with ``__in``
+filters and limit/offset paging, detail endpoints) and counts HTTP calls:
+
+  - per-ID:  chembl_prefetch disabled (one request per molecule / target /
+             molecule-target pair, as before)
+  - batched: chembl_prefetch groups IDs into ``__in`` queries
+  - warm:    batched run again on the per-ID cache (should issue 0 requests)
+
+Usage:
+    python scripts/bench_chembl_batch.py
+    python scripts/bench_chembl_batch.py --n-drugs 2000 --n-targets 800
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain import cache as cache_mod
+from kg_explain.cache import HTTPCache
+from kg_explain.datasources import chembl
+
+API = chembl.CHEMBL_API
+
+
+def make_data(n_drugs: int, n_targets: int, seed: int = 0) -> dict[str, list[dict]]:
+    rng = np.random.default_rng(seed)
+    mechs, acts = [], []
+    for i in range(n_drugs):
+        for t in rng.choice(n_targets, size=int(rng.integers(0, 4)), replace=False):
+            mechs.append({"molecule_chembl_id": f"CHEMBL{i}", "target_chembl_id": f"CHEMBLT{t}",
+                          "mechanism_of_action": "inhibitor"})
+            for _ in range(int(rng.integers(0, 5))):
+                acts.append({"molecule_chembl_id": f"CHEMBL{i}", "target_chembl_id": f"CHEMBLT{t}",
+                             "standard_type": "IC50", "pchembl_value": f"{rng.uniform(4, 10):.2f}",
+                             "standard_value": 1.0, "standard_units": "nM", "assay_type": "B"})
+    mols = [{"molecule_chembl_id": f"CHEMBL{i}", "molecule_hierarchy": {"parent_chembl_id": f"CHEMBL{i}"}}
+            for i in range(n_drugs)]
+    targets = [{"target_chembl_id": f"CHEMBLT{t}", "pref_name": f"T{t}", "target_type": "SINGLE PROTEIN",
+                "organism": "Homo sapiens",
+                "target_components": [{"component_id": t, "accession": f"P{t:05d}",
+                                       "target_component_xrefs": []}]} for t in range(n_targets)]
+    return {"mechanism": mechs, "molecule": mols, "target": targets, "activity": acts}
+
+
+class SyntheticAPI:
+    def __init__(self, data: dict[str, list[dict]]):
+        self.data = data
+        self.n_calls = 0
+        # 按 ID 建索引, 避免基准本身成为瓶颈
+        self.index = {res: {} for res in data}
+        for res, recs in data.items():
+            for r in recs:
+                for f in ("molecule_chembl_id", "target_chembl_id"):
+                    if f in r:
+                        self.index[res].setdefault((f, r[f]), []).append(r)
+
+    def __call__(self, url, params=None, headers=None, timeout=60):
+        self.n_calls += 1
+        params = dict(params or {})
+        rest = url[len(API) + 1:]
+        res = rest.split("/")[0].replace(".json", "")
+        if "/" in rest:
+            hits = self.index[res].get((f"{res}_chembl_id", rest.rsplit("/", 1)[1][:-5]), [])
+            if not hits:
+                raise cache_mod.requests.HTTPError("404")
+            return hits[0]
+        limit, offset = int(params.pop("limit", 20)), int(params.pop("offset", 0))
+        keys = [(k[:-4], v.split(",")) for k, v in params.items()
+                if k.endswith("_chembl_id__in")] or [(k, [v]) for k, v in params.items() if k.endswith("_chembl_id")]
+        field, ids = keys[0]
+        hits = [r for i in ids for r in self.index[res].get((field, i), [])]
+        for k, v in params.items():
+            if k.endswith("_chembl_id") and k != field:
+                hits = [r for r in hits if r.get(k) == v]
+        hits.sort(key=lambda r: id(r))
+        page = hits[offset:offset + limit]
+        return {chembl._RESULT_KEYS[res]: page,
+                "page_meta": {"limit": limit, "offset": offset, "total_count": len(hits),
+                              "next": "next" if offset + limit < len(hits) else None}}
+
+
+def run(label: str, api: SyntheticAPI, data_dir: Path, cache: HTTPCache) -> dict[str, str]:
+    cache_mod.http_get_json = chembl.http_get_json = api
+    t0 = time.perf_counter()
+    chembl.fetch_drug_targets(data_dir, cache)
+    chembl.fetch_target_xrefs(data_dir, cache)
+    chembl.fetch_drug_target_affinities(data_dir, cache)
+    dt = time.perf_counter() - t0
+    print(f"{label:<8}: {api.n_calls:6d} HTTP calls  {dt:6.2f}s")
+    return {n: (data_dir / n).read_text() for n in
+            ["edge_drug_target.csv", "target_xref.csv", "edge_drug_target_affinity.csv"]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-drugs", type=int, default=2000)
+    parser.add_argument("--n-targets", type=int, default=800)
+    args = parser.parse_args()
+
+    data = make_data(args.n_drugs, args.n_targets)
+    print(f"drugs: {args.n_drugs}, mechanisms: {len(data['mechanism'])}, activities: {len(data['activity'])}")
+    prefetch = chembl.chembl_prefetch
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for d in ("per_id", "batched"):
+            (tmp / d).mkdir()
+            pd.DataFrame({"drug_raw": [f"drug{i}" for i in range(args.n_drugs)],
+                          "canonical_name": [f"drug{i}" for i in range(args.n_drugs)],
+                          "chembl_id": [f"CHEMBL{i}" for i in range(args.n_drugs)]}
+                         ).to_csv(tmp / d / "drug_chembl_map.csv", index=False)
+
+        chembl.chembl_prefetch = lambda *a, **k: None
+        per_id_cache = HTTPCache(tmp / "cache_per_id", max_workers=8)
+        per_id = run("per-ID", SyntheticAPI(data), tmp / "per_id", per_id_cache)
+        chembl.chembl_prefetch = prefetch
+        batched = run("batched", SyntheticAPI(data), tmp / "batched", HTTPCache(tmp / "cache_batched", max_workers=8))
+        run("warm", SyntheticAPI(data), tmp / "per_id", per_id_cache)
+    print(f"identical outputs: {per_id == batched}")
+    return 0 if per_id == batched else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Benchmark: per-disease list metrics vs evaluation.rank_matrix.
+
+Generates a synthetic rank table (default 300 diseases x 2k drugs) and a
+gold standard with approval years, then times
+  - the previous run_benchmark loop (filter + sort rank_df per gold disease,
+    metrics.py list/set functions) against RankedLists.evaluate, checking
+    that both give identical per-disease metrics;
+  - a temporal sweep over several cutoff years, in-process vs process pool.
+
+Usage:
+    python scripts/bench_evaluation.py
+    python scripts/bench_evaluation.py --n-diseases 100 --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.evaluation.metrics import (
+    auroc, average_precision, hit_at_k, ndcg_at_k, precision_at_k, reciprocal_rank,
+)
+from kg_explain.evaluation.rank_matrix import RankedLists, gold_sets
+from kg_explain.evaluation.temporal_split import run_temporal_sweep
+
+KS = [5, 10, 20, 50, 100]
+
+
+def make_inputs(n_diseases: int, n_drugs: int, gold_per_disease: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    diseases = np.array([f"EFO_{i:05d}" for i in range(n_diseases)])
+    drugs = np.array([f"drug{i}" for i in range(n_drugs)])
+    n = n_diseases * n_drugs
+    rank_df = pd.DataFrame({
+        "drug_normalized": np.tile(drugs, n_diseases),
+        "diseaseId": np.repeat(diseases, n_drugs),
+        "final_score": rng.permutation(n) / n,
+    })
+    k = n_diseases * gold_per_disease
+    gold_df = pd.DataFrame({
+        "drug_normalized": drugs[rng.integers(0, n_drugs, k)],
+        "diseaseId": diseases[rng.integers(0, n_diseases, k)],
+        "approval_year": rng.integers(2000, 2025, k),
+    })
+    return rank_df, gold_df
+
+
+def evaluate_lists(rank_df: pd.DataFrame, gold: dict[str, set[str]]) -> dict:
+    """原 run_benchmark 循环"""
+    per_disease = {}
+    for did, positives in gold.items():
+        sub = rank_df[rank_df["diseaseId"] == did].sort_values("final_score", ascending=False)
+        ranked = sub["drug_normalized"].tolist()
+        if not ranked:
+            continue
+        m = {
+            "n_ranked": float(len(ranked)),
+            "n_positive": float(len(positives)),
+            "n_found": float(len(positives & set(ranked))),
+            "mrr": reciprocal_rank(ranked, positives),
+            "map": average_precision(ranked, positives),
+            "auroc": auroc(ranked, positives),
+        }
+        for k in KS:
+            m[f"hit@{k}"] = hit_at_k(ranked, positives, k)
+            m[f"p@{k}"] = precision_at_k(ranked, positives, k)
+            m[f"ndcg@{k}"] = ndcg_at_k(ranked, positives, k)
+        per_disease[did] = m
+    return per_disease
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-diseases", type=int, default=300)
+    parser.add_argument("--n-drugs", type=int, default=2000)
+    parser.add_argument("--gold-per-disease", type=int, default=20)
+    parser.add_argument("--cutoffs", default="2005,2008,2010,2012,2014,2016,2018,2020")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rank_df, gold_df = make_inputs(args.n_diseases, args.n_drugs, args.gold_per_disease, args.seed)
+    gold = gold_sets(gold_df)
+    print(f"rank rows: {len(rank_df)}, gold pairs: {len(gold_df)}, ks: {KS}")
+
+    t0 = time.perf_counter()
+    ranked = RankedLists(rank_df)
+    t_group = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vec, _ = ranked.evaluate(gold, KS)
+    t_vec = time.perf_counter() - t0
+    print(f"rank_matrix : {t_group + t_vec:8.2f}s  (group {t_group:.2f}s + evaluate {t_vec:.2f}s)")
+
+    t0 = time.perf_counter()
+    ref = evaluate_lists(rank_df, gold)
+    t_ref = time.perf_counter() - t0
+    print(f"per-disease : {t_ref:8.2f}s  speedup x{t_ref / max(t_group + t_vec, 1e-9):.1f}")
+    same = vec == ref
+    print(f"identical metrics: {same}")
+
+    cutoffs = [int(y) for y in args.cutoffs.split(",")]
+    for workers in (1, args.workers):
+        t0 = time.perf_counter()
+        run_temporal_sweep(ranked, gold_df, cutoffs, ks=KS, workers=workers)
+        print(f"temporal sweep ({len(cutoffs)} cutoffs, workers={workers}): "
+              f"{time.perf_counter() - t0:8.2f}s")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Benchmark: FAERS drug→AE edges from the local bulk store vs per-drug queries.
+
+Generates a synthetic FAERS ASCII quarter (default 200k reports, 3k drugs,
+1.5k MedDRA terms), builds the bulk store once, then serves
+edge_drug_ae_faers rows for --n-drugs drugs
+  - bulk: one store slice + vectorized PRR (drug_ae_from_store)
+  - per-drug: the fetch_drug_ae loop (per-drug term lists, _calc_prr per row)
+    with the network removed and the counts already in memory
+and checks both give the same rows. The openFDA path additionally pays
+>= n_drugs requests at the configured api.fda.gov rate limit (printed).
+
+Usage:
+    python scripts/bench_faers_bulk.py
+    python scripts/bench_faers_bulk.py --n-reports 500000 --n-drugs 500
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.datasources.faers import _calc_prr
+from kg_explain.datasources.faers_bulk import FAERSStore, build_faers_store, drug_ae_from_store
+
+MIN_COUNT, MIN_PRR, TOP_AE = 5, 1.5, 50
+
+
+def write_quarter(src: Path, n_reports: int, n_drugs: int, n_terms: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    # Zipf 型流行度: 少数药物 / AE 占多数报告
+    drug_p = 1.0 / np.arange(1, n_drugs + 1) ** 0.8
+    term_p = 1.0 / np.arange(1, n_terms + 1)
+    n_drug_rows = rng.integers(1, 4, n_reports)
+    n_reac_rows = rng.integers(1, 5, n_reports)
+    drug = pd.DataFrame({
+        "primaryid": np.repeat(np.arange(n_reports), n_drug_rows),
+        "drugname": np.char.add("DRUG", rng.choice(n_drugs, n_drug_rows.sum(), p=drug_p / drug_p.sum()).astype(str)),
+    })
+    drug["prod_ai"] = drug["drugname"]
+    reac = pd.DataFrame({
+        "primaryid": np.repeat(np.arange(n_reports), n_reac_rows),
+        "pt": np.char.add("Term ", rng.choice(n_terms, n_reac_rows.sum(), p=term_p / term_p.sum()).astype(str)),
+    })
+    drug.to_csv(src / "DRUG24Q1.txt", sep="$", index=False)
+    reac.to_csv(src / "REAC24Q1.txt", sep="$", index=False)
+
+
+def per_drug(store: FAERSStore, drugs: list[str]) -> pd.DataFrame:
+    """原 fetch_drug_ae._fetch_one 循环 (去掉网络请求)"""
+    bg, bg_total = store.background.to_dict(), store.background_total
+    counts = store.counts(drugs).sort_values(["report_count", "ae_term"], ascending=[False, True])
+    by_drug = {d: list(zip(g["ae_term"], g["report_count"])) for d, g in counts.groupby("drug")}
+    rows = []
+    for drug in drugs:
+        aes = by_drug.get(drug, [])
+        drug_total = sum(c for _, c in aes)
+        for term, count in aes[:TOP_AE]:
+            if count < MIN_COUNT:
+                continue
+            prr = _calc_prr(count, drug_total, bg.get(term, 0), bg_total)
+            if prr < MIN_PRR:
+                continue
+            rows.append({"drug_normalized": drug, "ae_term": term, "report_count": count,
+                         "drug_total_reports": drug_total, "prr": round(prr, 4)})
+    return pd.DataFrame(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-reports", type=int, default=200_000)
+    parser.add_argument("--n-drugs-total", type=int, default=3000)
+    parser.add_argument("--n-terms", type=int, default=1500)
+    parser.add_argument("--n-drugs", type=int, default=500, help="每次运行查询的药物数 (faers.max_drugs)")
+    parser.add_argument("--rate", type=float, default=4.0, help="api.fda.gov 限速 (请求/秒)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src, store_dir = Path(tmp) / "src", Path(tmp) / "store"
+        src.mkdir()
+        write_quarter(src, args.n_reports, args.n_drugs_total, args.n_terms)
+        t0 = time.perf_counter()
+        meta = build_faers_store(src, store_dir)
+        print(f"build store : {time.perf_counter() - t0:8.2f}s  "
+              f"({meta['n_drugs']} drugs, {meta['n_pairs']} pairs, {meta['format']})")
+
+        drugs = [f"drug{i}" for i in range(args.n_drugs)]
+        t0 = time.perf_counter()
+        store = FAERSStore(store_dir)
+        bulk, _ = drug_ae_from_store(store, drugs, min_count=MIN_COUNT, min_prr=MIN_PRR, top_ae=TOP_AE)
+        t_bulk = time.perf_counter() - t0
+        print(f"bulk        : {t_bulk:8.2f}s  ({len(bulk)} edges)")
+
+        t0 = time.perf_counter()
+        ref = per_drug(store, drugs)
+        t_ref = time.perf_counter() - t0
+        print(f"per-drug    : {t_ref:8.2f}s  speedup x{t_ref / max(t_bulk, 1e-9):.1f}")
+        print(f"openFDA     : >= {args.n_drugs / args.rate:6.0f}s  ({args.n_drugs} requests at {args.rate:g}/s)")
+
+        same = bulk.reset_index(drop=True).equals(ref.astype(bulk.dtypes.to_dict()))
+        print(f"identical rows: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark: per-call requests.get vs the pooled HTTP client.
+
+Starts a local stub JSON server (HTTP/1.1 keep-alive, optional artificial
+latency), then fetches the same URL list through ``concurrent_map``:
+
+  - baseline: the previous ``cached_get_json`` flow — HTTPCache lookup, then
+    ``requests.get`` per miss (new TCP connection every time; concurrent
+    misses on the same URL are all fetched)
+  - pooled:   ``cached_get_json`` over ``http_client`` (shared keep-alive
+    Session, per-host concurrency limit, in-flight request coalescing)
+
+and reports throughput, server-side request count and TCP connections.
+
+Usage:
+    python scripts/bench_http.py
+    python scripts/bench_http.py --n-urls 2000 --dup-frac 0.3 --latency-ms 20 --workers 16
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import requests
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.cache import HTTPCache, cached_get_json
+from kg_explain.http_client import configure_client
+from kg_explain.utils import concurrent_map
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.n_requests += 1
+            srv.connections.add(self.client_address)
+        if srv.latency:
+            time.sleep(srv.latency)
+        data = json.dumps({"path": self.path, "payload": "x" * 512}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency_ms: float) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.latency = latency_ms / 1000.0
+    srv.request_queue_size = 256
+    reset(srv)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def reset(srv) -> None:
+    srv.n_requests = 0
+    srv.connections = set()
+
+
+def make_urls(base: str, n_urls: int, dup_frac: float, seed: int = 0) -> list[str]:
+    """n_urls 个请求, 其中 dup_frac 比例重复前面出现过的 URL (打乱顺序以制造并发重复)"""
+    rng = np.random.default_rng(seed)
+    n_unique = max(1, int(n_urls * (1 - dup_frac)))
+    ids = np.concatenate([np.arange(n_unique), rng.integers(0, n_unique, n_urls - n_unique)])
+    rng.shuffle(ids)
+    return [f"{base}/molecule/CHEMBL{i}.json" for i in ids]
+
+
+def run(label: str, fn, urls: list[str], workers: int, srv) -> None:
+    reset(srv)
+    t0 = time.perf_counter()
+    results = concurrent_map(fn, urls, max_workers=workers)
+    dt = time.perf_counter() - t0
+    n_ok = sum(r is not None for r in results)
+    print(f"{label:<9}: {dt:7.2f}s  {len(urls) / dt:8.1f} req/s  ok={n_ok}  "
+          f"server requests={srv.n_requests}  connections={len(srv.connections)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-urls", type=int, default=1000)
+    parser.add_argument("--dup-frac", type=float, default=0.2, help="重复 URL 比例")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub 服务器每请求延迟")
+    parser.add_argument("--workers", type=int, default=12)
+    parser.add_argument("--per-host-limit", type=int, default=12)
+    args = parser.parse_args()
+
+    srv = start_stub(args.latency_ms)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    urls = make_urls(base, args.n_urls, args.dup_frac)
+    print(f"urls: {len(urls)} ({len(set(urls))} unique), latency {args.latency_ms} ms, "
+          f"{args.workers} workers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HTTPCache(Path(tmp) / "baseline")
+
+        def baseline(url):
+            hit = cache.get(url)
+            if hit is not None:
+                return hit
+            r = requests.get(url, timeout=30)
+            r.raise_for_status()
+            cache.set(url, r.json())
+            return r.json()
+
+        run("baseline", baseline, urls, args.workers, srv)
+
+        client = configure_client(per_host_limit=args.per_host_limit, pool_size=args.workers)
+        cache = HTTPCache(Path(tmp) / "pooled")
+        run("pooled", lambda url: cached_get_json(cache, url), urls, args.workers, srv)
+    print(f"client stats: {client.stats}")
+    srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
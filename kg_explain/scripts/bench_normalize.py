@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Benchmark: drug-name normalization on CT.gov-like intervention names.
+
+Generates --n-names synthetic trial intervention names (default 100k; drawn
+from --n-unique distinct strings with dosage / formulation / salt / combo /
+placebo variants, so names repeat as they do across trials), then runs the
+rxnorm + faers cleaning steps
+  - per-row: the previous row-wise .apply chain (uncached functions, one regex
+    search per non-drug pattern)
+  - shared : kg_explain.normalize Series API (unique values once, LRU cache,
+    combined non-drug regex) — cold cache and warm cache (second pipeline step)
+and checks all outputs are identical.
+
+Usage:
+    python scripts/bench_normalize.py
+    python scripts/bench_normalize.py --n-names 500000 --n-unique 20000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain import normalize as nz
+
+_DOSES = ["", " 100 mg", " 25mg bid", " 0.4 mg sublingual", " 150 mg/ml subcutaneous injection", " 10 mg/kg"]
+_FORMS = ["", " tablet", " capsules", " injection", " oral", " daily"]
+_SALTS = ["", " hydrochloride", " citrate", " sodium", " mesylate", " monohydrate"]
+_NON_DRUG = ["Placebo", "Matching placebo", "0.9% Sodium Chloride", "Standard of care",
+             "10 x 10^6 cells", "Sham procedure", "Normal saline", "Active comparator"]
+
+
+def make_names(n_names: int, n_unique: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    stems = [f"drugstem{i}" for i in range(max(n_unique // 4, 1))]
+    pool = []
+    for _ in range(n_unique):
+        r = rng.random()
+        if r < 0.05:
+            pool.append(str(rng.choice(_NON_DRUG)))
+            continue
+        name = str(rng.choice(stems)) + str(rng.choice(_SALTS)) + str(rng.choice(_DOSES)) + str(rng.choice(_FORMS))
+        if r < 0.15:
+            name += (" and " if r < 0.10 else ", ") + str(rng.choice(stems)) + str(rng.choice(_DOSES))
+        pool.append(name.title() if rng.random() < 0.5 else name)
+    # Zipf 型重复: 少数药物出现在大量试验中
+    p = 1.0 / np.arange(1, len(pool) + 1) ** 0.7
+    return pd.Series(np.array(pool, dtype=object)[rng.choice(len(pool), n_names, p=p / p.sum())],
+                     name="drug_raw")
+
+
+# ── 原逐行实现 (无缓存, 逐个模式 search) ──
+
+def _old_is_non_drug(name: str) -> bool:
+    s = name.strip().lower()
+    return any(pat.search(s) for pat in nz._NON_DRUG_PATTERNS)
+
+
+def _old_strip_dosage(s: str) -> str:
+    s = nz._DOSAGE_RE.sub("", s).strip()
+    return nz._FORMULATION_SUFFIXES.sub("", s).strip()
+
+
+def _old_clean(name: str) -> str:
+    s = name.strip().lower().rstrip(":")
+    if " and " in s:
+        parts = [p.strip() for p in s.split(" and ")]
+    elif ", " in s:
+        parts = [p.strip() for p in s.split(", ")]
+    else:
+        parts = [s]
+    cleaned = [p for p in (_old_strip_dosage(p) for p in parts) if p]
+    return " + ".join(cleaned) if cleaned else name.strip().lower()
+
+
+def per_row(names: pd.Series) -> tuple[pd.Series, pd.Series, pd.Series]:
+    mask = names.apply(_old_is_non_drug)
+    clean = names.apply(_old_clean)
+    salt = clean.map(nz.strip_salt_form.__wrapped__)
+    return mask, clean, salt
+
+
+def shared(names: pd.Series) -> tuple[pd.Series, pd.Series, pd.Series]:
+    mask = nz.non_drug_mask(names)
+    clean = nz.clean_drug_names(names)
+    salt = nz.strip_salt_forms(clean)
+    return mask, clean, salt
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-names", type=int, default=100_000)
+    parser.add_argument("--n-unique", type=int, default=8_000)
+    args = parser.parse_args()
+
+    names = make_names(args.n_names, args.n_unique)
+    print(f"names       : {len(names)} ({names.nunique()} unique)")
+
+    t0 = time.perf_counter()
+    ref = per_row(names)
+    t_ref = time.perf_counter() - t0
+    print(f"per-row     : {t_ref:8.3f}s")
+
+    nz.clear_cache()
+    t0 = time.perf_counter()
+    cold = shared(names)
+    t_cold = time.perf_counter() - t0
+    print(f"shared cold : {t_cold:8.3f}s  speedup x{t_ref / max(t_cold, 1e-9):.1f}")
+
+    t0 = time.perf_counter()
+    warm = shared(names)
+    t_warm = time.perf_counter() - t0
+    print(f"shared warm : {t_warm:8.3f}s  speedup x{t_ref / max(t_warm, 1e-9):.1f}")
+
+    same = all(a.equals(b.astype(a.dtype)) for out in (cold, warm) for a, b in zip(ref, out))
+    print(f"identical output: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Benchmark: Pathway→Disease aggregation, groupby lambda vs vectorized vs global store slice.
+
+Generates a synthetic gene_pathway / gene_disease pair and times:
+
+  - lambda:     the previous per-run build (``groupby.agg`` with Python
+                ``nlargest(3).mean()`` and first-non-null ``diseaseName`` lambdas)
+  - vectorized: ``aggregate_pathway_disease`` (lexsort + bincount top-3 mean)
+  - store:      one-off ``build_pathway_disease_store`` build, then slicing one
+                run's pathways (and a single disease partition) out of it
+
+lambda and vectorized outputs are compared exactly.
+
+Usage:
+    python scripts/bench_pathway_disease.py
+    python scripts/bench_pathway_disease.py --n-genes 20000 --n-diseases 5000 --assoc-per-gene 150
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.builders.edges import aggregate_pathway_disease
+from kg_explain.builders.pathway_disease_store import build_pathway_disease_store, read_pathway_disease_store
+
+
+def make_data(n_genes: int, n_pathways: int, n_diseases: int, assoc_per_gene: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    genes = np.array([f"ENSG{i:011d}" for i in range(n_genes)])
+    n_gp = n_genes * 6
+    gp = pd.DataFrame({
+        "ensembl_gene_id": genes[rng.integers(0, n_genes, n_gp)],
+        "reactome_stid": [f"R-HSA-{p}" for p in rng.zipf(1.3, n_gp) % n_pathways],
+    }).drop_duplicates()
+    gp["reactome_name"] = "Pathway " + gp["reactome_stid"]
+    n_ot = n_genes * assoc_per_gene
+    did = rng.integers(0, n_diseases, n_ot)
+    ot = pd.DataFrame({
+        "targetId": np.repeat(genes, assoc_per_gene),
+        "diseaseId": [f"EFO_{d:07d}" for d in did],
+        "diseaseName": [f"disease {d}" for d in did],
+        "score": np.round(rng.beta(1, 5, n_ot), 6).astype(str),
+    }).drop_duplicates(subset=["targetId", "diseaseId"])
+    return gp.astype(str), ot
+
+
+def lambda_aggregate(gp: pd.DataFrame, ot: pd.DataFrame) -> pd.DataFrame:
+    """原 build_pathway_disease 的聚合 (对照组)"""
+    genes = set(gp["ensembl_gene_id"].dropna().astype(str).tolist())
+    ot = ot[ot["targetId"].isin(genes)].copy()
+    ot["score_f"] = pd.to_numeric(ot["score"], errors="coerce").fillna(0.0)
+    j = gp.merge(ot, left_on="ensembl_gene_id", right_on="targetId", how="inner")
+    agg = j.groupby(["reactome_stid", "diseaseId"], as_index=False).agg(
+        pathway_score=("score_f", lambda s: s.nlargest(3).mean()),
+        support_genes=("ensembl_gene_id", "nunique"),
+        diseaseName=("diseaseName", lambda x: x.dropna().iloc[0] if len(x.dropna()) else ""),
+    )
+    return agg[agg["pathway_score"] > 0].reset_index(drop=True)
+
+
+def timed(label: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    print(f"{label:<26}: {time.perf_counter() - t0:7.2f}s")
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-genes", type=int, default=2000)
+    parser.add_argument("--n-pathways", type=int, default=2000)
+    parser.add_argument("--n-diseases", type=int, default=1000)
+    parser.add_argument("--assoc-per-gene", type=int, default=30, help="每个基因的疾病关联数")
+    parser.add_argument("--run-frac", type=float, default=0.1, help="单次运行覆盖的基因比例 (切片用)")
+    args = parser.parse_args()
+
+    gp, ot = make_data(args.n_genes, args.n_pathways, args.n_diseases, args.assoc_per_gene)
+    print(f"gene_pathway: {len(gp):,} rows, gene_disease: {len(ot):,} rows")
+
+    old = timed("lambda (per-run)", lambda_aggregate, gp, ot)
+    new = timed("vectorized (per-run)", aggregate_pathway_disease, gp, ot)
+    pd.testing.assert_frame_equal(old, new, check_exact=True)
+    print(f"identical: {len(new):,} pathway-disease edges")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src"
+        src.mkdir()
+        gp.to_csv(src / "edge_gene_pathway.csv", index=False)
+        ot.to_csv(src / "edge_target_disease_ot.csv", index=False)
+        store = Path(tmp) / "store"
+        meta = timed("store build (once)", build_pathway_disease_store, [src], store)
+        print(f"store format: {meta['format']}, {meta['n_diseases']:,} partitions")
+
+        run_genes = gp["ensembl_gene_id"].drop_duplicates().sample(frac=args.run_frac, random_state=0)
+        pathways = gp.loc[gp["ensembl_gene_id"].isin(run_genes), "reactome_stid"].unique().tolist()
+        sliced = timed(f"store slice ({len(pathways)} pathways)", read_pathway_disease_store,
+                       store, pathways=pathways)
+        one = timed("store slice (1 disease)", read_pathway_disease_store,
+                    store, diseases=[new["diseaseId"].iloc[0]])
+        print(f"slice rows: {len(sliced):,} / {len(one):,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Benchmark: per-drug vs precomputed penalties in run_ranker Pass 1.
+
+Generates a synthetic 5k-drug x 200-disease input (FAERS signals, failed
+trials with conditions, disease phenotypes, DTPD pair scores), then times
+the previous per-drug / per-disease mask filtering loop against
+``rankers.penalties.PenaltyTables`` and checks that both produce the same
+scored pair table.
+
+Usage:
+    python scripts/bench_penalties.py
+    python scripts/bench_penalties.py --n-drugs 1000 --pairs-per-drug 20
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+
+from kg_explain.rankers.penalties import PenaltyTables, is_serious_ae
+from kg_explain.utils import safe_str
+
+SERIOUS = ["death", "fatal", "life-threatening", "hospitalisation", "disability"]
+CONDITION = "atherosclerosis"
+W_SAFETY, W_TRIAL, W_PHENO, PHENO_CAP, MIN_PRR = 0.3, 0.2, 0.1, 10, 0.0
+
+
+def make_inputs(n_drugs: int, n_diseases: int, pairs_per_drug: int, seed: int = 0):
+    """合成 pair_dtpd / ae_df / trial_ae_df / phe_df (与 run_ranker 读入后的格式一致)"""
+    rng = np.random.default_rng(seed)
+    drugs = np.array([f"drug{i}" for i in range(n_drugs)])
+    diseases = np.array([f"EFO_{i:05d}" for i in range(n_diseases)])
+
+    d = np.repeat(drugs, pairs_per_drug)
+    s = diseases[rng.integers(0, n_diseases, len(d))]
+    pair = pd.DataFrame({"drug_normalized": d, "diseaseId": s}).drop_duplicates()
+    pair["diseaseName"] = "Disease " + pair["diseaseId"]
+    pair["final_score"] = rng.random(len(pair)).astype(str)
+    pair = pair.astype(str).reset_index(drop=True)
+
+    k = n_drugs * 30
+    terms = np.array([f"ae_{i}" for i in range(2000)] + ["death", "fatal arrhythmia", "hospitalisation"])
+    ae_df = pd.DataFrame({
+        "drug_normalized": drugs[rng.integers(0, n_drugs, k)],
+        "ae_term": terms[rng.integers(0, len(terms), k)],
+        "report_count": rng.integers(1, 5000, k).astype(float),
+        "prr": (rng.random(k) * 10).round(6),
+    })
+
+    k = n_drugs * 4
+    conds = np.array(["Atherosclerosis", "Heart Failure|Atherosclerosis", "Breast Cancer",
+                      "Coronary Artery Disease", "Diabetes|Obesity", ""])
+    trial_ae_df = pd.DataFrame({
+        "drug_normalized": drugs[rng.integers(0, n_drugs, k)],
+        "nctId": [f"NCT{i:08d}" for i in range(k)],
+        "is_safety_stop": rng.choice(["0", "1"], k),
+        "is_efficacy_stop": rng.choice(["0", "1"], k),
+        "overallStatus": "TERMINATED",
+        "conditions": conds[rng.integers(0, len(conds), k)],
+    }).astype(str)
+
+    k = n_diseases * 15
+    phe_df = pd.DataFrame({
+        "diseaseId": diseases[rng.integers(0, n_diseases, k)],
+        "phenotypeId": [f"HP_{i:07d}" for i in rng.integers(0, 5000, k)],
+        "phenotypeName": "phenotype",
+        "score": rng.random(k).round(4).astype(str),
+    })
+    return pair, ae_df, trial_ae_df, phe_df
+
+
+def score_rowwise(pair, ae_df, trial_ae_df, phe_df) -> pd.DataFrame:
+    """重构前 run_ranker Pass 1 的逐药物实现 (布尔掩码过滤 + 每行编译正则)"""
+    def calc_safety_penalty(drug):
+        drug_aes = ae_df[ae_df["drug_normalized"] == str(drug).lower().strip()]
+        if drug_aes.empty:
+            return 0.0
+        penalty = 0.0
+        # stable: 同分 PRR 按文件顺序 (与 PenaltyTables 一致)
+        for _, ae in drug_aes.sort_values("prr", ascending=False, kind="stable").head(10).iterrows():
+            count, prr = float(ae["report_count"]), float(ae["prr"])
+            if MIN_PRR > 0 and prr < MIN_PRR:
+                continue
+            if prr > 0:
+                ae_penalty = (np.log1p(prr) / 5.0) * min(1.0, np.log1p(count) / np.log1p(100))
+            else:
+                ae_penalty = np.log1p(count) / 20.0
+            if is_serious_ae(ae["ae_term"], SERIOUS):
+                ae_penalty *= 2.0
+            penalty += ae_penalty
+        return min(float(np.tanh(penalty)), 1.0)
+
+    def matches(conditions_str):
+        if not conditions_str:
+            return False
+        target_pattern = re.compile(r'\b' + re.escape(CONDITION) + r'\b', re.IGNORECASE)
+        for cond in conditions_str.split("|"):
+            cond_lower = cond.strip().lower()
+            if not cond_lower:
+                continue
+            if target_pattern.search(cond_lower):
+                return True
+            cond_pattern = re.compile(r'\b' + re.escape(cond_lower) + r'\b', re.IGNORECASE)
+            if len(cond_lower) >= 5 and cond_pattern.search(CONDITION):
+                return True
+        return False
+
+    def calc_trial_penalty(drug):
+        drug_trials = trial_ae_df[trial_ae_df["drug_normalized"] == drug.lower().strip()]
+        if drug_trials.empty:
+            return 0.0
+        safety_stops = len(drug_trials[drug_trials["is_safety_stop"].astype(str) == "1"])
+        eff_mask = drug_trials["is_efficacy_stop"].astype(str) == "1"
+        efficacy_stops = int((eff_mask & drug_trials["conditions"].fillna("").apply(matches)).sum())
+        return min(0.1 * np.log1p(safety_stops) + 0.05 * np.log1p(efficacy_stops), 1.0)
+
+    def phenotype_boost(disease_id):
+        scores = [float(x) for x in phe_df[phe_df["diseaseId"] == disease_id].head(PHENO_CAP)["score"]]
+        if not scores:
+            return 0.0
+        return W_PHENO * (sum(scores) / len(scores)) * np.log1p(len(scores))
+
+    safety_cache, trial_cache, pheno_cache, rows = {}, {}, {}, []
+    for _, pr in pair.iterrows():
+        drug, disease_id = safe_str(pr["drug_normalized"]), safe_str(pr["diseaseId"])
+        base_score = float(pd.to_numeric(pr["final_score"], errors="coerce") or 0)
+        if drug not in safety_cache:
+            safety_cache[drug] = calc_safety_penalty(drug)
+            trial_cache[drug] = calc_trial_penalty(drug)
+        if disease_id not in pheno_cache:
+            pheno_cache[disease_id] = phenotype_boost(disease_id)
+        sp, tp, pb = safety_cache[drug], trial_cache[drug], pheno_cache[disease_id]
+        risk = np.exp(-W_SAFETY * sp - W_TRIAL * tp)
+        rows.append({
+            "safety_penalty": round(sp, 4),
+            "trial_penalty": round(tp, 4),
+            "risk_multiplier": round(float(risk), 4),
+            "phenotype_boost": round(float(pb), 4),
+            "phenotype_multiplier": round(float(1.0 + pb), 4),
+            "final_score": round(base_score * risk * (1.0 + pb), 4),
+        })
+    return pd.DataFrame(rows)
+
+
+def score_vectorized(pair, ae_df, trial_ae_df, phe_df) -> pd.DataFrame:
+    tables = PenaltyTables(ae_df, trial_ae_df, phe_df, has_prr=True, serious_keywords=SERIOUS,
+                           min_prr=MIN_PRR, condition=CONDITION, phenotype_cap=PHENO_CAP,
+                           phenotype_boost_w=W_PHENO)
+    return tables.apply(pair["drug_normalized"].map(safe_str), pair["diseaseId"].map(safe_str),
+                        pd.to_numeric(pair["final_score"], errors="coerce"), W_SAFETY, W_TRIAL)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-drugs", type=int, default=5000)
+    parser.add_argument("--n-diseases", type=int, default=200)
+    parser.add_argument("--pairs-per-drug", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-rowwise", action="store_true", help="只计时预计算实现")
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.n_drugs, args.n_diseases, args.pairs_per_drug, args.seed)
+    print(f"pairs: {len(inputs[0])}, ae rows: {len(inputs[1])}, "
+          f"trial rows: {len(inputs[2])}, phenotype rows: {len(inputs[3])}")
+
+    t0 = time.perf_counter()
+    vec = score_vectorized(*inputs)
+    t_vec = time.perf_counter() - t0
+    print(f"precomputed : {t_vec:8.2f}s")
+
+    if not args.skip_rowwise:
+        t0 = time.perf_counter()
+        row = score_rowwise(*inputs)
+        t_row = time.perf_counter() - t0
+        print(f"per-drug    : {t_row:8.2f}s  speedup x{t_row / max(t_vec, 1e-9):.1f}")
+        same = row.equals(vec.reset_index(drop=True)[row.columns])
+        print(f"identical scores: {same}")
+        if not same:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
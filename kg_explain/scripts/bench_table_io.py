@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Benchmark: intermediate table I/O, CSV vs Parquet (kg_explain.utils.read_table).
+
+Writes the synthetic data_dir from ``bench_build_kg.make_fixture`` in each
+table format, then loads the ranking inputs (edge_drug_target,
+edge_target_pathway_all, edge_pathway_disease, edge_drug_ae_faers) in a
+fresh subprocess per mode and reports load time and peak RSS:
+
+  - csv-str:     previous path — read_csv(dtype=str) + pd.to_numeric per column
+  - csv:         read_table on CSV (same parse, schema-driven coercion)
+  - parquet:     read_table on Parquet (typed columns, IDs decoded to strings)
+  - parquet-cat: read_table(categorical=True) — IDs kept as category
+
+Parquet modes need pyarrow and are skipped without it.
+
+Usage:
+    python scripts/bench_table_io.py
+    python scripts/bench_table_io.py --n-edges 3000000 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_build_kg import make_fixture
+from kg_explain import utils
+from kg_explain.utils import TABLE_SCHEMAS, read_csv, read_table, write_table
+
+TABLES = ["edge_drug_target", "edge_target_pathway_all", "edge_pathway_disease", "edge_drug_ae_faers"]
+MODES = ["csv-str", "csv", "parquet", "parquet-cat"]
+
+
+def load(mode: str, data_dir: Path) -> int:
+    """加载排序输入表, 返回总行数"""
+    n = 0
+    for name in TABLES:
+        path = data_dir / f"{name}.csv"
+        if mode == "csv-str":
+            df = read_csv(path, dtype=str)
+            for col in TABLE_SCHEMAS[name]["numeric"]:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        else:
+            df = read_table(path, categorical=(mode == "parquet-cat"))
+        n += len(df)
+    return n
+
+
+def _peak_rss_mb() -> float:
+    """进程峰值 RSS (MB); Linux 读 VmHWM (可被 clear_refs 重置), 否则用 ru_maxrss"""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode: str, data_dir: Path) -> None:
+    # ru_maxrss 会跨 exec 继承父进程的峰值, 先重置 VmHWM
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+    base = _peak_rss_mb()
+    t0 = time.perf_counter()
+    n = load(mode, data_dir)
+    dt = time.perf_counter() - t0
+    peak = _peak_rss_mb()
+    print(json.dumps({"rows": n, "sec": dt, "peak_mb": peak, "delta_mb": peak - base}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-edges", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=1, help="每种模式运行次数 (取最快)")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], Path(args.child[1]))
+        return 0
+
+    modes = MODES if utils.pyarrow is not None else MODES[:2]
+    if utils.pyarrow is None:
+        print("pyarrow 未安装: 只比较 CSV 模式")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_dir = Path(tmp) / "csv"
+        csv_dir.mkdir()
+        make_fixture(csv_dir, args.n_edges)
+        dirs = {"csv-str": csv_dir, "csv": csv_dir}
+        if utils.pyarrow is not None:
+            pq_dir = Path(tmp) / "parquet"
+            t0 = time.perf_counter()
+            for name in TABLES:
+                write_table(read_csv(csv_dir / f"{name}.csv"), pq_dir / f"{name}.csv", fmt="parquet")
+            print(f"parquet write: {time.perf_counter() - t0:.2f}s")
+            dirs["parquet"] = dirs["parquet-cat"] = pq_dir
+
+        for mode in modes:
+            d = dirs[mode]
+            size = sum(f.stat().st_size for f in d.iterdir() if f.stem in TABLES) / 2**20
+            runs = [json.loads(subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(d)],
+                check=True, capture_output=True, text=True).stdout)
+                for _ in range(max(1, args.repeat))]
+            best = min(runs, key=lambda r: r["sec"])
+            print(f"{mode:<12}: load {best['sec']:6.2f}s  peak RSS {best['peak_mb']:7.1f} MB "
+                  f"(+{best['delta_mb']:.1f})  files {size:6.1f} MB  rows {best['rows']:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
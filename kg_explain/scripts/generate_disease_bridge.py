@@ -20,6 +20,11 @@ Usage examples:
     python scripts/generate_disease_bridge.py \\
         --disease-ids EFO_0003914,MONDO_0021661 \\
         --out output/bridge_origin_reassess.csv
+
+    # Path scores from the ranker's evidence packs (any rank.evidence_pack_format)
+    python scripts/generate_disease_bridge.py \\
+        --disease atherosclerosis \\
+        --evidence-packs output/
 """
 from __future__ import annotations
 
@@ -40,7 +45,9 @@ import yaml
 _project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(_project_root / "src"))
 
+from kg_explain.evidence_pack import EvidencePackStore
 from kg_explain.rankers.uncertainty import assign_confidence_tier, bootstrap_ci
+from kg_explain.utils import read_table, resolve_table
 
 logging.basicConfig(
     level=logging.INFO,
@@ -70,11 +77,11 @@ def _build_drug_target_map(data_dir: Path) -> Dict[str, List[dict]]:
     nt_path = data_dir / "node_target.csv"
     xref_path = data_dir / "target_xref.csv"
 
-    if not dt_path.exists():
+    if resolve_table(dt_path) is None:
         logger.warning("edge_drug_target.csv not found, skipping target enrichment")
         return {}
 
-    dt = pd.read_csv(dt_path, dtype=str).fillna("")
+    dt = read_table(dt_path, typed=False).fillna("")
 
     # target_chembl_id → pref_name
     target_names: Dict[str, str] = {}
@@ -255,11 +262,19 @@ def build_bridge(
     ci_level: float = 0.95,
     seed: int = 42,
     data_dir: Optional[str] = None,
+    evidence_packs: Optional[str] = None,
 ) -> pd.DataFrame:
-    """Build the origin-disease reassessment bridge DataFrame."""
+    """Build the origin-disease reassessment bridge DataFrame.
+
+    If ``evidence_packs`` is given (output dir, ``evidence_pack/`` dir, index
+    or SQLite file), path scores come from the ranker's evidence packs — i.e.
+    only the top-K explainable paths of surviving pairs — instead of the full
+    ``paths_path`` JSONL.
+    """
 
     # 1. Load V3
-    v3 = pd.read_csv(v3_path)
+    v3_file = resolve_table(Path(v3_path))
+    v3 = pd.read_parquet(v3_file) if v3_file is not None and v3_file.suffix == ".parquet" else pd.read_csv(v3_path)
     logger.info("V3 loaded: %d rows, %d drugs", len(v3), v3["drug_normalized"].nunique())
 
     # 2. Filter to target disease
@@ -343,7 +358,16 @@ def build_bridge(
     pair_scores: Dict[str, List[float]] = defaultdict(list)
     disease_id_set = set(disease_rows["diseaseId"].unique())
     pp = Path(paths_path)
-    if pp.exists():
+    if evidence_packs:
+        with EvidencePackStore.open(evidence_packs) as store:
+            for pack in store.iter_disease(disease_id_set):
+                drug = str(pack.get("drug", "")).lower().strip()
+                for p in pack.get("explainable_paths", []):
+                    if p.get("path_score") is not None:
+                        pair_scores[drug].append(float(p["path_score"]))
+        logger.info("Evidence packs (%s): %d drugs with %d total paths", evidence_packs,
+                    len(pair_scores), sum(len(v) for v in pair_scores.values()))
+    elif pp.exists():
         with open(pp, "r", encoding="utf-8") as f:
             for line in f:
                 try:
@@ -480,6 +504,9 @@ def main():
     parser.add_argument("--paths", type=str,
                         default=str(_project_root / "output" / "dtpd_paths.jsonl"),
                         help="DTPD evidence paths JSONL path")
+    parser.add_argument("--evidence-packs", type=str, default=None,
+                        help="Read path scores from ranker evidence packs instead of --paths "
+                             "(output dir, evidence_pack/, evidence_paths.idx.json or evidence_pack.sqlite)")
     parser.add_argument("--chembl", type=str,
                         default=str(_project_root / "data" / "drug_chembl_map.csv"),
                         help="ChEMBL mapping CSV path")
@@ -514,6 +541,7 @@ def main():
         n_bootstrap=args.n_bootstrap,
         seed=args.seed,
         data_dir=args.data_dir,
+        evidence_packs=args.evidence_packs,
     )
 
     out = Path(args.out)
@@ -0,0 +1,233 @@
+"""
+多疾病批量运行 — 共享、带版本的实体存储
+
+`python -m kg_explain batch --disease-list ops/disease_list_commercial_batch2.txt`
+
+单疾病管道里, drug→target / target→pathway / UniProt→Ensembl / FAERS 等
+实体级数据只由药物/靶点决定, 与疾病无关; 同一批疾病的药物高度重叠,
+逐个运行时这些实体被重复拉取. 批量模式分三段:
+
+  1. discover (按疾病并行): CT.gov 失败试验 / 签名反查, 得到每个疾病的药物
+  2. prefetch (共享): 合并全部疾病的药物集合 (universe), 对并集运行一遍
+     实体级数据源, 每个实体只请求一次 (ChEMBL 走 __in 批量), 响应写入
+     entity_store/<version>/http_cache.sqlite
+  3. per-disease (进程池并行): 每个疾病照常运行完整管道, HTTP 缓存指向实体
+     存储 — 实体查询全部命中, 疾病专属步骤 (CT.gov, 通路→疾病, 排序) 与
+     单独运行走同一代码路径, 因此产出与逐个运行一致
+
+实体存储按版本目录隔离 (默认 日期-疾病列表哈希), 同一版本内数据不过期,
+整批疾病看到同一份实体快照.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from .cache import HTTPCache
+from .config import ensure_dir
+from .utils import concurrent_map, read_csv, read_table, resolve_table, safe_str, write_json, write_table
+from . import datasources
+
+logger = logging.getLogger(__name__)
+
+STORE_DIRNAME = "entity_store"
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class DiseaseEntry:
+    """disease list 中的一行 (批量模式只使用 disease_key)"""
+    key: str
+
+
+def read_disease_list(path: Path) -> list[DiseaseEntry]:
+    """
+    读取 ops/disease_list_*.txt (| 分隔, # 开头为注释, 重复 key 只保留第一次出现).
+
+    只取第一列 disease_key: 疾病参数来自 configs/diseases/<disease_key>.yaml,
+    其余列 (query / origin_ids / inject_yaml) 供 ops/internal/runner.sh 使用, 这里忽略.
+    """
+    entries: dict[str, DiseaseEntry] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            key = line.split("|", 1)[0].strip()
+            if key and key not in entries:
+                entries[key] = DiseaseEntry(key=key)
+    return list(entries.values())
+
+
+class EntityStore:
+    """
+    带版本的共享实体存储: <root>/<version>/{http_cache.sqlite, universe/, manifest.json}.
+    """
+
+    def __init__(self, root: Path, version: str):
+        self.root = Path(root)
+        self.version = version
+        self.dir = ensure_dir(self.root / version)
+
+    @staticmethod
+    def default_version(entries: list[DiseaseEntry]) -> str:
+        """日期 + 疾病列表哈希: 同一天重跑同一批次复用同一份存储."""
+        keys = ",".join(sorted(e.key for e in entries))
+        digest = hashlib.sha1(keys.encode("utf-8")).hexdigest()[:8]
+        return f"{datetime.now(timezone.utc):%Y%m%d}-{digest}"
+
+    @property
+    def universe_dir(self) -> Path:
+        return ensure_dir(self.dir / "universe")
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.dir / MANIFEST_NAME
+
+    def cache(self, max_workers: int = 1, compress: str = "none") -> HTTPCache:
+        """实体存储的 HTTP 缓存 (单文件 SQLite, 版本内不过期, 多进程可并发读)."""
+        return HTTPCache(self.dir, max_workers=max_workers, ttl_seconds=0,
+                         backend="sqlite", compress=compress)
+
+    def load_manifest(self) -> dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def update_manifest(self, **fields: Any) -> dict[str, Any]:
+        manifest = self.load_manifest()
+        manifest.update(fields)
+        manifest.setdefault("version", self.version)
+        manifest["updated"] = datetime.now(timezone.utc).isoformat()
+        write_json(self.manifest_path, manifest)
+        return manifest
+
+
+def _concat_csv(paths: list[Path], out: Path, dedup: list[str] | None = None) -> int:
+    actual = [resolve_table(p) for p in paths]
+    frames = [read_table(p, typed=False) for p, a in zip(paths, actual) if a is not None and a.stat().st_size > 1]
+    frames = [f for f in frames if not f.empty]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not df.empty:
+        df = df.drop_duplicates(subset=dedup).reset_index(drop=True)
+    write_table(df, out)
+    return len(df)
+
+
+def build_universe(data_dirs: list[Path], universe_dir: Path, drug_source: str = "ctgov") -> dict[str, int]:
+    """
+    合并各疾病 discover 阶段的药物文件, 写入 universe_dir.
+
+    ctgov:     failed_trials_drug_rows.csv (按 drug_raw 去重, 实体查询只看药物名)
+    signature: drug_chembl_map.csv + edge_drug_target.csv
+
+    Returns:
+        各文件合并后的行数
+    """
+    counts: dict[str, int] = {}
+    if drug_source == "signature":
+        counts["drug_chembl_map"] = _concat_csv(
+            [d / "drug_chembl_map.csv" for d in data_dirs], universe_dir / "drug_chembl_map.csv",
+            dedup=["chembl_id"],
+        )
+        counts["edge_drug_target"] = _concat_csv(
+            [d / "edge_drug_target.csv" for d in data_dirs], universe_dir / "edge_drug_target.csv",
+            dedup=["drug_normalized", "molecule_chembl_id", "target_chembl_id"],
+        )
+    else:
+        counts["failed_trials_drug_rows"] = _concat_csv(
+            [d / "failed_trials_drug_rows.csv" for d in data_dirs],
+            universe_dir / "failed_trials_drug_rows.csv",
+            dedup=["drug_raw"],
+        )
+    logger.info("实体 universe: %s", counts)
+    return counts
+
+
+def prefetch_entities(
+    universe_dir: Path,
+    cache: HTTPCache,
+    drug_source: str = "ctgov",
+    faers_cfg: dict | None = None,
+    core_disease_ids: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    对 universe 运行一遍实体级数据源 (与单疾病管道 Step 2-10 的请求一致), 预填实体存储.
+
+    只拉取与疾病无关的实体数据; 疾病专属步骤 (通路→疾病边, 排序) 不在这里运行.
+    单个数据源失败只记日志 — 未预取的实体在疾病阶段按需请求, 结果不受影响.
+
+    Returns:
+        步骤计时列表
+    """
+    faers_cfg = faers_cfg or {}
+    timings: list[dict[str, Any]] = []
+
+    def _step(name, fn, *args, **kwargs):
+        t0 = time.time()
+        try:
+            fn(*args, **kwargs)
+            status = {"status": "ok"}
+        except Exception as e:
+            logger.warning("实体预取失败: %s (%s)", name, e)
+            status = {"status": "error", "error": str(e)}
+        timings.append({"step": name, "elapsed_sec": round(time.time() - t0, 2), **status})
+        logger.info("实体预取 %s: %.1fs", name, timings[-1]["elapsed_sec"])
+
+    d = universe_dir
+    if drug_source != "signature":
+        _step("rxnorm", datasources.rxnorm_map, d, cache)
+        _step("canonical", datasources.build_drug_canonical, d)
+        _step("chembl_map", datasources.chembl_map, d, cache)
+        _step("drug_targets", datasources.fetch_drug_targets, d, cache)
+    _step("affinities", datasources.fetch_drug_target_affinities, d, cache)
+    _step("target_xrefs", datasources.fetch_target_xrefs, d, cache)
+    _step("ensembl", datasources.target_to_ensembl, d, cache)
+    _step("pathways", datasources.fetch_target_pathways, d, cache)
+    _step("gene_diseases", datasources.fetch_gene_diseases, d, cache)
+
+    drugs_df = read_csv(d / "drug_chembl_map.csv", dtype=str) if (d / "drug_chembl_map.csv").exists() \
+        else pd.DataFrame()
+    drugs: list[str] = []
+    for col in ["canonical_name", "drug_raw"]:
+        if col in drugs_df.columns:
+            drugs = drugs_df[col].dropna().unique().tolist()
+            if drugs:
+                break
+    if drugs:
+        _step("faers", datasources.fetch_drug_ae, d, cache, drugs,
+              min_count=int(faers_cfg.get("min_report_count", 5)),
+              min_prr=float(faers_cfg.get("min_prr", 0)),
+              top_ae=int(faers_cfg.get("top_ae_per_drug", 50)),
+              max_drugs=len(drugs))
+
+    # 表型: 并集疾病 ID (各疾病 core_disease_ids 在疾病阶段按需补充)
+    ot_path = d / "edge_target_disease_ot.csv"
+    if ot_path.exists() and ot_path.stat().st_size > 1:
+        diseases = read_csv(ot_path, dtype=str)["diseaseId"].dropna().unique().tolist()
+        for did in core_disease_ids or []:
+            if did and did not in diseases:
+                diseases.append(did)
+        _step("phenotypes", _warm_phenotypes, d, cache, diseases)
+
+    mol_ids = sorted({safe_str(m) for m in drugs_df.get("chembl_id", pd.Series(dtype=str)).dropna()
+                      if safe_str(m)})
+    if mol_ids:
+        _step("known_indications", concurrent_map,
+              lambda m: datasources.fetch_known_indications(cache, m), mol_ids,
+              max_workers=cache.max_workers, desc="ChEMBL drug_indication")
+    return timings
+
+
+def _warm_phenotypes(data_dir: Path, cache: HTTPCache, diseases: list[str]) -> None:
+    # 请求只取决于疾病 ID; min_score / max_phenotypes 是本地过滤, 取最宽松值
+    datasources.fetch_disease_phenotypes(data_dir, cache, diseases, min_score=0.0, max_phenotypes=10**6)
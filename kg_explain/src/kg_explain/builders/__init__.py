@@ -5,7 +5,12 @@
   - gene_pathway: 基因-通路关系
   - pathway_disease: 通路-疾病关系
   - trial_ae: 试验-不良事件关系
+  - pathway_disease_store: 全局通路×疾病表 (离线构建, 按 diseaseId 分区)
 """
 from .edges import build_gene_pathway, build_pathway_disease, build_trial_ae
+from .pathway_disease_store import build_pathway_disease_store, read_pathway_disease_store
 
-__all__ = ["build_gene_pathway", "build_pathway_disease", "build_trial_ae"]
+__all__ = [
+    "build_gene_pathway", "build_pathway_disease", "build_trial_ae",
+    "build_pathway_disease_store", "read_pathway_disease_store",
+]
@@ -10,10 +10,11 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from ..config import Config
-from ..utils import read_csv, require_cols, safe_str, load_canonical_map
+from ..utils import read_csv, read_table, require_cols, safe_str, load_canonical_map, write_table
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ def build_gene_pathway(cfg: Config) -> Path:
     data_dir = cfg.data_dir
     files = cfg.files
 
-    tp = read_csv(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv"), dtype=str)
+    tp = read_table(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv"), typed=False)
     m = read_csv(data_dir / files.get("target_ensembl", "target_chembl_to_ensembl_all.csv"), dtype=str)
 
     require_cols(tp, {"target_chembl_id", "reactome_stid"}, "edge_target_pathway")
@@ -55,63 +56,111 @@ def build_gene_pathway(cfg: Config) -> Path:
     return out
 
 
-def build_pathway_disease(cfg: Config) -> Path:
+# Filter non-disease traits using ALLOWLIST of valid disease ontology prefixes.
+# Rationale: blocklist (old: GO_, MP_) was incomplete — HP: phenotypes,
+# NCIT: non-disease entities, measurement traits in EFO, etc. all slipped through.
+# Allowlist is safer: only known disease ontology prefixes pass.
+_VALID_DISEASE_PREFIXES = (
+    "EFO_", "EFO:", "MONDO_", "MONDO:", "DOID_", "DOID:", "OMIM:",
+    "Orphanet_", "OTAR_",
+)
+PATHWAY_DISEASE_COLS = ["reactome_stid", "diseaseId", "pathway_score", "support_genes", "diseaseName"]
+
+
+def _group_top_k_mean(codes: np.ndarray, values: np.ndarray, n_groups: int, k: int) -> np.ndarray:
     """
-    构建通路-疾病关系
+    每组最大 k 个值的均值 (向量化, 等价于 groupby(...).agg(lambda s: s.nlargest(k).mean())).
 
-    聚合: gene_pathway + gene_disease → pathway_disease
+    组内按值降序排列, 取组内位置 < k 的元素, bincount 求和/计数.
     """
-    data_dir = cfg.data_dir
-    files = cfg.files
+    order = np.lexsort((-values, codes))
+    g, v = codes[order], values[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    pos = np.arange(len(g)) - np.repeat(starts, np.diff(np.r_[starts, len(g)]))
+    keep = pos < k
+    sums = np.bincount(g[keep], weights=v[keep], minlength=n_groups)
+    counts = np.bincount(g[keep], minlength=n_groups)
+    return sums / np.maximum(counts, 1)
 
-    gp = read_csv(data_dir / files.get("gene_pathway", "edge_gene_pathway.csv"), dtype=str)
-    ot = read_csv(data_dir / files.get("gene_disease", "edge_target_disease_ot.csv"), dtype=str)
 
+def aggregate_pathway_disease(gp: pd.DataFrame, ot: pd.DataFrame) -> pd.DataFrame:
+    """
+    基因-通路 × 基因-疾病 → 通路-疾病边 (不含 reactome_name).
+
+    Args:
+        gp: ensembl_gene_id, reactome_stid
+        ot: targetId, diseaseId, score (, diseaseName)
+
+    Returns:
+        PATHWAY_DISEASE_COLS 列, 按 (reactome_stid, diseaseId) 排序, 已去掉零分边
+    """
     require_cols(ot, {"targetId", "diseaseId", "score"}, "edge_gene_disease")
 
     genes = set(gp["ensembl_gene_id"].dropna().astype(str).tolist())
     ot = ot[ot["targetId"].isin(genes)].copy()
     ot["score_f"] = pd.to_numeric(ot["score"], errors="coerce").fillna(0.0)
+    if "diseaseName" not in ot.columns:
+        ot["diseaseName"] = np.nan
 
-    # Filter non-disease traits using ALLOWLIST of valid disease ontology prefixes.
-    # Rationale: blocklist (old: GO_, MP_) was incomplete — HP: phenotypes,
-    # NCIT: non-disease entities, measurement traits in EFO, etc. all slipped through.
-    # Allowlist is safer: only known disease ontology prefixes pass.
-    _valid_disease_prefixes = (
-        "EFO_", "EFO:", "MONDO_", "MONDO:", "DOID_", "DOID:", "OMIM:",
-        "Orphanet_", "OTAR_",
-    )
     before = len(ot)
-    disease_id_str = ot["diseaseId"].astype(str)
-    mask = disease_id_str.str.startswith(_valid_disease_prefixes)
-    ot = ot[mask].copy()
+    mask = ot["diseaseId"].astype(str).str.startswith(_VALID_DISEASE_PREFIXES)
+    ot = ot[mask]
     n_filtered = before - len(ot)
     if n_filtered:
         logger.info("Filtered %d non-disease entries (kept only EFO/MONDO/DOID/OMIM/Orphanet prefixes)", n_filtered)
 
-    j = gp.merge(ot, left_on="ensembl_gene_id", right_on="targetId", how="inner")
+    j = gp[["ensembl_gene_id", "reactome_stid"]].merge(
+        ot[["targetId", "diseaseId", "score_f", "diseaseName"]],
+        left_on="ensembl_gene_id", right_on="targetId", how="inner",
+    ).dropna(subset=["reactome_stid", "diseaseId"])
 
     # v2: Use mean-of-top-3 instead of MAX for pathway-disease score.
     # Rationale: MAX is dominated by a single "celebrity gene" (APOE, TP53, etc.)
     # and inflates pathway scores for any pathway containing that gene.
     # Mean-of-top-3 requires at least some depth of evidence across multiple
     # pathway member genes while still rewarding strong individual associations.
-    def _top3_mean(scores):
-        top = scores.nlargest(3)
-        return top.mean()
-
-    agg = j.groupby(["reactome_stid", "diseaseId"], as_index=False).agg(
-        pathway_score=("score_f", _top3_mean),
+    grouped = j.groupby(["reactome_stid", "diseaseId"], sort=True)
+    agg = grouped.agg(
         support_genes=("ensembl_gene_id", "nunique"),
-        diseaseName=("diseaseName", lambda x: x.dropna().iloc[0] if len(x.dropna()) else ""),
-    )
+        diseaseName=("diseaseName", "first"),
+    ).reset_index()
+    agg.insert(2, "pathway_score", _group_top_k_mean(
+        grouped.ngroup().to_numpy(), j["score_f"].to_numpy(dtype=float), len(agg), 3,
+    ))
 
     # Filter zero-score edges
     before_zero = len(agg)
-    agg = agg[agg["pathway_score"] > 0]
+    agg = agg[agg["pathway_score"] > 0].reset_index(drop=True)
     n_zero = before_zero - len(agg)
     if n_zero:
         logger.info("Filtered %d zero-score pathway-disease edges", n_zero)
+    return agg[PATHWAY_DISEASE_COLS]
+
+
+def build_pathway_disease(cfg: Config) -> Path:
+    """
+    构建通路-疾病关系
+
+    聚合: gene_pathway + gene_disease → pathway_disease
+    配置 paths.pathway_disease_store 时, 从全局通路×疾病表切片本次运行的通路 (见 pathway_disease_store).
+    """
+    data_dir = cfg.data_dir
+    files = cfg.files
+
+    gp = read_csv(data_dir / files.get("gene_pathway", "edge_gene_pathway.csv"), dtype=str)
+
+    from .pathway_disease_store import STORE_META, read_pathway_disease_store
+
+    store = cfg.pathway_disease_store
+    if store is not None and (store / STORE_META).exists():
+        agg = read_pathway_disease_store(store, pathways=gp["reactome_stid"].dropna().unique().tolist())
+        agg = agg.drop(columns=["reactome_name"], errors="ignore")
+        logger.info("Pathway→Disease 从全局表切片: %s", store)
+    else:
+        if store is not None:
+            logger.warning("全局通路-疾病表不存在: %s, 改为按本次运行构建", store)
+        ot = read_csv(data_dir / files.get("gene_disease", "edge_target_disease_ot.csv"), dtype=str)
+        agg = aggregate_pathway_disease(gp, ot)
 
     if "reactome_name" in gp.columns:
         pn = gp[["reactome_stid", "reactome_name"]].drop_duplicates()
@@ -120,9 +169,7 @@ def build_pathway_disease(cfg: Config) -> Path:
     logger.info("Pathway→Disease 构建完成: %d 条边, %d 个通路, %d 个疾病",
                 len(agg), agg["reactome_stid"].nunique(), agg["diseaseId"].nunique())
 
-    out = data_dir / files.get("pathway_disease", "edge_pathway_disease.csv")
-    agg.to_csv(out, index=False)
-    return out
+    return write_table(agg, data_dir / files.get("pathway_disease", "edge_pathway_disease.csv"))
 
 
 def build_trial_ae(data_dir: Path) -> Path:
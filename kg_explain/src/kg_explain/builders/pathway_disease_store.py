@@ -0,0 +1,174 @@
+"""
+全局通路×疾病表 (离线构建, 各疾病运行切片复用)
+
+通路-疾病分数 (top-3 基因均值 + support_genes) 只由 基因-通路 与 基因-疾病
+两张表决定, 与具体运行的疾病无关. 离线对全部来源目录 (如批量运行的实体
+universe) 聚合一次, 按 diseaseId 分区写入:
+
+    <store>/_meta.json
+    <store>/diseaseId=<id>/...          Parquet (需 pyarrow), 否则 CSV 分区
+
+读取时按 diseaseId 裁剪分区, 按 reactome_stid 下推过滤 (Parquet), 运行时
+不再做 merge + groupby.
+
+注意: 全局表的通路分数基于来源目录的全部基因; 单次运行只包含本次药物的靶点
+基因, 当某通路在全局基因集中有更多成员时, 两者的 top-3 均值可能不同.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from ..utils import read_csv, read_table, require_cols, write_json
+from .edges import PATHWAY_DISEASE_COLS, aggregate_pathway_disease
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # 可选依赖: 未安装时写 CSV 分区
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+STORE_META = "_meta.json"
+PARTITION_COL = "diseaseId"
+STORE_COLS = PATHWAY_DISEASE_COLS + ["reactome_name"]
+
+
+def _load_gene_pathway(data_dir: Path, files: dict) -> pd.DataFrame:
+    """读取 edge_gene_pathway.csv; 不存在时由 target_pathway + target_to_ensembl 合并得到."""
+    gp_path = data_dir / files.get("gene_pathway", "edge_gene_pathway.csv")
+    if gp_path.exists():
+        gp = read_csv(gp_path, dtype=str)
+    else:
+        tp = read_table(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv"), typed=False)
+        m = read_csv(data_dir / files.get("target_ensembl", "target_chembl_to_ensembl_all.csv"), dtype=str)
+        require_cols(tp, {"target_chembl_id", "reactome_stid"}, "edge_target_pathway")
+        require_cols(m, {"target_chembl_id", "ensembl_gene_id"}, "target_to_ensembl")
+        gp = tp.merge(m, on="target_chembl_id", how="inner")
+    if "reactome_name" not in gp.columns:
+        gp["reactome_name"] = pd.NA
+    return gp[["ensembl_gene_id", "reactome_stid", "reactome_name"]].dropna(
+        subset=["ensembl_gene_id", "reactome_stid"]).drop_duplicates()
+
+
+def build_pathway_disease_store(source_dirs: list[Path], store_dir: Path, files: dict | None = None) -> dict:
+    """
+    合并各来源目录的 基因-通路 / 基因-疾病 表, 计算全局通路×疾病表并按 diseaseId 分区写入.
+
+    Args:
+        source_dirs: 含 edge_gene_pathway.csv (或 target_pathway + ensembl 映射) 与
+                     edge_target_disease_ot.csv 的数据目录
+        store_dir: 输出目录 (覆盖已有内容)
+        files: cfg.files (自定义文件名)
+
+    Returns:
+        _meta.json 内容
+    """
+    files = files or {}
+    gp_parts, ot_parts = [], []
+    for d in source_dirs:
+        d = Path(d)
+        ot_path = d / files.get("gene_disease", "edge_target_disease_ot.csv")
+        if not ot_path.exists():
+            logger.warning("跳过 %s: 缺少 %s", d, ot_path.name)
+            continue
+        gp_parts.append(_load_gene_pathway(d, files))
+        ot_parts.append(read_csv(ot_path, dtype=str))
+    if not gp_parts:
+        raise FileNotFoundError(f"没有可用的来源目录: {[str(d) for d in source_dirs]}")
+
+    gp = pd.concat(gp_parts, ignore_index=True).drop_duplicates()
+    ot = pd.concat(ot_parts, ignore_index=True)
+    ot = ot.drop_duplicates(subset=[c for c in ("targetId", "diseaseId", "score") if c in ot.columns])
+
+    agg = aggregate_pathway_disease(gp, ot)
+    names = gp[["reactome_stid", "reactome_name"]].dropna().drop_duplicates(subset=["reactome_stid"])
+    agg = agg.merge(names, on="reactome_stid", how="left")[STORE_COLS]
+
+    fmt = write_pathway_disease_partitions(agg, Path(store_dir))
+    meta = {
+        "format": fmt,
+        "partition_col": PARTITION_COL,
+        "n_rows": int(len(agg)),
+        "n_pathways": int(agg["reactome_stid"].nunique()),
+        "n_diseases": int(agg["diseaseId"].nunique()),
+        "n_genes": int(gp["ensembl_gene_id"].nunique()),
+        "sources": [str(d) for d in source_dirs],
+        "built": datetime.now(timezone.utc).isoformat(),
+    }
+    write_json(Path(store_dir) / STORE_META, meta)
+    logger.info("全局通路×疾病表: %d 条边, %d 个通路, %d 个疾病 → %s (%s)",
+                meta["n_rows"], meta["n_pathways"], meta["n_diseases"], store_dir, fmt)
+    return meta
+
+
+def write_pathway_disease_partitions(df: pd.DataFrame, store_dir: Path) -> str:
+    """按 diseaseId 分区写入 (Parquet 优先, 未安装 pyarrow 时写 CSV), 返回格式名."""
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    store_dir.mkdir(parents=True)
+    if pyarrow is not None:
+        df.to_parquet(store_dir, partition_cols=[PARTITION_COL], index=False)
+        return "parquet"
+    logger.warning("未安装 pyarrow, 全局通路×疾病表写为 CSV 分区")
+    for disease_id, part in df.groupby(PARTITION_COL, sort=False):
+        part_dir = store_dir / f"{PARTITION_COL}={quote(str(disease_id), safe='')}"
+        part_dir.mkdir()
+        part.drop(columns=[PARTITION_COL]).to_csv(part_dir / "part-0.csv", index=False)
+    return "csv"
+
+
+def read_pathway_disease_store(
+    store_dir: Path,
+    diseases: list[str] | None = None,
+    pathways: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    从全局表切片.
+
+    Args:
+        store_dir: build_pathway_disease_store 的输出目录
+        diseases: 只读取这些 diseaseId 的分区 (None = 全部)
+        pathways: 只保留这些 reactome_stid (Parquet 下推到行组过滤)
+
+    Returns:
+        STORE_COLS 列, 按 (reactome_stid, diseaseId) 排序
+    """
+    store_dir = Path(store_dir)
+    with open(store_dir / STORE_META, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") == "parquet":
+        if pyarrow is None:
+            raise ImportError(f"{store_dir} 为 Parquet 格式, 读取需要安装 pyarrow")
+        filters = []
+        if diseases is not None:
+            filters.append((PARTITION_COL, "in", list(diseases)))
+        if pathways is not None:
+            filters.append(("reactome_stid", "in", list(pathways)))
+        df = pd.read_parquet(store_dir, filters=filters or None)
+        df[PARTITION_COL] = df[PARTITION_COL].astype(str)
+    else:
+        if diseases is None:
+            part_dirs = sorted(store_dir.glob(f"{PARTITION_COL}=*"))
+        else:
+            part_dirs = [store_dir / f"{PARTITION_COL}={quote(str(d), safe='')}" for d in diseases]
+        frames = []
+        want = set(pathways) if pathways is not None else None
+        for part_dir in part_dirs:
+            if not part_dir.exists():
+                continue
+            part = read_csv(part_dir / "part-0.csv", dtype={"reactome_stid": str, "diseaseName": str,
+                                                            "reactome_name": str},
+                            float_precision="round_trip")
+            if want is not None:
+                part = part[part["reactome_stid"].isin(want)]
+            part[PARTITION_COL] = unquote(part_dir.name.split("=", 1)[1])
+            frames.append(part)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=STORE_COLS)
+    return df[STORE_COLS].sort_values(["reactome_stid", "diseaseId"]).reset_index(drop=True)
@@ -1,7 +1,7 @@
 """
 HTTP缓存与请求模块 — 工业级, 含统计、错误分类和可观测性
 
-提供带重试机制的HTTP请求和基于文件的响应缓存
+提供带重试机制的HTTP请求和响应缓存 (目录文件或单文件 SQLite)
 
 Improvements (v0.6.0):
     - HTTPCache.stats: 命中率/缺失率/过期率统计
@@ -9,21 +9,35 @@ Improvements (v0.6.0):
     - HTTPCache.cleanup_expired(): 清理过期条目
     - 错误分类: HTTP 状态码感知的日志
     - cached_get_json/cached_post_json 支持统计
+    - 请求走 http_client 共享连接池 (keep-alive, 按主机并发/限速, 在途请求合并)
+    - HTTPCache(backend="sqlite"): 单文件 WAL 存储 + 时间戳 TTL 索引 + 可选 zlib/zstd 压缩
+    - 读路径不再持全局锁; migrate_file_cache() 导入旧目录缓存
 """
 from __future__ import annotations
 
 import hashlib
 import json
 import logging
+import os
+import queue
+import sqlite3
 import threading
 import time
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Any
+from typing import Iterator, Optional, Any
 
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, retry_if_exception
 
 from .config import ensure_dir
+from .http_client import get_client
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖: 未安装时 compress="zstd" 回退为 zlib
+    zstandard = None
 
 
 def _is_retryable(exc: BaseException) -> bool:
@@ -53,18 +67,260 @@ def sha1(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
 
+CACHE_BACKENDS = ("files", "sqlite")
+CACHE_CODECS = ("none", "zlib", "zstd")
+SQLITE_NAME = "http_cache.sqlite"
+# sqlite 连接池下限 (实际大小取 max(max_workers, 此值))
+SQLITE_MIN_POOL = 4
+
+# entries.codec 列取值
+_CODEC_IDS = {"none": 0, "zlib": 1, "zstd": 2}
+
+
+class _FileStore:
+    """每个响应一个 http_json/<sha1>.json 文件 (TTL 基于文件 mtime)."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path(self, h: str) -> Path:
+        return self.root / f"{h}.json"
+
+    def load(self, h: str) -> Optional[tuple[float, bytes]]:
+        p = self.path(h)
+        try:
+            created = p.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        return created, p.read_bytes()
+
+    def created(self, h: str) -> Optional[float]:
+        try:
+            return self.path(h).stat().st_mtime
+        except OSError:
+            return None
+
+    def save(self, h: str, body: bytes) -> None:
+        # get() 不持锁读取: 先写同目录临时文件再原子替换, 读者不会看到写了一半的文件
+        p = self.path(h)
+        tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(body)
+            os.replace(tmp, p)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def delete(self, h: str) -> bool:
+        try:
+            self.path(h).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete_older_than(self, cutoff: float) -> int:
+        cleaned = 0
+        try:
+            for f in self.root.glob("*.json"):
+                try:
+                    if f.stat().st_mtime < cutoff:
+                        f.unlink()
+                        cleaned += 1
+                except OSError:
+                    pass
+        except OSError:
+            pass
+        return cleaned
+
+    def usage(self) -> tuple[int, int]:
+        n_files = 0
+        total_bytes = 0
+        try:
+            for f in self.root.glob("*.json"):
+                n_files += 1
+                total_bytes += f.stat().st_size
+        except OSError:
+            pass
+        return n_files, total_bytes
+
+    def close(self) -> None:
+        pass
+
+
+class _SQLiteStore:
+    """
+    单文件 SQLite (WAL) 存储: entries(key, created, codec, body).
+
+    连接来自有界连接池 (最多 pool_size 个, 任意线程借用后归还; WAL 下读不阻塞写),
+    线程数再多打开的连接数也不超过 pool_size;
+    created 列有索引, TTL 清理是一条 DELETE 而不是目录遍历.
+    """
+
+    def __init__(self, path: Path, compress: str = "none", level: int | None = None,
+                 pool_size: int = SQLITE_MIN_POOL):
+        self.path = path
+        self.codec = _CODEC_IDS[compress]
+        self._compressor = _make_compressor(compress, level)
+        self.pool_size = max(1, int(pool_size))
+        self._pool: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._conns: list[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        with self._con() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                con.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, created REAL NOT NULL, codec INTEGER NOT NULL, body BLOB NOT NULL)"
+                )
+                con.execute("CREATE INDEX IF NOT EXISTS idx_entries_created ON entries(created)")
+
+    @contextmanager
+    def _con(self) -> Iterator[sqlite3.Connection]:
+        """借出一个连接 (池未满时新建, 否则等待其他线程归还)."""
+        try:
+            con = self._pool.get_nowait()
+        except queue.Empty:
+            con = None
+            with self._conns_lock:
+                if len(self._conns) < self.pool_size:
+                    con = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+                    con.execute("PRAGMA synchronous=NORMAL")
+                    self._conns.append(con)
+            if con is None:
+                con = self._pool.get()
+        try:
+            yield con
+        finally:
+            self._pool.put(con)
+
+    def load(self, h: str) -> Optional[tuple[float, bytes]]:
+        with self._con() as con:
+            row = con.execute(
+                "SELECT created, codec, body FROM entries WHERE key = ?", (h,)
+            ).fetchone()
+        if row is None:
+            return None
+        created, codec, body = row
+        return created, _decompress(codec, body)
+
+    def created(self, h: str) -> Optional[float]:
+        with self._con() as con:
+            row = con.execute("SELECT created FROM entries WHERE key = ?", (h,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, h: str, body: bytes, created: float | None = None) -> None:
+        self.save_many([(h, time.time() if created is None else created, body)])
+
+    def save_many(self, rows: list[tuple[str, float, bytes]]) -> None:
+        encoded = [(h, created, self.codec, self._compressor(body)) for h, created, body in rows]
+        with self._con() as con, con:
+            con.executemany(
+                "INSERT OR REPLACE INTO entries (key, created, codec, body) VALUES (?, ?, ?, ?)", encoded,
+            )
+
+    def delete(self, h: str) -> bool:
+        with self._con() as con, con:
+            return con.execute("DELETE FROM entries WHERE key = ?", (h,)).rowcount > 0
+
+    def delete_older_than(self, cutoff: float) -> int:
+        with self._con() as con, con:
+            return con.execute("DELETE FROM entries WHERE created < ?", (cutoff,)).rowcount
+
+    def usage(self) -> tuple[int, int]:
+        with self._con() as con:
+            n, total = con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM entries"
+            ).fetchone()
+        return int(n), int(total)
+
+    def open_connections(self) -> int:
+        """当前已打开的连接数 (≤ pool_size)."""
+        with self._conns_lock:
+            return len(self._conns)
+
+    def close(self) -> None:
+        with self._conns_lock:
+            for con in self._conns:
+                con.close()
+            self._conns.clear()
+            self._pool = queue.LifoQueue()
+
+
+def _make_compressor(compress: str, level: int | None = None):
+    if compress == "zlib":
+        lvl = 6 if level is None else level
+        return lambda b: zlib.compress(b, lvl)
+    if compress == "zstd":
+        # ZstdCompressor 非线程安全, 每次调用新建 (开销远小于一次 HTTP 响应)
+        lvl = 3 if level is None else level
+        return lambda b: zstandard.ZstdCompressor(level=lvl).compress(b)
+    return bytes
+
+
+def _decompress(codec: int, body: bytes) -> bytes:
+    if codec == 0:
+        return bytes(body)
+    if codec == 1:
+        return zlib.decompress(body)
+    if codec == 2:
+        if zstandard is None:
+            raise ValueError("缓存条目为 zstd 压缩, 但未安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"未知缓存编码: {codec}")
+
+
+def _resolve_codec(compress: str) -> str:
+    compress = (compress or "none").strip().lower()
+    if compress not in CACHE_CODECS:
+        raise ValueError(f"compress='{compress}' 不合法, 可选: {list(CACHE_CODECS)}")
+    if compress == "zstd" and zstandard is None:
+        logger.warning("未安装 zstandard, 缓存压缩回退为 zlib")
+        return "zlib"
+    return compress
+
+
 class HTTPCache:
-    """HTTP响应文件缓存 (线程安全, 支持 TTL, 含统计)."""
+    """
+    HTTP响应缓存 (线程安全, 支持 TTL, 含统计).
+
+    backend:
+      - files:  每个响应一个 http_json/<sha1>.json (默认, 兼容旧缓存目录)
+      - sqlite: 单文件 http_cache.sqlite (WAL), 存写入时间戳, 可选 zlib/zstd 压缩;
+                旧目录缓存可用 migrate_file_cache() 导入
 
-    def __init__(self, cache_dir: Path, max_workers: int = 1, ttl_seconds: int = 0):
+    读路径不持锁: 磁盘读取和 JSON 解析并发进行, 锁只保护统计计数.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_workers: int = 1,
+        ttl_seconds: int = 0,
+        backend: str = "files",
+        compress: str = "none",
+    ):
         """
         Args:
             cache_dir: 缓存根目录.
             max_workers: 并发线程数 (供 datasource 读取).
             ttl_seconds: 缓存过期时间 (秒), 0 表示永不过期.
+            backend: 存储后端, "files" 或 "sqlite".
+            compress: sqlite 后端的压缩方式, "none" / "zlib" / "zstd" (files 后端忽略).
         """
-        self.root = ensure_dir(cache_dir / "http_json")
+        backend = (backend or "files").strip().lower()
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(f"backend='{backend}' 不合法, 可选: {list(CACHE_BACKENDS)}")
+        self.backend = backend
         self.max_workers = max(1, int(max_workers))
+        if backend == "sqlite":
+            self.root = ensure_dir(Path(cache_dir))
+            self.compress = _resolve_codec(compress)
+            self._store = _SQLiteStore(self.root / SQLITE_NAME, self.compress,
+                                       pool_size=max(self.max_workers, SQLITE_MIN_POOL))
+        else:
+            self.root = ensure_dir(Path(cache_dir) / "http_json")
+            self.compress = "none"
+            self._store = _FileStore(self.root)
         self.ttl_seconds = max(0, int(ttl_seconds))
         self._lock = threading.Lock()
 
@@ -94,18 +350,16 @@ class HTTPCache:
     def summary(self) -> dict[str, Any]:
         """返回缓存摘要 (含磁盘使用情况)."""
         stats = self.stats
-        n_files = 0
-        total_bytes = 0
         try:
-            for f in self.root.glob("*.json"):
-                n_files += 1
-                total_bytes += f.stat().st_size
-        except OSError:
-            pass
+            n_files, total_bytes = self._store.usage()
+        except (OSError, sqlite3.Error):
+            n_files, total_bytes = 0, 0
 
         stats["n_cached_files"] = n_files
         stats["total_size_mb"] = round(total_bytes / (1024 * 1024), 2)
         stats["ttl_seconds"] = self.ttl_seconds
+        stats["backend"] = self.backend
+        stats["compress"] = self.compress
         return stats
 
     # ── 核心操作 ──
@@ -113,87 +367,132 @@ class HTTPCache:
     def _path(self, key: str) -> Path:
         return self.root / f"{sha1(key)}.json"
 
-    def _is_expired(self, p: Path) -> bool:
-        """检查缓存文件是否过期 (基于文件修改时间)."""
-        if self.ttl_seconds <= 0:
-            return False
-        try:
-            age = time.time() - p.stat().st_mtime
-            return age > self.ttl_seconds
-        except OSError:
-            return True
+    def _is_stale(self, created: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created > self.ttl_seconds
 
-    def get(self, key: str) -> Optional[dict | list]:
-        """获取缓存 (过期条目视为未命中). 所有统计计数在锁内递增."""
-        p = self._path(key)
+    def _count(self, **deltas: int) -> None:
         with self._lock:
-            if p.exists():
-                if self._is_expired(p):
-                    logger.debug("缓存已过期: %s", p.name)
-                    self._expired += 1
-                    self._misses += 1
-                    return None
-                try:
-                    data = json.loads(p.read_text(encoding="utf-8"))
-                    self._hits += 1
-                    return data
-                except (json.JSONDecodeError, OSError) as e:
-                    logger.warning("缓存文件损坏, 将重新获取: %s (%s: %s)", p.name, type(e).__name__, e)
-                    self._errors += 1
-                    self._misses += 1
-                    return None
-            self._misses += 1
+            for name, d in deltas.items():
+                setattr(self, f"_{name}", getattr(self, f"_{name}") + d)
+
+    def get(self, key: str) -> Optional[dict | list]:
+        """获取缓存 (过期条目视为未命中). 读取/解析不持锁, 统计计数在锁内递增."""
+        h = sha1(key)
+        try:
+            rec = self._store.load(h)
+            if rec is None:
+                self._count(misses=1)
+                return None
+            created, body = rec
+            if self._is_stale(created):
+                logger.debug("缓存已过期: %s", h)
+                self._count(expired=1, misses=1)
+                return None
+            data = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError, ValueError, zlib.error, sqlite3.Error) as e:
+            logger.warning("缓存条目损坏, 将重新获取: %s (%s: %s)", h, type(e).__name__, e)
+            self._count(errors=1, misses=1)
             return None
+        self._count(hits=1)
+        return data
 
     def set(self, key: str, value: dict | list) -> None:
         """设置缓存."""
-        with self._lock:
-            try:
-                self._path(key).write_text(
-                    json.dumps(value, ensure_ascii=False), encoding="utf-8"
-                )
-                self._puts += 1
-            except (OSError, TypeError) as e:
-                logger.warning("缓存写入失败: %s (%s)", self._path(key).name, e)
-                self._errors += 1
+        h = sha1(key)
+        try:
+            self._store.save(h, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        except (OSError, TypeError, ValueError, sqlite3.Error) as e:
+            logger.warning("缓存写入失败: %s (%s)", h, e)
+            self._count(errors=1)
+            return
+        self._count(puts=1)
 
     def has(self, key: str) -> bool:
         """检查是否有有效缓存 (未过期)."""
-        p = self._path(key)
-        if not p.exists():
-            return False
-        return not self._is_expired(p)
+        created = self._store.created(sha1(key))
+        return created is not None and not self._is_stale(created)
 
     def invalidate(self, key: str) -> bool:
         """删除缓存条目, 返回是否成功."""
-        p = self._path(key)
         try:
-            if p.exists():
-                p.unlink()
-                return True
-        except OSError as e:
-            logger.warning("缓存删除失败: %s (%s)", p.name, e)
+            return self._store.delete(sha1(key))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("缓存删除失败: %s (%s)", sha1(key), e)
         return False
 
     def cleanup_expired(self) -> int:
-        """清理所有过期条目, 返回清理数量."""
+        """清理所有过期条目, 返回清理数量 (sqlite 后端走 created 索引)."""
         if self.ttl_seconds <= 0:
             return 0
-        cleaned = 0
         try:
-            for f in self.root.glob("*.json"):
-                if self._is_expired(f):
-                    try:
-                        f.unlink()
-                        cleaned += 1
-                    except OSError:
-                        pass
-        except OSError:
-            pass
+            cleaned = self._store.delete_older_than(time.time() - self.ttl_seconds)
+        except sqlite3.Error as e:
+            logger.warning("清理过期缓存失败: %s", e)
+            return 0
         if cleaned > 0:
-            logger.info("清理过期缓存: %d 个文件", cleaned)
+            logger.info("清理过期缓存: %d 个条目", cleaned)
         return cleaned
 
+    def close(self) -> None:
+        """关闭后端连接 (sqlite)."""
+        self._store.close()
+
+
+def migrate_file_cache(
+    cache_dir: Path,
+    compress: str = "none",
+    remove_files: bool = False,
+    batch_size: int = 1000,
+) -> dict[str, int]:
+    """
+    把目录缓存 (cache_dir/http_json/*.json) 导入 cache_dir/http_cache.sqlite.
+
+    文件 mtime 作为写入时间戳, TTL 语义不变; 无法解析的 JSON 文件跳过.
+    导入以文件名 (sha1) 为主键, 重复执行是幂等的.
+
+    Returns:
+        {"imported", "skipped", "removed"}
+    """
+    src = Path(cache_dir) / "http_json"
+    cache = HTTPCache(cache_dir, backend="sqlite", compress=compress)
+    store = cache._store
+    counts = {"imported": 0, "skipped": 0, "removed": 0}
+    batch: list[tuple[str, float, bytes]] = []
+    done: list[Path] = []
+
+    def _flush():
+        store.save_many(batch)
+        counts["imported"] += len(batch)
+        if remove_files:
+            for f in done:
+                try:
+                    f.unlink()
+                    counts["removed"] += 1
+                except OSError:
+                    pass
+        batch.clear()
+        done.clear()
+
+    files = sorted(src.glob("*.json")) if src.is_dir() else []
+    for f in files:
+        try:
+            created = f.stat().st_mtime
+            body = f.read_bytes()
+            json.loads(body)
+        except (OSError, ValueError) as e:
+            logger.warning("跳过无法导入的缓存文件: %s (%s)", f.name, e)
+            counts["skipped"] += 1
+            continue
+        batch.append((f.stem, created, body))
+        done.append(f)
+        if len(batch) >= batch_size:
+            _flush()
+    if batch:
+        _flush()
+    cache.close()
+    logger.info("缓存迁移完成: %s → %s, %s", src, Path(cache_dir) / SQLITE_NAME, counts)
+    return counts
+
 
 # ── HTTP 请求函数 (含重试) ──
 
@@ -218,7 +517,7 @@ def http_get_json(
         ValueError: 响应不是合法 JSON.
     """
     logger.debug("GET %s params=%s", url, params)
-    r = requests.get(url, params=params, headers=headers, timeout=timeout)
+    r = get_client().request("GET", url, params=params, headers=headers, timeout=timeout)
     r.raise_for_status()
     try:
         return r.json()
@@ -248,7 +547,7 @@ def http_post_json(
         ValueError: 响应不是合法 JSON.
     """
     logger.debug("POST %s payload_keys=%s", url, list(payload.keys()) if payload else [])
-    r = requests.post(url, json=payload, headers=headers, timeout=timeout)
+    r = get_client().request("POST", url, json=payload, headers=headers, timeout=timeout)
     r.raise_for_status()
     try:
         return r.json()
@@ -259,6 +558,13 @@ def http_post_json(
 
 # ── 带缓存的请求 ──
 
+def cache_key(url: str, params: dict | None = None) -> str:
+    """cached_get_json 使用的缓存 key (参数按名排序拼接)."""
+    if not params:
+        return url
+    return url + "?" + "&".join([f"{k}={params[k]}" for k in sorted(params.keys())])
+
+
 def cached_get_json(
     cache: HTTPCache,
     url: str,
@@ -266,16 +572,18 @@ def cached_get_json(
     headers: dict | None = None,
     timeout: int = 60,
 ) -> dict | list:
-    """带缓存的GET请求."""
-    key = url if not params else url + "?" + "&".join(
-        [f"{k}={params[k]}" for k in sorted(params.keys())]
-    )
+    """带缓存的GET请求 (相同 key 的并发未命中只请求一次)."""
+    key = cache_key(url, params)
     hit = cache.get(key)
     if hit is not None:
         return hit
-    js = http_get_json(url, params=params, headers=headers, timeout=timeout)
-    cache.set(key, js)
-    return js
+
+    def _fetch() -> dict | list:
+        js = http_get_json(url, params=params, headers=headers, timeout=timeout)
+        cache.set(key, js)
+        return js
+
+    return get_client().coalesce("GET " + key, _fetch)
 
 
 def cached_post_json(
@@ -285,11 +593,15 @@ def cached_post_json(
     headers: dict | None = None,
     timeout: int = 60,
 ) -> dict:
-    """带缓存的POST请求."""
+    """带缓存的POST请求 (相同 key 的并发未命中只请求一次)."""
     key = url + "::" + json.dumps(payload, sort_keys=True)
     hit = cache.get(key)
     if hit is not None:
         return hit
-    js = http_post_json(url, payload=payload, headers=headers, timeout=timeout)
-    cache.set(key, js)
-    return js
+
+    def _fetch() -> dict:
+        js = http_post_json(url, payload=payload, headers=headers, timeout=timeout)
+        cache.set(key, js)
+        return js
+
+    return get_client().coalesce("POST " + key, _fetch)
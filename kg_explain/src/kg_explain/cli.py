@@ -17,6 +17,13 @@ KG Explain 命令行接口 — v0.7.0, 含步骤计时和管道 manifest
   python -m kg_explain fetch ctgov --condition atherosclerosis
   python -m kg_explain fetch signature --signature-path PATH
 
+  # 多疾病批量 (共享实体存储, 疾病步骤并行)
+  python -m kg_explain batch --disease-list ../ops/disease_list_commercial_batch2.txt --workers 4
+
+  # HTTP 缓存: 目录缓存导入 SQLite / 清理过期条目 / 统计
+  python -m kg_explain cache migrate --compress zstd
+  python -m kg_explain cache cleanup
+
 Improvements (v0.7.0):
     - --drug-source {ctgov,signature}: 支持两种药物来源模式
     - signature 模式: 从疾病基因签名反查 ChEMBL 已批准药物
@@ -38,8 +45,13 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 from .config import ensure_dir, Config, load_config
-from .cache import HTTPCache
-from .utils import read_csv, write_json
+from .cache import HTTPCache, migrate_file_cache
+from .batch import STORE_DIRNAME, EntityStore, build_universe, prefetch_entities, read_disease_list
+from .http_client import configure_client, get_client
+from .utils import (
+    concurrent_map, peak_rss_mb, read_csv, read_table, reset_peak_rss, resolve_table,
+    set_table_format, write_json, write_table,
+)
 from . import datasources
 from . import builders
 from . import rankers
@@ -68,19 +80,22 @@ def _timed_step(name: str, fn, *args, **kwargs):
         *args, **kwargs: 函数参数.
 
     Returns:
-        (result, timing_dict): 函数返回值和计时信息.
+        (result, timing_dict): 函数返回值和计时信息 (含步骤峰值 RSS, 供 registry 性能基线使用).
     """
     logger.info("▶ %s ...", name)
+    reset_peak_rss()
     t0 = time.time()
     try:
         result = fn(*args, **kwargs)
         elapsed = time.time() - t0
         logger.info("✓ %s 完成 (%.1fs)", name, elapsed)
-        return result, {"step": name, "elapsed_sec": round(elapsed, 2), "status": "ok"}
+        return result, {"step": name, "elapsed_sec": round(elapsed, 2), "status": "ok",
+                        "peak_rss_mb": peak_rss_mb()}
     except Exception as e:
         elapsed = time.time() - t0
         logger.error("✗ %s 失败 (%.1fs): %s", name, elapsed, e)
-        return None, {"step": name, "elapsed_sec": round(elapsed, 2), "status": "error", "error": str(e)}
+        return None, {"step": name, "elapsed_sec": round(elapsed, 2), "status": "error", "error": str(e),
+                      "peak_rss_mb": peak_rss_mb()}
 
 
 def main():
@@ -116,6 +131,8 @@ KG Explain v0.7.0 - 药物重定位知识图谱可解释路径系统
     p_rank = subparsers.add_parser("rank", help="运行排序算法")
     p_rank.add_argument("--version", default="v5", choices=["v5", "v5_test"], help="排序版本")
     p_rank.add_argument("--config", help="配置文件路径")
+    p_rank.add_argument("--full", action="store_true",
+                        help="忽略 output/rank_state, 全部组件重算 (默认只重算输入变化的组件)")
 
     # fetch: 数据获取
     p_fetch = subparsers.add_parser("fetch", help="获取数据")
@@ -125,6 +142,12 @@ KG Explain v0.7.0 - 药物重定位知识图谱可解释路径系统
     p_ctgov = fetch_sub.add_parser("ctgov", help="从CT.gov获取失败试验")
     p_ctgov.add_argument("--condition", required=True, help="疾病条件")
     p_ctgov.add_argument("--max-pages", type=int, default=20, help="最大页数")
+    p_ctgov.add_argument("--fetch-mode", choices=["serial", "sharded"], default=None,
+                         help="抓取模式 (默认取 trial_filter.fetch_mode)")
+    p_ctgov.add_argument("--date-shards", default=None,
+                         help="sharded 模式的开始日期边界年份, 逗号分隔 (如 2005,2015)")
+    p_ctgov.add_argument("--no-resume", action="store_true",
+                         help="sharded 模式忽略已有游标, 从头抓取")
 
     # fetch rxnorm
     fetch_sub.add_parser("rxnorm", help="RxNorm药物映射")
@@ -157,6 +180,18 @@ KG Explain v0.7.0 - 药物重定位知识图谱可解释路径系统
     build_sub.add_parser("gene-pathway", help="构建基因-通路关系")
     build_sub.add_parser("pathway-disease", help="构建通路-疾病关系")
     build_sub.add_parser("trial-ae", help="构建试验-AE关系")
+    p_pds = build_sub.add_parser("pathway-disease-store",
+                                 help="离线构建全局通路×疾病表 (按 diseaseId 分区, Step 9 切片复用)")
+    p_pds.add_argument("--from", dest="source_dirs", nargs="+", default=None,
+                       help="来源数据目录 (默认 data_dir; 可指向批量运行的 entity_store/<version>/universe)")
+    p_pds.add_argument("--store", default=None,
+                       help="输出目录 (默认 paths.pathway_disease_store, 未配置时 <cache_dir>/pathway_disease_store)")
+    p_fs = build_sub.add_parser("faers-store",
+                                help="离线构建 FAERS 批量库 (季度 ASCII / openFDA JSON → 药物×AE 计数)")
+    p_fs.add_argument("--from", dest="source_dir", required=True,
+                      help="FAERS 批量下载目录 (DRUGyyQq.txt + REACyyQq.txt 或 drug-event-*.json, 可为 zip)")
+    p_fs.add_argument("--store", default=None,
+                      help="输出目录 (默认 faers.bulk_store, 未配置时 <cache_dir>/faers_store)")
 
     # benchmark: 评估排序质量
     p_bench = subparsers.add_parser("benchmark", help="评估排序结果 (需提供 gold-standard CSV)")
@@ -165,10 +200,40 @@ KG Explain v0.7.0 - 药物重定位知识图谱可解释路径系统
     p_bench.add_argument("--ks", default="5,10,20", help="K 值列表, 逗号分隔 (默认: 5,10,20)")
 
     # graph: 知识图谱构建与查询
-    p_graph = subparsers.add_parser("graph", help="构建/查询/导出知识图谱 (NetworkX)")
+    p_graph = subparsers.add_parser("graph", help="构建/查询/导出知识图谱 (NetworkX / Compact CSR)")
     p_graph.add_argument("--export", metavar="PATH", help="导出 GraphML 文件路径")
     p_graph.add_argument("--drug", help="查询指定药物的 DTPD 路径")
     p_graph.add_argument("--disease", help="查询指定疾病的 DTPD 路径")
+    p_graph.add_argument("--backend", default="networkx", choices=["networkx", "compact"],
+                         help="图后端: networkx (默认) 或 compact (整数索引 CSR, 省内存)")
+    p_graph.add_argument("--save-compact", metavar="DIR", help="将 compact 图保存为可 memory-map 的目录")
+    p_graph.add_argument("--load-compact", metavar="DIR", help="从 compact 目录加载图 (跳过 CSV 解析)")
+
+    # batch: 多疾病批量运行 (共享实体存储)
+    p_batch = subparsers.add_parser("batch", help="多疾病批量运行: 实体数据只拉取一次, 疾病步骤并行")
+    p_batch.add_argument("--disease-list", required=True,
+                         help="疾病列表 (ops/disease_list_*.txt, disease_key|query|origin_ids|inject_yaml)")
+    p_batch.add_argument("--version", default="v5", choices=["v5", "v5_test"], help="排序版本")
+    p_batch.add_argument("--drug-source", default="ctgov", choices=["ctgov", "signature"],
+                         help="药物来源: ctgov 或 signature")
+    p_batch.add_argument("--signature-template", default=None,
+                         help="signature 模式签名路径模板, {disease} 替换为 disease_key")
+    p_batch.add_argument("--max-drugs", type=int, default=0, help="signature 模式药物上限 (同 pipeline)")
+    p_batch.add_argument("--workers", type=int, default=2, help="疾病阶段并行进程数")
+    p_batch.add_argument("--store-dir", default=None, help="实体存储根目录 (默认 <cache_dir>/entity_store)")
+    p_batch.add_argument("--store-version", default=None,
+                         help="实体存储版本 (默认 日期-疾病列表哈希; 相同版本复用已预取的实体)")
+    p_batch.add_argument("--skip-prefetch", action="store_true", help="跳过 discover/prefetch, 直接运行疾病阶段")
+
+    # cache: HTTP 缓存维护
+    p_cache = subparsers.add_parser("cache", help="HTTP 缓存维护 (迁移/清理/统计)")
+    cache_sub = p_cache.add_subparsers(dest="action", required=True)
+    p_migrate = cache_sub.add_parser("migrate", help="将 http_json/ 目录缓存导入单文件 SQLite")
+    p_migrate.add_argument("--compress", default=None, choices=["none", "zlib", "zstd"],
+                           help="SQLite 条目压缩方式 (默认取 http.cache_compress)")
+    p_migrate.add_argument("--remove-files", action="store_true", help="导入成功后删除原 JSON 文件")
+    cache_sub.add_parser("cleanup", help="按 TTL 清理过期条目")
+    cache_sub.add_parser("stats", help="打印缓存条目数/大小")
 
     args = parser.parse_args()
     _setup_logging(verbose=args.verbose)
@@ -186,7 +251,16 @@ KG Explain v0.7.0 - 药物重定位知识图谱可解释路径系统
     ensure_dir(cfg.output_dir)
     ensure_dir(cfg.cache_dir)
     ttl_sec = int(cfg.cache_ttl_hours * 3600)
-    cache = HTTPCache(cfg.cache_dir, max_workers=cfg.http_max_workers, ttl_seconds=ttl_sec)
+    cache = HTTPCache(
+        cfg.cache_dir, max_workers=cfg.http_max_workers, ttl_seconds=ttl_sec,
+        backend=cfg.cache_backend, compress=cfg.cache_compress,
+    )
+    configure_client(
+        per_host_limit=cfg.http_per_host_limit,
+        rate_limits=cfg.http_rate_limits,
+        pool_size=cfg.http_max_workers,
+    )
+    set_table_format(cfg.table_format)
     if ttl_sec > 0:
         logger.info("缓存 TTL: %.1f 小时", cfg.cache_ttl_hours)
 
@@ -203,6 +277,10 @@ KG Explain v0.7.0 - 药物重定位知识图谱可解释路径系统
         run_benchmark_cmd(args, cfg)
     elif args.command == "graph":
         run_graph_cmd(args, cfg)
+    elif args.command == "cache":
+        run_cache_cmd(args, cfg, cache)
+    elif args.command == "batch":
+        run_batch_cmd(args, cfg)
 
 
 def _load_pipeline_config(disease: str, version: str, drug_source: str = "ctgov") -> Config:
@@ -277,6 +355,34 @@ def _fetch_known_indications(data_dir, cache, drugs_df):
                 len(ind_df), ind_df["molecule_chembl_id"].nunique() if not ind_df.empty else 0)
 
 
+def _fetch_ctgov_drugs(cfg: Config, cache: HTTPCache):
+    """Step 1 (CT.gov 模式): 失败试验 → failed_trials_drug_rows.csv."""
+    drug_filter = cfg.drug_filter
+    return datasources.fetch_failed_trials(
+        cfg.condition, cfg.data_dir, cache,
+        statuses=cfg.trial_statuses,
+        page_size=cfg.http_page_size,
+        max_pages=cfg.trial_max_pages,
+        include_types=drug_filter.get("include_types"),
+        exclude_types=drug_filter.get("exclude_types"),
+        also_completed=cfg.raw.get("ctgov", {}).get("also_completed", False),
+        fetch_mode=cfg.trial_fetch_mode,
+        date_shards=cfg.trial_date_shards,
+    )
+
+
+def _fetch_signature_drugs(cfg: Config, cache: HTTPCache, signature_path):
+    """Step 1 (Signature 模式): 基因签名反查 → drug_chembl_map.csv + edge_drug_target.csv."""
+    sig_cfg = cfg.raw.get("signature", {})
+    return datasources.fetch_drugs_from_signature(
+        cfg.data_dir, cache,
+        signature_path=signature_path,
+        max_phase=int(sig_cfg.get("max_phase", 2)),
+        max_genes=int(sig_cfg.get("max_genes", 100)),
+        gene_source=str(sig_cfg.get("gene_source", "both")),
+    )
+
+
 def run_pipeline(args, cfg: Config, cache: HTTPCache):
     """运行完整管道 (含计时和 manifest)."""
     pipeline_start = time.time()
@@ -311,15 +417,8 @@ def run_pipeline(args, cfg: Config, cache: HTTPCache):
             # 直接生成 drug_chembl_map.csv + edge_drug_target.csv + 占位文件
             # 跳过 Step 2-5
             # ══════════════════════════════════════════
-            sig_cfg = cfg.raw.get("signature", {})
             _, t = _timed_step("[1/10] 基因签名 → 药物反查",
-                datasources.fetch_drugs_from_signature,
-                data_dir, cache,
-                signature_path=signature_path,
-                max_phase=int(sig_cfg.get("max_phase", 2)),
-                max_genes=int(sig_cfg.get("max_genes", 100)),
-                gene_source=str(sig_cfg.get("gene_source", "both")),
-            )
+                _fetch_signature_drugs, cfg, cache, signature_path)
             step_timings.append(t)
 
             # ── Signature quality tiered gate ──
@@ -379,10 +478,10 @@ def run_pipeline(args, cfg: Config, cache: HTTPCache):
                         _drugs_df = _drugs_df[_drugs_df["chembl_id"].isin(_keep_ids)]
                         _drugs_df.to_csv(_chembl_path, index=False)
 
-                        if _dt_path.exists():
-                            _dt_df = _pd.read_csv(_dt_path, dtype=str)
+                        if resolve_table(_dt_path) is not None:
+                            _dt_df = read_table(_dt_path, typed=False)
                             _dt_df = _dt_df[_dt_df["molecule_chembl_id"].isin(_keep_ids)]
-                            _dt_df.to_csv(_dt_path, index=False)
+                            write_table(_dt_df, _dt_path)
 
                         logger.info("药物截断: %d → %d (effective_cap=%d, genes=%d, 按 gene_weight 排序)",
                                     _n_before, len(_drugs_df), _effective_cap, _n_total)
@@ -410,17 +509,7 @@ def run_pipeline(args, cfg: Config, cache: HTTPCache):
             # ══════════════════════════════════════════
 
             # Step 1: CT.gov
-            drug_filter = cfg.drug_filter
-            _, t = _timed_step("[1/10] CT.gov 失败试验",
-                datasources.fetch_failed_trials,
-                cfg.condition, data_dir, cache,
-                statuses=cfg.trial_statuses,
-                page_size=cfg.http_page_size,
-                max_pages=cfg.trial_max_pages,
-                include_types=drug_filter.get("include_types"),
-                exclude_types=drug_filter.get("exclude_types"),
-                also_completed=cfg.raw.get("ctgov", {}).get("also_completed", False),
-            )
+            _, t = _timed_step("[1/10] CT.gov 失败试验", _fetch_ctgov_drugs, cfg, cache)
             step_timings.append(t)
 
             # Step 2: RxNorm
@@ -503,6 +592,7 @@ def run_pipeline(args, cfg: Config, cache: HTTPCache):
                     min_prr=float(faers_cfg.get("min_prr", 0)),
                     top_ae=int(faers_cfg.get("top_ae_per_drug", 50)),
                     max_drugs=int(faers_cfg.get("max_drugs", 500)),
+                    bulk_store=cfg.faers_bulk_store,
                 )
 
                 # ── SIDER integration (FDA drug label side effects) ──
@@ -557,9 +647,13 @@ def run_pipeline(args, cfg: Config, cache: HTTPCache):
         "signature_path": str(signature_path) if signature_path else None,
         "ranker_version": args.version,
         "pipeline_elapsed_sec": round(pipeline_elapsed, 2),
+        "peak_rss_mb": max((t.get("peak_rss_mb", 0.0) for t in step_timings), default=0.0),
         "config_summary": cfg.summary(),
         "cache_stats": cache.summary(),
+        "http_stats": get_client().stats,
+        "entity_store": getattr(args, "entity_store", None),
         "step_timings": step_timings,
+        "rank_components": _rank_components(result),
         "outputs": {k: str(v) for k, v in (result or {}).items()},
     }
 
@@ -575,11 +669,20 @@ def run_pipeline(args, cfg: Config, cache: HTTPCache):
     logger.info("=" * 60)
 
 
+def _rank_components(result: dict | None) -> dict | None:
+    """本次排序各组件的复用情况 (rank_state/state.json 的 last_run)"""
+    state_path = (result or {}).get("rank_state")
+    if state_path is None or not Path(state_path).exists():
+        return None
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("last_run")
+
+
 def run_rank(args, cfg: Config):
     """仅运行排序."""
     if args.config:
         logger.warning("--config 参数目前不支持，使用默认配置")
-    result = rankers.run_pipeline(cfg)
+    result = rankers.run_pipeline(cfg, full=args.full)
 
     if result is None:
         logger.error("排序失败，未返回结果")
@@ -603,6 +706,10 @@ def run_fetch(args, cfg: Config, cache: HTTPCache):
             max_pages=args.max_pages,
             include_types=drug_filter.get("include_types"),
             exclude_types=drug_filter.get("exclude_types"),
+            fetch_mode=args.fetch_mode or cfg.trial_fetch_mode,
+            date_shards=([int(y) for y in args.date_shards.split(",") if y.strip()]
+                         if args.date_shards else cfg.trial_date_shards),
+            resume=not args.no_resume,
         )
         logger.info("Wrote: %s", result)
     elif args.source == "rxnorm":
@@ -637,6 +744,7 @@ def run_fetch(args, cfg: Config, cache: HTTPCache):
             min_prr=float(faers_cfg.get("min_prr", 0)),
             top_ae=int(faers_cfg.get("top_ae_per_drug", 50)),
             max_drugs=int(faers_cfg.get("max_drugs", 500)),
+            bulk_store=cfg.faers_bulk_store,
         )
         logger.info("Wrote: %s", result)
     elif args.source == "phenotypes":
@@ -671,13 +779,158 @@ def run_build(args, cfg: Config):
     elif args.target == "trial-ae":
         result = builders.build_trial_ae(cfg.data_dir)
         logger.info("Wrote: %s", result)
+    elif args.target == "pathway-disease-store":
+        sources = [Path(d) for d in args.source_dirs] if args.source_dirs else [cfg.data_dir]
+        store = Path(args.store) if args.store else (
+            cfg.pathway_disease_store or cfg.cache_dir / "pathway_disease_store")
+        meta = builders.build_pathway_disease_store(sources, store, files=cfg.files)
+        logger.info("Wrote: %s (%d rows)", store, meta["n_rows"])
+    elif args.target == "faers-store":
+        store = Path(args.store) if args.store else (cfg.faers_bulk_store or cfg.cache_dir / "faers_store")
+        meta = datasources.build_faers_store(Path(args.source_dir), store)
+        logger.info("Wrote: %s (%d drugs, %d pairs)", store, meta["n_drugs"], meta["n_pairs"])
+
+
+def _batch_signature_path(args, disease: str) -> str | None:
+    template = getattr(args, "signature_template", None)
+    return template.format(disease=disease) if template else None
+
+
+def _batch_discover(args, disease: str, store_dir: str, store_version: str) -> str:
+    """批量 discover 阶段: 单个疾病的 Step 1, 返回 data_dir."""
+    cfg = _load_pipeline_config(disease, args.version, args.drug_source)
+    ensure_dir(cfg.data_dir)
+    cache = EntityStore(Path(store_dir), store_version).cache(max_workers=cfg.http_max_workers)
+    if args.drug_source == "signature":
+        _fetch_signature_drugs(cfg, cache, _batch_signature_path(args, disease))
+    else:
+        _fetch_ctgov_drugs(cfg, cache)
+    cache.close()
+    return str(cfg.data_dir)
+
+
+def _batch_worker(args, disease: str, store_dir: str, store_version: str) -> dict:
+    """批量疾病阶段 (子进程): 以实体存储为 HTTP 缓存运行完整单疾病管道."""
+    t0 = time.time()
+    cfg = _load_pipeline_config(disease, args.version, args.drug_source)
+    ensure_dir(cfg.data_dir)
+    ensure_dir(cfg.output_dir)
+    cache = EntityStore(Path(store_dir), store_version).cache(max_workers=cfg.http_max_workers)
+    configure_client(
+        per_host_limit=cfg.http_per_host_limit,
+        rate_limits=cfg.http_rate_limits,
+        pool_size=cfg.http_max_workers,
+    )
+    set_table_format(cfg.table_format)
+    pipeline_args = argparse.Namespace(
+        disease=disease, version=args.version, skip_fetch=False,
+        drug_source=args.drug_source,
+        signature_path=_batch_signature_path(args, disease),
+        max_drugs=args.max_drugs, sigreverse_rank=None,
+        entity_store={"dir": store_dir, "version": store_version},
+    )
+    try:
+        run_pipeline(pipeline_args, cfg, cache)
+        status = {"status": "ok"}
+    except Exception as e:
+        logger.error("批量运行失败: %s (%s)", disease, e)
+        status = {"status": "error", "error": str(e)}
+    finally:
+        cache.close()
+    return {"disease": disease, "elapsed_sec": round(time.time() - t0, 2),
+            "cache_stats": cache.stats, **status}
+
+
+def run_batch_cmd(args, cfg: Config):
+    """
+    多疾病批量运行: discover (并行) → 实体并集预取 (共享) → 单疾病管道 (进程池并行).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    entries = read_disease_list(Path(args.disease_list))
+    if not entries:
+        raise ValueError(f"疾病列表为空: {args.disease_list}")
+    if args.drug_source == "signature" and not args.signature_template:
+        raise ValueError("signature 模式需要指定 --signature-template")
+    diseases = [e.key for e in entries]
+
+    store_root = Path(args.store_dir) if args.store_dir else cfg.cache_dir / STORE_DIRNAME
+    store = EntityStore(store_root, args.store_version or EntityStore.default_version(entries))
+    logger.info("批量运行: %d 个疾病, 实体存储 %s", len(diseases), store.dir)
+    batch_start = time.time()
+    workers = max(1, int(args.workers))
+    store_args = (str(store.root), store.version)
+
+    if not args.skip_prefetch:
+        # 1. discover: 每个疾病的药物来源 (CT.gov / 签名)
+        data_dirs = concurrent_map(lambda d: _batch_discover(args, d, *store_args), diseases,
+                                   max_workers=workers, desc="Batch discover")
+        data_dirs = [Path(d) for d in data_dirs if d]
+
+        # 2. prefetch: 药物/靶点并集的实体数据只拉取一次
+        cache = store.cache(max_workers=cfg.http_max_workers, compress=cfg.cache_compress)
+        universe = build_universe(data_dirs, store.universe_dir, args.drug_source)
+        core_ids = []
+        for d in diseases:
+            ids = _load_pipeline_config(d, args.version, args.drug_source).raw.get("core_disease_ids", [])
+            core_ids.extend(ids if isinstance(ids, list) else [])
+        timings = prefetch_entities(store.universe_dir, cache, args.drug_source,
+                                    faers_cfg=cfg.faers, core_disease_ids=core_ids)
+        store.update_manifest(diseases=diseases, drug_source=args.drug_source, universe=universe,
+                              prefetch_timings=timings, cache=cache.summary())
+        cache.close()
+
+    # 3. 单疾病管道: 进程池并行, 实体查询命中存储
+    if workers > 1 and len(diseases) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_batch_worker, [args] * len(diseases), diseases,
+                                    [store_args[0]] * len(diseases), [store_args[1]] * len(diseases)))
+    else:
+        results = [_batch_worker(args, d, *store_args) for d in diseases]
+
+    n_ok = sum(r["status"] == "ok" for r in results)
+    store.update_manifest(last_batch={
+        "disease_list": str(args.disease_list),
+        "ranker_version": args.version,
+        "elapsed_sec": round(time.time() - batch_start, 2),
+        "results": results,
+    })
+    logger.info("批量运行完成: %d/%d 成功 (%.1fs), manifest: %s",
+                n_ok, len(results), time.time() - batch_start, store.manifest_path)
+    return results
+
+
+def run_cache_cmd(args, cfg: Config, cache: HTTPCache):
+    """HTTP 缓存维护: migrate / cleanup / stats."""
+    if args.action == "migrate":
+        cache.close()
+        counts = migrate_file_cache(cfg.cache_dir, compress=args.compress or cfg.cache_compress,
+                                    remove_files=args.remove_files)
+        print(f"导入 {counts['imported']} 条, 跳过 {counts['skipped']} 条, 删除 {counts['removed']} 个文件")
+        if cfg.cache_backend != "sqlite":
+            print("提示: 设置 http.cache_backend: sqlite 以启用 SQLite 缓存")
+    elif args.action == "cleanup":
+        print(f"清理过期条目: {cache.cleanup_expired()} ({cache.backend})")
+    elif args.action == "stats":
+        print(json.dumps(cache.summary(), ensure_ascii=False, indent=2))
 
 
 def run_graph_cmd(args, cfg: Config):
     """构建/查询/导出知识图谱."""
     from .graph import build_kg, graph_stats, find_dtpd_paths, drug_summary, export_graphml
-
-    G = build_kg(cfg)
+    from .compact_graph import CompactGraph, build_compact_kg
+
+    load_compact = getattr(args, "load_compact", None)
+    save_compact = getattr(args, "save_compact", None)
+    if load_compact:
+        G = CompactGraph.load(Path(load_compact))
+    elif getattr(args, "backend", "networkx") == "compact" or save_compact:
+        G = build_compact_kg(cfg)
+    else:
+        G = build_kg(cfg)
+    if save_compact:
+        G.save(Path(save_compact))
+        print(f"Compact 图已保存: {save_compact}")
     stats = graph_stats(G)
 
     # 打印统计
@@ -711,7 +964,9 @@ def run_graph_cmd(args, cfg: Config):
         print(f"  试验: {len(summ['trials'])}")
 
     # 导出
-    if args.export:
+    if args.export and isinstance(G, CompactGraph):
+        logger.error("GraphML 导出仅支持 networkx 后端 (去掉 --backend compact / --load-compact)")
+    elif args.export:
         export_graphml(G, Path(args.export))
         print(f"\nGraphML 已导出: {args.export}")
 
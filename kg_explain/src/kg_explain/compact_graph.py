@@ -0,0 +1,450 @@
+"""
+紧凑型知识图谱后端 (整数索引 + CSR 邻接)
+
+与 graph.py 的 nx.DiGraph 并行的可选后端, 面向多疾病 / FAERS + 试验边
+全部加载后的大图:
+  - 节点 ID 驻留为 int32 索引, 每个节点一个 int8 类型码
+  - 每种边类型一份 CSR 邻接 (indptr int64 + indices int32)
+  - INDEXED_IN_EDGES 中的边类型另存入边 (CSC) 索引, 按目标节点 O(度) 查找
+  - 边属性按列存为 NumPy 数组; 字符串属性存为类别码 + 词表
+  - 字符串列采用 UTF-8 字节 + 偏移量存储, 可整体 memory-map
+
+graph.find_dtpd_paths / drug_summary / graph_stats 对两种后端均可用.
+
+持久化格式: 一个目录, 内含 meta.json 与若干 .npy 文件,
+CompactGraph.load(path) 默认以 mmap_mode="r" 打开, 重复查询无需重新解析 CSV.
+
+与 NetworkX 后端的差异: 同一 (src, dst) 在不同边类型中各自保留 (NetworkX 会合并为一条边).
+"""
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .config import Config, ensure_dir
+from .graph import _EdgeSection, _dedupe_edges, _iter_edge_sections, _node_table
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+
+NODE_TYPES = ("Drug", "Target", "Pathway", "Disease", "AE", "Phenotype", "Trial")
+EDGE_TYPES = ("DRUG_TARGET", "TARGET_PATHWAY", "PATHWAY_DISEASE",
+              "DRUG_AE", "DISEASE_PHENOTYPE", "DRUG_TRIAL")
+
+# 边类型 → {属性名: 存储类型}; "cat" 为类别码 (int32) + 词表
+EDGE_ATTR_SCHEMA: dict[str, dict[str, str]] = {
+    "DRUG_TARGET": {"mechanism": "cat"},
+    "TARGET_PATHWAY": {},
+    "PATHWAY_DISEASE": {"pathway_score": "float64", "support_genes": "int64"},
+    "DRUG_AE": {"report_count": "int64", "prr": "float64"},
+    "DISEASE_PHENOTYPE": {"score": "float64"},
+    "DRUG_TRIAL": {"is_safety_stop": "bool", "is_efficacy_stop": "bool", "status": "cat"},
+}
+
+# 需要按目标节点查询的边类型 (find_dtpd_paths 查疾病的入边)
+INDEXED_IN_EDGES = ("PATHWAY_DISEASE",)
+
+_TYPE_CODE = {t: i for i, t in enumerate(NODE_TYPES)}
+
+
+class StringColumn:
+    """UTF-8 字节 + int64 偏移量的只读字符串列 (可 memory-map)."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values) -> "StringColumn":
+        encoded = [str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.data[a:b]).decode("utf-8")
+
+    def tolist(self) -> list[str]:
+        raw = bytes(self.data)
+        off = self.offsets.tolist()
+        return [raw[off[i]:off[i + 1]].decode("utf-8") for i in range(len(self))]
+
+
+class EdgeBlock:
+    """单一边类型的 CSR 邻接 + 列式属性."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray,
+                 attrs: dict[str, np.ndarray], vocab: dict[str, list[str]],
+                 in_indptr: Optional[np.ndarray] = None, in_pos: Optional[np.ndarray] = None):
+        self.indptr = indptr
+        self.indices = indices
+        self.attrs = attrs
+        self.vocab = vocab
+        # 入边 (CSC) 索引: in_pos[in_indptr[j]:in_indptr[j+1]] 为指向节点 j 的边位置 (升序)
+        self.in_indptr = in_indptr
+        self.in_pos = in_pos
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def row(self, i: int) -> tuple[int, int]:
+        """节点 i 出边在 indices/attrs 中的 [start, end) 范围."""
+        if i < 0 or i + 1 >= len(self.indptr):
+            return 0, 0
+        return int(self.indptr[i]), int(self.indptr[i + 1])
+
+    def sources(self) -> np.ndarray:
+        """每条边的源节点索引 (由 indptr 展开)."""
+        n = len(self.indptr) - 1
+        return np.repeat(np.arange(n, dtype=np.int32), np.diff(self.indptr))
+
+    def incoming(self, j: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        指向节点 j 的边
+
+        Returns:
+            (src, pos): 源节点索引与边位置 (按边位置升序); 有入边索引时为 O(度) 查找
+        """
+        if self.in_indptr is None:
+            pos = np.flatnonzero(np.asarray(self.indices) == j)
+        elif j < 0 or j + 1 >= len(self.in_indptr):
+            pos = np.empty(0, dtype=np.int64)
+        else:
+            pos = np.asarray(self.in_pos[int(self.in_indptr[j]):int(self.in_indptr[j + 1])], dtype=np.int64)
+        src = np.searchsorted(self.indptr, pos, side="right") - 1
+        return src, pos
+
+    def attr(self, name: str, pos: int, default=None):
+        """取单条边的属性, 转为 Python 标量."""
+        col = self.attrs.get(name)
+        if col is None:
+            return default
+        if name in self.vocab:
+            return self.vocab[name][int(col[pos])]
+        return col[pos].item()
+
+
+class CompactGraph:
+    """整数索引的 CSR 知识图谱 (graph.py 中查询函数的替代后端)."""
+
+    def __init__(self, node_ids: StringColumn, node_type: np.ndarray, node_name: StringColumn,
+                 id_order: np.ndarray, blocks: dict[str, EdgeBlock]):
+        self.node_ids = node_ids
+        self.node_type = node_type
+        self.node_name = node_name
+        # 节点按 ID 字典序排列的索引, 用于二分查找 (无需构建全量 dict)
+        self.id_order = id_order
+        self.blocks = blocks
+
+    # ── 基础查询 ──
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_type)
+
+    @property
+    def n_edges(self) -> int:
+        return sum(len(b) for b in self.blocks.values())
+
+    def index(self, node_id: str) -> int:
+        """节点 ID → 整数索引, 不存在返回 -1."""
+        key = node_id.encode("utf-8")
+        lo, hi = 0, len(self.id_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = int(self.id_order[mid])
+            a, b = int(self.node_ids.offsets[i]), int(self.node_ids.offsets[i + 1])
+            cur = bytes(self.node_ids.data[a:b])
+            if cur < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.id_order):
+            i = int(self.id_order[lo])
+            if self.node_ids[i] == node_id:
+                return i
+        return -1
+
+    def __contains__(self, node_id: str) -> bool:
+        return self.index(node_id) >= 0
+
+    def type_of(self, i: int) -> str:
+        return NODE_TYPES[int(self.node_type[i])]
+
+    # ── 与 graph.py 对应的查询 ──
+
+    def graph_stats(self) -> dict:
+        """按类型计数节点和边 (结构同 graph.graph_stats)."""
+        codes, counts = np.unique(np.asarray(self.node_type), return_counts=True)
+        return {
+            "nodes": {NODE_TYPES[int(c)]: int(n) for c, n in zip(codes, counts)},
+            "edges": {et: len(b) for et, b in self.blocks.items() if len(b) > 0},
+            "total_nodes": self.n_nodes,
+            "total_edges": self.n_edges,
+        }
+
+    def find_dtpd_paths(self, drug: str, disease: str, max_paths: int = 100) -> list[dict]:
+        """枚举 Drug → Target → Pathway → Disease 路径 (结构同 graph.find_dtpd_paths)."""
+        d, s = self.index(drug), self.index(disease)
+        if d < 0 or s < 0:
+            return []
+
+        dt, tp, pdz = self.blocks["DRUG_TARGET"], self.blocks["TARGET_PATHWAY"], self.blocks["PATHWAY_DISEASE"]
+        # 指向该疾病的 PATHWAY_DISEASE 边: pathway 索引 → 边位置
+        pd_src, hit = pdz.incoming(s)
+        if hit.size == 0:
+            return []
+        pd_pos = dict(zip(pd_src.tolist(), hit.tolist()))
+        target_code, pathway_code = _TYPE_CODE["Target"], _TYPE_CODE["Pathway"]
+
+        paths = []
+        a, b = dt.row(d)
+        for dt_pos in range(a, b):
+            t = int(dt.indices[dt_pos])
+            if self.node_type[t] != target_code:
+                continue
+            ta, tb = tp.row(t)
+            for p in np.asarray(tp.indices[ta:tb]).tolist():
+                if self.node_type[p] != pathway_code or p not in pd_pos:
+                    continue
+                pos = pd_pos[p]
+                paths.append({
+                    "drug": drug,
+                    "target": self.node_ids[t],
+                    "pathway": self.node_ids[p],
+                    "pathway_name": self.node_name[p],
+                    "disease": disease,
+                    "disease_name": self.node_name[s],
+                    "mechanism": dt.attr("mechanism", dt_pos, ""),
+                    "pathway_score": pdz.attr("pathway_score", pos, 0),
+                    "support_genes": pdz.attr("support_genes", pos, 0),
+                })
+                if len(paths) >= max_paths:
+                    return paths
+        return paths
+
+    def drug_summary(self, drug: str) -> dict:
+        """药物邻域摘要 (结构同 graph.drug_summary)."""
+        d = self.index(drug)
+        if d < 0:
+            return {"targets": [], "pathways": [], "adverse_events": [], "trials": []}
+
+        targets, pathways, aes, trials = [], set(), [], []
+        dt, tp = self.blocks["DRUG_TARGET"], self.blocks["TARGET_PATHWAY"]
+        a, b = dt.row(d)
+        for pos in range(a, b):
+            t = int(dt.indices[pos])
+            if self.type_of(t) != "Target":
+                continue
+            targets.append({"id": self.node_ids[t], "mechanism": dt.attr("mechanism", pos, "")})
+            ta, tb = tp.row(t)
+            for p in np.asarray(tp.indices[ta:tb]).tolist():
+                if self.type_of(p) == "Pathway":
+                    pathways.add((self.node_ids[p], self.node_name[p]))
+
+        ae = self.blocks["DRUG_AE"]
+        a, b = ae.row(d)
+        for pos in range(a, b):
+            n = int(ae.indices[pos])
+            if self.type_of(n) == "AE":
+                aes.append({
+                    "term": self.node_ids[n],
+                    "report_count": ae.attr("report_count", pos, 0),
+                    "prr": ae.attr("prr", pos, 0),
+                })
+
+        tr = self.blocks["DRUG_TRIAL"]
+        a, b = tr.row(d)
+        for pos in range(a, b):
+            n = int(tr.indices[pos])
+            if self.type_of(n) == "Trial":
+                trials.append({
+                    "nctId": self.node_ids[n],
+                    "is_safety_stop": tr.attr("is_safety_stop", pos, False),
+                    "is_efficacy_stop": tr.attr("is_efficacy_stop", pos, False),
+                })
+
+        return {
+            "targets": targets,
+            "pathways": [{"id": pid, "name": pname} for pid, pname in sorted(pathways)],
+            "adverse_events": aes,
+            "trials": trials,
+        }
+
+    # ── 持久化 ──
+
+    def save(self, path: Path) -> Path:
+        """保存为目录 (meta.json + *.npy), 可被 load() memory-map."""
+        path = ensure_dir(Path(path))
+        arrays: dict[str, np.ndarray] = {
+            "node_ids.data": self.node_ids.data,
+            "node_ids.offsets": self.node_ids.offsets,
+            "node_name.data": self.node_name.data,
+            "node_name.offsets": self.node_name.offsets,
+            "node_type": self.node_type,
+            "id_order": self.id_order,
+        }
+        vocab: dict[str, dict[str, list[str]]] = {}
+        for et, blk in self.blocks.items():
+            arrays[f"{et}.indptr"] = blk.indptr
+            arrays[f"{et}.indices"] = blk.indices
+            for name, col in blk.attrs.items():
+                arrays[f"{et}.attr.{name}"] = col
+            if blk.in_indptr is not None:
+                arrays[f"{et}.in_indptr"] = blk.in_indptr
+                arrays[f"{et}.in_pos"] = blk.in_pos
+            vocab[et] = blk.vocab
+        for name, arr in arrays.items():
+            np.save(path / f"{name}.npy", np.asarray(arr), allow_pickle=False)
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "node_types": list(NODE_TYPES),
+            "edge_types": list(self.blocks.keys()),
+            "edge_attrs": {et: list(b.attrs.keys()) for et, b in self.blocks.items()},
+            "in_indexed": [et for et, b in self.blocks.items() if b.in_indptr is not None],
+            "vocab": vocab,
+            "stats": self.graph_stats(),
+        }
+        (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info("Compact KG 已保存: %s (%d 节点, %d 边)", path, self.n_nodes, self.n_edges)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "CompactGraph":
+        """从 save() 产生的目录加载; mmap=True 时数组以只读 memory-map 打开."""
+        path = Path(path)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Compact KG 目录缺少 meta.json: {path.resolve()}")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Compact KG 格式版本不匹配: {meta.get('format_version')} (期望 {FORMAT_VERSION})"
+            )
+        mode = "r" if mmap else None
+
+        def _arr(name: str) -> np.ndarray:
+            return np.load(path / f"{name}.npy", mmap_mode=mode, allow_pickle=False)
+
+        blocks = {}
+        in_indexed = set(meta.get("in_indexed", []))
+        for et in meta["edge_types"]:
+            blocks[et] = EdgeBlock(
+                indptr=_arr(f"{et}.indptr"),
+                indices=_arr(f"{et}.indices"),
+                attrs={name: _arr(f"{et}.attr.{name}") for name in meta["edge_attrs"][et]},
+                vocab=meta["vocab"].get(et, {}),
+                in_indptr=_arr(f"{et}.in_indptr") if et in in_indexed else None,
+                in_pos=_arr(f"{et}.in_pos") if et in in_indexed else None,
+            )
+        G = cls(
+            node_ids=StringColumn(_arr("node_ids.data"), _arr("node_ids.offsets")),
+            node_type=_arr("node_type"),
+            node_name=StringColumn(_arr("node_name.data"), _arr("node_name.offsets")),
+            id_order=_arr("id_order"),
+            blocks=blocks,
+        )
+        logger.info("Compact KG 已加载: %s (%d 节点, %d 边, mmap=%s)", path, G.n_nodes, G.n_edges, mmap)
+        return G
+
+
+def _edge_block(n_nodes: int, src: np.ndarray, dst: np.ndarray, etype: str,
+                attr_frame: pd.DataFrame) -> EdgeBlock:
+    """按源节点稳定排序构建 CSR (行内保持插入顺序)."""
+    order = np.argsort(src, kind="stable")
+    counts = np.bincount(src, minlength=n_nodes) if len(src) else np.zeros(n_nodes, dtype=np.int64)
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    attrs: dict[str, np.ndarray] = {}
+    vocab: dict[str, list[str]] = {}
+    for name, kind in EDGE_ATTR_SCHEMA[etype].items():
+        col = attr_frame[name].to_numpy()[order] if name in attr_frame else np.array([])
+        if kind == "cat":
+            codes, uniques = pd.factorize(pd.Series(col, dtype=object), sort=False)
+            attrs[name] = codes.astype(np.int32)
+            vocab[name] = [str(u) for u in uniques]
+        else:
+            attrs[name] = np.asarray(col, dtype=kind)
+    indices = dst[order].astype(np.int32)
+
+    in_indptr = in_pos = None
+    if etype in INDEXED_IN_EDGES:
+        # 入边 (CSC): 按目标节点稳定排序的边位置
+        in_pos = np.argsort(indices, kind="stable").astype(np.int64)
+        in_counts = np.bincount(indices, minlength=n_nodes) if len(indices) else np.zeros(n_nodes, dtype=np.int64)
+        in_indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(in_counts, out=in_indptr[1:])
+    return EdgeBlock(indptr, indices, attrs, vocab, in_indptr, in_pos)
+
+
+def build_compact_kg(cfg: Config, sections: Optional[list[_EdgeSection]] = None) -> CompactGraph:
+    """
+    从 CSV 边数据直接构建 CompactGraph (不经过 NetworkX)
+
+    节点类型/名称的覆盖语义与 build_kg 一致.
+
+    Args:
+        cfg: 配置 (用于 data_dir 和 files 映射)
+        sections: 预先读取的边数据 (默认按 cfg 读取)
+
+    Returns:
+        CompactGraph
+    """
+    node_tables: list[pd.DataFrame] = []
+    edge_frames: list[tuple[str, pd.DataFrame]] = []
+    for sec in (sections if sections is not None else _iter_edge_sections(cfg)):
+        if len(sec.src) == 0:
+            continue
+        node_tables.append(_node_table(sec.nodes))
+        edge_frames.append((sec.etype, _dedupe_edges(sec.src, sec.dst, sec.attrs)))
+
+    if node_tables:
+        nodes = pd.concat([t.reset_index() for t in node_tables], ignore_index=True)
+        nodes = nodes.groupby("id", sort=False).agg(type=("type", "last"), name=("name", "last"))
+    else:
+        nodes = pd.DataFrame({"type": pd.Series(dtype=object), "name": pd.Series(dtype=object)},
+                             index=pd.Index([], name="id", dtype=object))
+
+    ids = nodes.index.astype(str)
+    n_nodes = len(ids)
+    node_type = nodes["type"].map(_TYPE_CODE).to_numpy(dtype=np.int8)
+    node_name = nodes["name"].fillna("").astype(str).tolist()
+    id_index = pd.Index(ids)
+    id_order = np.argsort(np.array([s.encode("utf-8") for s in ids], dtype=object), kind="stable").astype(np.int32)
+
+    blocks: dict[str, EdgeBlock] = {}
+    for etype in EDGE_TYPES:
+        frames = [f for et, f in edge_frames if et == etype]
+        if frames:
+            ef = frames[0]
+            src = id_index.get_indexer(ef["_src"]).astype(np.int64)
+            dst = id_index.get_indexer(ef["_dst"]).astype(np.int64)
+        else:
+            ef = pd.DataFrame()
+            src = dst = np.array([], dtype=np.int64)
+        blocks[etype] = _edge_block(n_nodes, src, dst, etype, ef)
+
+    G = CompactGraph(
+        node_ids=StringColumn.from_values(ids),
+        node_type=node_type,
+        node_name=StringColumn.from_values(node_name),
+        id_order=id_order,
+        blocks=blocks,
+    )
+    stats = G.graph_stats()
+    logger.info("Compact KG 构建完成: %d 节点, %d 边", stats["total_nodes"], stats["total_edges"])
+    return G
@@ -24,6 +24,12 @@ logger = logging.getLogger("kg_explain.config")
 
 # ── 常量: 合理范围 ──
 _VALID_MODES = {"v5", "v5_test", "5", "default"}
+_VALID_DTPD_ENGINES = {"pandas", "chunked", "sparse"}
+_VALID_EVIDENCE_PACK_FORMATS = {"files", "jsonl", "sqlite"}
+_VALID_CACHE_BACKENDS = {"files", "sqlite"}
+_VALID_CACHE_COMPRESS = {"none", "zlib", "zstd"}
+_VALID_TABLE_FORMATS = {"csv", "parquet"}
+_VALID_TRIAL_FETCH_MODES = {"serial", "sharded"}
 _MAX_TIMEOUT = 600  # 秒
 _MAX_RETRIES = 20
 _MAX_PAGE_SIZE = 5000
@@ -63,6 +69,12 @@ class Config:
     def cache_dir(self) -> Path:
         return Path(self.raw.get("paths", {}).get("cache_dir", "./cache"))
 
+    @property
+    def pathway_disease_store(self) -> Path | None:
+        """全局通路×疾病表目录 (build pathway-disease-store 产出); 未配置时按运行构建."""
+        val = str(self.raw.get("paths", {}).get("pathway_disease_store") or "").strip()
+        return Path(val) if val else None
+
     # ── 子配置 dict ──
     @property
     def disease(self) -> dict:
@@ -110,11 +122,41 @@ class Config:
         val = int(self.raw.get("http", {}).get("max_workers", 8))
         return max(1, min(val, _MAX_WORKERS))
 
+    @property
+    def http_per_host_limit(self) -> int:
+        """每个主机的最大并发请求数 (默认与 max_workers 相同)."""
+        val = int(self.raw.get("http", {}).get("per_host_limit", self.http_max_workers))
+        return max(1, min(val, _MAX_WORKERS))
+
+    @property
+    def http_rate_limits(self) -> dict[str, float]:
+        """主机名 → 每秒请求数 (令牌桶); 未列出的主机不限速."""
+        limits = self.raw.get("http", {}).get("rate_limits") or {}
+        if not isinstance(limits, dict):
+            return {}
+        return {str(h).strip().lower(): float(r) for h, r in limits.items() if r and float(r) > 0}
+
     @property
     def cache_ttl_hours(self) -> float:
         val = float(self.raw.get("http", {}).get("cache_ttl_hours", 0))
         return max(0.0, min(val, _MAX_TTL_HOURS))
 
+    @property
+    def cache_backend(self) -> str:
+        """HTTP 缓存后端: files (每响应一个 JSON 文件) 或 sqlite (单文件 WAL)."""
+        return str(self.raw.get("http", {}).get("cache_backend", "files")).strip().lower()
+
+    @property
+    def cache_compress(self) -> str:
+        """sqlite 缓存条目压缩: none / zlib / zstd (zstd 需安装 zstandard)."""
+        return str(self.raw.get("http", {}).get("cache_compress", "none")).strip().lower()
+
+    # ── 中间表存储 ──
+    @property
+    def table_format(self) -> str:
+        """data_dir / output_dir 中间表格式: csv 或 parquet (需 pyarrow, 排序结果仍导出 CSV)."""
+        return str(self.raw.get("storage", {}).get("table_format", "csv")).strip().lower()
+
     # ── 试验筛选 ──
     @property
     def trial_filter(self) -> dict:
@@ -132,11 +174,30 @@ class Config:
         val = int(self.trial_filter.get("max_pages", 20))
         return max(1, min(val, 500))
 
+    @property
+    def trial_fetch_mode(self) -> str:
+        """CT.gov 抓取模式: serial (逐页串行) 或 sharded (状态 × 日期分片并发, 可续抓)."""
+        return str(self.trial_filter.get("fetch_mode", "serial")).strip().lower()
+
+    @property
+    def trial_date_shards(self) -> list[int]:
+        """sharded 模式的 StartDate 边界年份; 空列表表示只按状态分片."""
+        years = self.trial_filter.get("date_shards") or []
+        if not isinstance(years, list):
+            return []
+        return [int(y) for y in years]
+
     # ── FAERS ──
     @property
     def faers(self) -> dict:
         return self.raw.get("faers", {})
 
+    @property
+    def faers_bulk_store(self) -> Path | None:
+        """FAERS 批量库目录 (build faers-store 产出); 设置时 Step 10 不再逐药物查询 openFDA."""
+        val = str(self.faers.get("bulk_store") or "").strip()
+        return Path(val) if val else None
+
     # ── 表型 ──
     @property
     def phenotype(self) -> dict:
@@ -170,6 +231,26 @@ class Config:
     def topk_pairs_per_drug(self) -> int:
         return max(1, int(self.rank.get("topk_pairs_per_drug", 50)))
 
+    @property
+    def dtpd_engine(self) -> str:
+        """DTPD 路径引擎: pandas (全量 merge) / chunked (按药物分块流式写出) / sparse (稀疏矩阵, 路径惰性提取)"""
+        return str(self.rank.get("dtpd_engine", "pandas")).strip().lower()
+
+    @property
+    def evidence_pack_format(self) -> str:
+        """证据包存储: files (每对一个 JSON) / jsonl (evidence_paths.jsonl + 偏移索引) / sqlite (单文件)"""
+        return str(self.rank.get("evidence_pack_format", "files")).strip().lower()
+
+    @property
+    def evidence_pack_workers(self) -> int:
+        val = int(self.rank.get("evidence_pack_workers", 8))
+        return max(1, min(val, _MAX_WORKERS))
+
+    @property
+    def rank_incremental(self) -> bool:
+        """增量重排: 持久化组件哈希与中间表 (output/rank_state/), 只重算输入变化的组件"""
+        return bool(self.rank.get("incremental", True))
+
     @property
     def hub_penalty_lambda(self) -> float:
         val = float(self.rank.get("hub_penalty_lambda", 1.0))
@@ -221,6 +302,30 @@ class Config:
             except (ValueError, TypeError) as e:
                 errors.append(f"http.max_retries 无法解析为整数: {e}")
 
+        if self.cache_backend not in _VALID_CACHE_BACKENDS:
+            errors.append(
+                f"http.cache_backend='{self.cache_backend}' 不合法, 可选: {sorted(_VALID_CACHE_BACKENDS)}"
+            )
+        if self.cache_compress not in _VALID_CACHE_COMPRESS:
+            errors.append(
+                f"http.cache_compress='{self.cache_compress}' 不合法, 可选: {sorted(_VALID_CACHE_COMPRESS)}"
+            )
+
+        if self.table_format not in _VALID_TABLE_FORMATS:
+            errors.append(
+                f"storage.table_format='{self.table_format}' 不合法, 可选: {sorted(_VALID_TABLE_FORMATS)}"
+            )
+
+        if self.trial_fetch_mode not in _VALID_TRIAL_FETCH_MODES:
+            errors.append(
+                f"trial_filter.fetch_mode='{self.trial_fetch_mode}' 不合法, "
+                f"可选: {sorted(_VALID_TRIAL_FETCH_MODES)}"
+            )
+        try:
+            self.trial_date_shards
+        except (ValueError, TypeError) as e:
+            errors.append(f"trial_filter.date_shards 必须是年份列表: {e}")
+
         # 排序参数检查
         rank = self.rank
         for key in ("safety_penalty_weight", "trial_failure_penalty", "phenotype_overlap_boost"):
@@ -232,6 +337,16 @@ class Config:
                 except (ValueError, TypeError) as e:
                     errors.append(f"rank.{key} 无法解析为浮点数: {e}")
 
+        if self.dtpd_engine not in _VALID_DTPD_ENGINES:
+            errors.append(
+                f"rank.dtpd_engine='{self.dtpd_engine}' 不合法, 可选: {sorted(_VALID_DTPD_ENGINES)}"
+            )
+        if self.evidence_pack_format not in _VALID_EVIDENCE_PACK_FORMATS:
+            errors.append(
+                f"rank.evidence_pack_format='{self.evidence_pack_format}' 不合法, "
+                f"可选: {sorted(_VALID_EVIDENCE_PACK_FORMATS)}"
+            )
+
         # ── v3: Cross-parameter consistency checks ──
         # 1. Total weight budget: safety + trial + phenotype should be reasonable
         spw = float(rank.get("safety_penalty_weight", 0.3))
@@ -291,15 +406,23 @@ class Config:
             "data_dir": str(self.data_dir),
             "output_dir": str(self.output_dir),
             "cache_dir": str(self.cache_dir),
+            "pathway_disease_store": str(self.pathway_disease_store or ""),
+            "faers_bulk_store": str(self.faers_bulk_store or ""),
             "http_timeout": self.http_timeout,
             "http_max_retries": self.http_max_retries,
             "http_page_size": self.http_page_size,
             "http_max_workers": self.http_max_workers,
+            "http_per_host_limit": self.http_per_host_limit,
+            "http_rate_limits": self.http_rate_limits,
             "cache_ttl_hours": self.cache_ttl_hours,
+            "cache_backend": self.cache_backend,
+            "cache_compress": self.cache_compress,
+            "table_format": self.table_format,
             "trial_statuses": self.trial_statuses,
             "trial_max_pages": self.trial_max_pages,
             "topk_paths_per_pair": self.topk_paths_per_pair,
             "topk_pairs_per_drug": self.topk_pairs_per_drug,
+            "rank_incremental": self.rank_incremental,
         }
 
 
@@ -7,7 +7,7 @@
   - ChEMBL: 药物-靶点关系 + 生物活性亲和力数据
   - Reactome: 通路数据
   - OpenTargets: 基因-疾病关联
-  - FAERS: FDA不良事件报告
+  - FAERS: FDA不良事件报告 (openFDA API 或本地批量库)
   - SIDER: FDA药物标签副作用数据 (补充FAERS)
   - Signature: 基因签名驱动的药物反查 (跨疾病 repurposing)
 """
@@ -20,6 +20,7 @@ from .chembl import (
 from .reactome import fetch_target_pathways
 from .opentargets import fetch_gene_diseases, fetch_disease_phenotypes
 from .faers import fetch_drug_ae
+from .faers_bulk import build_faers_store
 from .sider import load_sider_safety, merge_faers_sider
 from .signature import fetch_drugs_from_signature, fetch_known_indications, inject_sigreverse_drugs
 
@@ -36,6 +37,7 @@ __all__ = [
     "fetch_gene_diseases",
     "fetch_disease_phenotypes",
     "fetch_drug_ae",
+    "build_faers_store",
     "load_sider_safety",
     "merge_faers_sider",
     "fetch_drugs_from_signature",
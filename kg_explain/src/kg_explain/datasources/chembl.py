@@ -6,6 +6,10 @@ ChEMBL 数据源
   2. 药物 → 靶点 (mechanism of action)
   3. 靶点 → UniProt/Ensembl 交叉引用
 
+批量查询: mechanism / molecule / target / activity 在逐个查询前先用
+``<field>__in=ID1,ID2,...`` 合并请求 (chembl_prefetch), 结果按 ID 拆分后写入
+与单 ID 查询相同的缓存 key, 冷/热缓存互相兼容.
+
 API: https://www.ebi.ac.uk/chembl/api/data
 """
 from __future__ import annotations
@@ -14,9 +18,9 @@ from pathlib import Path
 
 import pandas as pd
 
-from ..cache import HTTPCache, cached_get_json
-from ..utils import read_csv, safe_str, load_canonical_map, concurrent_map
-from .rxnorm import _is_non_drug
+from ..cache import HTTPCache, cache_key, cached_get_json, http_get_json
+from ..utils import read_csv, read_table, safe_str, load_canonical_map, concurrent_map, write_table
+from ..normalize import is_non_drug
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +51,148 @@ def _classify_drug(molecule_type: str) -> str:
 # ChEMBL API端点
 CHEMBL_API = "https://www.ebi.ac.uk/chembl/api/data"
 
+# 批量查询: 每个 __in 请求的 ID 数 (URL 长度 ~1 KB) 与分页大小 (ChEMBL 上限 1000)
+CHEMBL_BATCH_SIZE = 50
+_CHEMBL_PAGE_LIMIT = 1000
+_RESULT_KEYS = {
+    "mechanism": "mechanisms",
+    "molecule": "molecules",
+    "target": "targets",
+    "activity": "activities",
+}
+
+
+def _as_fields(id_field: str | tuple[str, ...]) -> tuple[str, ...]:
+    return (id_field,) if isinstance(id_field, str) else tuple(id_field)
+
+
+def _as_key(ident: str | tuple[str, ...]) -> tuple[str, ...]:
+    return (ident,) if isinstance(ident, str) else tuple(ident)
+
+
+def _per_id_request(resource: str, fields: tuple[str, ...], key: tuple[str, ...], params: dict | None,
+                    detail: bool) -> tuple[str, dict | None]:
+    """单 ID 查询的 (url, params), 与逐个查询函数保持一致 (决定缓存 key)"""
+    if detail:
+        return f"{CHEMBL_API}/{resource}/{key[0]}.json", None
+    return f"{CHEMBL_API}/{resource}.json", {**(params or {}), **dict(zip(fields, key))}
+
+
+def _fetch_batch(
+    cache: HTTPCache,
+    resource: str,
+    fields: tuple[str, ...],
+    params: dict | None,
+    keys: list[tuple[str, ...]],
+    detail: bool,
+) -> int:
+    """
+    一次 __in 查询 (含分页) 取回 keys 的全部记录, 按 fields 拆分写入单 ID 缓存.
+
+    多字段 (如 molecule × target) 时每个字段各用一个 __in 过滤, 交叉积中
+    未请求的组合直接丢弃.
+    列表型 (detail=False): 每个 ID 写入 {<key>: 前 limit 条, page_meta}, 与单 ID
+    查询返回的前 limit 条相同 (ChEMBL 默认按主键排序).
+    详情型 (detail=True): 每个 ID 写入记录本身; 未返回的 ID 不写, 留给逐个查询处理.
+
+    Returns:
+        发出的 HTTP 请求数. 失败时只记日志, 未写入的 ID 由逐个查询兜底.
+    """
+    result_key = _RESULT_KEYS[resource]
+    per_id_limit = int((params or {}).get("limit", 20))
+    query = {k: v for k, v in (params or {}).items() if k != "limit"}
+    for j, f in enumerate(fields):
+        query[f"{f}__in"] = ",".join(dict.fromkeys(k[j] for k in keys))
+    query["limit"] = _CHEMBL_PAGE_LIMIT
+    url = f"{CHEMBL_API}/{resource}.json"
+
+    records: list[dict] = []
+    n_requests = 0
+    offset = 0
+    try:
+        while True:
+            js = http_get_json(url, params={**query, "offset": offset})
+            n_requests += 1
+            page = js.get(result_key) or []
+            records.extend(page)
+            offset += len(page)
+            meta = js.get("page_meta") or {}
+            if not page or not meta.get("next") or offset >= int(meta.get("total_count") or 0):
+                break
+    except Exception as e:
+        logger.warning("ChEMBL 批量查询失败, 回退逐个查询: %s %s=%s... (%d IDs): %s",
+                       resource, "/".join(fields), keys[0], len(keys), e)
+        return n_requests
+
+    by_key: dict[tuple[str, ...], list[dict]] = {k: [] for k in keys}
+    for rec in records:
+        rows = by_key.get(tuple(rec.get(f) for f in fields))
+        if rows is not None:
+            rows.append(rec)
+
+    for key, rows in by_key.items():
+        u, p = _per_id_request(resource, fields, key, params, detail)
+        if detail:
+            if rows:
+                cache.set(cache_key(u, p), rows[0])
+            continue
+        cache.set(cache_key(u, p), {
+            result_key: rows[:per_id_limit],
+            "page_meta": {"limit": per_id_limit, "offset": 0, "total_count": len(rows),
+                          "next": None, "previous": None},
+        })
+    return n_requests
+
+
+def chembl_prefetch(
+    cache: HTTPCache,
+    resource: str,
+    id_field: str | tuple[str, ...],
+    groups: list[tuple[dict | None, list]],
+    detail: bool = False,
+    batch_size: int = CHEMBL_BATCH_SIZE,
+) -> dict[str, int]:
+    """
+    用 __in 批量请求预填单 ID 缓存, 之后的逐个查询全部命中缓存.
+
+    Args:
+        cache: HTTP 缓存.
+        resource: mechanism / molecule / target / activity.
+        id_field: 批量过滤与拆分结果的字段, 如 molecule_chembl_id;
+            也可以是字段元组 (如 activity 的 (molecule_chembl_id, target_chembl_id)), 此时 ID 为同长元组.
+        groups: [(单 ID 查询的其余参数, ID 列表)]; 参数含 limit 时作为每个 ID 的条数上限.
+        detail: True 表示单 ID 查询是详情端点 <resource>/<id>.json.
+        batch_size: 每个 __in 请求的 ID 数 (按输入顺序切分, 多字段时先按首字段排序可减少交叉积).
+
+    Returns:
+        {"ids", "cached", "batches", "requests"}
+    """
+    fields = _as_fields(id_field)
+    jobs: list[tuple[dict | None, list[tuple[str, ...]]]] = []
+    n_ids = 0
+    n_cached = 0
+    step = max(1, int(batch_size))
+    for params, ids in groups:
+        todo = []
+        for key in dict.fromkeys(_as_key(i) for i in ids if i):
+            n_ids += 1
+            url, p = _per_id_request(resource, fields, key, params, detail)
+            if cache.has(cache_key(url, p)):
+                n_cached += 1
+            else:
+                todo.append(key)
+        jobs.extend((params, todo[k:k + step]) for k in range(0, len(todo), step))
+
+    results = concurrent_map(
+        lambda job: _fetch_batch(cache, resource, fields, job[0], job[1], detail),
+        jobs, max_workers=cache.max_workers, desc=f"ChEMBL {resource} batch",
+    )
+    stats = {"ids": n_ids, "cached": n_cached, "batches": len(jobs),
+             "requests": sum(r or 0 for r in results)}
+    logger.info("ChEMBL %s 批量预取: %d IDs (%d 已缓存), %d 批, %d 次请求",
+                resource, n_ids, n_cached, stats["batches"], stats["requests"])
+    return stats
+
 
 def _chembl_molecule_search(cache: HTTPCache, q: str, max_hits: int = 5) -> list[dict]:
     """搜索分子"""
@@ -192,6 +338,14 @@ def _chembl_mechanisms(cache: HTTPCache, molecule_chembl_id: str, limit: int = 1
     return js.get("mechanisms") or []
 
 
+def _cached_empty_mechanisms(cache: HTTPCache, molecule_chembl_id: str) -> bool:
+    """预取后 mechanism 缓存为空 (需要 parent 回退)"""
+    url, params = _per_id_request("mechanism", ("molecule_chembl_id",), (molecule_chembl_id,),
+                                  {"limit": 1000}, detail=False)
+    js = cache.get(cache_key(url, params))
+    return js is not None and not js.get("mechanisms")
+
+
 def fetch_drug_targets(
     data_dir: Path,
     cache: HTTPCache,
@@ -211,6 +365,16 @@ def fetch_drug_targets(
         if safe_str(r.get("chembl_id"))
     })
 
+    # 批量预取: mechanism → (无机制分子的) parent molecule → parent mechanism
+    chembl_prefetch(cache, "mechanism", "molecule_chembl_id", [({"limit": 1000}, unique_mols)])
+    no_mech = [m for m in unique_mols if _cached_empty_mechanisms(cache, m)]
+    if no_mech:
+        chembl_prefetch(cache, "molecule", "molecule_chembl_id", [(None, no_mech)], detail=True)
+        parents = concurrent_map(lambda m: _chembl_parent_molecule(cache, m), no_mech,
+                                 max_workers=cache.max_workers)
+        parents = [p for p in parents if p]
+        chembl_prefetch(cache, "mechanism", "molecule_chembl_id", [({"limit": 1000}, parents)])
+
     def _fetch_mech(mol):
         try:
             mechs = _chembl_mechanisms(cache, mol)
@@ -239,7 +403,7 @@ def fetch_drug_targets(
         drug_raw = safe_str(r.get("drug_raw"))
         if not mol or not drug_raw:
             continue
-        if _is_non_drug(drug_raw):
+        if is_non_drug(drug_raw):
             continue
 
         drug_norm = safe_str(r.get("canonical_name")) or drug_raw.lower()
@@ -258,9 +422,15 @@ def fetch_drug_targets(
     logger.info("Drug→Target 关系: %d 条边, %d 个药物, %d 个靶点",
                 len(out_df), out_df["drug_normalized"].nunique(), out_df["target_chembl_id"].nunique())
 
-    out = data_dir / "edge_drug_target.csv"
-    out_df.to_csv(out, index=False)
-    return out
+    return write_table(out_df, data_dir / "edge_drug_target.csv")
+
+
+# Only fetch binding/functional assays with numeric results
+_ACTIVITY_PARAMS = {
+    "limit": 20,
+    "standard_type__in": "IC50,Ki,Kd,EC50",
+    "pchembl_value__isnull": "false",
+}
 
 
 def _chembl_bioactivities(
@@ -279,12 +449,10 @@ def _chembl_bioactivities(
     """
     url = f"{CHEMBL_API}/activity.json"
     params = {
+        **_ACTIVITY_PARAMS,
         "molecule_chembl_id": molecule_chembl_id,
         "target_chembl_id": target_chembl_id,
         "limit": limit,
-        # Only fetch binding/functional assays with numeric results
-        "standard_type__in": "IC50,Ki,Kd,EC50",
-        "pchembl_value__isnull": "false",
     }
     try:
         js = cached_get_json(cache, url, params=params)
@@ -321,7 +489,7 @@ def fetch_drug_target_affinities(
     Returns:
         Path to output CSV
     """
-    dt = read_csv(data_dir / "edge_drug_target.csv", dtype=str)
+    dt = read_table(data_dir / "edge_drug_target.csv", typed=False)
     if dt.empty:
         logger.warning("edge_drug_target.csv empty, skipping affinity fetch")
         out = data_dir / "edge_drug_target_affinity.csv"
@@ -337,6 +505,11 @@ def fetch_drug_target_affinities(
         .drop_duplicates(subset=["molecule_chembl_id", "target_chembl_id"])
     )
 
+    # 批量预取: molecule_chembl_id__in × target_chembl_id__in (按分子排序, 同一批内分子集中)
+    pair_ids = sorted(zip(pairs["molecule_chembl_id"].astype(str), pairs["target_chembl_id"].astype(str)))
+    chembl_prefetch(cache, "activity", ("molecule_chembl_id", "target_chembl_id"),
+                    [(_ACTIVITY_PARAMS, pair_ids)])
+
     def _fetch_affinity(row_tuple):
         _, row = row_tuple
         mol = str(row["molecule_chembl_id"])
@@ -414,8 +587,9 @@ def fetch_target_xrefs(
     Returns:
         (node_path, xref_path): 靶点节点和交叉引用
     """
-    dt = read_csv(data_dir / "edge_drug_target.csv", dtype=str)
+    dt = read_table(data_dir / "edge_drug_target.csv", typed=False)
     targets = sorted(set(dt["target_chembl_id"].dropna().astype(str).tolist()))
+    chembl_prefetch(cache, "target", "target_chembl_id", [(None, targets)], detail=True)
 
     def _fetch_one(tid):
         try:
@@ -7,15 +7,20 @@ ClinicalTrials.gov 数据源
 API文档: https://clinicaltrials.gov/data-api/api
 """
 from __future__ import annotations
+import json
 import logging
+import os
 import re
+import shutil
+import threading
 from pathlib import Path
 
 import pandas as pd
 from tqdm import tqdm
 
-from ..cache import HTTPCache, cached_get_json
+from ..cache import HTTPCache, cached_get_json, sha1
 from ..config import ensure_dir
+from ..utils import concurrent_map
 
 logger = logging.getLogger(__name__)
 
@@ -160,6 +165,40 @@ def _label_outcome(study: dict) -> str:
     return "UNCLEAR"
 
 
+def _study_rows(
+    study: dict,
+    include_types: list[str] | None,
+    exclude_types: list[str] | None,
+    trial_source: str,
+    label_completed: bool = False,
+) -> tuple[list[dict], int]:
+    """单个试验 → 药物行 (每个干预一行, 无干预时一行空药物)
+
+    Returns:
+        (rows, n_filtered); label_completed 且结局非 NEGATIVE/MIXED 时返回空行
+    """
+    # For COMPLETED trials, only keep NEGATIVE/MIXED outcomes
+    if label_completed:
+        outcome = _label_outcome(study)
+        if outcome not in ("NEGATIVE", "MIXED"):
+            return [], 0
+
+    b = _extract_basic(study)
+    ints_raw = _extract_interventions(study)
+    ints = _filter_interventions(ints_raw, include_types, exclude_types)
+    n_filtered = len(ints_raw) - len(ints)
+
+    if not ints:
+        return [{**b, "drug_raw": None, "intervention_type": None,
+                 "trial_source": trial_source}], n_filtered
+    return [{
+        **b,
+        "drug_raw": it.get("name"),
+        "intervention_type": it.get("type"),
+        "trial_source": trial_source,
+    } for it in ints], n_filtered
+
+
 def _fetch_studies(
     cache: HTTPCache,
     condition: str,
@@ -195,28 +234,10 @@ def _fetch_studies(
         js = cached_get_json(cache, CTG_API, params=params)
 
         for st in js.get("studies") or []:
-            # For COMPLETED trials, only keep NEGATIVE/MIXED outcomes
-            if label_completed:
-                outcome = _label_outcome(st)
-                if outcome not in ("NEGATIVE", "MIXED"):
-                    continue
-
-            b = _extract_basic(st)
-            ints_raw = _extract_interventions(st)
-            ints = _filter_interventions(ints_raw, include_types, exclude_types)
-            n_filtered += len(ints_raw) - len(ints)
-
-            if not ints:
-                rows.append({**b, "drug_raw": None, "intervention_type": None,
-                             "trial_source": trial_source})
-            else:
-                for it in ints:
-                    rows.append({
-                        **b,
-                        "drug_raw": it.get("name"),
-                        "intervention_type": it.get("type"),
-                        "trial_source": trial_source,
-                    })
+            study_rows, n = _study_rows(st, include_types, exclude_types,
+                                        trial_source, label_completed)
+            rows.extend(study_rows)
+            n_filtered += n
 
         page_token = js.get("nextPageToken")
         if not page_token:
@@ -225,6 +246,244 @@ def _fetch_studies(
     return rows, n_filtered
 
 
+# ── 分片并发抓取 (fetch_mode="sharded") ──
+#
+# 查询空间按 (状态, 开始日期区间) 切成互不重叠的分片: overallStatus 单值,
+# StartDate 区间首尾开放并单独查询缺失日期的试验, 因此每个试验恰好落在一个分片中.
+# 各分片独立翻页 (nextPageToken 只在分片内串行), 分片之间并发;
+# 每页解析后立即追加到分片的行文件, 游标 (下一页 token + 文件字节数) 同步落盘,
+# 中断后重新运行从断点继续.
+
+ROW_COLUMNS = [
+    "nctId", "briefTitle", "overallStatus", "whyStopped", "phases", "conditions",
+    "drug_raw", "intervention_type", "trial_source",
+]
+FETCH_STATE_DIR = "failed_trials_fetch"
+
+
+def date_ranges(boundaries: list[int] | None) -> list[str | None]:
+    """
+    边界年份 → StartDate 过滤表达式 (Essie 语法, 用于 filter.advanced)
+
+    [2010, 2020] → RANGE[MIN, 2009-12-31] / RANGE[2010-01-01, 2019-12-31] /
+    RANGE[2020-01-01, MAX] / MISSING; 空列表 → [None] (不按日期切分)
+    """
+    years = sorted({int(y) for y in boundaries or []})
+    if not years:
+        return [None]
+    lows = ["MIN"] + [f"{y}-01-01" for y in years]
+    highs = [f"{y - 1}-12-31" for y in years] + ["MAX"]
+    ranges = [f"AREA[StartDate]RANGE[{lo}, {hi}]" for lo, hi in zip(lows, highs)]
+    return ranges + ["AREA[StartDate]MISSING"]
+
+
+class _FetchCursor:
+    """分片游标 (cursor.json), 记录每个分片的下一页 token / 已取页数 / 行文件字节数"""
+
+    def __init__(self, state_dir: Path, fingerprint: str, resume: bool = True):
+        self.dir = ensure_dir(state_dir)
+        self.path = self.dir / "cursor.json"
+        self._lock = threading.Lock()
+        state = {}
+        if resume and self.path.exists():
+            try:
+                state = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning("CT.gov 游标无法读取, 重新抓取: %s", self.path)
+        if state.get("fingerprint") != fingerprint:
+            if state:
+                logger.info("CT.gov 查询参数已变化, 丢弃旧游标")
+            for part in self.dir.glob("shard_*.csv"):
+                part.unlink()
+            state = {"fingerprint": fingerprint, "shards": {}}
+        self.state = state
+
+    def part_path(self, shard_id: str) -> Path:
+        return self.dir / f"shard_{shard_id}.csv"
+
+    def get(self, shard_id: str) -> dict:
+        with self._lock:
+            return dict(self.state["shards"].get(shard_id) or
+                        {"next_token": None, "pages": 0, "bytes": 0, "rows": 0,
+                         "n_filtered": 0, "done": False})
+
+    def update(self, shard_id: str, entry: dict) -> None:
+        with self._lock:
+            self.state["shards"][shard_id] = entry
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.state, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def _fetch_shard(
+    cache: HTTPCache,
+    cursor: _FetchCursor,
+    shard: dict,
+    page_size: int,
+    max_pages: int,
+    include_types: list[str] | None,
+    exclude_types: list[str] | None,
+) -> dict:
+    """翻完一个分片: 每页的行立即追加到分片行文件, 然后推进游标"""
+    sid = shard["id"]
+    entry = cursor.get(sid)
+    part = cursor.part_path(sid)
+    if entry["done"]:
+        return entry
+
+    # 截掉上次中断时游标之后写入的半页
+    with open(part, "a+b") as f:
+        f.truncate(entry["bytes"])
+
+    while entry["pages"] < max_pages:
+        params = {
+            "query.cond": shard["condition"],
+            "pageSize": min(int(page_size), 1000),
+            "countTotal": "true",
+            "filter.overallStatus": shard["status"],
+        }
+        if shard["date_filter"]:
+            params["filter.advanced"] = shard["date_filter"]
+        if entry["next_token"]:
+            params["pageToken"] = entry["next_token"]
+
+        js = cached_get_json(cache, CTG_API, params=params)
+
+        page_rows = []
+        for st in js.get("studies") or []:
+            study_rows, n = _study_rows(st, include_types, exclude_types,
+                                        shard["trial_source"], shard["label_completed"])
+            page_rows.extend(study_rows)
+            entry["n_filtered"] += n
+        if page_rows:
+            with open(part, "a", encoding="utf-8", newline="") as f:
+                pd.DataFrame(page_rows, columns=ROW_COLUMNS).to_csv(f, header=False, index=False)
+
+        entry["pages"] += 1
+        entry["rows"] += len(page_rows)
+        entry["bytes"] = part.stat().st_size
+        entry["next_token"] = js.get("nextPageToken")
+        entry["done"] = not entry["next_token"]
+        cursor.update(sid, entry)
+        if entry["done"]:
+            break
+    else:
+        entry["done"] = True
+        cursor.update(sid, entry)
+    return entry
+
+
+def _fetch_sharded(
+    cache: HTTPCache,
+    condition: str,
+    data_dir: Path,
+    statuses: list[str],
+    page_size: int,
+    max_pages: int,
+    include_types: list[str] | None,
+    exclude_types: list[str] | None,
+    also_completed: bool,
+    date_shards: list[int] | None,
+    max_workers: int | None,
+    resume: bool,
+) -> tuple[Path, int]:
+    """
+    分片并发抓取, 行文件按分片顺序拼接到 failed_trials_drug_rows.csv
+
+    max_pages 作用于每个分片. 有分片失败时抛出 RuntimeError, 已完成的页保留在游标中.
+
+    Returns:
+        (rows_path, n_filtered)
+    """
+    groups = [(s, "STOPPED", False) for s in statuses]
+    if also_completed:
+        groups.append(("COMPLETED", "COMPLETED_NEGATIVE", True))
+    shards = []
+    for status, source, label in groups:
+        for date_filter in date_ranges(date_shards):
+            shards.append({
+                "id": f"{len(shards):03d}", "condition": condition, "status": status,
+                "date_filter": date_filter, "trial_source": source, "label_completed": label,
+            })
+
+    fingerprint = sha1(json.dumps({
+        "condition": condition, "page_size": int(page_size), "max_pages": int(max_pages),
+        "include_types": include_types, "exclude_types": exclude_types,
+        "shards": [{k: v for k, v in s.items() if k != "id"} for s in shards],
+    }, sort_keys=True))
+    cursor = _FetchCursor(data_dir / FETCH_STATE_DIR, fingerprint, resume=resume)
+    n_resumed = sum(1 for s in shards if cursor.get(s["id"])["pages"] > 0)
+    if n_resumed:
+        logger.info("CT.gov 从游标继续: %d/%d 个分片已有进度", n_resumed, len(shards))
+
+    workers = max_workers if max_workers is not None else cache.max_workers
+    results = concurrent_map(
+        lambda shard: _fetch_shard(cache, cursor, shard, page_size, max_pages,
+                                   include_types, exclude_types),
+        shards, max_workers=workers, desc=f"CT.gov [{condition}] {len(shards)} 分片",
+    )
+    failed = [s["id"] for s, r in zip(shards, results) if r is None]
+    if failed:
+        raise RuntimeError(
+            f"CT.gov 分片抓取未完成 ({len(failed)}/{len(shards)} 个分片失败), "
+            f"重新运行将从 {cursor.path} 继续"
+        )
+
+    rows_path = data_dir / "failed_trials_drug_rows.csv"
+    tmp = rows_path.with_name(rows_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as out:
+        out.write(",".join(ROW_COLUMNS) + "\n")
+        for s in shards:
+            part = cursor.part_path(s["id"])
+            if part.exists():
+                with open(part, encoding="utf-8", newline="") as f:
+                    shutil.copyfileobj(f, out)
+    os.replace(tmp, rows_path)
+
+    n_filtered = sum(r["n_filtered"] for r in results)
+    n_pages = sum(r["pages"] for r in results)
+    logger.info("CT.gov 分片抓取完成: %d 个分片, %d 页, %d 行",
+                len(shards), n_pages, sum(r["rows"] for r in results))
+    shutil.rmtree(cursor.dir, ignore_errors=True)
+    return rows_path, n_filtered
+
+
+def _fetch_serial(
+    cache: HTTPCache,
+    condition: str,
+    statuses: list[str],
+    page_size: int,
+    max_pages: int,
+    include_types: list[str] | None,
+    exclude_types: list[str] | None,
+    also_completed: bool,
+) -> tuple[pd.DataFrame, int]:
+    """串行抓取: 先 STOPPED 状态组, 再 (可选) COMPLETED+negative"""
+    # Fetch stopped trials (existing behavior)
+    rows, n_filtered = _fetch_studies(
+        cache, condition, statuses, page_size, max_pages,
+        include_types, exclude_types, trial_source="STOPPED",
+    )
+
+    # Optionally fetch COMPLETED trials with negative outcomes
+    if also_completed:
+        completed_rows, n_filt2 = _fetch_studies(
+            cache, condition, ["COMPLETED"], page_size, max_pages,
+            include_types, exclude_types,
+            trial_source="COMPLETED_NEGATIVE", label_completed=True,
+        )
+        n_filtered += n_filt2
+        n_completed = len(set(r.get("nctId") for r in completed_rows if r.get("nctId")))
+        rows.extend(completed_rows)
+        logger.info("CT.gov COMPLETED+negative: %d 行, %d 个试验",
+                     len(completed_rows), n_completed)
+
+    df = pd.DataFrame(rows)
+    if "trial_source" not in df.columns:
+        df["trial_source"] = "STOPPED"
+    return df, n_filtered
+
+
 def fetch_failed_trials(
     condition: str,
     data_dir: Path,
@@ -235,6 +494,10 @@ def fetch_failed_trials(
     include_types: list[str] | None = None,
     exclude_types: list[str] | None = None,
     also_completed: bool = False,
+    fetch_mode: str = "serial",
+    date_shards: list[int] | None = None,
+    max_workers: int | None = None,
+    resume: bool = True,
 ) -> tuple[Path, Path]:
     """
     从CT.gov获取失败的临床试验
@@ -249,6 +512,11 @@ def fetch_failed_trials(
         include_types: 仅保留的干预类型
         exclude_types: 排除的干预类型
         also_completed: 是否同时获取 COMPLETED+negative 试验
+        fetch_mode: serial (逐页串行, 默认) / sharded (按状态 × 开始日期区间分片并发,
+                    逐页流式写出, 中断后可续抓; max_pages 作用于每个分片)
+        date_shards: sharded 模式的开始日期边界年份 (如 [2005, 2015]), 空则只按状态分片
+        max_workers: sharded 模式的并发分片数 (默认 cache.max_workers)
+        resume: sharded 模式是否从 data_dir/failed_trials_fetch/cursor.json 继续
 
     Returns:
         (rows_path, summary_path): 试验行数据和药物汇总
@@ -257,39 +525,29 @@ def fetch_failed_trials(
         statuses = ["TERMINATED", "WITHDRAWN", "SUSPENDED"]
 
     ensure_dir(data_dir)
+    rows_path = data_dir / "failed_trials_drug_rows.csv"
 
-    # Fetch stopped trials (existing behavior)
-    rows, n_filtered = _fetch_studies(
-        cache, condition, statuses, page_size, max_pages,
-        include_types, exclude_types, trial_source="STOPPED",
-    )
-
-    n_completed = 0
-    # Optionally fetch COMPLETED trials with negative outcomes
-    if also_completed:
-        completed_rows, n_filt2 = _fetch_studies(
-            cache, condition, ["COMPLETED"], page_size, max_pages,
-            include_types, exclude_types,
-            trial_source="COMPLETED_NEGATIVE", label_completed=True,
+    if fetch_mode == "sharded":
+        rows_path, n_filtered = _fetch_sharded(
+            cache, condition, data_dir, statuses, page_size, max_pages,
+            include_types, exclude_types, also_completed, date_shards, max_workers, resume,
         )
-        n_filtered += n_filt2
-        n_completed = len(set(r.get("nctId") for r in completed_rows if r.get("nctId")))
-        rows.extend(completed_rows)
-        logger.info("CT.gov COMPLETED+negative: %d 行, %d 个试验",
-                     len(completed_rows), n_completed)
+        df = pd.read_csv(rows_path, dtype=str)
+    elif fetch_mode == "serial":
+        df, n_filtered = _fetch_serial(
+            cache, condition, statuses, page_size, max_pages,
+            include_types, exclude_types, also_completed,
+        )
+        # 保存行数据
+        df.to_csv(rows_path, index=False)
+    else:
+        raise ValueError(f"未知 fetch_mode: {fetch_mode} (可选 serial / sharded)")
 
-    df = pd.DataFrame(rows)
-    if "trial_source" not in df.columns:
-        df["trial_source"] = "STOPPED"
     n_trials = df["nctId"].nunique() if not df.empty else 0
     n_drugs = df["drug_raw"].dropna().nunique() if not df.empty else 0
     logger.info("CT.gov 获取完成: %d 行, %d 个试验 (STOPPED+COMPLETED_NEG), %d 个药物, %d 个干预被过滤",
                 len(df), n_trials, n_drugs, n_filtered)
 
-    # 保存行数据
-    rows_path = data_dir / "failed_trials_drug_rows.csv"
-    df.to_csv(rows_path, index=False)
-
     # 生成药物汇总
     d = df[df["drug_raw"].notna()].copy()
     d["drug_normalized"] = d["drug_raw"].fillna("").astype(str).str.strip().str.lower()
@@ -20,51 +20,16 @@ PRR (Proportional Reporting Ratio):
 """
 from __future__ import annotations
 import logging
-import re
 from pathlib import Path
 
 import pandas as pd
 
 from ..cache import HTTPCache, cached_get_json
-from ..utils import concurrent_map
+from ..normalize import strip_salt_form as _strip_salt_form
+from ..utils import concurrent_map, write_table
 
 logger = logging.getLogger(__name__)
 
-# ---------------------------------------------------------------------------
-# Salt-form stripping (lightweight local copy; canonical version lives in
-# dr.common.text but kg_explain is a separate package)
-# ---------------------------------------------------------------------------
-_SALT_SUFFIXES = sorted([
-    "sodium", "potassium", "calcium", "magnesium", "aluminum",
-    "hydrochloride", "dihydrochloride", "hcl",
-    "sulfate", "sulphate", "bisulfate",
-    "citrate", "maleate", "fumarate", "succinate", "tartrate",
-    "phosphate", "acetate", "benzoate", "mesylate", "besylate",
-    "tosylate", "lactate", "gluconate", "carbonate", "nitrate",
-    "bromide", "chloride", "iodide",
-    "disodium", "dipotassium", "tromethamine",
-    "hemifumarate", "esylate", "xinafoate",
-    "hemihydrate", "monohydrate", "dihydrate", "trihydrate",
-    "sesquihydrate", "hydrate", "anhydrous",
-], key=len, reverse=True)
-
-_SALT_RE = re.compile(
-    r"\b(" + "|".join(re.escape(s) for s in _SALT_SUFFIXES) + r")\b",
-    re.IGNORECASE,
-)
-
-
-def _strip_salt_form(name: str) -> str:
-    """Remove salt-form suffixes from a drug name.
-
-    >>> _strip_salt_form("tofacitinib citrate")
-    'tofacitinib'
-    >>> _strip_salt_form("aspirin")
-    'aspirin'
-    """
-    s = _SALT_RE.sub("", str(name).strip())
-    return re.sub(r"\s+", " ", s).strip()
-
 # openFDA API端点
 FAERS_API = "https://api.fda.gov/drug/event.json"
 
@@ -166,6 +131,7 @@ def fetch_drug_ae(
     min_prr: float = 0.0,
     top_ae: int = 50,
     max_drugs: int = 500,
+    bulk_store: Path | None = None,
 ) -> Path:
     """
     获取药物-不良事件关系 (edge_drug_ae) 并计算 PRR
@@ -178,10 +144,30 @@ def fetch_drug_ae(
         min_prr: 最小 PRR 阈值 (低于此值不视为信号，0 表示不过滤)
         top_ae: 每个药物保留的 top AE 数
         max_drugs: 最多处理的药物数
+        bulk_store: FAERS 批量库目录 (build_faers_store 产出); 设置时不发网络请求,
+                    计数与 PRR 全部来自本地 (见 faers_bulk)
 
     Returns:
         输出文件路径
     """
+    # Expand combo drugs: "aspirin+ticagrelor" → ["aspirin", "ticagrelor"]
+    expanded = []
+    seen = set()
+    for d in drug_list[:max_drugs]:
+        parts = [p.strip() for p in d.split("+")]
+        for p in parts:
+            if p and p.lower() not in seen:
+                seen.add(p.lower())
+                expanded.append(p)
+
+    if bulk_store is not None:
+        from .faers_bulk import FAERSStore, drug_ae_from_store
+        out_df, n_prr_filtered = drug_ae_from_store(
+            FAERSStore(bulk_store), expanded,
+            min_count=min_count, min_prr=min_prr, top_ae=top_ae,
+        )
+        return _write_drug_ae(data_dir, out_df.drop_duplicates(), n_prr_filtered)
+
     # 获取全局背景率 (只请求一次)
     bg_ae, bg_total = _fetch_background_ae(cache)
     has_bg = bg_total > 0
@@ -215,16 +201,6 @@ def fetch_drug_ae(
             })
         return drug_rows, filtered
 
-    # Expand combo drugs: "aspirin+ticagrelor" → ["aspirin", "ticagrelor"]
-    expanded = []
-    seen = set()
-    for d in drug_list[:max_drugs]:
-        parts = [p.strip() for p in d.split("+")]
-        for p in parts:
-            if p and p.lower() not in seen:
-                seen.add(p.lower())
-                expanded.append(p)
-
     results = concurrent_map(
         _fetch_one, expanded,
         max_workers=cache.max_workers, desc="FAERS Drug→AE",
@@ -233,11 +209,13 @@ def fetch_drug_ae(
     n_prr_filtered = sum(f for r in results if r is not None for _, f in [r] if f)
 
     out_df = pd.DataFrame(rows).drop_duplicates()
+    return _write_drug_ae(data_dir, out_df, n_prr_filtered)
+
+
+def _write_drug_ae(data_dir: Path, out_df: pd.DataFrame, n_prr_filtered: int) -> Path:
     n_signals = len(out_df[out_df["prr"] >= 2.0]) if not out_df.empty and "prr" in out_df.columns else 0
     logger.info("Drug→AE 关系: %d 条边, %d 个药物, %d 个信号(PRR≥2), %d 条被PRR过滤",
                 len(out_df), out_df["drug_normalized"].nunique() if not out_df.empty else 0,
                 n_signals, n_prr_filtered)
 
-    out = data_dir / "edge_drug_ae_faers.csv"
-    out_df.to_csv(out, index=False)
-    return out
+    return write_table(out_df, data_dir / "edge_drug_ae_faers.csv")
@@ -0,0 +1,373 @@
+"""
+FAERS 本地批量数据 (离线构建, 替代逐药物 openFDA 查询)
+
+fetch_drug_ae 默认每个药物发一次 openFDA count 查询 (盐型回退再加一次), PRR 逐行计算;
+max_drugs=500 时这部分请求主导运行时间. 这里把 FDA 季度批量下载一次性聚合为
+药物×AE 报告数表, 运行时按药物切片, PRR 全表向量化计算, 不发任何网络请求.
+
+支持的来源 (可为 .zip; 两种来源覆盖同一批病例, 同一目录只放一种, 否则重复计数):
+  - FAERS 季度 ASCII: DRUGyyQq.txt + REACyyQq.txt ('$' 分隔; primaryid / drugname /
+    prod_ai / pt), 如 faers_ascii_2024Q1.zip
+  - openFDA 批量 JSON: drug-event-000N-of-000M.json(.zip) ({"results": [report, ...]})
+
+药物键: drugname / prod_ai (openFDA: medicinalproduct / openfda.generic_name / brand_name)
+小写去空白, 多成分按 '\\' 拆开, 另加去盐型的名称 (对应 API 的短语匹配与盐型回退).
+同一报告内 (药物键, AE) 只计一次, 与 openFDA count 的"报告数"口径一致.
+ASCII 季度中同一病例 (caseid) 的多个版本只保留最新的 primaryid (跨季度比较),
+与 openFDA 只收录最新版本的口径一致.
+
+存储:
+    <store>/_meta.json
+    <store>/drug_ae_counts.parquet   drug, ae_term, report_count (按 drug 排序, 读取时行组下推)
+    <store>/ae_background.csv        ae_term, report_count (全局背景, 所有报告)
+未安装 pyarrow 时计数表写为 drug_ae_counts.csv.
+
+与 API 模式的差异: API 只返回每个药物前 100 个 AE (背景前 1000 个), drug_total /
+背景总数按截断后的列表求和; 批量模式使用完整计数.
+"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import re
+import shutil
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from ..utils import read_csv, write_json
+from ..normalize import strip_salt_forms
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # 可选依赖: 未安装时写 CSV
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+STORE_META = "_meta.json"
+COUNTS_NAME = "drug_ae_counts"
+BACKGROUND_FILE = "ae_background.csv"
+
+_ASCII_RE = re.compile(r"^(DRUG|REAC)(\d{2}Q\d)\.txt$", re.I)
+_JSON_RE = re.compile(r"\.json$", re.I)
+
+
+# ── 读取来源文件 ──
+
+def _zip_member(path: Path, member: str) -> io.BytesIO:
+    with zipfile.ZipFile(path) as zf:
+        return io.BytesIO(zf.read(member))
+
+
+def _iter_sources(source_dir: Path) -> Iterator[tuple[str, str, Callable[[], io.IOBase]]]:
+    """遍历来源目录 (含 zip 成员), 产出 (类型, 名称, 打开函数)"""
+    for path in sorted(Path(source_dir).rglob("*")):
+        if not path.is_file():
+            continue
+        if path.suffix.lower() == ".zip":
+            with zipfile.ZipFile(path) as zf:
+                members = zf.namelist()
+            for member in sorted(members):
+                base = member.rsplit("/", 1)[-1]
+                kind = "ascii" if _ASCII_RE.match(base) else "json" if _JSON_RE.search(base) else None
+                if kind:
+                    yield kind, f"{path.name}:{member}", lambda p=path, m=member: _zip_member(p, m)
+        elif _ASCII_RE.match(path.name):
+            yield "ascii", path.name, lambda p=path: open(p, "rb")
+        elif _JSON_RE.search(path.name):
+            yield "json", path.name, lambda p=path: open(p, "rb")
+
+
+def _ascii_table(name: str) -> tuple[str, str]:
+    """来源名称 (可含 zip 成员路径) → (DRUG/REAC, 季度如 24Q1)"""
+    table, quarter = _ASCII_RE.match(name.rsplit("/", 1)[-1].rsplit(":", 1)[-1]).groups()
+    return table.upper(), quarter.upper()
+
+
+# 旧版 LAERS 列名 → FAERS 列名
+_LEGACY_COLS = {"isr": "primaryid", "case": "caseid"}
+
+
+def _read_ascii(opener: Callable[[], io.IOBase], columns: list[str]) -> pd.DataFrame:
+    """读取 FAERS ASCII 表 ('$' 分隔, latin-1) 的指定列, 列名统一小写; 旧版 LAERS 的 isr/case 改名"""
+    wanted = set(columns) | {k for k, v in _LEGACY_COLS.items() if v in columns}
+    with opener() as f:
+        df = pd.read_csv(f, sep="$", dtype=str, encoding="latin-1", quoting=3,
+                         on_bad_lines="skip", index_col=False,
+                         usecols=lambda c: c.strip().lower() in wanted)
+    df.columns = [c.strip().lower() for c in df.columns]
+    for old, new in _LEGACY_COLS.items():
+        if new not in df.columns and old in df.columns:
+            df = df.rename(columns={old: new})
+    for col in columns:
+        if col not in df.columns:
+            df[col] = pd.NA
+    return df[columns]
+
+
+def _superseded_versions(drug_openers: list[Callable[[], io.IOBase]]) -> set[str]:
+    """
+    全部季度 DRUG 表中已被新版本取代的 primaryid (每个 caseid 只保留数值最大的 primaryid)
+
+    primaryid 由 caseid 加版本号构成, 数值越大版本越新; 无 caseid 或 primaryid 非数字的行不参与比较.
+    """
+    ids = pd.concat([_read_ascii(o, ["primaryid", "caseid"]) for o in drug_openers],
+                    ignore_index=True).dropna().drop_duplicates()
+    num = pd.to_numeric(ids["primaryid"], errors="coerce")
+    ids, num = ids[num.notna()], num[num.notna()]
+    latest = num.groupby(ids["caseid"]).transform("max")
+    old = set(ids.loc[num < latest, "primaryid"])
+    if old:
+        logger.info("FAERS 批量: 跳过 %d 个已被新版本取代的病例报告", len(old))
+    return old
+
+
+def _ascii_quarter(drug_open, reac_open, quarter: str,
+                   superseded: set[str] = frozenset()) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """ASCII 季度 → (report, name) 与 (report, ae_term) 长表 (跳过 superseded 中的旧版本)"""
+    drug = _read_ascii(drug_open, ["primaryid", "drugname", "prod_ai"])
+    reac = _read_ascii(reac_open, ["primaryid", "pt"])
+    if superseded:
+        drug = drug[~drug["primaryid"].isin(superseded)]
+        reac = reac[~reac["primaryid"].isin(superseded)]
+    names = pd.concat([
+        drug[["primaryid", "drugname"]].set_axis(["report", "name"], axis=1),
+        drug[["primaryid", "prod_ai"]].set_axis(["report", "name"], axis=1),
+    ], ignore_index=True)
+    names["report"] = quarter + ":" + names["report"].astype(str)
+    reac = reac.set_axis(["report", "ae_term"], axis=1)
+    reac["report"] = quarter + ":" + reac["report"].astype(str)
+    return names, reac
+
+
+def _openfda_json(opener) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """openFDA 批量 JSON → (report, name) 与 (report, ae_term) 长表"""
+    with opener() as f:
+        js = json.load(f)
+    names, reacs = [], []
+    for rec in js.get("results") or []:
+        rid = "openfda:" + str(rec.get("safetyreportid"))
+        patient = rec.get("patient") or {}
+        for d in patient.get("drug") or []:
+            names.append((rid, d.get("medicinalproduct")))
+            openfda = d.get("openfda") or {}
+            for field in ("generic_name", "brand_name"):
+                names.extend((rid, n) for n in openfda.get(field) or [])
+        reacs.extend((rid, r.get("reactionmeddrapt")) for r in patient.get("reaction") or [])
+    return (pd.DataFrame(names, columns=["report", "name"]),
+            pd.DataFrame(reacs, columns=["report", "ae_term"]))
+
+
+def _drug_keys(names: pd.DataFrame) -> pd.DataFrame:
+    """(report, 原始药名) → (report, drug) 去重; 多成分拆开, 另加去盐型名称"""
+    s = names["name"].dropna().astype(str).str.lower().str.split("\\", regex=False)
+    long = pd.DataFrame({"report": names.loc[s.index, "report"], "drug": s}).explode("drug")
+    long["drug"] = long["drug"].str.strip().str.rstrip(".").str.strip()
+    long = long[long["drug"] != ""]
+    salt = long.assign(drug=strip_salt_forms(long["drug"]))
+    salt = salt[(salt["drug"] != "") & (salt["drug"] != long["drug"])]
+    return pd.concat([long, salt], ignore_index=True).drop_duplicates()
+
+
+def _pair_counts(names: pd.DataFrame, reacs: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    一批报告的 药物×AE 报告数 与 AE 背景报告数
+
+    Returns:
+        (pairs[drug, ae_term, report_count], background: ae_term → report_count)
+    """
+    reacs = reacs.dropna()
+    reacs = reacs.assign(ae_term=reacs["ae_term"].astype(str).str.strip().str.upper())
+    reacs = reacs[reacs["ae_term"] != ""].drop_duplicates()
+    background = reacs.groupby("ae_term").size()
+    drugs = _drug_keys(names)
+    pairs = drugs.merge(reacs, on="report", how="inner")
+    counts = pairs.groupby(["drug", "ae_term"], sort=False).size().rename("report_count").reset_index()
+    return counts, background
+
+
+# ── 构建 / 读取 ──
+
+def build_faers_store(source_dir: Path, store_dir: Path) -> dict:
+    """
+    聚合 FAERS 批量下载为 药物×AE 计数表 (覆盖已有内容)
+
+    每个季度 / JSON 文件单独聚合后累加, 内存只需容纳一个文件的长表.
+    ASCII 季度先扫描一遍全部 DRUG 表的 (primaryid, caseid), 每个病例只计最新版本.
+
+    Args:
+        source_dir: 含 ASCII 季度文件 / openFDA JSON (可为 zip) 的目录
+        store_dir: 输出目录
+
+    Returns:
+        _meta.json 内容
+    """
+    found = list(_iter_sources(source_dir))
+    drug_openers = [opener for kind, name, opener in found
+                    if kind == "ascii" and _ascii_table(name)[0] == "DRUG"]
+    superseded = _superseded_versions(drug_openers) if drug_openers else set()
+
+    pending: dict[str, dict[str, Callable]] = {}
+    parts, backgrounds, sources = [], [], []
+    for kind, name, opener in found:
+        if kind == "json":
+            names, reacs = _openfda_json(opener)
+        else:
+            table, quarter = _ascii_table(name)
+            pending.setdefault(quarter, {})[table] = opener
+            if len(pending[quarter]) < 2:
+                continue
+            files = pending.pop(quarter)
+            names, reacs = _ascii_quarter(files["DRUG"], files["REAC"], quarter, superseded)
+            name = f"{quarter} (ASCII)"
+        counts, background = _pair_counts(names, reacs)
+        parts.append(counts)
+        backgrounds.append(background)
+        sources.append(name)
+        logger.info("FAERS 批量: %s → %d 个报告, %d 个 药物×AE 组合",
+                    name, reacs["report"].nunique(), len(counts))
+    for quarter in pending:
+        logger.warning("FAERS 季度 %s 缺少 DRUG 或 REAC 文件, 跳过", quarter)
+    if not parts:
+        raise FileNotFoundError(f"{source_dir} 中没有 FAERS ASCII 季度文件或 openFDA JSON")
+
+    counts = (pd.concat(parts, ignore_index=True)
+              .groupby(["drug", "ae_term"], as_index=False)["report_count"].sum()
+              .sort_values(["drug", "ae_term"], ignore_index=True))
+    background = pd.concat(backgrounds).groupby(level=0).sum().sort_index()
+
+    store_dir = Path(store_dir)
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    store_dir.mkdir(parents=True)
+    if pyarrow is not None:
+        counts.to_parquet(store_dir / f"{COUNTS_NAME}.parquet", index=False, row_group_size=200_000)
+        fmt = "parquet"
+    else:
+        logger.warning("未安装 pyarrow, FAERS 计数表写为 CSV")
+        counts.to_csv(store_dir / f"{COUNTS_NAME}.csv", index=False)
+        fmt = "csv"
+    background.rename_axis("ae_term").rename("report_count").reset_index().to_csv(
+        store_dir / BACKGROUND_FILE, index=False)
+
+    meta = {
+        "format": fmt,
+        "n_pairs": int(len(counts)),
+        "n_drugs": int(counts["drug"].nunique()),
+        "n_ae_terms": int(len(background)),
+        "background_total": int(background.sum()),
+        "sources": sources,
+        "built": datetime.now(timezone.utc).isoformat(),
+    }
+    write_json(store_dir / STORE_META, meta)
+    logger.info("FAERS 批量库: %d 个药物, %d 个AE术语, %d 个组合 → %s (%s)",
+                meta["n_drugs"], meta["n_ae_terms"], meta["n_pairs"], store_dir, fmt)
+    return meta
+
+
+class FAERSStore:
+    """
+    FAERS 批量计数表 (build_faers_store 的输出), 背景只加载一次
+
+    用法:
+        store = FAERSStore(store_dir)
+        pairs = store.counts(["aspirin", "atorvastatin"])
+    """
+
+    def __init__(self, store_dir: Path):
+        self.dir = Path(store_dir)
+        with open(self.dir / STORE_META, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        bg = read_csv(self.dir / BACKGROUND_FILE, dtype={"ae_term": str})
+        self.background = pd.Series(bg["report_count"].to_numpy(dtype=np.int64), index=bg["ae_term"])
+        self.background_total = int(self.background.sum())
+
+    def counts(self, drugs: list[str]) -> pd.DataFrame:
+        """这些药物键的 (drug, ae_term, report_count) 行"""
+        drugs = list(dict.fromkeys(drugs))
+        if self.meta.get("format") == "parquet":
+            if pyarrow is None:
+                raise ImportError(f"{self.dir} 为 Parquet 格式, 读取需要安装 pyarrow")
+            df = pd.read_parquet(self.dir / f"{COUNTS_NAME}.parquet",
+                                 filters=[("drug", "in", drugs)] if drugs else None)
+        else:
+            df = read_csv(self.dir / f"{COUNTS_NAME}.csv", dtype={"drug": str, "ae_term": str})
+            df = df[df["drug"].isin(drugs)]
+        return df.reset_index(drop=True)
+
+    def has(self, drugs: list[str]) -> set[str]:
+        return set(self.counts(drugs)["drug"].unique())
+
+
+def calc_prr_array(a, drug_total, bg_ae_count, bg_total: int) -> np.ndarray:
+    """_calc_prr 的向量化版本 (逐元素结果相同)"""
+    a = np.asarray(a, dtype=np.int64)
+    drug_total = np.asarray(drug_total, dtype=np.int64)
+    c = np.asarray(bg_ae_count, dtype=np.int64) - a
+    n_other = bg_total - drug_total
+    ok = (drug_total > 0) & (bg_total > drug_total) & (c > 0) & (n_other > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prr = (a / drug_total) / (c / n_other)
+    return np.where(ok, prr, 0.0)
+
+
+def drug_ae_from_store(
+    store: FAERSStore,
+    drugs: list[str],
+    min_count: int = 5,
+    min_prr: float = 0.0,
+    top_ae: int = 50,
+) -> tuple[pd.DataFrame, int]:
+    """
+    从批量库生成 edge_drug_ae_faers 行 (列与 fetch_drug_ae 相同)
+
+    药物名先按原名 (小写) 查找, 无记录时回退到去盐型名称. 每个药物取报告数最多的
+    top_ae 个 AE (同数按术语排序), 再按 min_count / min_prr 过滤.
+
+    Returns:
+        (rows, n_prr_filtered)
+    """
+    query = pd.DataFrame({"drug_normalized": [d.lower().strip() for d in drugs]})
+    query["key"] = query["drug_normalized"]
+    stripped = strip_salt_forms(query["drug_normalized"])
+    found = store.has(list(query["key"]) + list(stripped))
+    fallback = ~query["key"].isin(found) & stripped.isin(found)
+    query.loc[fallback, "key"] = stripped[fallback]
+    if fallback.any():
+        logger.info("FAERS 批量库 salt-form fallback: %d 个药物", int(fallback.sum()))
+
+    counts = store.counts(query["key"].tolist())
+    drug_total = counts.groupby("drug")["report_count"].sum()
+    counts = counts.sort_values(["drug", "report_count", "ae_term"], ascending=[True, False, True],
+                                kind="stable")
+    counts = counts[counts.groupby("drug").cumcount() < top_ae]
+
+    rows = query.reset_index(names="order").merge(counts, left_on="key", right_on="drug", how="inner")
+    rows = rows.sort_values(["order", "report_count", "ae_term"], ascending=[True, False, True],
+                            kind="stable")
+    rows = rows[rows["report_count"] >= min_count]
+    totals = rows["key"].map(drug_total).to_numpy(dtype=np.int64)
+
+    has_bg = store.background_total > 0
+    prr = np.zeros(len(rows))
+    if has_bg:
+        bg = store.background.reindex(rows["ae_term"]).fillna(0).to_numpy(dtype=np.int64)
+        prr = calc_prr_array(rows["report_count"].to_numpy(), totals, bg, store.background_total)
+    keep = np.ones(len(rows), dtype=bool)
+    if min_prr > 0 and has_bg:
+        keep = prr >= min_prr
+
+    out = pd.DataFrame({
+        "drug_normalized": rows["drug_normalized"].to_numpy()[keep],
+        "ae_term": rows["ae_term"].to_numpy()[keep],
+        "report_count": rows["report_count"].to_numpy(dtype=np.int64)[keep],
+        "drug_total_reports": totals[keep],
+        "prr": np.round(prr[keep], 4),
+    })
+    return out, int((~keep).sum())
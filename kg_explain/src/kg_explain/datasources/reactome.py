@@ -13,7 +13,7 @@ import pandas as pd
 import requests
 
 from ..cache import HTTPCache, cached_get_json
-from ..utils import concurrent_map, read_csv
+from ..utils import concurrent_map, read_csv, write_table
 
 logger = logging.getLogger(__name__)
 
@@ -154,6 +154,4 @@ def fetch_target_pathways(
     logger.info("Target→Pathway 关系: %d 条边, %d 个靶点, %d 个通路",
                 len(out_df), out_df["target_chembl_id"].nunique(), out_df["reactome_stid"].nunique())
 
-    out = data_dir / "edge_target_pathway_all.csv"
-    out_df.to_csv(out, index=False)
-    return out
+    return write_table(out_df, data_dir / "edge_target_pathway_all.csv")
@@ -6,12 +6,19 @@ API: https://rxnav.nlm.nih.gov/REST/approximateTerm.json
 """
 from __future__ import annotations
 import logging
-import re
 from pathlib import Path
 
 import pandas as pd
 
 from ..cache import HTTPCache, cached_get_json
+# _clean_drug_name / _strip_dosage / _is_non_drug: 旧私有名称, 保留供外部调用方导入
+from ..normalize import (  # noqa: F401
+    clean_drug_name as _clean_drug_name,
+    clean_drug_names,
+    is_non_drug as _is_non_drug,
+    non_drug_mask,
+    strip_dosage as _strip_dosage,
+)
 from ..utils import read_csv, safe_str, concurrent_map
 
 logger = logging.getLogger(__name__)
@@ -68,95 +75,6 @@ def rxnorm_map(
     return out
 
 
-def _clean_drug_name(name: str) -> str:
-    """
-    清洗药物名称: 去除剂量、剂型、给药方式等后缀
-
-    Examples:
-        "cilostazol 100 mg"      → "cilostazol"
-        "aspirin 25 mg bid"      → "aspirin"
-        "ezetimibe 10mg"         → "ezetimibe"
-        "fentanyl injection"     → "fentanyl"
-        "aspirin tablet"         → "aspirin"
-        "nitroglycerin 0.4 mg sublingual" → "nitroglycerin"
-        "alirocumab 150 mg/ml subcutaneous injection" → "alirocumab"
-        "dipyridamole 200mg and aspirin 25mg bid:" → "dipyridamole + aspirin"
-        "atorvastatin, aspirin, losartan, amlodipine"
-            → "atorvastatin + aspirin + losartan + amlodipine"
-    """
-    s = name.strip().lower()
-    # 去掉尾部冒号
-    s = s.rstrip(":")
-
-    # 把 "X and Y" / "X, Y, Z" 拆成多个成分, 分别清洗后用 " + " 连接
-    # 先试 " and " 分割
-    if " and " in s:
-        parts = [p.strip() for p in s.split(" and ")]
-    elif ", " in s:
-        parts = [p.strip() for p in s.split(", ")]
-    else:
-        parts = [s]
-
-    cleaned = []
-    for p in parts:
-        p = _strip_dosage(p)
-        if p:
-            cleaned.append(p)
-
-    return " + ".join(cleaned) if cleaned else name.strip().lower()
-
-
-# 剂量/剂型/给药方式后缀模式
-_DOSAGE_RE = re.compile(
-    r"\s+\d[\d.,/]*\s*"             # "100 mg", "0.4 mg", "200mg", "150 mg/ml"
-    r"(?:mg|ml|mcg|iu|units?|%|"
-    r"mg/ml|mcg/ml|mg/kg)"
-    r"(?:/\w+)?"                     # "/ml", "/day" 等
-    r"(?:\s+.*)?$",                  # 后面的 "bid", "sublingual" 等全部丢弃
-    re.I,
-)
-
-_FORMULATION_SUFFIXES = re.compile(
-    r"\s+(?:tablet|tablets|capsule|capsules|injection|infusion|"
-    r"oral|sublingual|subcutaneous|intravenous|iv|im|sc|"
-    r"bid|tid|qd|qid|daily|per\s+day)s?\s*$",
-    re.I,
-)
-
-# 非药物名称模式: 细胞剂量、安慰剂、生理盐水等
-_NON_DRUG_PATTERNS = [
-    re.compile(r"^\d+\s*x\s*\d+.*cells?$", re.I),             # "10 x 10^6 cells"
-    re.compile(r"\bcells?\b", re.I),                            # any "cell(s)" mention
-    re.compile(r"(^|/)placebo", re.I),                          # "placebo", "matching placebo", "X/placebo"
-    re.compile(r"^(matching\s+)?placebo", re.I),                # "placebo", "matching placebo ..."
-    re.compile(r"^saline$", re.I),                              # "saline"
-    re.compile(r"^normal\s+saline", re.I),                      # "normal saline"
-    re.compile(r"^\d+(\.\d+)?%\s+sodium\s+chloride", re.I),    # "0.9% sodium chloride ..."
-    re.compile(r"\bcomparator\b", re.I),                        # "Comparator", "active comparator"
-    re.compile(r"\bsugar\s+pill\b", re.I),                      # "sugar pill"
-    re.compile(r"\boptimal\s+medical\b", re.I),                 # "optimal medical care/therapy"
-    re.compile(r"\bcontrol\s+(systolic\s+)?blood\s+pressure\b", re.I),  # "control blood pressure..."
-    re.compile(r"\bcontrast[- ]enhanced\b", re.I),              # "contrast-enhanced ultrasound"
-    re.compile(r"\bstandard\s+of\s+care\b", re.I),             # "standard of care"
-    re.compile(r"^sham\b", re.I),                               # "sham" procedure
-    re.compile(r"^observation$", re.I),                         # "observation" (watchful waiting)
-]
-
-
-def _is_non_drug(name: str) -> bool:
-    """判断是否为非药物名称 (安慰剂、细胞剂量等)"""
-    s = name.strip().lower()
-    return any(pat.search(s) for pat in _NON_DRUG_PATTERNS)
-
-
-def _strip_dosage(s: str) -> str:
-    """去除单个成分的剂量和剂型后缀"""
-    s = _DOSAGE_RE.sub("", s).strip()
-    # 可能还有残留的剂型词
-    s = _FORMULATION_SUFFIXES.sub("", s).strip()
-    return s
-
-
 def build_drug_canonical(data_dir: Path) -> Path:
     """
     根据 RxNorm RXCUI 构建药物规范名称映射
@@ -198,13 +116,13 @@ def build_drug_canonical(data_dir: Path) -> Path:
 
     # 过滤非药物条目 (安慰剂、细胞剂量等)
     before = len(out_df)
-    out_df = out_df[~out_df["drug_raw"].apply(_is_non_drug)].copy()
+    out_df = out_df[~non_drug_mask(out_df["drug_raw"])].copy()
     n_filtered = before - len(out_df)
     if n_filtered > 0:
         logger.info("过滤了 %d 个非药物条目 (安慰剂/细胞剂量等)", n_filtered)
 
-    # 统一清洗: 去除剂量/剂型后缀
-    out_df["canonical_name"] = out_df["canonical_name"].apply(_clean_drug_name)
+    # 统一清洗: 去除剂量/剂型后缀 (每个唯一名称只清洗一次)
+    out_df["canonical_name"] = clean_drug_names(out_df["canonical_name"])
 
     # Strip " combination" suffix to avoid duplicates like
     # "niacin/laropiprant" vs "niacin/laropiprant combination"
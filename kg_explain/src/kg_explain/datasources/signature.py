@@ -31,7 +31,7 @@ from pathlib import Path
 import pandas as pd
 
 from ..cache import HTTPCache, cached_get_json
-from ..utils import concurrent_map, safe_str
+from ..utils import concurrent_map, read_table, resolve_table, safe_str, write_table
 
 logger = logging.getLogger(__name__)
 
@@ -476,8 +476,7 @@ def fetch_drugs_from_signature(
     else:
         dt_df = pd.DataFrame(columns=["drug_normalized", "drug_raw", "molecule_chembl_id", "target_chembl_id", "mechanism_of_action"])
 
-    dt_out = data_dir / "edge_drug_target.csv"
-    dt_df.to_csv(dt_out, index=False)
+    dt_out = write_table(dt_df, data_dir / "edge_drug_target.csv")
 
     # (d) drug_canonical.csv - 兼容 Step 3 格式
     if not sig_df.empty:
@@ -608,7 +607,7 @@ def inject_sigreverse_drugs(
     dt_path = data_dir / "edge_drug_target.csv"
 
     existing_chembl = pd.read_csv(chembl_map_path, dtype=str) if chembl_map_path.exists() else pd.DataFrame()
-    existing_dt = pd.read_csv(dt_path, dtype=str) if dt_path.exists() else pd.DataFrame()
+    existing_dt = read_table(dt_path, typed=False) if resolve_table(dt_path) is not None else pd.DataFrame()
 
     existing_ids = set()
     if not existing_chembl.empty and "chembl_id" in existing_chembl.columns:
@@ -739,7 +738,7 @@ def inject_sigreverse_drugs(
         combined_dt = combined_dt.drop_duplicates(
             subset=["drug_normalized", "molecule_chembl_id", "target_chembl_id"], keep="first"
         )
-        combined_dt.to_csv(dt_path, index=False)
+        write_table(combined_dt, dt_path)
 
     n_new = len(new_chembl_rows)
     logger.info("SigReverse 注入完成: +%d 新药物 (%d 有靶点), +%d 药物-靶点边",
@@ -1,37 +1,37 @@
 """
 Benchmark 评估器
 
-加载 gold-standard CSV + 排序结果 CSV, 计算 per-disease 和聚合指标
+加载 gold-standard CSV + 排序结果 CSV (或内存中的 DataFrame), 计算 per-disease 和聚合指标
 """
 from __future__ import annotations
 import logging
-from collections import defaultdict
 from pathlib import Path
 
 import pandas as pd
 
-from .metrics import (
-    hit_at_k, reciprocal_rank, precision_at_k,
-    average_precision, ndcg_at_k, auroc,
-)
+from .rank_matrix import RankedLists, gold_sets
 
 logger = logging.getLogger(__name__)
 
 
 def run_benchmark(
-    rank_csv: Path,
-    gold_csv: Path,
+    rank_csv: Path | pd.DataFrame | RankedLists,
+    gold_csv: Path | pd.DataFrame,
     ks: list[int] | None = None,
     score_col: str = "final_score",
 ) -> dict:
     """
     运行 benchmark 评估
 
+    rank 表只分组排序一次, 所有疾病 × 所有 K 的指标由 RankedLists.evaluate 一次算出
+    (与 metrics.py 逐疾病计算结果一致). 多组 gold 复用同一 rank 表时传入 RankedLists.
+
     Args:
-        rank_csv: 排序结果 CSV (需含 drug_normalized, diseaseId, final_score)
-        gold_csv: Gold-standard CSV (需含 drug_normalized, diseaseId)
+        rank_csv: 排序结果 CSV / DataFrame (需含 drug_normalized, diseaseId, final_score),
+                  或已构建的 RankedLists
+        gold_csv: Gold-standard CSV / DataFrame (需含 drug_normalized, diseaseId)
         ks: Hit@K / P@K / NDCG@K 的 K 值列表
-        score_col: 用于排序的分数列名
+        score_col: 用于排序的分数列名 (传入 RankedLists 时忽略)
 
     Returns:
         {
@@ -45,51 +45,18 @@ def run_benchmark(
     if ks is None:
         ks = [5, 10, 20]
 
-    rank_df = pd.read_csv(rank_csv, dtype=str)
-    gold_df = pd.read_csv(gold_csv, dtype=str)
-
-    rank_df[score_col] = pd.to_numeric(rank_df[score_col], errors="coerce").fillna(0)
+    ranked = RankedLists.load(rank_csv, score_col)
+    gold_df = gold_csv if isinstance(gold_csv, pd.DataFrame) else pd.read_csv(gold_csv, dtype=str)
 
     # 构建 gold set (per disease)
-    gold_by_disease: dict[str, set[str]] = defaultdict(set)
-    for _, r in gold_df.iterrows():
-        drug = str(r["drug_normalized"]).lower().strip()
-        disease = str(r["diseaseId"]).strip()
-        gold_by_disease[disease].add(drug)
+    gold_by_disease = gold_sets(gold_df)
 
     n_gold_pairs = sum(len(v) for v in gold_by_disease.values())
     logger.info("Gold standard: %d 对 drug-disease, %d 个疾病",
                 n_gold_pairs, len(gold_by_disease))
 
     # 对每个有 gold 数据的疾病计算指标
-    per_disease: dict[str, dict] = {}
-    n_gold_found = 0
-
-    for did, positives in gold_by_disease.items():
-        sub = rank_df[rank_df["diseaseId"] == did].sort_values(score_col, ascending=False)
-        ranked_drugs = sub["drug_normalized"].tolist()
-
-        if not ranked_drugs:
-            logger.warning("疾病 %s 在排序结果中无记录, 跳过", did)
-            continue
-
-        found = positives & set(ranked_drugs)
-        n_gold_found += len(found)
-
-        metrics: dict[str, float] = {
-            "n_ranked": float(len(ranked_drugs)),
-            "n_positive": float(len(positives)),
-            "n_found": float(len(found)),
-            "mrr": reciprocal_rank(ranked_drugs, positives),
-            "map": average_precision(ranked_drugs, positives),
-            "auroc": auroc(ranked_drugs, positives),
-        }
-        for k in ks:
-            metrics[f"hit@{k}"] = hit_at_k(ranked_drugs, positives, k)
-            metrics[f"p@{k}"] = precision_at_k(ranked_drugs, positives, k)
-            metrics[f"ndcg@{k}"] = ndcg_at_k(ranked_drugs, positives, k)
-
-        per_disease[did] = metrics
+    per_disease, n_gold_found = ranked.evaluate(gold_by_disease, ks)
 
     # 聚合 (macro average)
     aggregate: dict[str, float] = {}
@@ -191,7 +158,6 @@ def run_external_benchmark(
         Same structure as run_benchmark() plus external source info.
     """
     from .external_benchmarks import build_external_gold
-    import tempfile
 
     if ks is None:
         ks = [5, 10, 20]
@@ -202,18 +168,7 @@ def run_external_benchmark(
         return {"per_disease": {}, "aggregate": {}, "n_diseases_evaluated": 0,
                 "n_gold_pairs": 0, "n_gold_found": 0, "source": "hetionet"}
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False) as f:
-        gold_df.to_csv(f, index=False)
-        gold_path = Path(f.name)
-
-    try:
-        result = run_benchmark(rank_csv, gold_path, ks=ks)
-    finally:
-        try:
-            gold_path.unlink(missing_ok=True)
-        except OSError:
-            pass
-
+    result = run_benchmark(rank_csv, gold_df, ks=ks)
     result["source"] = "hetionet"
     return result
 
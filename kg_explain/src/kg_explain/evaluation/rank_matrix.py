@@ -0,0 +1,208 @@
+"""
+数组化排序评估 — 一次分组, 所有疾病 × 所有 K 一次算完
+
+metrics.py 的纯函数逐疾病处理 Python 列表 (set 查找), run_benchmark 原先为每个
+gold 疾病过滤并重排整张 rank 表. 这里改为:
+  - RankedLists: rank 表按 (diseaseId, score 降序) 一次排序分组, 可复用于多组 gold
+  - 相关性: (疾病, 药物) 整数编码后 np.isin, 得到每行的布尔相关性 (即按疾病分段的相关性矩阵)
+  - 指标: 段内累计命中数 + 正例位置矩阵, Hit@K / P@K / NDCG@K / MRR / AP / AUROC 全部向量化
+
+数值与 metrics.py 逐位一致: 浮点累加按名次顺序逐项进行 (cumsum, 不用 pairwise sum),
+折扣因子用 math.log2 预计算. 唯一差异: 同一疾病内分数相同的药物按文件顺序排列
+(原实现依赖 sort_values 的不稳定排序).
+"""
+from __future__ import annotations
+
+import logging
+import math
+from typing import Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _validate_ks(ks: Iterable[int]) -> list[int]:
+    ks = list(ks)
+    for k in ks:
+        if not isinstance(k, (int, np.integer)) or isinstance(k, bool) or k < 1:
+            raise ValueError(f"k 必须是正整数, 得到 {k}")
+    return [int(k) for k in ks]
+
+
+def _row_sums(group: np.ndarray, rank: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """按组内名次逐项累加 (与 Python 循环中 += 的舍入顺序一致)"""
+    width = int(rank.max()) + 1 if len(rank) else 1
+    mat = np.zeros((n_groups, width))
+    mat[group, rank] = values
+    return np.cumsum(mat, axis=1)[:, -1]
+
+
+def gold_sets(gold_df: pd.DataFrame) -> dict[str, set[str]]:
+    """
+    Gold-standard 表 → {diseaseId: {drug 小写}}
+
+    疾病顺序为首次出现顺序 (与逐行构建一致).
+    """
+    gold: dict[str, set[str]] = {}
+    if gold_df.empty:
+        return gold
+    diseases = gold_df["diseaseId"].map(str).str.strip().tolist()
+    drugs = gold_df["drug_normalized"].map(str).str.lower().str.strip().tolist()
+    for did, drug in zip(diseases, drugs):
+        gold.setdefault(did, set()).add(drug)
+    return gold
+
+
+class RankedLists:
+    """
+    按疾病分组、组内按分数降序的 rank 表 (只排序一次)
+
+    用法:
+        ranked = RankedLists(rank_df)
+        per_disease, n_found = ranked.evaluate(gold_by_disease, ks=[5, 10, 20])
+    """
+
+    def __init__(self, rank_df: pd.DataFrame, score_col: str = "final_score"):
+        scores = pd.to_numeric(rank_df[score_col], errors="coerce").fillna(0).to_numpy(dtype=float)
+        codes, diseases = pd.factorize(rank_df["diseaseId"], use_na_sentinel=False)
+        # lexsort 稳定: 同分药物保持文件顺序
+        order = np.lexsort((-scores, codes))
+        # 药物只编码一次; 只存整数编码, 传给进程池时序列化开销小
+        drug_codes, drugs = pd.factorize(rank_df["drug_normalized"], use_na_sentinel=False)
+        self.score_col = score_col
+        self.drug_index = pd.Index(drugs, dtype=object)
+        self.drug_codes = drug_codes[order]
+        self.group = codes[order]
+        self.sizes = np.bincount(codes, minlength=len(diseases))
+        self.starts = np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype(np.int64)
+        self.position = np.arange(len(order)) - self.starts[self.group]
+        self.index = {d: i for i, d in enumerate(diseases)}
+
+    @classmethod
+    def load(cls, rank, score_col: str = "final_score") -> "RankedLists":
+        """rank: CSV 路径 / DataFrame / 已分组的 RankedLists (原样返回)"""
+        if isinstance(rank, RankedLists):
+            return rank
+        if not isinstance(rank, pd.DataFrame):
+            rank = pd.read_csv(rank, dtype=str)
+        return cls(rank, score_col=score_col)
+
+    def __len__(self) -> int:
+        return len(self.drug_codes)
+
+    def ranked(self, disease_id: str) -> list[str]:
+        """单个疾病的排序药物列表 (可直接传给 metrics.py 的函数)"""
+        code = self.index.get(disease_id)
+        if code is None:
+            return []
+        start = self.starts[code]
+        return self.drug_index[self.drug_codes[start:start + self.sizes[code]]].tolist()
+
+    def evaluate(
+        self,
+        gold_by_disease: Mapping[str, Iterable[str]],
+        ks: Iterable[int] = (5, 10, 20),
+    ) -> tuple[dict[str, dict[str, float]], int]:
+        """
+        计算每个 gold 疾病的全部指标
+
+        Args:
+            gold_by_disease: {diseaseId: 正例药物集合}; 不在 rank 表中的疾病跳过
+            ks: Hit@K / P@K / NDCG@K 的 K 值
+
+        Returns:
+            (per_disease, n_gold_found); per_disease 的键顺序与 gold_by_disease 一致,
+            每个疾病的指标键与 run_benchmark 相同
+        """
+        ks = _validate_ks(ks)
+        gold = {did: set(drugs) for did, drugs in gold_by_disease.items()}
+        for did in gold:
+            if did not in self.index:
+                logger.warning("疾病 %s 在排序结果中无记录, 跳过", did)
+        evaluated = [did for did in gold if did in self.index]
+        if not evaluated:
+            return {}, 0
+
+        # slot: 按 rank 表中的分组顺序, 使被选中的行保持连续
+        codes = np.sort(np.array([self.index[did] for did in evaluated], dtype=np.int64))
+        slot_of = {int(c): i for i, c in enumerate(codes)}
+        n_slots = len(codes)
+        sizes = self.sizes[codes]
+        mask = np.isin(self.group, codes)
+        rows_slot = np.repeat(np.arange(n_slots), sizes)
+        pos = self.position[mask]
+
+        # (slot, drug) 整数键 → 每行的相关性
+        slot_names = [None] * n_slots
+        gold_slot, gold_drug = [], []
+        for did in evaluated:
+            s = slot_of[self.index[did]]
+            slot_names[s] = did
+            gold_slot.extend([s] * len(gold[did]))
+            gold_drug.extend(gold[did])
+        gold_codes = self.drug_index.get_indexer(pd.Index(gold_drug, dtype=object))
+        known = gold_codes >= 0
+        n_uniq = max(len(self.drug_index), 1)
+        row_keys = rows_slot * n_uniq + self.drug_codes[mask]
+        gold_keys = np.array(gold_slot, dtype=np.int64)[known] * n_uniq + gold_codes[known]
+        rel = np.isin(row_keys, gold_keys)
+
+        n_pos = np.array([len(gold[did]) for did in slot_names], dtype=np.int64)
+        n_found = np.bincount(np.unique(row_keys[rel]) // n_uniq, minlength=n_slots)
+
+        # 段内累计命中数
+        cum = np.cumsum(rel, dtype=np.int64)
+        seg_start = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        base = np.concatenate([[0], cum])[seg_start]
+        cumhits = cum - np.repeat(base, sizes)
+
+        # 正例位置: 所属 slot / 段内名次 / 正例中的序号
+        p_idx = np.flatnonzero(rel)
+        g = rows_slot[p_idx]
+        ppos = pos[p_idx]
+        prank = cumhits[p_idx] - 1
+        n_rel_rows = np.bincount(g, minlength=n_slots)
+        n_ranked = sizes.astype(np.int64)
+        # 空正例集合所有指标为 0 (与 metrics.py 一致)
+        has_pos = n_pos > 0
+
+        mrr = np.zeros(n_slots)
+        first = prank == 0
+        mrr[g[first]] = 1.0 / (ppos[first] + 1)
+
+        ap_sum = _row_sums(g, prank, (prank + 1) / (ppos + 1), n_slots)
+        ap = np.where(has_pos, ap_sum / np.maximum(n_pos, 1), 0.0)
+
+        n_neg = n_ranked - n_rel_rows
+        concordant = np.bincount(g, weights=n_neg[g] - (ppos - prank), minlength=n_slots)
+        valid = (n_rel_rows > 0) & (n_neg > 0)
+        auc = np.where(valid, concordant / np.maximum(n_rel_rows * n_neg, 1), 0.0)
+
+        max_k = max(ks) if ks else 0
+        discount = np.array([1.0 / math.log2(i + 2) for i in range(max_k)])
+        ideal = np.cumsum(discount)
+
+        columns: dict[str, np.ndarray] = {
+            "n_ranked": n_ranked.astype(float),
+            "n_positive": n_pos.astype(float),
+            "n_found": n_found.astype(float),
+            "mrr": mrr,
+            "map": ap,
+            "auroc": auc,
+        }
+        for k in ks:
+            in_k = ppos < k
+            hits_k = np.bincount(g[in_k], minlength=n_slots)
+            dcg = _row_sums(g[in_k], prank[in_k], discount[ppos[in_k]], n_slots)
+            idcg = ideal[np.minimum(n_pos, k) - 1]
+            columns[f"hit@{k}"] = np.where(has_pos, (hits_k > 0).astype(float), 0.0)
+            columns[f"p@{k}"] = np.where(has_pos, hits_k / np.minimum(n_ranked, k), 0.0)
+            columns[f"ndcg@{k}"] = np.where(has_pos, dcg / np.where(has_pos, idcg, 1.0), 0.0)
+
+        names = list(columns)
+        table = np.column_stack([columns[n] for n in names]).tolist()
+        per_slot = {slot_names[s]: dict(zip(names, table[s])) for s in range(n_slots)}
+        per_disease = {did: per_slot[did] for did in evaluated}
+        return per_disease, int(n_found.sum())
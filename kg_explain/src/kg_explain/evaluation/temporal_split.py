@@ -6,16 +6,25 @@ Splits known drug-disease indications by time:
 
 This tests whether the pipeline can "predict" recent approvals
 using only historical data.
+
+The runners take the rank table in memory (CSV path, DataFrame or a
+prebuilt RankedLists) and pass gold splits to run_benchmark as
+DataFrames, so no temp CSVs are written and the rank table is grouped
+once.  run_temporal_sweep / run_holdout_sweep evaluate many cutoffs or
+holdout sets in a process pool; each worker receives the grouped rank
+table once via the pool initializer.
 """
 from __future__ import annotations
 
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Sequence
 
 import pandas as pd
 
 from .benchmark import run_benchmark
+from .rank_matrix import RankedLists
 
 logger = logging.getLogger(__name__)
 
@@ -82,7 +91,7 @@ def cross_disease_holdout(
 
 
 def run_temporal_validation(
-    rank_csv: Path,
+    rank_csv: Path | pd.DataFrame | RankedLists,
     gold_df: pd.DataFrame,
     cutoff_year: int = 2020,
     ks: list[int] | None = None,
@@ -93,7 +102,7 @@ def run_temporal_validation(
     post-cutoff (future) drug-disease pairs.
 
     Args:
-        rank_csv: Path to ranking output CSV
+        rank_csv: Ranking output CSV path, DataFrame or prebuilt RankedLists
         gold_df: Gold standard with approval_year column
         cutoff_year: Year to split on
         ks: K values for Hit@K etc.
@@ -106,24 +115,14 @@ def run_temporal_validation(
             "gap_analysis": {metric: test_value - train_value}
         }
     """
-    import tempfile
-
     if ks is None:
         ks = [5, 10, 20]
 
     train_gold, test_gold = split_by_year(gold_df, cutoff_year)
+    ranked = RankedLists.load(rank_csv)
 
-    # Write temp gold CSVs for run_benchmark
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False) as f:
-        train_gold[["drug_normalized", "diseaseId"]].to_csv(f, index=False)
-        train_path = Path(f.name)
-
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False) as f:
-        test_gold[["drug_normalized", "diseaseId"]].to_csv(f, index=False)
-        test_path = Path(f.name)
-
-    train_result = run_benchmark(rank_csv, train_path, ks=ks) if len(train_gold) > 0 else {}
-    test_result = run_benchmark(rank_csv, test_path, ks=ks) if len(test_gold) > 0 else {}
+    train_result = run_benchmark(ranked, train_gold, ks=ks) if len(train_gold) > 0 else {}
+    test_result = run_benchmark(ranked, test_gold, ks=ks) if len(test_gold) > 0 else {}
 
     # Compute gap analysis
     gap: dict[str, float] = {}
@@ -142,13 +141,6 @@ def run_temporal_validation(
     except Exception as e:
         logger.warning("Leakage audit failed: %s", e)
 
-    # Clean up temp files
-    try:
-        train_path.unlink(missing_ok=True)
-        test_path.unlink(missing_ok=True)
-    except OSError:
-        pass
-
     return {
         "cutoff_year": cutoff_year,
         "train_n_pairs": len(train_gold),
@@ -161,7 +153,7 @@ def run_temporal_validation(
 
 
 def run_cross_disease_validation(
-    rank_csv: Path,
+    rank_csv: Path | pd.DataFrame | RankedLists,
     gold_df: pd.DataFrame,
     holdout_diseases: list[str],
     ks: list[int] | None = None,
@@ -169,7 +161,7 @@ def run_cross_disease_validation(
     """Run cross-disease holdout validation.
 
     Args:
-        rank_csv: Ranking output CSV
+        rank_csv: Ranking output CSV path, DataFrame or prebuilt RankedLists
         gold_df: Full gold standard
         holdout_diseases: EFO IDs to hold out
         ks: K values
@@ -177,29 +169,14 @@ def run_cross_disease_validation(
     Returns:
         Same structure as run_temporal_validation but with disease holdout.
     """
-    import tempfile
-
     if ks is None:
         ks = [5, 10, 20]
 
     train_gold, test_gold = cross_disease_holdout(gold_df, holdout_diseases)
+    ranked = RankedLists.load(rank_csv)
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False) as f:
-        train_gold[["drug_normalized", "diseaseId"]].to_csv(f, index=False)
-        train_path = Path(f.name)
-
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False) as f:
-        test_gold[["drug_normalized", "diseaseId"]].to_csv(f, index=False)
-        test_path = Path(f.name)
-
-    train_result = run_benchmark(rank_csv, train_path, ks=ks) if len(train_gold) > 0 else {}
-    test_result = run_benchmark(rank_csv, test_path, ks=ks) if len(test_gold) > 0 else {}
-
-    try:
-        train_path.unlink(missing_ok=True)
-        test_path.unlink(missing_ok=True)
-    except OSError:
-        pass
+    train_result = run_benchmark(ranked, train_gold, ks=ks) if len(train_gold) > 0 else {}
+    test_result = run_benchmark(ranked, test_gold, ks=ks) if len(test_gold) > 0 else {}
 
     return {
         "holdout_diseases": holdout_diseases,
@@ -208,3 +185,95 @@ def run_cross_disease_validation(
         "train_metrics": train_result,
         "test_metrics": test_result,
     }
+
+
+# ---------------------------------------------------------------------------
+# Sweeps: many cutoffs / holdouts over one grouped rank table
+# ---------------------------------------------------------------------------
+
+_WORKER_STATE: dict = {}
+
+
+def _init_worker(ranked: RankedLists, gold_df: pd.DataFrame, ks: list[int]) -> None:
+    """Pool initializer: ship the grouped rank table and gold once per worker."""
+    _WORKER_STATE.update(ranked=ranked, gold_df=gold_df, ks=ks)
+
+
+def _temporal_task(cutoff_year: int) -> dict:
+    st = _WORKER_STATE
+    return run_temporal_validation(st["ranked"], st["gold_df"], cutoff_year, st["ks"])
+
+
+def _holdout_task(holdout_diseases: list[str]) -> dict:
+    st = _WORKER_STATE
+    return run_cross_disease_validation(st["ranked"], st["gold_df"], holdout_diseases, st["ks"])
+
+
+def _run_sweep(task, items: list, rank_csv, gold_df: pd.DataFrame,
+               ks: list[int] | None, workers: int, score_col: str) -> list[dict]:
+    ranked = RankedLists.load(rank_csv, score_col)
+    ks = [5, 10, 20] if ks is None else list(ks)
+    workers = max(1, int(workers))
+    if workers > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(items)), initializer=_init_worker,
+                                 initargs=(ranked, gold_df, ks)) as pool:
+            return list(pool.map(task, items))
+    _init_worker(ranked, gold_df, ks)
+    try:
+        return [task(item) for item in items]
+    finally:
+        _WORKER_STATE.clear()
+
+
+def run_temporal_sweep(
+    rank_csv: Path | pd.DataFrame | RankedLists,
+    gold_df: pd.DataFrame,
+    cutoff_years: Sequence[int],
+    ks: list[int] | None = None,
+    workers: int = 1,
+    score_col: str = "final_score",
+) -> dict[int, dict]:
+    """Run temporal validation at several cutoff years.
+
+    The rank table is grouped once; with workers > 1 the cutoffs are
+    evaluated in a process pool.
+
+    Args:
+        rank_csv: Ranking output CSV path, DataFrame or prebuilt RankedLists
+        gold_df: Gold standard with approval_year column
+        cutoff_years: Years to split on
+        ks: K values
+        workers: Process count (1 = run in-process)
+        score_col: Score column used for ranking
+
+    Returns:
+        {cutoff_year: run_temporal_validation result}, in input order
+    """
+    years = [int(y) for y in cutoff_years]
+    results = _run_sweep(_temporal_task, years, rank_csv, gold_df, ks, workers, score_col)
+    return dict(zip(years, results))
+
+
+def run_holdout_sweep(
+    rank_csv: Path | pd.DataFrame | RankedLists,
+    gold_df: pd.DataFrame,
+    holdouts: Sequence[Sequence[str]],
+    ks: list[int] | None = None,
+    workers: int = 1,
+    score_col: str = "final_score",
+) -> list[dict]:
+    """Run cross-disease holdout validation for several holdout sets.
+
+    Args:
+        rank_csv: Ranking output CSV path, DataFrame or prebuilt RankedLists
+        gold_df: Full gold standard
+        holdouts: Holdout disease lists (e.g. one per fold)
+        ks: K values
+        workers: Process count (1 = run in-process)
+        score_col: Score column used for ranking
+
+    Returns:
+        run_cross_disease_validation results, in input order
+    """
+    items = [list(h) for h in holdouts]
+    return _run_sweep(_holdout_task, items, rank_csv, gold_df, ks, workers, score_col)
@@ -0,0 +1,261 @@
+"""
+Evidence pack 存储 — 每对药物-疾病的完整证据包
+
+三种格式 (rank.evidence_pack_format):
+  - files:  evidence_pack/{drug}__{disease}.json, 每对一个缩进 JSON (默认)
+  - jsonl:  复用 evidence_paths.jsonl, 另写 evidence_paths.idx.json (pair → 字节偏移/长度)
+  - sqlite: evidence_pack.sqlite 单文件, 主键 (drug, disease_id)
+
+写入: write_evidence_packs() 同时清理其它格式的旧产物, 目录中只保留本次运行的一种格式.
+读取: EvidencePackStore.open(output_dir) 自动识别格式, 提供 get / keys / 迭代.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .config import ensure_dir
+from .utils import concurrent_map
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PACK_DIR = "evidence_pack"
+JSONL_NAME = "evidence_paths.jsonl"
+INDEX_NAME = "evidence_paths.idx.json"
+SQLITE_NAME = "evidence_pack.sqlite"
+
+
+def pack_key(drug: str, disease_id: str) -> str:
+    """索引键 (与 ranker 的存活对键一致)"""
+    return f"{drug}||{disease_id}"
+
+
+def pack_filename(drug: str, disease_id: str) -> str:
+    """files 格式下的文件名 (/ 和 : 替换为 _)"""
+    return (drug + "__" + disease_id).replace("/", "_").replace(":", "_") + ".json"
+
+
+def _clear_stale(output_dir: Path, keep: set[str] | None = None) -> None:
+    """删除上次运行留下的证据包产物, 保持与当前排名同步 (keep: 保留的 files 格式文件名)"""
+    ep_dir = output_dir / PACK_DIR
+    if ep_dir.is_dir():
+        for old_pack in ep_dir.glob("*.json"):
+            if keep is not None and old_pack.name in keep:
+                continue
+            try:
+                old_pack.unlink()
+            except OSError as e:
+                logger.warning("无法删除旧 evidence pack: %s (%s)", old_pack.name, e)
+    for name in (INDEX_NAME, SQLITE_NAME):
+        (output_dir / name).unlink(missing_ok=True)
+
+
+def _write_files(ep_dir: Path, packs: list[dict], max_workers: int) -> None:
+    def _write(pack: dict) -> None:
+        (ep_dir / pack_filename(pack["drug"], pack["disease"]["id"])).write_text(
+            json.dumps(pack, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+    concurrent_map(_write, packs, max_workers=max_workers)
+
+
+def _write_index(jsonl_path: Path, packs: list[dict]) -> Path:
+    """为 evidence_paths.jsonl 建立 pair → (offset, length) 索引 (第 i 行对应 packs[i])"""
+    pairs: dict[str, list[int]] = {}
+    offset = 0
+    with jsonl_path.open("rb") as f:
+        for pack, line in zip(packs, f):
+            pairs[pack_key(pack["drug"], pack["disease"]["id"])] = [offset, len(line)]
+            offset += len(line)
+    idx_path = jsonl_path.with_name(INDEX_NAME)
+    idx_path.write_text(
+        json.dumps({"source": jsonl_path.name, "n_packs": len(pairs), "pairs": pairs}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    return idx_path
+
+
+def _write_sqlite(db_path: Path, packs: list[dict]) -> Path:
+    tmp = db_path.with_suffix(".sqlite.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute(
+            "CREATE TABLE packs (drug TEXT NOT NULL, disease_id TEXT NOT NULL, "
+            "final_score REAL, pack TEXT NOT NULL, PRIMARY KEY (drug, disease_id))"
+        )
+        con.executemany(
+            "INSERT OR REPLACE INTO packs VALUES (?, ?, ?, ?)",
+            ((p["drug"], p["disease"]["id"], p["scores"]["final"], json.dumps(p, ensure_ascii=False))
+             for p in packs),
+        )
+        con.commit()
+    finally:
+        con.close()
+    tmp.replace(db_path)
+    return db_path
+
+
+def write_evidence_packs(
+    output_dir: Path,
+    packs: list[dict],
+    fmt: str = "files",
+    max_workers: int = 8,
+    changed: set[str] | None = None,
+) -> Path:
+    """
+    按 fmt 写出证据包.
+
+    jsonl 格式要求 output_dir/evidence_paths.jsonl 已按 packs 顺序写出.
+
+    Args:
+        changed: 增量重排时内容有变化的 pair_key 集合. files 格式下只重写这些文件,
+                 其余已有文件保留, 不在 packs 中的旧文件删除; jsonl / sqlite 仍整体重写.
+
+    Returns:
+        证据包存储位置 (目录 / 索引文件 / SQLite 文件), 可直接传给 EvidencePackStore.open
+    """
+    output_dir = Path(output_dir)
+    incremental = fmt == "files" and changed is not None
+    _clear_stale(output_dir, keep={pack_filename(p["drug"], p["disease"]["id"]) for p in packs}
+                 if incremental else None)
+    if fmt == "jsonl":
+        return _write_index(output_dir / JSONL_NAME, packs)
+    if fmt == "sqlite":
+        return _write_sqlite(output_dir / SQLITE_NAME, packs)
+    ep_dir = ensure_dir(output_dir / PACK_DIR)
+    if incremental:
+        packs = [p for p in packs if pack_key(p["drug"], p["disease"]["id"]) in changed]
+    _write_files(ep_dir, packs, max_workers)
+    return ep_dir
+
+
+class EvidencePackStore:
+    """
+    证据包只读访问 (三种格式统一接口).
+
+    用法:
+        with EvidencePackStore.open("output/") as store:
+            pack = store.get("aspirin", "EFO_0003914")
+            for pack in store: ...
+    """
+
+    def __init__(self, fmt: str, path: Path):
+        self.fmt = fmt
+        self.path = Path(path)
+        self._con: sqlite3.Connection | None = None
+        self._pairs: dict[str, list[int]] = {}
+        self._jsonl: Path | None = None
+        if fmt == "sqlite":
+            self._con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        elif fmt == "jsonl":
+            idx = json.loads(self.path.read_text(encoding="utf-8"))
+            self._pairs = idx["pairs"]
+            self._jsonl = self.path.with_name(idx.get("source", JSONL_NAME))
+
+    @classmethod
+    def open(cls, location: str | Path) -> "EvidencePackStore":
+        """
+        打开证据包存储.
+
+        location 可以是输出目录 (自动识别格式), 也可以直接是
+        evidence_pack/ 目录、evidence_paths.idx.json 或 evidence_pack.sqlite.
+        """
+        p = Path(location)
+        if p.is_dir() and p.name != PACK_DIR:
+            for name, fmt in ((SQLITE_NAME, "sqlite"), (INDEX_NAME, "jsonl")):
+                if (p / name).exists():
+                    return cls(fmt, p / name)
+            p = p / PACK_DIR
+        if p.suffix == ".sqlite":
+            return cls("sqlite", p)
+        if p.name.endswith(".idx.json"):
+            return cls("jsonl", p)
+        if not p.is_dir():
+            raise FileNotFoundError(f"未找到证据包存储: {location}")
+        return cls("files", p)
+
+    def get(self, drug: str, disease_id: str) -> dict | None:
+        """读取单个证据包, 不存在返回 None"""
+        if self.fmt == "sqlite":
+            row = self._con.execute(
+                "SELECT pack FROM packs WHERE drug = ? AND disease_id = ?", (drug, disease_id)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        if self.fmt == "jsonl":
+            loc = self._pairs.get(pack_key(drug, disease_id))
+            if loc is None:
+                return None
+            with self._jsonl.open("rb") as f:
+                f.seek(loc[0])
+                return json.loads(f.read(loc[1]))
+        fp = self.path / pack_filename(drug, disease_id)
+        return json.loads(fp.read_text(encoding="utf-8")) if fp.exists() else None
+
+    def keys(self) -> list[tuple[str, str]]:
+        """所有 (drug, disease_id) 对"""
+        if self.fmt == "sqlite":
+            return [tuple(r) for r in self._con.execute("SELECT drug, disease_id FROM packs ORDER BY rowid")]
+        if self.fmt == "jsonl":
+            return [tuple(k.split("||", 1)) for k in self._pairs]
+        return [(p["drug"], p["disease"]["id"]) for p in self]
+
+    def __len__(self) -> int:
+        if self.fmt == "sqlite":
+            return self._con.execute("SELECT COUNT(*) FROM packs").fetchone()[0]
+        if self.fmt == "jsonl":
+            return len(self._pairs)
+        return sum(1 for _ in self.path.glob("*.json"))
+
+    @property
+    def nbytes(self) -> int:
+        """存储占用字节数"""
+        if self.fmt == "files":
+            return sum(fp.stat().st_size for fp in self.path.glob("*.json"))
+        if self.fmt == "jsonl":
+            return self.path.stat().st_size + self._jsonl.stat().st_size
+        return self.path.stat().st_size
+
+    def __iter__(self) -> Iterator[dict]:
+        if self.fmt == "sqlite":
+            for (text,) in self._con.execute("SELECT pack FROM packs ORDER BY rowid"):
+                yield json.loads(text)
+        elif self.fmt == "jsonl":
+            # 顺序读整个文件比逐条 seek 快
+            with self._jsonl.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            for fp in sorted(self.path.glob("*.json")):
+                yield json.loads(fp.read_text(encoding="utf-8"))
+
+    def iter_disease(self, disease_ids: Iterable[str]) -> Iterator[dict]:
+        """只迭代指定疾病的证据包"""
+        wanted = set(disease_ids)
+        if self.fmt == "sqlite" and wanted:
+            marks = ",".join("?" * len(wanted))
+            for (text,) in self._con.execute(
+                f"SELECT pack FROM packs WHERE disease_id IN ({marks}) ORDER BY rowid", sorted(wanted)
+            ):
+                yield json.loads(text)
+            return
+        for pack in self:
+            if pack["disease"]["id"] in wanted:
+                yield pack
+
+    def close(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def __enter__(self) -> "EvidencePackStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
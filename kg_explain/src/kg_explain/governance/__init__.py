@@ -1,11 +1,11 @@
 """Model governance: version registry, quality gates, and regression testing."""
 
-from .registry import ModelVersion, ModelRegistry
+from .registry import ModelVersion, ModelRegistry, performance_from_manifest
 from .quality_gate import QualityGate, QualityGateResult
-from .regression import RegressionSuite, RegressionFixture, RegressionResult
+from .regression import RegressionSuite, RegressionFixture, RegressionResult, write_reports
 
 __all__ = [
-    "ModelVersion", "ModelRegistry",
+    "ModelVersion", "ModelRegistry", "performance_from_manifest",
     "QualityGate", "QualityGateResult",
-    "RegressionSuite", "RegressionFixture", "RegressionResult",
+    "RegressionSuite", "RegressionFixture", "RegressionResult", "write_reports",
 ]
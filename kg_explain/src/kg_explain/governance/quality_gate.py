@@ -3,17 +3,30 @@
 Evaluates current pipeline metrics against configured thresholds
 and optionally checks for regression from a baseline version.
 
+With performance_tolerance set, per-step wall time, total pipeline time
+and peak RSS are also compared against the baseline's performance
+snapshot (see registry.performance_from_manifest); a step that is more
+than that fraction slower blocks the release.
+
 Usage:
-    gate = QualityGate({"hit@10": 0.50, "mrr": 0.25}, regression_tolerance=0.05)
-    result = gate.check(current_metrics, baseline_metrics)
+    gate = QualityGate({"hit@10": 0.50, "mrr": 0.25}, regression_tolerance=0.05,
+                       performance_tolerance=0.20)
+    result = gate.check(current_metrics, baseline_metrics,
+                        performance=current_perf, baseline_performance=baseline_perf)
     if not result.passed:
         print("BLOCKED:", result.failures)
+
+    # or straight from the registry (baseline = latest approved version)
+    result = gate.check_release(registry, "v5-20260301-abcd1234")
 """
 from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .registry import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +40,7 @@ class QualityGateResult:
     warnings: List[str] = field(default_factory=list)
     metrics: Dict[str, float] = field(default_factory=dict)
     baseline_metrics: Optional[Dict[str, float]] = None
+    performance_regressions: List[str] = field(default_factory=list)
 
     def summary(self) -> str:
         status = "PASSED" if self.passed else "BLOCKED"
@@ -35,6 +49,8 @@ class QualityGateResult:
             lines.append(f"  Failures: {'; '.join(self.failures)}")
         if self.regressions:
             lines.append(f"  Regressions: {'; '.join(self.regressions)}")
+        if self.performance_regressions:
+            lines.append(f"  Performance: {'; '.join(self.performance_regressions)}")
         if self.warnings:
             lines.append(f"  Warnings: {'; '.join(self.warnings)}")
         return "\n".join(lines)
@@ -47,6 +63,10 @@ class QualityGate:
         thresholds: {metric_name: minimum_value}
         regression_tolerance: Maximum allowed drop from baseline (e.g., 0.05 = 5%)
         warning_margin: Metrics within this margin of threshold trigger warnings
+        performance_tolerance: Maximum allowed slowdown / memory growth relative to
+            the baseline (e.g., 0.20 = 20%); None disables the performance rule
+        performance_min_seconds: Steps faster than this in the baseline are not
+            gated (timer noise dominates)
     """
 
     def __init__(
@@ -54,21 +74,29 @@ class QualityGate:
         thresholds: Dict[str, float],
         regression_tolerance: float = 0.05,
         warning_margin: float = 0.03,
+        performance_tolerance: Optional[float] = None,
+        performance_min_seconds: float = 1.0,
     ):
         self.thresholds = thresholds
         self.regression_tolerance = regression_tolerance
         self.warning_margin = warning_margin
+        self.performance_tolerance = performance_tolerance
+        self.performance_min_seconds = performance_min_seconds
 
     def check(
         self,
         metrics: Dict[str, float],
         baseline_metrics: Optional[Dict[str, float]] = None,
+        performance: Optional[Dict[str, Any]] = None,
+        baseline_performance: Optional[Dict[str, Any]] = None,
     ) -> QualityGateResult:
         """Run quality gate check.
 
         Args:
             metrics: Current pipeline metrics
             baseline_metrics: Previous approved version's metrics (optional)
+            performance: Current performance snapshot (optional)
+            baseline_performance: Baseline performance snapshot (optional)
 
         Returns:
             QualityGateResult with pass/fail and details
@@ -76,6 +104,7 @@ class QualityGate:
         failures: List[str] = []
         regressions: List[str] = []
         warnings: List[str] = []
+        perf_regressions: List[str] = []
 
         # Check absolute thresholds
         for metric_name, min_value in self.thresholds.items():
@@ -109,7 +138,11 @@ class QualityGate:
                         f"{baseline:.4f} (tolerance: {self.regression_tolerance:.4f})"
                     )
 
-        passed = len(failures) == 0 and len(regressions) == 0
+        # Check performance regression from baseline
+        if self.performance_tolerance is not None and performance and baseline_performance:
+            perf_regressions = self._check_performance(performance, baseline_performance, warnings)
+
+        passed = len(failures) == 0 and len(regressions) == 0 and len(perf_regressions) == 0
 
         result = QualityGateResult(
             passed=passed,
@@ -118,6 +151,7 @@ class QualityGate:
             warnings=warnings,
             metrics=metrics,
             baseline_metrics=baseline_metrics,
+            performance_regressions=perf_regressions,
         )
 
         if passed:
@@ -127,6 +161,70 @@ class QualityGate:
 
         return result
 
+    def _check_performance(
+        self,
+        current: Dict[str, Any],
+        baseline: Dict[str, Any],
+        warnings: List[str],
+    ) -> List[str]:
+        """Compare step times, total time and peak RSS against the baseline (higher = worse)."""
+        tol = self.performance_tolerance
+        out: List[str] = []
+
+        def _compare(label: str, cur: float, base: float, unit: str) -> None:
+            if base <= 0:
+                return
+            growth = (cur - base) / base
+            if growth > tol:
+                out.append(
+                    f"{label}: {cur:.2f}{unit} vs baseline {base:.2f}{unit} "
+                    f"(+{growth:.1%}, tolerance: {tol:.0%})"
+                )
+
+        cur_steps = current.get("step_seconds", {})
+        for step, base in baseline.get("step_seconds", {}).items():
+            if base < self.performance_min_seconds:
+                continue
+            if step not in cur_steps:
+                warnings.append(f"step '{step}': not found in performance snapshot")
+                continue
+            _compare(f"step '{step}'", float(cur_steps[step]), float(base), "s")
+
+        for key, unit in (("pipeline_elapsed_sec", "s"), ("peak_rss_mb", "MB")):
+            if key in current and key in baseline:
+                if key == "pipeline_elapsed_sec" and baseline[key] < self.performance_min_seconds:
+                    continue
+                _compare(key, float(current[key]), float(baseline[key]), unit)
+        return out
+
+    def check_release(
+        self,
+        registry: "ModelRegistry",
+        version_id: str,
+        baseline_id: Optional[str] = None,
+    ) -> QualityGateResult:
+        """Gate a registered version against a baseline version's metrics and performance.
+
+        Args:
+            registry: Model registry holding both versions
+            version_id: Candidate version
+            baseline_id: Baseline version (default: latest approved version of
+                the same ranker, excluding the candidate itself)
+        """
+        candidate = registry.get(version_id)
+        if baseline_id is not None:
+            baseline = registry.get(baseline_id)
+        else:
+            approved = [v for v in registry.list_versions(candidate.ranker_version, status="approved")
+                        if v.version_id != version_id]
+            baseline = approved[-1] if approved else None
+        if baseline is None:
+            logger.info("No approved baseline for %s; checking thresholds only", version_id)
+            return self.check(candidate.metrics)
+        return self.check(candidate.metrics, baseline.metrics,
+                          performance=candidate.performance,
+                          baseline_performance=baseline.performance)
+
     @classmethod
     def from_config(cls, config_dict: dict) -> "QualityGate":
         """Create from YAML config section.
@@ -137,8 +235,17 @@ class QualityGate:
                 "hit@10": 0.50
                 mrr: 0.25
               regression_tolerance: 0.05
+              performance_tolerance: 0.20     # optional
+              performance_min_seconds: 1.0
         """
         thresholds = config_dict.get("thresholds", {})
         tolerance = float(config_dict.get("regression_tolerance", 0.05))
         margin = float(config_dict.get("warning_margin", 0.03))
-        return cls(thresholds=thresholds, regression_tolerance=tolerance, warning_margin=margin)
+        perf_tol = config_dict.get("performance_tolerance")
+        return cls(
+            thresholds=thresholds,
+            regression_tolerance=tolerance,
+            warning_margin=margin,
+            performance_tolerance=float(perf_tol) if perf_tol is not None else None,
+            performance_min_seconds=float(config_dict.get("performance_min_seconds", 1.0)),
+        )
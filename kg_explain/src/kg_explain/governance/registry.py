@@ -5,6 +5,8 @@ Each "model version" is a combination of:
   - Config YAML hash
   - Data file hashes (edge CSVs)
   - Evaluation metrics at registration time
+  - Performance snapshot (per-step wall time / peak RSS, HTTP calls,
+    cache hit rate) taken from pipeline_manifest.json
 
 Storage: JSON file (append-safe, human-readable).
 """
@@ -33,11 +35,61 @@ class ModelVersion:
     git_commit: str = ""
     notes: str = ""
     status: str = "candidate"  # candidate | approved | deprecated
+    performance: Dict[str, Any] = field(default_factory=dict)
 
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
 
+def performance_from_manifest(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract a performance snapshot from a pipeline_manifest.json dict.
+
+    Returns:
+        {
+            "step_seconds": {step: wall seconds},   # from cli._timed_step
+            "step_peak_rss_mb": {step: MB},
+            "pipeline_elapsed_sec": float,
+            "peak_rss_mb": float,
+            "http_requests": int,
+            "cache_hits": int, "cache_misses": int, "cache_hit_rate": float,
+        }
+        Keys whose source is absent from the manifest are omitted.
+    """
+    perf: Dict[str, Any] = {}
+    timings = [t for t in manifest.get("step_timings") or [] if t.get("step")]
+    if timings:
+        perf["step_seconds"] = {t["step"]: float(t.get("elapsed_sec", 0.0)) for t in timings}
+        rss = {t["step"]: float(t["peak_rss_mb"]) for t in timings if "peak_rss_mb" in t}
+        if rss:
+            perf["step_peak_rss_mb"] = rss
+    if "pipeline_elapsed_sec" in manifest:
+        perf["pipeline_elapsed_sec"] = float(manifest["pipeline_elapsed_sec"])
+    if "peak_rss_mb" in manifest:
+        perf["peak_rss_mb"] = float(manifest["peak_rss_mb"])
+    http = manifest.get("http_stats") or {}
+    if "requests" in http:
+        perf["http_requests"] = int(http["requests"])
+    cache = manifest.get("cache_stats") or {}
+    for key in ("hits", "misses"):
+        if key in cache:
+            perf[f"cache_{key}"] = int(cache[key])
+    if "hit_rate" in cache:
+        perf["cache_hit_rate"] = float(cache["hit_rate"])
+    return perf
+
+
+def flatten_performance(perf: Dict[str, Any]) -> Dict[str, float]:
+    """Nested snapshot → flat {metric: value}; per-step entries become "step_seconds/<step>"."""
+    flat: Dict[str, float] = {}
+    for key, value in perf.items():
+        if isinstance(value, dict):
+            for sub, v in value.items():
+                flat[f"{key}/{sub}"] = float(v)
+        elif isinstance(value, (int, float)):
+            flat[key] = float(value)
+    return flat
+
+
 class ModelRegistry:
     """File-based model version registry.
 
@@ -95,6 +147,7 @@ class ModelRegistry:
         metrics: Dict[str, float],
         git_commit: str = "",
         notes: str = "",
+        performance: Optional[Dict[str, Any]] = None,
     ) -> ModelVersion:
         """Register a new model version.
 
@@ -105,6 +158,7 @@ class ModelRegistry:
             metrics: Evaluation metrics {name: value}
             git_commit: Git commit hash
             notes: Human-readable notes
+            performance: Performance snapshot (see performance_from_manifest)
 
         Returns:
             The created ModelVersion
@@ -140,6 +194,7 @@ class ModelRegistry:
             git_commit=git_commit,
             notes=notes,
             status="candidate",
+            performance=dict(performance or {}),
         )
 
         self._versions.append(version)
@@ -211,8 +266,27 @@ class ModelRegistry:
             "config_changed": va.config_hash != vb.config_hash,
             "metric_diff": metric_diff,
             "data_diff": data_diff,
+            "performance_diff": self.performance_diff(va, vb),
         }
 
+    @staticmethod
+    def performance_diff(va: ModelVersion, vb: ModelVersion) -> Dict[str, Dict[str, Any]]:
+        """Per-metric performance deltas (delta = a - b, pct relative to b).
+
+        Metrics present in only one version are listed with the other side None.
+        """
+        pa, pb = flatten_performance(va.performance), flatten_performance(vb.performance)
+        out: Dict[str, Dict[str, Any]] = {}
+        for m in sorted(set(pa) | set(pb)):
+            val_a, val_b = pa.get(m), pb.get(m)
+            entry: Dict[str, Any] = {"a": val_a, "b": val_b, "delta": None, "pct": None}
+            if val_a is not None and val_b is not None:
+                entry["delta"] = round(val_a - val_b, 6)
+                if val_b:
+                    entry["pct"] = round((val_a - val_b) / abs(val_b), 4)
+            out[m] = entry
+        return out
+
     def list_versions(
         self,
         ranker_version: Optional[str] = None,
@@ -226,6 +300,10 @@ class ModelRegistry:
             result = [v for v in result if v.status == status]
         return result
 
+    def get(self, version_id: str) -> ModelVersion:
+        """Look up a version by ID (KeyError if missing)."""
+        return self._find(version_id)
+
     def _find(self, version_id: str) -> ModelVersion:
         for v in self._versions:
             if v.version_id == version_id:
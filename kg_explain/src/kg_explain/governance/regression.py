@@ -4,24 +4,46 @@ Stores "regression fixtures" — known input CSVs with pre-computed
 expected ranking outputs. On each run, re-runs the ranker and asserts
 outputs match within tolerance.
 
+Two modes:
+  - run_all():            compare an existing actual_output.csv against the snapshot
+  - run_all(rerun=True):  re-run the ranker on each fixture's data in an isolated
+                          temp output dir (optionally in a process pool). Outputs are
+                          memoized by fixture input hash + code version, so unchanged
+                          fixtures are not re-ranked. Each result records runtime and
+                          peak RSS; manifests may set max_runtime_s / max_peak_rss_mb
+                          budgets so performance regressions fail like score regressions.
+
 Usage:
     suite = RegressionSuite(Path("tests/fixtures"))
-    results = suite.run_all()
+    results = suite.run_all(rerun=True, workers=4)
     for r in results:
         print(f"{r.fixture_name}: {'PASS' if r.passed else 'FAIL'}")
+    write_reports(results, Path("output/regression"))
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-from dataclasses import dataclass, field
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from ..utils import peak_rss_mb, reset_peak_rss
+
 logger = logging.getLogger(__name__)
 
+RANK_OUTPUT = "drug_disease_rank.csv"
+CACHE_DIRNAME = ".rerun_cache"
+
 
 @dataclass
 class RegressionFixture:
@@ -31,6 +53,9 @@ class RegressionFixture:
     expected_output: Path
     ranker_version: str
     tolerance: float = 0.001
+    config: Dict[str, Any] = field(default_factory=dict)
+    max_runtime_s: Optional[float] = None
+    max_peak_rss_mb: Optional[float] = None
 
     def to_dict(self) -> dict:
         return {
@@ -39,6 +64,9 @@ class RegressionFixture:
             "expected_output": str(self.expected_output),
             "ranker_version": self.ranker_version,
             "tolerance": self.tolerance,
+            "config": self.config,
+            "max_runtime_s": self.max_runtime_s,
+            "max_peak_rss_mb": self.max_peak_rss_mb,
         }
 
 
@@ -50,14 +78,25 @@ class RegressionResult:
     max_score_delta: float = 0.0
     rank_changes: int = 0
     details: List[str] = field(default_factory=list)
+    runtime_s: float = 0.0
+    peak_rss_mb: float = 0.0
+    cached: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
 
     def summary(self) -> str:
         status = "PASS" if self.passed else "FAIL"
-        return (
+        text = (
             f"[{status}] {self.fixture_name}: "
             f"max_delta={self.max_score_delta:.6f}, "
             f"rank_changes={self.rank_changes}"
         )
+        if self.runtime_s or self.peak_rss_mb:
+            text += f", runtime={self.runtime_s:.2f}s, peak_rss={self.peak_rss_mb:.0f}MB"
+            if self.cached:
+                text += " (cached)"
+        return text
 
 
 class RegressionSuite:
@@ -98,36 +137,90 @@ class RegressionSuite:
                     expected_output=subdir / manifest.get("expected_output", "expected_output.csv"),
                     ranker_version=manifest.get("ranker_version", "v5"),
                     tolerance=float(manifest.get("tolerance", 0.001)),
+                    config=manifest.get("config", {}),
+                    max_runtime_s=_optional_float(manifest.get("max_runtime_s")),
+                    max_peak_rss_mb=_optional_float(manifest.get("max_peak_rss_mb")),
                 )
                 self.fixtures.append(fixture)
                 logger.debug("Discovered fixture: %s", fixture.name)
 
-            except (json.JSONDecodeError, OSError, KeyError) as e:
+            except (json.JSONDecodeError, OSError, KeyError, TypeError, ValueError) as e:
                 logger.warning("Failed to load fixture %s: %s", subdir.name, e)
 
         logger.info("Discovered %d regression fixtures in %s",
                      len(self.fixtures), self.fixtures_dir)
 
-    def run_all(self) -> List[RegressionResult]:
-        """Run all regression tests."""
-        results = []
-        for fixture in self.fixtures:
-            result = self.run_one(fixture.name)
-            results.append(result)
+    def run_all(
+        self,
+        rerun: bool = False,
+        workers: int = 1,
+        cache_dir: Optional[Path] = None,
+        use_cache: bool = True,
+    ) -> List[RegressionResult]:
+        """Run all regression tests.
+
+        Args:
+            rerun: Re-run the ranker on each fixture's data (see rerun_one);
+                   otherwise compare existing actual_output.csv files.
+            workers: Process count for rerun mode (1 = run in-process).
+            cache_dir: Memoized ranker outputs (default: <fixtures_dir>/.rerun_cache).
+            use_cache: False re-ranks every fixture and does not touch the cache.
+
+        Returns:
+            One result per fixture, in discovery order.
+        """
+        if not rerun:
+            return [self.run_one(fixture.name) for fixture in self.fixtures]
+
+        cache = self._cache_dir(cache_dir) if use_cache else None
+        version = code_version()
+        workers = max(1, int(workers))
+        if workers > 1 and len(self.fixtures) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(self.fixtures))) as pool:
+                futures = [pool.submit(_rerun_fixture, fixture, cache, version)
+                           for fixture in self.fixtures]
+                results = [f.result() for f in futures]
+        else:
+            results = [_rerun_fixture(fixture, cache, version) for fixture in self.fixtures]
+
+        n_passed = sum(r.passed for r in results)
+        logger.info("Regression rerun: %d/%d passed (%d cached, workers=%d)",
+                    n_passed, len(results), sum(r.cached for r in results), workers)
         return results
 
+    def rerun_one(
+        self,
+        fixture_name: str,
+        cache_dir: Optional[Path] = None,
+        use_cache: bool = True,
+    ) -> RegressionResult:
+        """Re-run the ranker for one fixture and compare against its snapshot."""
+        fixture = self._find(fixture_name)
+        if fixture is None:
+            return RegressionResult(
+                fixture_name=fixture_name,
+                passed=False,
+                details=[f"Fixture not found: {fixture_name}"],
+            )
+        cache = self._cache_dir(cache_dir) if use_cache else None
+        return _rerun_fixture(fixture, cache, code_version())
+
+    def _cache_dir(self, cache_dir: Optional[Path]) -> Path:
+        return Path(cache_dir) if cache_dir is not None else self.fixtures_dir / CACHE_DIRNAME
+
+    def _find(self, fixture_name: str) -> Optional[RegressionFixture]:
+        for f in self.fixtures:
+            if f.name == fixture_name:
+                return f
+        return None
+
     def run_one(self, fixture_name: str) -> RegressionResult:
         """Run a single regression fixture by comparing actual vs expected output.
 
         This does NOT re-run the ranker (which would need API calls).
         Instead, it compares the current output CSV against the expected snapshot.
         """
-        fixture = None
-        for f in self.fixtures:
-            if f.name == fixture_name:
-                fixture = f
-                break
-
+        fixture = self._find(fixture_name)
         if fixture is None:
             return RegressionResult(
                 fixture_name=fixture_name,
@@ -157,8 +250,9 @@ class RegressionSuite:
 
         return self._compare_outputs(fixture, actual_output)
 
+    @staticmethod
     def _compare_outputs(
-        self, fixture: RegressionFixture, actual_path: Path
+        fixture: RegressionFixture, actual_path: Path
     ) -> RegressionResult:
         """Compare actual vs expected ranking output."""
         try:
@@ -247,10 +341,12 @@ class RegressionSuite:
         output_csv: Path,
         ranker_version: str = "v5",
         tolerance: float = 0.001,
+        config: Optional[Dict[str, Any]] = None,
     ) -> RegressionFixture:
         """Create a new fixture from current pipeline output (snapshot).
 
-        Copies the current output as the expected baseline.
+        Copies the current output as the expected baseline.  ``config`` holds
+        raw config overrides (e.g. rank / disease sections) for rerun mode.
         """
         import shutil
 
@@ -276,6 +372,8 @@ class RegressionSuite:
             "ranker_version": ranker_version,
             "tolerance": tolerance,
         }
+        if config:
+            manifest["config"] = config
         with open(fixture_dir / "manifest.json", "w", encoding="utf-8") as f:
             json.dump(manifest, f, indent=2)
 
@@ -285,7 +383,206 @@ class RegressionSuite:
             expected_output=expected,
             ranker_version=ranker_version,
             tolerance=tolerance,
+            config=dict(config or {}),
         )
         self.fixtures.append(fixture)
         logger.info("Created regression fixture: %s", name)
         return fixture
+
+
+# ---------------------------------------------------------------------------
+# Rerun mode: isolated ranker runs, memoized by input hash + code version
+# ---------------------------------------------------------------------------
+
+def _optional_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """kg_explain version + SHA256 of every source file in the package.
+
+    Any code change invalidates memoized fixture outputs, even without a
+    version bump or a git checkout.
+    """
+    from .. import __version__
+
+    root = Path(__file__).resolve().parent.parent
+    h = hashlib.sha256(__version__.encode("utf-8"))
+    for path in sorted(root.rglob("*.py")):
+        h.update(path.relative_to(root).as_posix().encode("utf-8"))
+        h.update(_hash_file(path).encode("ascii"))
+    return f"{__version__}+{h.hexdigest()[:16]}"
+
+
+def fixture_input_hash(fixture: RegressionFixture) -> str:
+    """SHA256 over the fixture's data files, config overrides and ranker version."""
+    h = hashlib.sha256()
+    if fixture.data_dir.exists():
+        for path in sorted(p for p in fixture.data_dir.rglob("*") if p.is_file()):
+            h.update(path.relative_to(fixture.data_dir).as_posix().encode("utf-8"))
+            h.update(_hash_file(path).encode("ascii"))
+    params = {"ranker_version": fixture.ranker_version, "config": fixture.config}
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _run_ranker_isolated(fixture: RegressionFixture, dest: Path) -> tuple[float, float]:
+    """Run the ranker on the fixture data in a temp output dir; copy the rank CSV to dest.
+
+    Returns:
+        (runtime_s, peak_rss_mb)
+    """
+    from ..config import Config, _deep_merge
+    from ..rankers import run_pipeline
+
+    with tempfile.TemporaryDirectory(prefix=f"regression_{fixture.name}_") as tmp:
+        raw = _deep_merge(fixture.config, {
+            "mode": fixture.ranker_version,
+            "paths": {
+                "data_dir": str(fixture.data_dir),
+                "output_dir": str(Path(tmp) / "output"),
+                "cache_dir": str(Path(tmp) / "cache"),
+            },
+            "rank": {"incremental": False},
+        })
+        reset_peak_rss()  # pool workers run many fixtures
+        t0 = time.perf_counter()
+        outputs = run_pipeline(Config(raw=raw))
+        runtime = time.perf_counter() - t0
+        peak = peak_rss_mb()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(outputs["rank_csv"], dest)
+    return runtime, peak
+
+
+def _rerun_fixture(
+    fixture: RegressionFixture,
+    cache_dir: Optional[Path],
+    version: str,
+) -> RegressionResult:
+    """Worker: memoized ranker run + snapshot comparison + performance budgets."""
+    if not fixture.expected_output.exists():
+        return RegressionResult(
+            fixture_name=fixture.name,
+            passed=False,
+            details=[f"Expected output not found: {fixture.expected_output}"],
+        )
+
+    key = hashlib.sha256(f"{fixture_input_hash(fixture)}|{version}".encode("utf-8")).hexdigest()
+    cached = False
+    with tempfile.TemporaryDirectory(prefix=f"regression_{fixture.name}_out_") as tmp:
+        if cache_dir is not None:
+            entry = Path(cache_dir) / f"{fixture.name}-{key[:16]}"
+            actual, meta_path = entry / RANK_OUTPUT, entry / "meta.json"
+        else:
+            actual, meta_path = Path(tmp) / RANK_OUTPUT, None
+
+        meta: Dict[str, Any] = {}
+        if meta_path is not None and meta_path.exists() and actual.exists():
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                cached = meta.get("key") == key
+            except (json.JSONDecodeError, OSError):
+                cached = False
+
+        if not cached:
+            try:
+                runtime, peak = _run_ranker_isolated(fixture, actual)
+            except Exception as e:
+                logger.warning("Regression fixture %s: ranker failed: %s", fixture.name, e)
+                return RegressionResult(
+                    fixture_name=fixture.name,
+                    passed=False,
+                    details=[f"Ranker failed: {type(e).__name__}: {e}"],
+                )
+            meta = {"key": key, "code_version": version,
+                    "runtime_s": round(runtime, 4), "peak_rss_mb": round(peak, 1)}
+            if meta_path is not None:
+                meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+        result = RegressionSuite._compare_outputs(fixture, actual)
+
+    result.runtime_s = float(meta.get("runtime_s", 0.0))
+    result.peak_rss_mb = float(meta.get("peak_rss_mb", 0.0))
+    result.cached = cached
+
+    perf_failures = []
+    if fixture.max_runtime_s is not None and result.runtime_s > fixture.max_runtime_s:
+        perf_failures.append(
+            f"runtime {result.runtime_s:.2f}s exceeds budget {fixture.max_runtime_s:.2f}s")
+    if fixture.max_peak_rss_mb is not None and result.peak_rss_mb > fixture.max_peak_rss_mb:
+        perf_failures.append(
+            f"peak RSS {result.peak_rss_mb:.0f}MB exceeds budget {fixture.max_peak_rss_mb:.0f}MB")
+    if perf_failures:
+        result.passed = False
+        result.details = perf_failures + result.details
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Reports
+# ---------------------------------------------------------------------------
+
+def to_junit_xml(results: List[RegressionResult], suite_name: str = "kg_explain.regression") -> str:
+    """JUnit XML (one testcase per fixture; runtime as time, peak RSS as a property)."""
+    suite = ET.Element("testsuite", {
+        "name": suite_name,
+        "tests": str(len(results)),
+        "failures": str(sum(not r.passed for r in results)),
+        "errors": "0",
+        "time": f"{sum(r.runtime_s for r in results):.3f}",
+    })
+    for r in results:
+        case = ET.SubElement(suite, "testcase", {
+            "classname": suite_name,
+            "name": r.fixture_name,
+            "time": f"{r.runtime_s:.3f}",
+        })
+        props = ET.SubElement(case, "properties")
+        for name, value in (("peak_rss_mb", f"{r.peak_rss_mb:.1f}"), ("cached", str(r.cached).lower()),
+                            ("max_score_delta", f"{r.max_score_delta:.6f}"),
+                            ("rank_changes", str(r.rank_changes))):
+            ET.SubElement(props, "property", {"name": name, "value": value})
+        if not r.passed:
+            failure = ET.SubElement(case, "failure", {
+                "message": r.details[0] if r.details else "regression failed",
+                "type": "RegressionFailure",
+            })
+            failure.text = "\n".join(r.details)
+    ET.indent(suite)
+    return ET.tostring(suite, encoding="unicode", xml_declaration=True)
+
+
+def to_json_report(results: List[RegressionResult]) -> dict:
+    """JSON report: totals + per-fixture results (scores, runtime, peak RSS)."""
+    return {
+        "code_version": code_version(),
+        "n_fixtures": len(results),
+        "n_passed": sum(r.passed for r in results),
+        "n_failed": sum(not r.passed for r in results),
+        "n_cached": sum(r.cached for r in results),
+        "total_runtime_s": round(sum(r.runtime_s for r in results), 4),
+        "max_peak_rss_mb": max((r.peak_rss_mb for r in results), default=0.0),
+        "results": [r.to_dict() for r in results],
+    }
+
+
+def write_reports(results: List[RegressionResult], out_dir: Path) -> Dict[str, Path]:
+    """Write regression_junit.xml and regression_report.json to out_dir."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    junit = out_dir / "regression_junit.xml"
+    junit.write_text(to_junit_xml(results), encoding="utf-8")
+    report = out_dir / "regression_report.json"
+    report.write_text(json.dumps(to_json_report(results), indent=2, ensure_ascii=False), encoding="utf-8")
+    logger.info("Regression reports written: %s, %s", junit, report)
+    return {"junit": junit, "json": report}
@@ -2,7 +2,7 @@
 知识图谱 NetworkX 层
 
 将 CSV 边数据加载为 nx.DiGraph, 支持:
-  - 图构建 (build_kg)
+  - 图构建 (build_kg, 批量列式构建; _build_kg_rowwise 为逐行参考实现)
   - DTPD 路径枚举 (find_dtpd_paths)
   - 图统计 (graph_stats)
   - GraphML 导出 (export_graphml)
@@ -11,17 +11,24 @@
 边类型:   DRUG_TARGET, TARGET_PATHWAY, PATHWAY_DISEASE,
           DRUG_AE, DISEASE_PHENOTYPE, DRUG_TRIAL
 
+查询函数 (graph_stats / find_dtpd_paths / drug_summary) 同时接受
+compact_graph.CompactGraph (整数索引 CSR 后端, 适合大图与 memory-map 复用).
+
 后续可平滑迁移至 Neo4j (节点标签=type, 关系类型=edge type)
 """
 from __future__ import annotations
 import logging
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, NamedTuple
 
 import networkx as nx
 import pandas as pd
 
 from .config import Config
-from .utils import safe_str
+from .utils import read_table, resolve_table, safe_str
+
+if TYPE_CHECKING:
+    from .compact_graph import CompactGraph
 
 
 def _safe_numeric(val, default=0.0):
@@ -33,16 +40,201 @@ logger = logging.getLogger(__name__)
 
 
 def _load_csv(path: Path) -> pd.DataFrame:
-    """加载 CSV, 文件不存在返回空 DataFrame"""
-    if not path.exists():
+    """加载中间表 (CSV / Parquet, 全部为字符串列), 文件不存在返回空 DataFrame"""
+    if resolve_table(path) is None:
         logger.debug("文件不存在, 跳过: %s", path)
         return pd.DataFrame()
-    return pd.read_csv(path, low_memory=False, dtype=str)
+    return read_table(path, typed=False)
+
+
+def _str_col(df: pd.DataFrame, col: str) -> pd.Series:
+    """整列版 safe_str: NaN/缺失列 → "", 其余去除首尾空格"""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str).str.strip()
+
+
+def _num_col(df: pd.DataFrame, col: str, default: float = 0.0) -> pd.Series:
+    """整列版 _safe_numeric: 无法解析/缺失列 → default"""
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=float)
+    return pd.to_numeric(df[col], errors="coerce").fillna(default).astype(float)
+
+
+def _valid_rows(src: pd.Series, dst: pd.Series) -> pd.Series:
+    """两端 ID 均非空的行"""
+    return (src != "") & (dst != "")
+
+
+class _EdgeSection(NamedTuple):
+    """单个边文件清洗后的列数据 (供 NetworkX / Compact 两种后端共用)"""
+    etype: str
+    src: pd.Series
+    dst: pd.Series
+    nodes: list[tuple[pd.Series, str, pd.Series | None]]
+    attrs: dict[str, pd.Series]
+
+
+def _iter_edge_sections(cfg: Config) -> Iterator[_EdgeSection]:
+    """
+    按固定顺序读取并整列清洗各边文件
+
+    每个 section 只保留两端 ID 均非空的行; nodes 为 (ids, type, names),
+    names 为 None 表示该角色不带 name 属性.
+    """
+    data_dir = cfg.data_dir
+    files = cfg.files
+
+    # ── Drug → Target ──
+    dt = _load_csv(data_dir / files.get("drug_target", "edge_drug_target.csv"))
+    drug, target = _str_col(dt, "drug_normalized"), _str_col(dt, "target_chembl_id")
+    ok = _valid_rows(drug, target)
+    dt, drug, target = dt[ok], drug[ok], target[ok]
+    yield _EdgeSection("DRUG_TARGET", drug, target,
+                       [(drug, "Drug", None), (target, "Target", None)],
+                       {"mechanism": _str_col(dt, "mechanism_of_action")})
+
+    # ── Target → Pathway ──
+    tp = _load_csv(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv"))
+    target, pathway = _str_col(tp, "target_chembl_id"), _str_col(tp, "reactome_stid")
+    ok = _valid_rows(target, pathway)
+    tp, target, pathway = tp[ok], target[ok], pathway[ok]
+    yield _EdgeSection("TARGET_PATHWAY", target, pathway,
+                       [(target, "Target", None),
+                        (pathway, "Pathway", _str_col(tp, "reactome_name"))],
+                       {})
+
+    # ── Pathway → Disease ──
+    pd_edge = _load_csv(data_dir / files.get("pathway_disease", "edge_pathway_disease.csv"))
+    pathway, disease = _str_col(pd_edge, "reactome_stid"), _str_col(pd_edge, "diseaseId")
+    ok = _valid_rows(pathway, disease)
+    pd_edge, pathway, disease = pd_edge[ok], pathway[ok], disease[ok]
+    yield _EdgeSection("PATHWAY_DISEASE", pathway, disease,
+                       [(pathway, "Pathway", _str_col(pd_edge, "reactome_name")),
+                        (disease, "Disease", _str_col(pd_edge, "diseaseName"))],
+                       {"pathway_score": _num_col(pd_edge, "pathway_score"),
+                        "support_genes": _num_col(pd_edge, "support_genes", default=1.0).astype(int)})
+
+    # ── Drug → AE (FAERS) ──
+    ae = _load_csv(data_dir / "edge_drug_ae_faers.csv")
+    drug, ae_term = _str_col(ae, "drug_normalized"), _str_col(ae, "ae_term")
+    ok = _valid_rows(drug, ae_term)
+    ae, drug, ae_term = ae[ok], drug[ok], ae_term[ok]
+    yield _EdgeSection("DRUG_AE", drug, ae_term,
+                       [(drug, "Drug", None), (ae_term, "AE", None)],
+                       {"report_count": _num_col(ae, "report_count").astype(int),
+                        # 逐元素 round() 与 Python 内置 round 一致 (np.round 在 .5 边界上可能不同)
+                        "prr": _num_col(ae, "prr").map(lambda x: round(x, 4))})
+
+    # ── Disease → Phenotype ──
+    phe = _load_csv(data_dir / "edge_disease_phenotype.csv")
+    disease, pheno = _str_col(phe, "diseaseId"), _str_col(phe, "phenotypeId")
+    ok = _valid_rows(disease, pheno)
+    phe, disease, pheno = phe[ok], disease[ok], pheno[ok]
+    yield _EdgeSection("DISEASE_PHENOTYPE", disease, pheno,
+                       [(disease, "Disease", _str_col(phe, "diseaseName")),
+                        (pheno, "Phenotype", _str_col(phe, "phenotypeName"))],
+                       {"score": _num_col(phe, "score")})
+
+    # ── Drug → Trial (safety/efficacy stops) ──
+    trial = _load_csv(data_dir / "edge_trial_ae.csv")
+    drug, nct = _str_col(trial, "drug_normalized"), _str_col(trial, "nctId")
+    ok = _valid_rows(drug, nct)
+    trial, drug, nct = trial[ok], drug[ok], nct[ok]
+    yield _EdgeSection("DRUG_TRIAL", drug, nct,
+                       [(drug, "Drug", None), (nct, "Trial", None)],
+                       {"is_safety_stop": _str_col(trial, "is_safety_stop") == "1",
+                        "is_efficacy_stop": _str_col(trial, "is_efficacy_stop") == "1",
+                        "status": _str_col(trial, "overallStatus")})
+
+
+def _node_table(parts: list[tuple[pd.Series, str, pd.Series | None]]) -> pd.DataFrame:
+    """
+    按行交错合并各角色节点并去重, 语义与逐行 add_node 一致
+
+    各角色按行交错排列, 保证节点顺序与逐行构建相同 (首次出现位置);
+    同一节点多次出现时 type 取最后一次, name 取最后一次非空赋值.
+
+    Returns:
+        以节点 ID 为索引, 含 type/name 列的 DataFrame (name 为 NaN 表示无 name 属性)
+    """
+    n_rows = len(parts[0][0]) if parts else 0
+    if n_rows == 0:
+        return pd.DataFrame({"type": pd.Series(dtype=object), "name": pd.Series(dtype=object)})
+    frames = []
+    for role, (ids, ntype, names) in enumerate(parts):
+        frames.append(pd.DataFrame({
+            "_pos": range(role, n_rows * len(parts), len(parts)),
+            "id": ids.to_numpy(),
+            "type": ntype,
+            "name": names.to_numpy() if names is not None else None,
+        }))
+    nodes = pd.concat(frames, ignore_index=True).sort_values("_pos", kind="stable")
+    return nodes.groupby("id", sort=False).agg(type=("type", "last"), name=("name", "last"))
+
+
+def _dedupe_edges(src: pd.Series, dst: pd.Series, attrs: dict[str, pd.Series]) -> pd.DataFrame:
+    """
+    同一 (src, dst) 保留首次出现的位置, 属性取最后一次 (与逐行 add_edge 一致)
+
+    Returns:
+        含 _src/_dst 及各属性列的 DataFrame
+    """
+    edges = pd.DataFrame({"_src": src.to_numpy(), "_dst": dst.to_numpy(),
+                          **{k: v.to_numpy() for k, v in attrs.items()}})
+    keys = ["_src", "_dst"]
+    first = edges.drop_duplicates(keys, keep="first")[keys]
+    last = edges.drop_duplicates(keys, keep="last")
+    return first.merge(last, on=keys, how="left")
 
 
 def build_kg(cfg: Config) -> nx.DiGraph:
     """
-    从 CSV 边数据构建 KG
+    从 CSV 边数据构建 KG (批量: 整列清洗 + add_nodes_from/add_edges_from)
+
+    节点/边属性与插入顺序与逐行构建 (_build_kg_rowwise) 完全一致.
+
+    Args:
+        cfg: 配置 (用于 data_dir 和 files 映射)
+
+    Returns:
+        nx.DiGraph 带有类型化节点和边
+    """
+    G = nx.DiGraph()
+    for sec in _iter_edge_sections(cfg):
+        if len(sec.src) == 0:
+            continue
+        nodes = _node_table(sec.nodes)
+        G.add_nodes_from(
+            (nid, {"type": t} if pd.isna(name) else {"type": t, "name": name})
+            for nid, t, name in zip(nodes.index.tolist(), nodes["type"].tolist(), nodes["name"].tolist())
+        )
+
+        edges = _dedupe_edges(sec.src, sec.dst, sec.attrs)
+        names = list(sec.attrs.keys())
+        cols = [edges[k].tolist() for k in names]
+        G.add_edges_from(
+            (u, v, {"type": sec.etype, **dict(zip(names, vals))})
+            for u, v, *vals in zip(edges["_src"].tolist(), edges["_dst"].tolist(), *cols)
+        )
+
+    _log_stats(G)
+    return G
+
+
+def _log_stats(G: nx.DiGraph) -> None:
+    """记录图构建统计"""
+    stats = graph_stats(G)
+    logger.info("KG 构建完成: %d 节点, %d 边", stats["total_nodes"], stats["total_edges"])
+    for ntype, count in sorted(stats["nodes"].items()):
+        logger.info("  节点 %-12s: %d", ntype, count)
+    for etype, count in sorted(stats["edges"].items()):
+        logger.info("  边   %-20s: %d", etype, count)
+
+
+def _build_kg_rowwise(cfg: Config) -> nx.DiGraph:
+    """
+    逐行构建 KG (旧实现, 保留作一致性测试和基准对照)
 
     Args:
         cfg: 配置 (用于 data_dir 和 files 映射)
@@ -136,17 +328,11 @@ def build_kg(cfg: Config) -> nx.DiGraph:
                    is_efficacy_stop=safe_str(r.get("is_efficacy_stop")) == "1",
                    status=safe_str(r.get("overallStatus")))
 
-    stats = graph_stats(G)
-    logger.info("KG 构建完成: %d 节点, %d 边", stats["total_nodes"], stats["total_edges"])
-    for ntype, count in sorted(stats["nodes"].items()):
-        logger.info("  节点 %-12s: %d", ntype, count)
-    for etype, count in sorted(stats["edges"].items()):
-        logger.info("  边   %-20s: %d", etype, count)
-
+    _log_stats(G)
     return G
 
 
-def graph_stats(G: nx.DiGraph) -> dict:
+def graph_stats(G: nx.DiGraph | CompactGraph) -> dict:
     """
     图统计: 按类型计数节点和边
 
@@ -154,6 +340,9 @@ def graph_stats(G: nx.DiGraph) -> dict:
         {"nodes": {type: count}, "edges": {type: count},
          "total_nodes": int, "total_edges": int}
     """
+    if not isinstance(G, nx.DiGraph):
+        return G.graph_stats()
+
     node_types: dict[str, int] = {}
     for _, d in G.nodes(data=True):
         t = d.get("type", "Unknown")
@@ -173,7 +362,7 @@ def graph_stats(G: nx.DiGraph) -> dict:
 
 
 def find_dtpd_paths(
-    G: nx.DiGraph,
+    G: nx.DiGraph | CompactGraph,
     drug: str,
     disease: str,
     max_paths: int = 100,
@@ -190,6 +379,9 @@ def find_dtpd_paths(
     Returns:
         路径列表, 每条路径含 drug/target/pathway/disease 及边属性
     """
+    if not isinstance(G, nx.DiGraph):
+        return G.find_dtpd_paths(drug, disease, max_paths=max_paths)
+
     if drug not in G or disease not in G:
         return []
 
@@ -226,7 +418,7 @@ def find_dtpd_paths(
     return paths
 
 
-def drug_summary(G: nx.DiGraph, drug: str) -> dict:
+def drug_summary(G: nx.DiGraph | CompactGraph, drug: str) -> dict:
     """
     药物邻域摘要: 靶点、通路、AE、试验
 
@@ -237,6 +429,9 @@ def drug_summary(G: nx.DiGraph, drug: str) -> dict:
     Returns:
         {targets: [...], pathways: [...], adverse_events: [...], trials: [...]}
     """
+    if not isinstance(G, nx.DiGraph):
+        return G.drug_summary(drug)
+
     if drug not in G:
         return {"targets": [], "pathways": [], "adverse_events": [], "trials": []}
 
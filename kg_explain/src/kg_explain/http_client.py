@@ -0,0 +1,203 @@
+"""
+HTTP 连接池客户端 — 共享 keep-alive Session, 按主机并发/限速, 在途请求合并
+
+cache.http_get_json / http_post_json / cached_* 通过 get_client() 发请求:
+  - 共享 requests.Session + HTTPAdapter 连接池: 同一主机复用 TCP/TLS 连接
+  - 按主机并发上限 (Semaphore): 多个 datasource 线程池叠加时也不超过上限
+  - 按主机令牌桶限速 (requests/second), 例如 ChEMBL / OpenFDA 的配额
+  - 请求合并: 相同 key 的在途请求只发一次, 其余线程等待同一结果
+
+用法:
+    configure_client(per_host_limit=8, rate_limits={"api.fda.gov": 4})
+    r = get_client().request("GET", url, params=params, timeout=60)
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Any, Callable, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """线程安全令牌桶: 平均 rate 次/秒, 允许 burst 次突发."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError(f"rate 必须 > 0, 实际: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取一个令牌 (不足时预约并睡眠), 返回等待秒数."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class _InFlight:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class PooledHTTPClient:
+    """共享连接池的 HTTP 客户端 (线程安全)."""
+
+    def __init__(
+        self,
+        per_host_limit: int = 8,
+        rate_limits: dict[str, float] | None = None,
+        pool_size: int | None = None,
+    ):
+        """
+        Args:
+            per_host_limit: 每个主机的最大并发请求数.
+            rate_limits: 主机名 (netloc) → 每秒请求数; 未列出的主机不限速.
+            pool_size: 每个主机保持的 keep-alive 连接数 (默认 = per_host_limit).
+        """
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.rate_limits = {str(h).lower(): float(r) for h, r in (rate_limits or {}).items() if float(r) > 0}
+        pool_size = max(1, int(pool_size or self.per_host_limit))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._host_sems: dict[str, threading.BoundedSemaphore] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._inflight: dict[str, _InFlight] = {}
+
+        # 统计
+        self._requests = 0
+        self._coalesced = 0
+        self._throttled_s = 0.0
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """返回请求统计副本."""
+        return {
+            "requests": self._requests,
+            "coalesced": self._coalesced,
+            "throttled_seconds": round(self._throttled_s, 3),
+            "hosts": sorted(self._host_sems),
+        }
+
+    def _gate(self, host: str) -> tuple[threading.BoundedSemaphore, TokenBucket | None]:
+        with self._lock:
+            sem = self._host_sems.get(host)
+            if sem is None:
+                sem = self._host_sems[host] = threading.BoundedSemaphore(self.per_host_limit)
+                rate = self.rate_limits.get(host)
+                if rate:
+                    self._buckets[host] = TokenBucket(rate)
+            return sem, self._buckets.get(host)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求 (受主机并发上限和限速约束), 返回 Response (不检查状态码)."""
+        sem, bucket = self._gate(urlsplit(url).netloc.lower())
+        with sem:
+            if bucket is not None:
+                waited = bucket.acquire()
+                if waited:
+                    with self._lock:
+                        self._throttled_s += waited
+            r = self.session.request(method, url, **kwargs)
+        with self._lock:
+            self._requests += 1
+        return r
+
+    def coalesce(self, key: str, fn: Callable[[], T]) -> T:
+        """
+        合并相同 key 的在途调用: 第一个线程执行 fn, 其余线程等待并得到结果副本.
+
+        fn 抛出的异常同样传给所有等待者. 调用结束后 key 即释放, 不做结果缓存.
+        """
+        with self._lock:
+            entry = self._inflight.get(key)
+            leader = entry is None
+            if leader:
+                entry = self._inflight[key] = _InFlight()
+            else:
+                entry.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            entry.event.wait()
+            if entry.error is not None:
+                raise entry.error
+            return copy.deepcopy(entry.result)
+
+        result = None
+        try:
+            result = fn()
+            return result
+        except BaseException as e:
+            entry.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                has_waiters = entry.waiters > 0
+            # 等待者拿快照副本, leader 返回的对象可被调用方随意修改
+            if has_waiters and entry.error is None:
+                entry.result = copy.deepcopy(result)
+            entry.event.set()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: PooledHTTPClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PooledHTTPClient:
+    """进程内共享客户端 (首次调用时按默认参数创建)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PooledHTTPClient()
+    return _client
+
+
+def configure_client(
+    per_host_limit: int = 8,
+    rate_limits: dict[str, float] | None = None,
+    pool_size: int | None = None,
+) -> PooledHTTPClient:
+    """替换共享客户端 (关闭旧连接池), 返回新客户端."""
+    global _client
+    client = PooledHTTPClient(per_host_limit, rate_limits, pool_size)
+    with _client_lock:
+        old, _client = _client, client
+    if old is not None:
+        old.close()
+    logger.debug("HTTP client: per_host_limit=%d, rate_limits=%s", client.per_host_limit, client.rate_limits)
+    return client
@@ -0,0 +1,185 @@
+"""
+药物名称规范化 — 预编译正则 + 结果缓存 + Series 接口
+
+rxnorm (剂量/剂型清洗、非药物过滤)、faers / faers_bulk (盐型去除)、chembl 与
+utils.load_canonical_map 共用这一份实现. 同一批试验干预名称在各步骤中被反复清洗:
+  - 标量函数带 LRU 缓存, 相同输入直接返回同一个结果字符串 (不重复跑正则链)
+  - Series 接口先 factorize 取唯一值, 每个唯一值只计算一次再按编码映射回去
+  - 所有正则在导入时编译一次
+
+结果与原各模块的逐行实现逐字相同 (测试覆盖). 盐型列表与 LLM 端 dr.common.text
+保持一致 (两个包独立发布, 不互相导入).
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+_CACHE_SIZE = 1 << 17
+
+_WS_RE = re.compile(r"\s+")
+
+# ── 盐型 ──
+_SALT_SUFFIXES = sorted([
+    "sodium", "potassium", "calcium", "magnesium", "aluminum",
+    "hydrochloride", "dihydrochloride", "hcl",
+    "sulfate", "sulphate", "bisulfate",
+    "citrate", "maleate", "fumarate", "succinate", "tartrate",
+    "phosphate", "acetate", "benzoate", "mesylate", "besylate",
+    "tosylate", "lactate", "gluconate", "carbonate", "nitrate",
+    "bromide", "chloride", "iodide",
+    "disodium", "dipotassium", "tromethamine",
+    "hemifumarate", "esylate", "xinafoate",
+    "hemihydrate", "monohydrate", "dihydrate", "trihydrate",
+    "sesquihydrate", "hydrate", "anhydrous",
+], key=len, reverse=True)
+
+_SALT_RE = re.compile(
+    r"\b(" + "|".join(re.escape(s) for s in _SALT_SUFFIXES) + r")\b",
+    re.IGNORECASE,
+)
+
+# ── 剂量/剂型/给药方式后缀 ──
+_DOSAGE_RE = re.compile(
+    r"\s+\d[\d.,/]*\s*"             # "100 mg", "0.4 mg", "200mg", "150 mg/ml"
+    r"(?:mg|ml|mcg|iu|units?|%|"
+    r"mg/ml|mcg/ml|mg/kg)"
+    r"(?:/\w+)?"                     # "/ml", "/day" 等
+    r"(?:\s+.*)?$",                  # 后面的 "bid", "sublingual" 等全部丢弃
+    re.I,
+)
+
+_FORMULATION_SUFFIXES = re.compile(
+    r"\s+(?:tablet|tablets|capsule|capsules|injection|infusion|"
+    r"oral|sublingual|subcutaneous|intravenous|iv|im|sc|"
+    r"bid|tid|qd|qid|daily|per\s+day)s?\s*$",
+    re.I,
+)
+
+# ── 非药物名称: 细胞剂量、安慰剂、生理盐水等 ──
+_NON_DRUG_PATTERNS = [
+    re.compile(r"^\d+\s*x\s*\d+.*cells?$", re.I),             # "10 x 10^6 cells"
+    re.compile(r"\bcells?\b", re.I),                            # any "cell(s)" mention
+    re.compile(r"(^|/)placebo", re.I),                          # "placebo", "matching placebo", "X/placebo"
+    re.compile(r"^(matching\s+)?placebo", re.I),                # "placebo", "matching placebo ..."
+    re.compile(r"^saline$", re.I),                              # "saline"
+    re.compile(r"^normal\s+saline", re.I),                      # "normal saline"
+    re.compile(r"^\d+(\.\d+)?%\s+sodium\s+chloride", re.I),    # "0.9% sodium chloride ..."
+    re.compile(r"\bcomparator\b", re.I),                        # "Comparator", "active comparator"
+    re.compile(r"\bsugar\s+pill\b", re.I),                      # "sugar pill"
+    re.compile(r"\boptimal\s+medical\b", re.I),                 # "optimal medical care/therapy"
+    re.compile(r"\bcontrol\s+(systolic\s+)?blood\s+pressure\b", re.I),  # "control blood pressure..."
+    re.compile(r"\bcontrast[- ]enhanced\b", re.I),              # "contrast-enhanced ultrasound"
+    re.compile(r"\bstandard\s+of\s+care\b", re.I),             # "standard of care"
+    re.compile(r"^sham\b", re.I),                               # "sham" procedure
+    re.compile(r"^observation$", re.I),                         # "observation" (watchful waiting)
+]
+# 合并为一个交替式, 一次扫描 (与逐个 search 的 any() 等价)
+_NON_DRUG_RE = re.compile("|".join(f"(?:{p.pattern})" for p in _NON_DRUG_PATTERNS), re.I)
+
+
+# ── 标量接口 (带缓存) ──
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def strip_salt_form(name: str) -> str:
+    """Remove salt-form suffixes from a drug name.
+
+    >>> strip_salt_form("tofacitinib citrate")
+    'tofacitinib'
+    >>> strip_salt_form("aspirin")
+    'aspirin'
+    """
+    s = _SALT_RE.sub("", str(name).strip())
+    return _WS_RE.sub(" ", s).strip()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def strip_dosage(s: str) -> str:
+    """去除单个成分的剂量和剂型后缀"""
+    s = _DOSAGE_RE.sub("", s).strip()
+    # 可能还有残留的剂型词
+    return _FORMULATION_SUFFIXES.sub("", s).strip()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def clean_drug_name(name: str) -> str:
+    """
+    清洗药物名称: 去除剂量、剂型、给药方式等后缀
+
+    Examples:
+        "cilostazol 100 mg"      → "cilostazol"
+        "aspirin 25 mg bid"      → "aspirin"
+        "ezetimibe 10mg"         → "ezetimibe"
+        "fentanyl injection"     → "fentanyl"
+        "aspirin tablet"         → "aspirin"
+        "nitroglycerin 0.4 mg sublingual" → "nitroglycerin"
+        "alirocumab 150 mg/ml subcutaneous injection" → "alirocumab"
+        "dipyridamole 200mg and aspirin 25mg bid:" → "dipyridamole + aspirin"
+        "atorvastatin, aspirin, losartan, amlodipine"
+            → "atorvastatin + aspirin + losartan + amlodipine"
+    """
+    s = name.strip().lower()
+    # 去掉尾部冒号
+    s = s.rstrip(":")
+
+    # 把 "X and Y" / "X, Y, Z" 拆成多个成分, 分别清洗后用 " + " 连接
+    if " and " in s:
+        parts = [p.strip() for p in s.split(" and ")]
+    elif ", " in s:
+        parts = [p.strip() for p in s.split(", ")]
+    else:
+        parts = [s]
+
+    cleaned = [p for p in (strip_dosage(p) for p in parts) if p]
+    return " + ".join(cleaned) if cleaned else name.strip().lower()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def is_non_drug(name: str) -> bool:
+    """判断是否为非药物名称 (安慰剂、细胞剂量等)"""
+    return _NON_DRUG_RE.search(name.strip().lower()) is not None
+
+
+def cache_info() -> dict[str, tuple]:
+    """各标量函数的 LRU 命中统计"""
+    return {fn.__name__: fn.cache_info()
+            for fn in (strip_salt_form, strip_dosage, clean_drug_name, is_non_drug)}
+
+
+def clear_cache() -> None:
+    for fn in (strip_salt_form, strip_dosage, clean_drug_name, is_non_drug):
+        fn.cache_clear()
+
+
+# ── Series 接口 (唯一值计算一次) ──
+
+def map_unique(values: pd.Series, fn: Callable, na_value=np.nan, dtype=object) -> pd.Series:
+    """
+    对 Series 的每个唯一非空值调用一次 fn, 按 factorize 编码映射回原位置
+
+    与 values.map(fn) 结果相同 (缺失值位置为 na_value), 重复名称越多越快.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    # codes == -1 (缺失值) 落在表尾的 na_value
+    table = np.array([fn(u) for u in uniques] + [na_value], dtype=dtype)
+    return pd.Series(table[codes], index=values.index, name=values.name)
+
+
+def clean_drug_names(values: pd.Series) -> pd.Series:
+    """clean_drug_name 的 Series 版本"""
+    return map_unique(values, clean_drug_name)
+
+
+def strip_salt_forms(values: pd.Series) -> pd.Series:
+    """strip_salt_form 的 Series 版本"""
+    return map_unique(values, strip_salt_form)
+
+
+def non_drug_mask(values: pd.Series) -> pd.Series:
+    """is_non_drug 的 Series 版本 (布尔掩码, 缺失值为 False)"""
+    return map_unique(values, is_non_drug, na_value=False, dtype=bool)
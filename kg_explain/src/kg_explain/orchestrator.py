@@ -5,19 +5,29 @@ Not a full Airflow/Prefect replacement — just enough to:
 2. Hash inputs to detect whether a step needs re-running
 3. Track step status and timing
 4. Resume from failure point
+5. Run independent steps in parallel (max_workers > 1)
+6. Reuse file digests while (size, mtime_ns) are unchanged (FileDigestCache)
+7. Restore outputs of a step whose inputs were seen before, e.g. in another
+   disease directory, from a content-addressed store (OutputStore)
+8. Export step timing as a Chrome trace (chrome://tracing / Perfetto)
 
 Usage:
-    orch = PipelineOrchestrator(Path("output/pipeline_state.json"))
+    orch = PipelineOrchestrator(Path("output/pipeline_state.json"), max_workers=4,
+                                output_store=OutputStore(Path("cache/step_outputs")))
     orch.add_step(StepDefinition("fetch_data", fetch_fn, ["config.yaml"], ["data.csv"], []))
     orch.add_step(StepDefinition("rank", rank_fn, ["data.csv"], ["rank.csv"], ["fetch_data"]))
-    results = orch.run(resume=True)
+    results = orch.run(resume=True, trace_path=Path("output/pipeline_trace.json"))
 """
 from __future__ import annotations
 
 import hashlib
 import json
 import logging
+import os
+import shutil
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
 from pathlib import Path
@@ -25,6 +35,164 @@ from typing import Any, Callable, Dict, List, Optional, Set
 
 logger = logging.getLogger(__name__)
 
+# Statuses that count as "step done" for resume and status()
+_DONE_STATUSES = {"completed", "restored"}
+
+# Files modified this close to the moment they were hashed are re-hashed on the
+# next check: a same-size rewrite within the mtime granularity would otherwise
+# look unchanged (same idea as git's "racily clean" index entries).
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FileDigestCache:
+    """SHA-256 digests keyed by (path, size, mtime_ns), persisted as JSON.
+
+    A file is only read again when its size or mtime_ns changed, or when it
+    was modified within _RACY_WINDOW_NS of being hashed. Thread-safe.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None and path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                self._entries = {}
+
+    def digest(self, path: str) -> str:
+        """SHA-256 hex digest of a file, or 'missing' if it doesn't exist."""
+        p = Path(path)
+        try:
+            st = p.stat()
+        except OSError:
+            return "missing"
+        key = str(p.resolve())
+        with self._lock:
+            entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry["size"] == st.st_size
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and entry["hashed_at_ns"] - st.st_mtime_ns > _RACY_WINDOW_NS
+        ):
+            with self._lock:
+                self.hits += 1
+            return entry["sha256"]
+
+        hashed_at = time.time_ns()
+        digest = _sha256_file(p)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "hashed_at_ns": hashed_at,
+                "sha256": digest,
+            }
+        return digest
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            snapshot = dict(self._entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+
+
+class OutputStore:
+    """Content-addressed store of step outputs.
+
+    Layout::
+
+        root/objects/<sha[:2]>/<sha>      output file contents
+        root/manifests/<key>.json         step key -> ordered output digests
+
+    The key is derived from the step name, the input digests (by position,
+    not path) and the config hash, so identical inputs in a different disease
+    directory map to the same manifest. Outputs are copied, never hard-linked,
+    because steps rewrite their outputs in place.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._objects = self.root / "objects"
+        self._manifests = self.root / "manifests"
+
+    def _object_path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / digest
+
+    def _manifest_path(self, key: str) -> Path:
+        return self._manifests / f"{key}.json"
+
+    @staticmethod
+    def _copy(src: Path, dst: Path) -> None:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+    def has(self, key: str) -> bool:
+        return self._manifest_path(key).exists()
+
+    def put(self, key: str, step_name: str, outputs: List[str], digests: List[str]) -> None:
+        """Store outputs (already hashed) under key."""
+        for out, digest in zip(outputs, digests):
+            obj = self._object_path(digest)
+            if not obj.exists():
+                self._copy(Path(out), obj)
+        manifest = {
+            "step": step_name,
+            "outputs": [
+                {"name": Path(o).name, "sha256": d} for o, d in zip(outputs, digests)
+            ],
+            "created": _now_iso(),
+        }
+        mp = self._manifest_path(key)
+        mp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = mp.with_name(mp.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, mp)
+
+    def restore(self, key: str, outputs: List[str]) -> bool:
+        """Copy stored outputs for key to the given paths. False if unavailable."""
+        mp = self._manifest_path(key)
+        try:
+            with open(mp, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        entries = manifest.get("outputs") or []
+        if len(entries) != len(outputs):
+            return False
+        objects = [self._object_path(e["sha256"]) for e in entries]
+        if not all(o.exists() for o in objects):
+            return False
+        for obj, out in zip(objects, outputs):
+            self._copy(obj, Path(out))
+        return True
+
 
 @dataclass
 class StepDefinition:
@@ -40,7 +208,7 @@ class StepDefinition:
 class StepResult:
     """Result of executing a step."""
     name: str
-    status: str             # "completed" | "skipped" | "failed"
+    status: str             # "completed" | "restored" | "skipped" | "failed"
     elapsed_sec: float = 0.0
     input_hash: str = ""
     output_hash: str = ""
@@ -55,7 +223,14 @@ class StepResult:
 class PipelineOrchestrator:
     """DAG-based pipeline orchestrator with idempotency."""
 
-    def __init__(self, state_path: Path, config_hash: str = ""):
+    def __init__(
+        self,
+        state_path: Path,
+        config_hash: str = "",
+        max_workers: int = 1,
+        digest_cache: Optional[FileDigestCache] = None,
+        output_store: Optional[OutputStore] = None,
+    ):
         """
         Args:
             state_path: Path to JSON state file for resume/skip tracking
@@ -63,11 +238,25 @@ class PipelineOrchestrator:
                 When config changes, all steps are re-executed even if
                 input data files are unchanged. Pass e.g.,
                 hashlib.sha256(yaml_content.encode()).hexdigest()[:12]
+            max_workers: Number of steps that may run concurrently. Steps
+                start as soon as all their dependencies are done; 1 keeps
+                strict topological order.
+            digest_cache: File digest cache. Defaults to one persisted next
+                to the state file (<state>.digests.json).
+            output_store: Optional content-addressed store; when set and
+                resuming, steps whose inputs match a stored run are restored
+                instead of run.
         """
         self.state_path = state_path
         self._config_hash = config_hash
+        self.max_workers = max(1, int(max_workers))
+        self.digests = digest_cache or FileDigestCache(
+            state_path.with_name(state_path.stem + ".digests.json")
+        )
+        self.output_store = output_store
         self.steps: Dict[str, StepDefinition] = {}
         self.state: Dict[str, Dict[str, Any]] = {}
+        self.timeline: List[Dict[str, Any]] = []
         self._load_state()
 
     def _load_state(self) -> None:
@@ -91,15 +280,23 @@ class PipelineOrchestrator:
         self.steps[step.name] = step
 
     def _compute_file_hash(self, path: str) -> str:
-        """Compute SHA256 of a file. Returns 'missing' if file doesn't exist."""
-        p = Path(path)
-        if not p.exists():
-            return "missing"
-        h = hashlib.sha256()
-        with open(p, "rb") as f:
-            for chunk in iter(lambda: f.read(1024 * 1024), b""):
-                h.update(chunk)
-        return h.hexdigest()
+        """Compute SHA256 of a file. Returns 'missing' if file doesn't exist.
+
+        Served from the digest cache while (size, mtime_ns) are unchanged.
+        """
+        return self.digests.digest(path)
+
+    def _compute_content_key(self, step: StepDefinition) -> str:
+        """Output-store key: step name + input digests by position + config.
+
+        Unlike the input hash, paths are not part of the key, so the same
+        inputs under another disease directory produce the same key.
+        """
+        parts = [f"__step__:{step.name}", f"__n_outputs__:{len(step.outputs)}"]
+        parts += [self._compute_file_hash(inp) for inp in step.inputs]
+        if self._config_hash:
+            parts.append(f"__config__:{self._config_hash}")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
 
     def _compute_input_hash(self, step: StepDefinition) -> str:
         """Compute combined hash of all input files + config version for a step.
@@ -118,17 +315,20 @@ class PipelineOrchestrator:
         combined = "|".join(hashes)
         return hashlib.sha256(combined.encode("utf-8")).hexdigest()
 
-    def _should_skip(self, step: StepDefinition) -> tuple[bool, str]:
+    def _should_skip(
+        self, step: StepDefinition, current_hash: Optional[str] = None
+    ) -> tuple[bool, str]:
         """Check if step can be skipped (inputs unchanged since last successful run).
 
         Returns:
             (should_skip, reason)
         """
         prev = self.state.get(step.name, {})
-        if prev.get("status") != "completed":
+        if prev.get("status") not in _DONE_STATUSES:
             return False, "not previously completed"
 
-        current_hash = self._compute_input_hash(step)
+        if current_hash is None:
+            current_hash = self._compute_input_hash(step)
         prev_hash = prev.get("input_hash", "")
 
         if current_hash == prev_hash:
@@ -166,108 +366,213 @@ class PipelineOrchestrator:
 
         return order
 
+    def _execute(self, step: StepDefinition, resume: bool, force: Set[str]) -> StepResult:
+        """Skip, restore or run a single step (called from worker threads)."""
+        t_start = time.time()
+        input_hash = self._compute_input_hash(step)
+
+        # Check if we can skip
+        if resume and step.name not in force:
+            should_skip, reason = self._should_skip(step, input_hash)
+            if should_skip:
+                logger.info("[SKIP] %s: %s", step.name, reason)
+                result = StepResult(
+                    name=step.name,
+                    status="skipped",
+                    skipped_reason=reason,
+                    input_hash=input_hash,
+                    timestamp=_now_iso(),
+                )
+                self._record(result, t_start)
+                return result
+
+        # Restore from the output store if these inputs were seen before.
+        # resume=False re-runs every step; its outputs are still stored below.
+        content_key = ""
+        if self.output_store is not None and step.outputs:
+            content_key = self._compute_content_key(step)
+            if resume and step.name not in force and self.output_store.restore(content_key, step.outputs):
+                elapsed = time.time() - t_start
+                logger.info("[RESTORE] %s from output store (%.1fs)", step.name, elapsed)
+                result = StepResult(
+                    name=step.name,
+                    status="restored",
+                    elapsed_sec=round(elapsed, 2),
+                    input_hash=input_hash,
+                    output_hash=self._compute_output_hash(step)[0],
+                    timestamp=_now_iso(),
+                )
+                self._record(result, t_start)
+                return result
+
+        # Execute the step
+        logger.info("[RUN] %s", step.name)
+        t0 = time.time()
+        try:
+            step.fn()
+            elapsed = time.time() - t0
+            output_hash, digests = self._compute_output_hash(step)
+            if content_key and "missing" not in digests:
+                try:
+                    self.output_store.put(content_key, step.name, step.outputs, digests)
+                except OSError as e:
+                    logger.warning("Output store write failed for %s: %s", step.name, e)
+
+            result = StepResult(
+                name=step.name,
+                status="completed",
+                elapsed_sec=round(elapsed, 2),
+                input_hash=input_hash,
+                output_hash=output_hash,
+                timestamp=_now_iso(),
+            )
+            logger.info("[DONE] %s (%.1fs)", step.name, elapsed)
+
+        except Exception as e:
+            elapsed = time.time() - t0
+            result = StepResult(
+                name=step.name,
+                status="failed",
+                elapsed_sec=round(elapsed, 2),
+                input_hash=input_hash,
+                error=str(e),
+                timestamp=_now_iso(),
+            )
+            logger.error("[FAIL] %s: %s (%.1fs)", step.name, e, elapsed)
+
+        self._record(result, t_start)
+        return result
+
+    def _compute_output_hash(self, step: StepDefinition) -> tuple[str, List[str]]:
+        digests = [self._compute_file_hash(o) for o in step.outputs]
+        return hashlib.sha256("|".join(digests).encode()).hexdigest(), digests
+
+    def _record(self, result: StepResult, t_start: float) -> None:
+        """Append a timeline entry for the Chrome trace."""
+        self.timeline.append({
+            "name": result.name,
+            "status": result.status,
+            "start": t_start,
+            "end": time.time(),
+            "thread": threading.current_thread().name,
+        })
+
     def run(
         self,
         resume: bool = True,
         force_steps: Optional[Set[str]] = None,
+        trace_path: Optional[Path] = None,
     ) -> List[StepResult]:
-        """Execute the pipeline in topological order.
+        """Execute the pipeline as a DAG.
+
+        A step starts once all its dependencies are done; up to max_workers
+        steps run concurrently, picked in topological order.
 
         Args:
             resume: If True, skip already-completed steps with same input hash
+                and restore steps whose inputs match an output_store entry.
+                If False, every step runs (outputs are still written to the store).
             force_steps: If provided, force re-run these steps regardless of hash
+            trace_path: If provided, write a Chrome trace of step timing here
 
         Returns:
-            List of StepResult for each step
+            List of StepResult for each step, in topological order
         """
         force = force_steps or set()
         order = self._topological_sort()
-        results: List[StepResult] = []
+        position = {name: i for i, name in enumerate(order)}
+        results: Dict[str, StepResult] = {}
         failed_steps: Set[str] = set()
+        self.timeline = []
 
         logger.info("Pipeline execution order: %s", " -> ".join(order))
 
-        for step_name in order:
-            step = self.steps[step_name]
-
-            # Check if any dependency failed
-            dep_failed = any(d in failed_steps for d in step.depends_on)
-            if dep_failed:
-                result = StepResult(
-                    name=step_name,
-                    status="skipped",
-                    skipped_reason="dependency failed",
-                    timestamp=datetime.now(timezone.utc).isoformat(),
-                )
-                results.append(result)
-                failed_steps.add(step_name)
-                continue
-
-            # Check if we can skip
-            if resume and step_name not in force:
-                should_skip, reason = self._should_skip(step)
-                if should_skip:
-                    result = StepResult(
-                        name=step_name,
-                        status="skipped",
-                        skipped_reason=reason,
-                        input_hash=self._compute_input_hash(step),
-                        timestamp=datetime.now(timezone.utc).isoformat(),
-                    )
-                    results.append(result)
-                    logger.info("[SKIP] %s: %s", step_name, reason)
+        remaining = list(order)
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="pipeline") as pool:
+            while remaining or running:
+                # Schedule ready steps (earliest in topological order first)
+                progressed = True
+                while progressed and len(running) < self.max_workers:
+                    progressed = False
+                    for step_name in remaining:
+                        step = self.steps[step_name]
+                        deps = [d for d in step.depends_on if d in self.steps]
+                        if not all(d in results for d in deps):
+                            continue
+                        remaining.remove(step_name)
+                        progressed = True
+                        # Check if any dependency failed
+                        if any(d in failed_steps for d in step.depends_on):
+                            results[step_name] = StepResult(
+                                name=step_name,
+                                status="skipped",
+                                skipped_reason="dependency failed",
+                                timestamp=_now_iso(),
+                            )
+                            failed_steps.add(step_name)
+                        else:
+                            running[pool.submit(self._execute, step, resume, force)] = step_name
+                        break
+
+                if not running:
                     continue
-
-            # Execute the step
-            input_hash = self._compute_input_hash(step)
-            logger.info("[RUN] %s", step_name)
-            t0 = time.time()
-
-            try:
-                step.fn()
-                elapsed = time.time() - t0
-                output_hash = hashlib.sha256(
-                    "|".join(self._compute_file_hash(o) for o in step.outputs).encode()
-                ).hexdigest()
-
-                result = StepResult(
-                    name=step_name,
-                    status="completed",
-                    elapsed_sec=round(elapsed, 2),
-                    input_hash=input_hash,
-                    output_hash=output_hash,
-                    timestamp=datetime.now(timezone.utc).isoformat(),
-                )
-                self.state[step_name] = result.to_dict()
-                logger.info("[DONE] %s (%.1fs)", step_name, elapsed)
-
-            except Exception as e:
-                elapsed = time.time() - t0
-                result = StepResult(
-                    name=step_name,
-                    status="failed",
-                    elapsed_sec=round(elapsed, 2),
-                    input_hash=input_hash,
-                    error=str(e),
-                    timestamp=datetime.now(timezone.utc).isoformat(),
-                )
-                self.state[step_name] = result.to_dict()
-                failed_steps.add(step_name)
-                logger.error("[FAIL] %s: %s (%.1fs)", step_name, e, elapsed)
-
-            results.append(result)
-            self._save_state()
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    step_name = running.pop(fut)
+                    result = fut.result()
+                    results[step_name] = result
+                    if result.status == "failed":
+                        failed_steps.add(step_name)
+                    if result.status != "skipped":
+                        self.state[step_name] = result.to_dict()
+                        self._save_state()
+
+        self.digests.save()
+        ordered = sorted(results.values(), key=lambda r: position[r.name])
 
         # Summary
-        n_completed = sum(1 for r in results if r.status == "completed")
-        n_skipped = sum(1 for r in results if r.status == "skipped")
-        n_failed = sum(1 for r in results if r.status == "failed")
+        n_completed = sum(1 for r in ordered if r.status == "completed")
+        n_restored = sum(1 for r in ordered if r.status == "restored")
+        n_skipped = sum(1 for r in ordered if r.status == "skipped")
+        n_failed = sum(1 for r in ordered if r.status == "failed")
         logger.info(
-            "Pipeline complete: %d completed, %d skipped, %d failed",
-            n_completed, n_skipped, n_failed,
+            "Pipeline complete: %d completed, %d restored, %d skipped, %d failed",
+            n_completed, n_restored, n_skipped, n_failed,
         )
 
-        return results
+        if trace_path is not None:
+            self.export_trace(trace_path)
+        return ordered
+
+    def export_trace(self, path: Path) -> Path:
+        """Write the last run's step timeline in Chrome trace event format.
+
+        Open with chrome://tracing or https://ui.perfetto.dev. Each worker
+        thread is one track; skipped/restored steps appear as short slices.
+        """
+        t0 = min((e["start"] for e in self.timeline), default=0.0)
+        threads = {name: i for i, name in enumerate(dict.fromkeys(e["thread"] for e in self.timeline))}
+        events: List[Dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for name, tid in threads.items()
+        ]
+        for e in sorted(self.timeline, key=lambda e: e["start"]):
+            events.append({
+                "name": e["name"],
+                "cat": e["status"],
+                "ph": "X",
+                "pid": 1,
+                "tid": threads[e["thread"]],
+                "ts": round((e["start"] - t0) * 1e6),
+                "dur": round((e["end"] - e["start"]) * 1e6),
+                "args": {"status": e["status"]},
+            })
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, indent=1)
+        return path
 
     def status(self) -> Dict[str, Any]:
         """Return current pipeline state (for monitoring/display)."""
@@ -278,6 +583,6 @@ class PipelineOrchestrator:
             },
             "total_steps": len(self.steps),
             "completed": sum(
-                1 for s in self.state.values() if s.get("status") == "completed"
+                1 for s in self.state.values() if s.get("status") in _DONE_STATUSES
             ),
         }
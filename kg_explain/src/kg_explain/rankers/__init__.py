@@ -4,6 +4,7 @@
 当前版本:
   - ranker.py: 完整排名器 (DTPD路径 + FAERS安全 + 表型 + Bootstrap CI)
   - dtpd.py:   DTPD 基础路径评分 (ranker 内部调用)
+  - incremental.py: 增量重排的组件哈希与中间表 (rank_state/)
 """
 import logging
 
@@ -20,11 +21,11 @@ __all__ = [
 ]
 
 
-def run_pipeline(cfg) -> dict:
-    """根据配置运行排名 (仅支持 v5/default)"""
+def run_pipeline(cfg, full: bool = False) -> dict:
+    """根据配置运行排名 (仅支持 v5/default); full=True 时忽略增量状态全部重算"""
     m = cfg.mode
     if m in ("v5", "5", "v5_test", "default"):
-        return run_ranker(cfg)
+        return run_ranker(cfg, full=full)
     raise ValueError(
         f"未知模式: {m}。仅支持 v5 (default)。"
     )
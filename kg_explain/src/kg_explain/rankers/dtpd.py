@@ -15,39 +15,47 @@ DTPD 基础路径评分器: Drug → Target → Pathway → Disease
   path_score = pathway_score * hub_penalty(target_degree)^lambda * (1 + boost * log(support_genes))
 """
 from __future__ import annotations
+import logging
+from contextlib import nullcontext
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
 from ..config import Config, ensure_dir
-from ..utils import read_csv, require_cols, write_jsonl
+from ..utils import get_table_format, read_table, require_cols, write_jsonl, write_table
 from .base import hub_penalty
 
+logger = logging.getLogger(__name__)
 
-def run_dtpd(cfg: Config) -> dict[str, Path]:
+
+def load_dtpd_inputs(cfg: Config) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame | None]:
     """
-    运行 DTPD 基础路径评分
+    加载并预处理 DTPD 输入边
 
     Returns:
-        输出文件路径字典
+        (dt, tp_core, pd_edge, aff_merge)
+        - dt: edge_drug_target 原始行
+        - tp_core: 去重后的 (target, pathway, reactome_name)
+        - pd_edge: 含 pathway_score_f (已乘通路广度折扣) / support_genes_f 的通路-疾病边
+        - aff_merge: (drug, target) → _affinity_weight, 无亲和力数据时为 None
     """
-    output_dir = ensure_dir(cfg.output_dir)
     data_dir = cfg.data_dir
     files = cfg.files
     rank_cfg = cfg.rank
 
     # 加载数据
-    dt = read_csv(data_dir / files.get("drug_target", "edge_drug_target.csv"), dtype=str)
-    tp = read_csv(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv"), dtype=str)
-    pd_edge = read_csv(data_dir / files.get("pathway_disease", "edge_pathway_disease.csv"), dtype=str)
+    dt = read_table(data_dir / files.get("drug_target", "edge_drug_target.csv"))
+    tp = read_table(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv"))
+    pd_edge = read_table(data_dir / files.get("pathway_disease", "edge_pathway_disease.csv"))
 
     require_cols(dt, {"drug_normalized", "target_chembl_id"}, "edge_drug_target")
     require_cols(tp, {"target_chembl_id", "reactome_stid", "reactome_name"}, "edge_target_pathway")
     require_cols(pd_edge, {"reactome_stid", "diseaseId", "pathway_score", "support_genes"}, "edge_pathway_disease")
 
-    pd_edge["pathway_score_f"] = pd.to_numeric(pd_edge["pathway_score"], errors="coerce").fillna(0.0)
-    pd_edge["support_genes_f"] = pd.to_numeric(pd_edge["support_genes"], errors="coerce").fillna(1.0)
+    # read_table 已按 TABLE_SCHEMAS 给出数值列 (CSV / Parquet 一致), 这里只补缺失值
+    pd_edge["pathway_score_f"] = pd_edge["pathway_score"].fillna(0.0)
+    pd_edge["support_genes_f"] = pd_edge["support_genes"].fillna(1.0)
 
     # v3: Penalize overly broad pathways (e.g., "Signal Transduction" with 500+ genes).
     # A drug hitting ANY kinase in a mega-pathway gets an inflated score.
@@ -60,27 +68,109 @@ def run_dtpd(cfg: Config) -> dict[str, Path]:
     )
     pd_edge["pathway_score_f"] = pd_edge["pathway_score_f"] * pd_edge["_pathway_breadth_discount"]
 
-    # 合并路径
-    # 只保留路径核心列, 避免 drug_raw/mechanism_of_action 等额外列造成假性重复
-    dt_core = dt[["drug_normalized", "target_chembl_id"]].drop_duplicates()
     # tp 可能因多个 UniProt accession 导致 (target, pathway) 重复, 先去重
     if "reactome_name" not in tp.columns:
         tp["reactome_name"] = ""
     tp_core = tp[["target_chembl_id", "reactome_stid", "reactome_name"]].drop_duplicates(
         subset=["target_chembl_id", "reactome_stid"]
     )
+
+    # v3: Load drug-target affinity data if available (pChEMBL values)
+    aff_merge = None
+    aff_path = data_dir / "edge_drug_target_affinity.csv"
+    if aff_path.exists() and aff_path.stat().st_size > 1:
+        aff_df = pd.read_csv(aff_path, dtype=str)
+        aff_df["pchembl_f"] = pd.to_numeric(aff_df.get("pchembl_value", pd.Series(dtype=float)),
+                                              errors="coerce")
+        # Affinity weight: pChEMBL 6→1.0 (baseline), 8→1.3, 10→1.6; <6→0.8
+        aff_df["_affinity_weight"] = (1.0 + 0.15 * (aff_df["pchembl_f"] - 6.0)).clip(0.7, 1.8)
+        aff_merge = aff_df[["drug_normalized", "target_chembl_id", "_affinity_weight"]].drop_duplicates(
+            subset=["drug_normalized", "target_chembl_id"]
+        )
+
+    return dt, tp_core, pd_edge, aff_merge
+
+
+def score_pairs(pair: pd.DataFrame, diversity_bonus: float) -> pd.DataFrame:
+    """
+    由每对的 top-K 路径统计计算 mechanism_score / final_score
+
+    Args:
+        pair: 含 drug_normalized, diseaseId, diseaseName, _max_score, _n_paths, _unique_targets
+        diversity_bonus: rank.path_diversity_bonus
+
+    Returns:
+        dtpd_rank.csv 格式的 DataFrame (已按 drug, final_score 排序)
+    """
+    pair = pair.copy()
+    # Diversity bonus: log1p(n_paths-1) so 1 path → 0 bonus, 2→0.69*b, 5→1.6*b, 10→2.2*b
+    pair["mechanism_score"] = (
+        pair["_max_score"]
+        + diversity_bonus * np.log1p(pair["_n_paths"] - 1)
+        # Extra bonus for hitting disease through independent targets (not just pathways)
+        + diversity_bonus * 0.5 * np.log1p(pair["_unique_targets"] - 1)
+    )
+    pair.drop(columns=["_max_score", "_n_paths", "_unique_targets"], inplace=True)
+    # Normalize combo drug scores: "drug_a+drug_b+drug_c" has 3x more targets,
+    # so divide mechanism_score by component count to keep scores comparable.
+    pair["n_components"] = pair["drug_normalized"].str.count(r"\+") + 1
+    pair["mechanism_score"] = pair["mechanism_score"] / pair["n_components"]
+    pair["final_score"] = pair["mechanism_score"]
+    pair.drop(columns=["n_components"], inplace=True)
+    return pair.sort_values(["drug_normalized", "final_score"], ascending=[True, False])
+
+
+def path_record(r) -> dict:
+    """将一行 top-K 路径转为 dtpd_paths.jsonl 记录"""
+    return {
+        "drug": r["drug_normalized"],
+        "diseaseId": r["diseaseId"],
+        "diseaseName": r.get("diseaseName", ""),
+        "path_score": float(r["path_score"]),
+        "nodes": [
+            {"type": "Drug", "id": r["drug_normalized"]},
+            {"type": "Target", "id": r["target_chembl_id"]},
+            {"type": "Pathway", "id": r["reactome_stid"], "name": r.get("reactome_name", "")},
+            {"type": "Disease", "id": r["diseaseId"], "name": r.get("diseaseName", "")},
+        ],
+        "edges": [
+            {"rel": "DRUG_HAS_TARGET", "src": r["drug_normalized"], "dst": r["target_chembl_id"], "source": "ChEMBL"},
+            {"rel": "TARGET_IN_PATHWAY", "src": r["target_chembl_id"], "dst": r["reactome_stid"], "source": "Reactome"},
+            {"rel": "PATHWAY_ASSOC_DISEASE", "src": r["reactome_stid"], "dst": r["diseaseId"], "source": "OpenTargets(agg)",
+             "pathway_score": float(r.get("pathway_score_f", 0)), "support_genes": int(float(r["support_genes_f"]))},
+        ],
+    }
+
+
+def _target_degree(dt_core: pd.DataFrame, tp_core: pd.DataFrame) -> pd.Series:
+    """靶点度数: 每个 (有通路的) 靶点被多少个药物作用"""
+    tp_targets = tp_core.dropna(subset=["reactome_stid"])["target_chembl_id"]
+    dt_ok = dt_core.dropna(subset=["drug_normalized", "target_chembl_id"])
+    dt_ok = dt_ok[dt_ok["target_chembl_id"].isin(set(tp_targets))]
+    return dt_ok.groupby("target_chembl_id")["drug_normalized"].nunique().rename("target_deg")
+
+
+# 每批展开的 (drug, target, pathway) 行数: 与 pd_edge merge 后的路径表只在批内物化
+_PATH_BATCH_ROWS = 4096
+
+def _block_dtp(dt_core: pd.DataFrame, tp_core: pd.DataFrame, tdeg: pd.Series, rank_cfg: dict) -> pd.DataFrame:
+    """一批药物的 (drug, target, pathway) 行及靶点 hub 惩罚"""
     dtp = dt_core.merge(tp_core, on="target_chembl_id", how="inner").dropna(
         subset=["drug_normalized", "target_chembl_id", "reactome_stid"]
     ).drop_duplicates()
 
-    # 计算靶点度数
-    tdeg = dtp.groupby("target_chembl_id")["drug_normalized"].nunique().rename("target_deg")
+    # 靶点度数 (全局计算, 与分块无关)
     dtp = dtp.merge(tdeg, on="target_chembl_id", how="left")
 
     # Hub惩罚
     lam = float(rank_cfg.get("hub_penalty_lambda", 1.0))
     dtp["w_hub_target"] = hub_penalty(dtp["target_deg"]).pow(lam)
+    return dtp
 
+
+def _block_paths(dtp: pd.DataFrame, pd_edge: pd.DataFrame,
+                 aff_merge: pd.DataFrame | None, rank_cfg: dict) -> pd.DataFrame:
+    """物化一批 (drug, target, pathway) 行的全部路径并计算 path_score"""
     # 合并通路-疾病
     # tp 和 pd_edge 都有 reactome_name 列, 用后缀区分后保留 tp 侧的
     paths = dtp.merge(pd_edge, on="reactome_stid", how="inner", suffixes=("", "_pd"))
@@ -89,23 +179,10 @@ def run_dtpd(cfg: Config) -> dict[str, Path]:
         paths["reactome_name"] = paths["reactome_name"].fillna(paths["reactome_name_pd"])
         paths.drop(columns=["reactome_name_pd"], inplace=True)
 
-    # v3: Load drug-target affinity data if available (pChEMBL values)
-    aff_path = data_dir / "edge_drug_target_affinity.csv"
-    if aff_path.exists() and aff_path.stat().st_size > 1:
-        import logging as _logging
-        _dtpd_logger = _logging.getLogger(__name__)
-        aff_df = pd.read_csv(aff_path, dtype=str)
-        aff_df["pchembl_f"] = pd.to_numeric(aff_df.get("pchembl_value", pd.Series(dtype=float)),
-                                              errors="coerce")
-        # Affinity weight: pChEMBL 6→1.0 (baseline), 8→1.3, 10→1.6; <6→0.8
-        aff_df["_affinity_weight"] = (1.0 + 0.15 * (aff_df["pchembl_f"] - 6.0)).clip(0.7, 1.8)
-        aff_merge = aff_df[["drug_normalized", "target_chembl_id", "_affinity_weight"]].drop_duplicates(
-            subset=["drug_normalized", "target_chembl_id"]
-        )
+    # v3: drug-target affinity weighting (pChEMBL)
+    if aff_merge is not None:
         paths = paths.merge(aff_merge, on=["drug_normalized", "target_chembl_id"], how="left")
         paths["_affinity_weight"] = paths["_affinity_weight"].fillna(1.0)
-        n_with_aff = (paths["_affinity_weight"] != 1.0).sum()
-        _dtpd_logger.info("Affinity data applied to %d/%d paths", n_with_aff, len(paths))
     else:
         paths["_affinity_weight"] = 1.0
 
@@ -118,12 +195,138 @@ def run_dtpd(cfg: Config) -> dict[str, Path]:
         * paths["w_support"]
         * paths["_affinity_weight"]
     )
-
-    # 每对取top K路径
     paths["pair_key"] = paths["drug_normalized"].astype(str) + "||" + paths["diseaseId"].astype(str)
-    k = int(rank_cfg.get("topk_paths_per_pair", 10))
+    return paths
+
+
+def select_topk(paths: pd.DataFrame, k: int) -> pd.DataFrame:
+    """
+    每对取 top-K 路径 (默认模式的历史排序)
+
+    path_score 降序用 pandas 默认的 quicksort (不稳定), 同分路径的先后由整个 paths 表决定;
+    分块 / 稀疏引擎通过 LegacyTopK 复现同一结果.
+
+    Returns:
+        按 pair_key, path_score 降序排列的 top-K 路径
+    """
     top_paths = paths.sort_values("path_score", ascending=False).groupby("pair_key", as_index=False).head(k).copy()
+    return top_paths.sort_values(["pair_key", "path_score"], ascending=[True, False])
+
+
+class LegacyTopK:
+    """
+    全局复现默认模式 (select_topk) 的 top-K 截断
+
+    select_topk 的 quicksort 不稳定, 第 K 名同分时保留哪条路径取决于全部路径按 merge 顺序
+    (dt 行, tp 行, pd 行) 排成的分数数组, 块内或逐对排序都无法复现.
+    这里按 merge 顺序只展开每条路径的 path_score 与 pair 编号 (不物化路径表), 对它们执行
+    与 select_topk 相同的 sort_values / groupby.head, 记下入选路径的名次 (未入选为 -1).
+    分块 / 稀疏引擎按名次截断和排序, 输出与默认模式逐字节一致;
+    代价是每条路径约 24 字节的全局数组 (path_score, pair 编号, 名次).
+    """
+
+    def __init__(self, dt_core: pd.DataFrame, tp_core: pd.DataFrame, pd_edge: pd.DataFrame,
+                 aff_merge: pd.DataFrame | None, rank_cfg: dict, k: int):
+        self.aff_merge = aff_merge
+        self.rank_cfg = rank_cfg
+        # 带上原始行标签, 供稀疏引擎按 (dt 行, tp 行, pd 行) 定位路径
+        tdeg = _target_degree(dt_core, tp_core)
+        dtp = _block_dtp(dt_core.assign(_row_dt=dt_core.index), tp_core.assign(_row_tp=tp_core.index),
+                         tdeg, rank_cfg)
+        pde = pd_edge.assign(_pos_pd=pd_edge.groupby("reactome_stid", dropna=False).cumcount())
+
+        # pd_edge 按通路分组 (组内保持原行序), 即 merge 时每个 dtp 行匹配到的 pd 行顺序
+        stids = pd.Index(pde["reactome_stid"].dropna().unique())
+        c_code = stids.get_indexer(pde["reactome_stid"])
+        valid = np.flatnonzero(c_code >= 0)
+        c_order = valid[np.argsort(c_code[valid], kind="stable")]
+        c_cnt = np.append(np.bincount(c_code[valid], minlength=len(stids)), 0)
+        c_ptr = np.r_[0, np.cumsum(c_cnt)]
+        r_code = stids.get_indexer(dtp["reactome_stid"])
+        r_code[r_code < 0] = len(stids)
+        cnt = c_cnt[r_code]
+        # 每个 dtp 行的首条路径在全部路径 (merge 顺序) 中的位置
+        dtp["_pos_dtp"] = np.cumsum(cnt) - cnt
+        self.dtp = dtp
+        self.pd_edge = pde
+
+        if aff_merge is not None:
+            aff = dtp[["drug_normalized", "target_chembl_id"]].merge(
+                aff_merge, on=["drug_normalized", "target_chembl_id"], how="left")
+            aff_w = aff["_affinity_weight"].fillna(1.0).to_numpy(dtype=float)
+        else:
+            aff_w = np.ones(len(dtp))
+        w_hub = dtp["w_hub_target"].to_numpy(dtype=float)
+        psf = pde["pathway_score_f"].to_numpy(dtype=float)
+        sb = float(rank_cfg.get("support_gene_boost", 0.15))
+        w_sup = (1.0 + sb * np.log1p(pde["support_genes_f"])).to_numpy(dtype=float)
+        d_code, d_uni = pd.factorize(dtp["drug_normalized"])
+        s_code, s_uni = pd.factorize(pde["diseaseId"], use_na_sentinel=False)
+        n_s = max(len(s_uni), 1)
+
+        scores, combos = [], []
+        for start in range(0, len(dtp), _PATH_BATCH_ROWS):
+            cb = cnt[start:start + _PATH_BATCH_ROWS]
+            r = np.repeat(np.arange(start, start + len(cb)), cb)
+            within = np.arange(len(r)) - np.repeat(np.cumsum(cb) - cb, cb)
+            c = c_order[c_ptr[r_code[r]] + within]
+            # 与 _block_paths 相同的乘法顺序
+            scores.append(psf[c] * w_hub[r] * w_sup[c] * aff_w[r])
+            combos.append(d_code[r].astype(np.int64) * n_s + s_code[c])
+        score = np.concatenate(scores) if scores else np.empty(0)
+        combo = np.concatenate(combos) if combos else np.empty(0, dtype=np.int64)
+        self.n_paths = len(score)
+        self.n_with_aff = int(cnt[aff_w != 1.0].sum())
+
+        # pair_key 与 _block_paths 同样由字符串拼接得到 (缺失值同样传播), 只对出现过的 (drug, disease) 组合计算
+        uni, inv = np.unique(combo, return_inverse=True)
+        keys = (pd.Series(d_uni.take(uni // n_s)).astype(str) + "||"
+                + pd.Series(s_uni.take(uni % n_s)).astype(str))
+        key_code = pd.factorize(keys)[0].astype(float)
+        key_code[key_code < 0] = np.nan
+
+        light = pd.DataFrame({"path_score": score, "pair_key": key_code[inv.ravel()]})
+        top = light.sort_values("path_score", ascending=False).groupby("pair_key", as_index=False).head(k)
+        self.rank = np.full(len(light), -1, dtype=np.int64)
+        self.rank[top.index.to_numpy()] = np.arange(len(top))
+
+    def block_topk(self, drugs: list[str]) -> pd.DataFrame:
+        """
+        一批药物的 top-K 路径 (路径按 _PATH_BATCH_ROWS 行分批展开, 只保留入选路径)
+
+        Returns:
+            与 select_topk 对全部路径的结果中这些药物的行相同 (同列, 同顺序)
+        """
+        dtp = self.dtp[self.dtp["drug_normalized"].isin(set(drugs))]
+        parts = []
+        # 空块也展开一次, 保证 top_paths 带齐列
+        for start in range(0, max(len(dtp), 1), _PATH_BATCH_ROWS):
+            paths = _block_paths(dtp.iloc[start:start + _PATH_BATCH_ROWS], self.pd_edge,
+                                 self.aff_merge, self.rank_cfg)
+            pos = (paths["_pos_dtp"] + paths["_pos_pd"]).to_numpy(dtype=np.int64)
+            paths["_rank"] = self.rank[pos]
+            parts.append(paths[paths["_rank"] >= 0])
+        top_paths = pd.concat(parts, ignore_index=True).sort_values("_rank")
+        top_paths = top_paths.drop(columns=["_row_dt", "_row_tp", "_pos_dtp", "_pos_pd", "_rank"])
+        return top_paths.sort_values(["pair_key", "path_score"], ascending=[True, False])
+
+    def path_rank(self, row_dt: np.ndarray, row_tp: np.ndarray, row_pd: np.ndarray) -> np.ndarray:
+        """按原始行标签 (dt 行, tp 行, pd 行) 取路径名次, 未入选 top-K 为 -1"""
+        if len(row_dt) == 0:
+            return np.empty(0, dtype=np.int64)
+        i = pd.MultiIndex.from_frame(self.dtp[["_row_dt", "_row_tp"]]).get_indexer(
+            pd.MultiIndex.from_arrays([row_dt, row_tp]))
+        j = self.pd_edge.index.get_indexer(row_pd)
+        return self.rank[self.dtp["_pos_dtp"].to_numpy()[i] + self.pd_edge["_pos_pd"].to_numpy()[j]]
+
 
+def _aggregate_topk(top_paths: pd.DataFrame, diversity_bonus: float) -> pd.DataFrame:
+    """
+    由每对的 top-K 路径聚合 pair 分数
+
+    Returns:
+        dtpd_rank.csv 格式的 pair 表
+    """
     # v3 aggregation: max(path_score) + diversity_bonus * log(n_paths)
     #
     # Rationale: The old rank-weighted sum (1/sqrt(rank)) systematically
@@ -135,57 +338,109 @@ def run_dtpd(cfg: Config) -> dict[str, Path]:
     #   mechanism_score = max(path_score) + diversity_bonus * log1p(n_paths - 1)
     # This keeps the strongest single path as the baseline and rewards pathway
     # diversity logarithmically (diminishing returns after ~5 paths).
-    diversity_bonus = float(rank_cfg.get("path_diversity_bonus", 0.10))
-    top_paths = top_paths.sort_values(["pair_key", "path_score"], ascending=[True, False])
-
     pair = top_paths.groupby(["drug_normalized", "diseaseId"], as_index=False).agg(
         _max_score=("path_score", "max"),
         _n_paths=("path_score", "count"),
         _unique_targets=("target_chembl_id", "nunique"),
         diseaseName=("diseaseName", lambda x: x.dropna().iloc[0] if len(x.dropna()) else ""),
     )
-    # Diversity bonus: log1p(n_paths-1) so 1 path → 0 bonus, 2→0.69*b, 5→1.6*b, 10→2.2*b
-    pair["mechanism_score"] = (
-        pair["_max_score"]
-        + diversity_bonus * np.log1p(pair["_n_paths"] - 1)
-        # Extra bonus for hitting disease through independent targets (not just pathways)
-        + diversity_bonus * 0.5 * np.log1p(pair["_unique_targets"] - 1)
-    )
-    pair.drop(columns=["_max_score", "_n_paths", "_unique_targets"], inplace=True)
-    # Normalize combo drug scores: "drug_a+drug_b+drug_c" has 3x more targets,
-    # so divide mechanism_score by component count to keep scores comparable.
-    pair["n_components"] = pair["drug_normalized"].str.count(r"\+") + 1
-    pair["mechanism_score"] = pair["mechanism_score"] / pair["n_components"]
-    pair["final_score"] = pair["mechanism_score"]
-    pair.drop(columns=["n_components"], inplace=True)
-    pair = pair.sort_values(["drug_normalized", "final_score"], ascending=[True, False])
+    return score_pairs(pair, diversity_bonus)
 
-    # 输出
-    out_csv = output_dir / "dtpd_rank.csv"
-    pair.to_csv(out_csv, index=False)
 
-    # 证据路径
+def _drug_blocks(drugs: list[str], block_size: int) -> list[list[str]]:
+    """
+    将已排序的药物名切分为连续块
+
+    dtpd_paths.jsonl 按 "drug||disease" 排序, 而 dtpd_rank.csv 按 drug 排序;
+    仅当一个药物名是另一个的前缀时两种顺序才会不同 (如 "aspirin" / "aspirin lysine"),
+    因此这类药物必须落在同一块内, 分块拼接后的两个文件才与整体排序一致.
+    """
+    blocks: list[list[str]] = []
+    cur: list[str] = []
+    for d in drugs:
+        if len(cur) >= block_size and not any(d.startswith(c) for c in cur):
+            blocks.append(cur)
+            cur = []
+        cur.append(d)
+    if cur or not blocks:
+        blocks.append(cur)
+    return blocks
+
+
+def run_dtpd(cfg: Config) -> dict[str, Path]:
+    """
+    运行 DTPD 基础路径评分
+
+    rank.dtpd_engine = chunked 时按药物分块 (rank.dtpd_block_size 个药物一块) 计算,
+    每块的 pair 分数与 top-K 路径直接追加写入输出文件, 路径表只按块分批物化.
+    每个 (drug, disease) 对的全部路径都落在同一块内; 同分路径的截断由 LegacyTopK 按默认模式的
+    全局排序决定, 任意块大小的输出与默认模式逐字节一致.
+
+    Returns:
+        输出文件路径字典
+    """
+    output_dir = ensure_dir(cfg.output_dir)
+    rank_cfg = cfg.rank
+
+    dt, tp_core, pd_edge, aff_merge = load_dtpd_inputs(cfg)
+
+    # 合并路径
+    # 只保留路径核心列, 避免 drug_raw/mechanism_of_action 等额外列造成假性重复
+    dt_core = dt[["drug_normalized", "target_chembl_id"]].drop_duplicates()
+    tdeg = _target_degree(dt_core, tp_core)
+
+    k = int(rank_cfg.get("topk_paths_per_pair", 10))
+    diversity_bonus = float(rank_cfg.get("path_diversity_bonus", 0.10))
+
+    chunked = cfg.dtpd_engine == "chunked"
+    if chunked:
+        legacy = LegacyTopK(dt_core, tp_core, pd_edge, aff_merge, rank_cfg, k)
+        drugs = sorted(dt_core["drug_normalized"].dropna().unique())
+        blocks = _drug_blocks(drugs, max(1, int(rank_cfg.get("dtpd_block_size", 256))))
+    else:
+        blocks = [None]
+
+    out_csv = output_dir / "dtpd_rank.csv"
     ev_path = output_dir / "dtpd_paths.jsonl"
-    write_jsonl(ev_path, [
-        {
-            "drug": r["drug_normalized"],
-            "diseaseId": r["diseaseId"],
-            "diseaseName": r.get("diseaseName", ""),
-            "path_score": float(r["path_score"]),
-            "nodes": [
-                {"type": "Drug", "id": r["drug_normalized"]},
-                {"type": "Target", "id": r["target_chembl_id"]},
-                {"type": "Pathway", "id": r["reactome_stid"], "name": r.get("reactome_name", "")},
-                {"type": "Disease", "id": r["diseaseId"], "name": r.get("diseaseName", "")},
-            ],
-            "edges": [
-                {"rel": "DRUG_HAS_TARGET", "src": r["drug_normalized"], "dst": r["target_chembl_id"], "source": "ChEMBL"},
-                {"rel": "TARGET_IN_PATHWAY", "src": r["target_chembl_id"], "dst": r["reactome_stid"], "source": "Reactome"},
-                {"rel": "PATHWAY_ASSOC_DISEASE", "src": r["reactome_stid"], "dst": r["diseaseId"], "source": "OpenTargets(agg)",
-                 "pathway_score": float(r.get("pathway_score_f", 0)), "support_genes": int(float(r["support_genes_f"]))},
-            ],
-        }
-        for _, r in top_paths.iterrows()
-    ])
+    n_paths = n_with_aff = n_pairs = 0
+    # CSV 逐块追加写出; Parquet 收集各块 pair 表后一次写入
+    parquet = get_table_format() == "parquet"
+    pair_parts: list[pd.DataFrame] = []
+    if not parquet:
+        out_csv.with_suffix(".parquet").unlink(missing_ok=True)
+
+    with (nullcontext() if parquet else out_csv.open("w", encoding="utf-8", newline="")) as f_csv:
+        def _records():
+            nonlocal n_paths, n_with_aff, n_pairs
+            for i, block in enumerate(blocks):
+                if chunked:
+                    top_paths = legacy.block_topk(block)
+                else:
+                    paths = _block_paths(_block_dtp(dt_core, tp_core, tdeg, rank_cfg), pd_edge, aff_merge, rank_cfg)
+                    n_paths = len(paths)
+                    n_with_aff = int((paths["_affinity_weight"] != 1.0).sum())
+                    top_paths = select_topk(paths, k)
+                    del paths
+                pair = _aggregate_topk(top_paths, diversity_bonus)
+                n_pairs += len(pair)
+                # 输出
+                if parquet:
+                    pair_parts.append(pair)
+                else:
+                    pair.to_csv(f_csv, index=False, header=(i == 0))
+                # 证据路径
+                for _, r in top_paths.iterrows():
+                    yield path_record(r)
+
+        write_jsonl(ev_path, _records())
+    if parquet:
+        out_csv = write_table(pd.concat(pair_parts, ignore_index=True), out_csv)
+
+    if chunked:
+        n_paths, n_with_aff = legacy.n_paths, legacy.n_with_aff
+    if aff_merge is not None:
+        logger.info("Affinity data applied to %d/%d paths", n_with_aff, n_paths)
+    if len(blocks) > 1:
+        logger.info("DTPD 分块计算: %d 块, %d 条路径, %d 对", len(blocks), n_paths, n_pairs)
 
     return {"rank_csv": out_csv, "evidence_paths": ev_path}
@@ -0,0 +1,360 @@
+"""
+DTPD 稀疏矩阵引擎: 全部 (drug, disease) 对的批量路径统计
+
+dtpd.run_dtpd 通过两次 pandas merge 物化全部路径 (drug × target × pathway × disease),
+药物数达到 ChEMBL 已批准药物规模时内存会爆炸. 本引擎改为三个稀疏矩阵:
+
+  A: drug × target      (值 = hub_penalty^λ × affinity_weight)
+  B: target × pathway   (二值)
+  C: pathway × disease  (值 = pathway_score_f × w_support)
+
+  路径数         N = bin(A) · B · bin(C)
+  路径分数之和   S = A · B · C
+  独立靶点数     U = bin(A) · bin(B · bin(C))
+  最大路径分数   max-product 半环, 按药物分块展开 (内存受块大小限制)
+
+显式的 top-K 路径只在需要时按药物分块惰性提取:
+  - 路径数 > K 的对 (计算 top-K 内的独立靶点数)
+  - 排名截断后存活的对 (证据包 / Bootstrap CI)
+
+与 pandas 引擎的差异:
+  - 路径数 > K 的对, 同分路径的截断由 dtpd.LegacyTopK 按默认模式的全局排序复现, 与 pandas 引擎一致
+  - 路径数 ≤ K 的对, 最大路径分数由因式分解计算, 与逐路径乘积仅存在浮点舍入级差异
+  - pair 的 diseaseName 取该疾病在 edge_pathway_disease 中第一个非空名称
+  - dtpd_paths.jsonl 只包含 run_ranker 截断后存活的对
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ..config import Config, ensure_dir
+from ..utils import write_table
+from .base import hub_penalty
+from .dtpd import LegacyTopK, load_dtpd_inputs, score_pairs
+
+logger = logging.getLogger(__name__)
+
+
+def _expand_rows(indptr: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    CSR 行展开: 对每个 rows[i] 列出其全部非零位置
+
+    Returns:
+        (owner, pos): owner[j] 为 rows 中的序号, pos[j] 为 indices/data 中的位置
+    """
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    owner = np.repeat(np.arange(len(rows), dtype=np.int64), counts)
+    offsets = np.cumsum(counts) - counts
+    pos = np.repeat(starts - offsets, counts) + np.arange(total, dtype=np.int64)
+    return owner, pos
+
+
+def _csr_layout(rows: np.ndarray, cols: np.ndarray, n_rows: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    由 (row, col) 坐标构造 CSR 结构 (不合并重复项)
+
+    Returns:
+        (indptr, indices, order): order 为原始行在 CSR 数据中的排列
+    """
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32), order
+
+
+def _max_reduce(keys: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """按 key 分组取最大值 (返回 key 升序)"""
+    if len(keys) == 0:
+        return keys, values
+    order = np.argsort(keys, kind="stable")
+    k, v = keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    return k[starts], np.maximum.reduceat(v, starts)
+
+
+def _values_at(M: sparse.csr_matrix, keys: np.ndarray, fill: float = 0.0) -> np.ndarray:
+    """按 row * n_cols + col 键取稀疏矩阵元素 (缺失为 fill)"""
+    coo = M.tocoo()
+    mkeys = coo.row.astype(np.int64) * M.shape[1] + coo.col.astype(np.int64)
+    order = np.argsort(mkeys, kind="stable")
+    mkeys, mvals = mkeys[order], coo.data[order]
+    idx = np.searchsorted(mkeys, keys)
+    idx_c = np.minimum(idx, max(len(mkeys) - 1, 0))
+    found = (idx < len(mkeys)) & (mkeys[idx_c] == keys) if len(mkeys) else np.zeros(len(keys), bool)
+    out = np.full(len(keys), fill, dtype=float)
+    out[found] = mvals[idx_c[found]]
+    return out
+
+
+class SparseDTPD:
+    """DTPD 稀疏矩阵表示 (实体按字典序编码为整数)."""
+
+    def __init__(self, dt: pd.DataFrame, tp_core: pd.DataFrame, pd_edge: pd.DataFrame,
+                 aff_merge: pd.DataFrame | None, rank_cfg: dict, block_size: int = 256):
+        self.block_size = max(1, int(block_size))
+        # LegacyTopK 按 K 惰性构建 (只有路径数 > K 的对需要)
+        self._legacy_inputs = (dt[["drug_normalized", "target_chembl_id"]].drop_duplicates(),
+                               tp_core, pd_edge, aff_merge, rank_cfg)
+        self._legacy: dict[int, LegacyTopK] = {}
+
+        dt_core = dt[["drug_normalized", "target_chembl_id"]].dropna().drop_duplicates()
+        tp_core = tp_core.dropna(subset=["target_chembl_id", "reactome_stid"])
+        pde = pd_edge.dropna(subset=["reactome_stid", "diseaseId"])
+        # 只有连到通路的靶点参与路径 (与 pandas 引擎的 target_deg 口径一致)
+        dt_core = dt_core[dt_core["target_chembl_id"].isin(set(tp_core["target_chembl_id"]))]
+
+        self.drugs = pd.Index(sorted(dt_core["drug_normalized"].unique()))
+        self.targets = pd.Index(sorted(set(dt_core["target_chembl_id"]) | set(tp_core["target_chembl_id"])))
+        self.pathways = pd.Index(sorted(set(tp_core["reactome_stid"]) | set(pde["reactome_stid"])))
+        self.diseases = pd.Index(sorted(pde["diseaseId"].unique()))
+        n_d, n_t, n_p, n_s = len(self.drugs), len(self.targets), len(self.pathways), len(self.diseases)
+
+        # ── A: drug × target ──
+        d_idx = self.drugs.get_indexer(dt_core["drug_normalized"])
+        t_idx = self.targets.get_indexer(dt_core["target_chembl_id"])
+        deg = np.bincount(t_idx, minlength=n_t)
+        lam = float(rank_cfg.get("hub_penalty_lambda", 1.0))
+        w_hub = hub_penalty(pd.Series(deg)).pow(lam).to_numpy()
+        if aff_merge is not None:
+            aff = dt_core.merge(aff_merge, on=["drug_normalized", "target_chembl_id"], how="left")
+            aff_w = aff["_affinity_weight"].fillna(1.0).to_numpy(dtype=float)
+        else:
+            aff_w = np.ones(len(dt_core))
+        a_ptr, a_idx, a_order = _csr_layout(d_idx, t_idx, n_d)
+        self.A_hub = sparse.csr_matrix((w_hub[t_idx][a_order], a_idx, a_ptr), shape=(n_d, n_t))
+        self.A_aff = sparse.csr_matrix((aff_w[a_order], a_idx, a_ptr), shape=(n_d, n_t))
+        self.A_w = sparse.csr_matrix((self.A_hub.data * self.A_aff.data, a_idx, a_ptr), shape=(n_d, n_t))
+        # 原始行标签 (dt 行, tp 行, pd 行): 用于向 LegacyTopK 查询默认模式的 top-K 名次
+        self._a_row = dt_core.index.to_numpy()[a_order]
+
+        # ── B: target × pathway (tp_core 已按 (target, pathway) 去重) ──
+        b_ptr, b_idx, b_order = _csr_layout(self.targets.get_indexer(tp_core["target_chembl_id"]),
+                                            self.pathways.get_indexer(tp_core["reactome_stid"]), n_t)
+        self.B = sparse.csr_matrix((np.ones(len(b_idx)), b_idx, b_ptr), shape=(n_t, n_p))
+        self._tp_names = tp_core["reactome_name"].to_numpy(dtype=object)[b_order]
+        self._b_row = tp_core.index.to_numpy()[b_order]
+
+        # ── C: pathway × disease (保留重复行: 与 pandas merge 一样各自成为一条路径) ──
+        sb = float(rank_cfg.get("support_gene_boost", 0.15))
+        self.C_ptr, self.C_idx, rows = _csr_layout(self.pathways.get_indexer(pde["reactome_stid"]),
+                                                   self.diseases.get_indexer(pde["diseaseId"]), n_p)
+        self._c_row = pde.index.to_numpy()[rows]
+        self.C_psf = pde["pathway_score_f"].to_numpy(dtype=float)[rows]
+        self.C_sup = pde["support_genes_f"].to_numpy(dtype=float)[rows]
+        self.C_wsup = 1.0 + sb * np.log1p(self.C_sup)
+        self._pd_pw_names = (pde["reactome_name"].to_numpy(dtype=object)[rows]
+                             if "reactome_name" in pde.columns else np.full(len(rows), np.nan, dtype=object))
+        self._pd_dis_names = (pde["diseaseName"].to_numpy(dtype=object)[rows]
+                              if "diseaseName" in pde.columns else np.full(len(rows), np.nan, dtype=object))
+        names = (pde.dropna(subset=["diseaseName"]).drop_duplicates("diseaseId")
+                 .set_index("diseaseId")["diseaseName"] if "diseaseName" in pde.columns
+                 else pd.Series(dtype=object))
+        self.disease_names = names.reindex(self.diseases).fillna("").to_numpy(dtype=object)
+
+        logger.info("Sparse DTPD: %d drugs × %d targets × %d pathways × %d diseases "
+                    "(nnz A=%d, B=%d, C=%d)", n_d, n_t, n_p, n_s,
+                    self.A_hub.nnz, self.B.nnz, len(self.C_idx))
+
+    @classmethod
+    def from_config(cls, cfg: Config) -> "SparseDTPD":
+        dt, tp_core, pd_edge, aff_merge = load_dtpd_inputs(cfg)
+        return cls(dt, tp_core, pd_edge, aff_merge, cfg.rank,
+                   block_size=int(cfg.rank.get("dtpd_block_size", 256)))
+
+    # ── 全部对的统计 (稀疏乘积) ──
+
+    def _C(self, data: np.ndarray) -> sparse.csr_matrix:
+        return sparse.csr_matrix((data, self.C_idx, self.C_ptr),
+                                 shape=(len(self.pathways), len(self.diseases)))
+
+    def _max_scores(self) -> tuple[np.ndarray, np.ndarray]:
+        """max-product: 每对最大路径分数 (按药物分块展开)"""
+        A_w = self.A_w
+        c_w = self.C_psf * self.C_wsup
+        n_s = len(self.diseases)
+        keys_out, vals_out = [], []
+        for start in range(0, len(self.drugs), self.block_size):
+            blk = np.arange(start, min(start + self.block_size, len(self.drugs)))
+            own, a_pos = _expand_rows(A_w.indptr, blk)
+            t = A_w.indices[a_pos]
+            own2, b_pos = _expand_rows(self.B.indptr, t)
+            dp_d = blk[own[own2]]
+            dp_p = self.B.indices[b_pos]
+            # (drug, pathway) 上先对靶点取 max
+            dp_key, dp_val = _max_reduce(dp_d.astype(np.int64) * len(self.pathways) + dp_p,
+                                         A_w.data[a_pos][own2])
+            d, p = dp_key // len(self.pathways), dp_key % len(self.pathways)
+            own3, c_pos = _expand_rows(self.C_ptr, p)
+            key, val = _max_reduce(d[own3] * n_s + self.C_idx[c_pos], dp_val[own3] * c_w[c_pos])
+            keys_out.append(key)
+            vals_out.append(val)
+        if not keys_out:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(keys_out), np.concatenate(vals_out)
+
+    def pair_stats(self) -> pd.DataFrame:
+        """
+        全部 (drug, disease) 对的路径统计
+
+        Returns:
+            DataFrame: drug_normalized, diseaseId, n_paths, score_sum, max_score, n_targets
+            (按 drug, disease 字典序)
+        """
+        A_bin = self.A_hub.copy()
+        A_bin.data[:] = 1.0
+        C_bin = self._C(np.ones(len(self.C_idx)))
+        A_w = self.A_w
+
+        N = (A_bin @ self.B @ C_bin).tocoo()
+        S = (A_w @ self.B @ self._C(self.C_psf * self.C_wsup)).tocsr()
+        BC = (self.B @ C_bin).tocsr()
+        BC.data[:] = 1.0
+        U = (A_bin @ BC).tocsr()
+
+        n_s = len(self.diseases)
+        keys = N.row.astype(np.int64) * n_s + N.col.astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        keys, n_paths = keys[order], N.data[order]
+        mkeys, mvals = self._max_scores()
+        max_score = np.zeros(len(keys))
+        max_score[np.searchsorted(keys, mkeys)] = mvals
+
+        d, s = keys // n_s, keys % n_s
+        return pd.DataFrame({
+            "drug_normalized": self.drugs.to_numpy(dtype=object)[d],
+            "diseaseId": self.diseases.to_numpy(dtype=object)[s],
+            "n_paths": np.rint(n_paths).astype(np.int64),
+            "score_sum": _values_at(S, keys),
+            "max_score": max_score,
+            "n_targets": np.rint(_values_at(U, keys)).astype(np.int64),
+        })
+
+    # ── 显式 top-K 路径 (惰性) ──
+
+    def topk_paths(self, pairs: pd.DataFrame, k: int) -> pd.DataFrame:
+        """
+        为指定的 (drug_normalized, diseaseId) 对提取 top-K 显式路径
+
+        路径分数按 pandas 引擎相同的乘法顺序计算, 截断与排序取 LegacyTopK 的名次,
+        逐路径结果一致.
+
+        Returns:
+            与 run_dtpd 的 top_paths 同列的 DataFrame, 按 pair_key, path_score 降序排列
+        """
+        cols = ["drug_normalized", "target_chembl_id", "reactome_stid", "reactome_name",
+                "diseaseId", "diseaseName", "pathway_score_f", "support_genes_f", "path_score"]
+        d_all = self.drugs.get_indexer(pairs["drug_normalized"])
+        s_all = self.diseases.get_indexer(pairs["diseaseId"])
+        ok = (d_all >= 0) & (s_all >= 0)
+        n_s = len(self.diseases)
+        wanted = np.unique(d_all[ok].astype(np.int64) * n_s + s_all[ok])
+        drugs = np.unique(d_all[ok])
+
+        frames = []
+        for start in range(0, len(drugs), self.block_size):
+            blk = drugs[start:start + self.block_size]
+            own, a_pos = _expand_rows(self.A_hub.indptr, blk)
+            t = self.A_hub.indices[a_pos]
+            own2, b_pos = _expand_rows(self.B.indptr, t)
+            p = self.B.indices[b_pos]
+            own3, c_pos = _expand_rows(self.C_ptr, p)
+            d = blk[own[own2[own3]]].astype(np.int64)
+            s = self.C_idx[c_pos]
+            keep = np.isin(d * n_s + s, wanted)
+            if not keep.any():
+                continue
+            a_sel = a_pos[own2[own3]][keep]
+            b_sel = b_pos[own3][keep]
+            c_sel = c_pos[keep]
+            psf = self.C_psf[c_sel]
+            score = psf * self.A_hub.data[a_sel] * self.C_wsup[c_sel] * self.A_aff.data[a_sel]
+            pw_name = pd.Series(self._tp_names[b_sel]).fillna(pd.Series(self._pd_pw_names[c_sel]))
+            frames.append(pd.DataFrame({
+                "drug_normalized": self.drugs.to_numpy(dtype=object)[d[keep]],
+                "target_chembl_id": self.targets.to_numpy(dtype=object)[self.A_hub.indices[a_sel]],
+                "reactome_stid": self.pathways.to_numpy(dtype=object)[p[own3][keep]],
+                "reactome_name": pw_name.to_numpy(dtype=object),
+                "diseaseId": self.diseases.to_numpy(dtype=object)[s[keep]],
+                "diseaseName": self._pd_dis_names[c_sel],
+                "pathway_score_f": psf,
+                "support_genes_f": self.C_sup[c_sel],
+                "path_score": score,
+                "_row_dt": self._a_row[a_sel],
+                "_row_tp": self._b_row[b_sel],
+                "_row_pd": self._c_row[c_sel],
+            }))
+
+        if not frames:
+            return pd.DataFrame(columns=cols + ["pair_key"])
+        paths = pd.concat(frames, ignore_index=True)
+        paths["pair_key"] = paths["drug_normalized"].astype(str) + "||" + paths["diseaseId"].astype(str)
+        paths["_rank"] = self._legacy_topk(k).path_rank(paths["_row_dt"].to_numpy(), paths["_row_tp"].to_numpy(),
+                                                        paths["_row_pd"].to_numpy())
+        paths = paths[paths["_rank"] >= 0].sort_values("_rank")
+        paths = paths.drop(columns=["_row_dt", "_row_tp", "_row_pd", "_rank"])
+        return paths.sort_values(["pair_key", "path_score"], ascending=[True, False]).reset_index(drop=True)
+
+    def _legacy_topk(self, k: int) -> LegacyTopK:
+        if k not in self._legacy:
+            self._legacy[k] = LegacyTopK(*self._legacy_inputs, k=k)
+        return self._legacy[k]
+
+    # ── mechanism score ──
+
+    def pair_scores(self, k: int, diversity_bonus: float) -> pd.DataFrame:
+        """
+        计算全部对的 mechanism_score (dtpd_rank.csv 格式)
+
+        路径数 ≤ K 的对直接由稀疏统计得到 top-K 聚合; 其余对惰性提取 top-K 路径.
+        """
+        stats = self.pair_stats()
+        pair = pd.DataFrame({
+            "drug_normalized": stats["drug_normalized"],
+            "diseaseId": stats["diseaseId"],
+            "_max_score": stats["max_score"],
+            "_n_paths": np.minimum(stats["n_paths"], k),
+            "_unique_targets": stats["n_targets"],
+            "diseaseName": self.disease_names[self.diseases.get_indexer(stats["diseaseId"])],
+        })
+
+        over = stats["n_paths"] > k
+        if over.any():
+            top = self.topk_paths(stats.loc[over, ["drug_normalized", "diseaseId"]], k)
+            agg = top.groupby(["drug_normalized", "diseaseId"]).agg(
+                _max_score=("path_score", "max"),
+                _unique_targets=("target_chembl_id", "nunique"),
+            )
+            idx = pd.MultiIndex.from_frame(pair.loc[over, ["drug_normalized", "diseaseId"]])
+            pair.loc[over, "_max_score"] = agg["_max_score"].reindex(idx).to_numpy()
+            pair.loc[over, "_unique_targets"] = agg["_unique_targets"].reindex(idx).to_numpy()
+            logger.info("Sparse DTPD: %d/%d 对路径数 > K=%d, 已提取显式 top-K", int(over.sum()), len(pair), k)
+
+        return score_pairs(pair, diversity_bonus)
+
+
+def run_dtpd_sparse(cfg: Config) -> tuple[dict[str, Path], SparseDTPD]:
+    """
+    稀疏引擎版 run_dtpd: 只写 dtpd_rank.csv, 路径留待 SparseDTPD.topk_paths 惰性提取
+
+    Returns:
+        (输出文件路径字典, SparseDTPD 引擎)
+    """
+    output_dir = ensure_dir(cfg.output_dir)
+    rank_cfg = cfg.rank
+    engine = SparseDTPD.from_config(cfg)
+    pair = engine.pair_scores(
+        k=int(rank_cfg.get("topk_paths_per_pair", 10)),
+        diversity_bonus=float(rank_cfg.get("path_diversity_bonus", 0.10)),
+    )
+    out_csv = write_table(pair, output_dir / "dtpd_rank.csv")
+    logger.info("Sparse DTPD: %d 对写入 %s", len(pair), out_csv)
+    return {"rank_csv": out_csv}, engine
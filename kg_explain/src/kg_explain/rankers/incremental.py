@@ -0,0 +1,163 @@
+"""
+增量重排: run_ranker 组件级内容哈希与中间表
+
+output_dir/rank_state/ 下保存:
+  - state.json:              每个组件的输入哈希 (输入文件 SHA-256 + 参数) 与输出文件摘要
+  - digests.json:            FileDigestCache, (size, mtime_ns) 不变的文件不重读
+  - penalties_drug.csv:      药物级 FAERS / 失败试验惩罚 (PenaltyTables.to_frames)
+  - penalties_disease.csv:   疾病级表型加成
+  - evidence_drug.csv:       药物 → 安全/试验证据明细哈希
+  - evidence_disease.csv:    疾病 → 表型明细哈希
+  - pair_ci.csv:             每对的路径哈希 + Bootstrap CI 结果
+  - packs.csv:               每对的证据包指纹 (行序 = evidence_paths.jsonl 行序)
+
+组件:
+  - mechanism:      run_dtpd 路径枚举 (dtpd_rank + dtpd_paths.jsonl); 输入不变且输出未被改动时跳过
+  - paths:          sparse 引擎的存活对证据路径 (存活对及其顺序不变时复用)
+  - penalties:      惩罚/加成表; 输入不变时直接读表, 证据明细只在需要时重建
+  - uncertainty:    只为路径哈希变化 (或新进入 Top-K) 的对重算 CI
+  - evidence_packs: 只重写指纹变化的证据包, 其余从上次 evidence_paths.jsonl 原样读取
+
+每对 CI 使用独立的 RandomState(seed), 与其它对无关, 因此逐对复用与全量重算结果一致.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from ..config import ensure_dir
+from ..orchestrator import FileDigestCache
+from ..utils import write_json
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = "rank_state"
+STATE_FILE = "state.json"
+
+# 只影响 DTPD 之后步骤的 rank 参数; 其余 rank 参数 (含未来新增) 都计入 mechanism 哈希
+DOWNSTREAM_RANK_KEYS = frozenset({
+    "safety_penalty_weight", "trial_failure_penalty", "phenotype_overlap_boost",
+    "topk_pairs_per_drug", "uncertainty_workers", "uncertainty_bootstrap", "uncertainty_ci",
+    "uncertainty_seed", "evidence_pack_format",
+    "evidence_pack_workers", "incremental",
+})
+
+
+def params_digest(params: Any) -> str:
+    """参数的稳定哈希 (键排序的 JSON)"""
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def json_digest(obj: Any) -> str:
+    """证据明细 / 证据包指纹用的短哈希"""
+    return hashlib.sha1(json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def pair_path_hashes(lines: list[bytes], drugs: Iterable, diseases: Iterable) -> dict[tuple[str, str], str]:
+    """
+    按 (drug 小写, diseaseId) 聚合路径行哈希 (组内保持文件顺序).
+
+    Args:
+        lines: dtpd_paths.jsonl 的原始行 (与 drugs / diseases 一一对应)
+        drugs, diseases: 每行的 drug / diseaseId
+
+    Returns:
+        {(drug, diseaseId): hash}; 与 add_uncertainty_to_ranking 的分组键一致
+    """
+    if not lines:
+        return {}
+    row_hash = pd.util.hash_array(np.array(lines, dtype=object))
+    keys = pd.DataFrame({
+        "drug": pd.Series(list(drugs), dtype=str).str.lower().str.strip(),
+        "diseaseId": pd.Series(list(diseases), dtype=str).str.strip(),
+    })
+    return {
+        key: hashlib.sha1(row_hash[idx].tobytes()).hexdigest()
+        for key, idx in keys.groupby(["drug", "diseaseId"], sort=False).indices.items()
+    }
+
+
+class RankState:
+    """
+    run_ranker 的组件状态 (output_dir/rank_state/).
+
+    用法:
+        state = RankState(output_dir)
+        key = state.key([input files], {params})
+        if not state.reusable("mechanism", key, [outputs]):
+            ...  # 重算
+        state.commit("mechanism", key, [outputs], status="recomputed")
+        state.save()
+    """
+
+    def __init__(self, output_dir: Path, reset: bool = False):
+        self.dir = ensure_dir(Path(output_dir) / STATE_DIR)
+        self.path = self.dir / STATE_FILE
+        self.digests = FileDigestCache(self.dir / "digests.json")
+        self.components: dict[str, dict] = {}
+        self.report: dict[str, dict] = {}
+        if not reset and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.components = json.load(f).get("components", {})
+            except (json.JSONDecodeError, OSError):
+                logger.warning("rank_state 损坏, 全量重算: %s", self.path)
+
+    def key(self, files: Iterable[Path | None], params: Any) -> str:
+        """组件输入哈希: 输入文件内容 (缺失为 'missing') + 参数"""
+        parts = [self.digests.digest(str(f)) if f is not None else "missing" for f in files]
+        parts.append(params_digest(params))
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _output_digests(self, outputs: Iterable[Path | None]) -> list[str]:
+        return [self.digests.digest(str(o)) if o is not None else "missing" for o in outputs]
+
+    def reusable(self, name: str, key: str, outputs: Iterable[Path | None]) -> bool:
+        """上次运行的输入哈希相同, 且输出文件仍是上次写出的内容"""
+        prev = self.components.get(name)
+        if not prev or prev.get("key") != key:
+            return False
+        digests = self._output_digests(outputs)
+        return "missing" not in digests and digests == prev.get("outputs")
+
+    def commit(self, name: str, key: str, outputs: Iterable[Path | None], status: str, **counts) -> None:
+        """记录组件的输入哈希 / 输出摘要, 并写入本次运行报告"""
+        self.components[name] = {"key": key, "outputs": self._output_digests(outputs)}
+        self.report[name] = {"status": status, **counts}
+
+    def table_path(self, name: str) -> Path:
+        return self.dir / f"{name}.csv"
+
+    def load_table(self, name: str, str_cols: Iterable[str]) -> pd.DataFrame | None:
+        """读取中间表 (浮点按 round_trip 解析, 与写出前逐位一致)"""
+        path = self.table_path(name)
+        if not path.exists():
+            return None
+        return pd.read_csv(path, dtype={c: str for c in str_cols}, keep_default_na=False,
+                           na_values=[""], float_precision="round_trip")
+
+    def save_table(self, name: str, df: pd.DataFrame) -> Path:
+        path = self.table_path(name)
+        df.to_csv(path, index=False)
+        return path
+
+    def save(self) -> Path:
+        self.digests.save()
+        write_json(self.path, {"components": self.components, "last_run": self.report})
+        return self.path
+
+    def summary(self) -> str:
+        """日志用: mechanism=reused, uncertainty=partial(reused=10, recomputed=2), ..."""
+        parts = []
+        for name, rep in self.report.items():
+            extra = ", ".join(f"{k}={v}" for k, v in rep.items() if k != "status")
+            parts.append(f"{name}={rep['status']}" + (f"({extra})" if extra else ""))
+        return ", ".join(parts)
@@ -0,0 +1,365 @@
+"""
+排名惩罚/加成预计算: FAERS 安全信号, 失败试验, 疾病表型
+
+run_ranker 原先为每个药物/疾病用布尔掩码过滤整张 ae/trial/phenotype 表
+(O(药物数 × 行数)), 并为每个试验行重新编译正则. 这里改为一次性预计算:
+  - FAERS: groupby 得到每个药物的 top-10 信号, 惩罚按列用 NumPy 计算
+  - 试验: conditions 每个唯一字符串只匹配一次
+  - 表型: 按疾病 groupby 取前 N 条
+结果以药物 / 疾病为索引, 由 run_ranker 映射回 pair 表.
+证据明细 (evidence pack 用) 只为存活对按需生成.
+
+数值与逐药物实现一致: 每组内按原顺序逐项累加, 不改变浮点舍入.
+唯一差异: 同一药物内 PRR 相同的信号按文件顺序取 top-10 (原实现依赖不稳定排序).
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SAFETY_TOP_N = 10
+TRIAL_EVIDENCE_N = 5
+
+
+def is_serious_ae(ae_term: str, serious_keywords: list[str]) -> bool:
+    """判断是否为严重不良事件"""
+    ae_lower = ae_term.lower()
+    return any(kw.lower() in ae_lower for kw in serious_keywords)
+
+
+class ConditionMatcher:
+    """试验 conditions 与目标疾病的词边界匹配 (目标正则只编译一次, 结果按字符串缓存)
+
+    v2: Uses word-boundary matching instead of bi-directional substring.
+    Old bi-directional substring was too permissive:
+    - "heart" matched any cardiac condition
+    - "failure" matched any trial with "failure" in its name
+    Now: target_condition must appear as a whole-word match within the
+    trial condition string, or vice versa for multi-word conditions.
+    """
+
+    def __init__(self, target_condition: str):
+        self.target_condition = target_condition
+        self._target_pattern = re.compile(r'\b' + re.escape(target_condition) + r'\b', re.IGNORECASE)
+        self._memo: dict[str, bool] = {}
+
+    def __call__(self, conditions_str: str) -> bool:
+        hit = self._memo.get(conditions_str)
+        if hit is None:
+            hit = self._memo[conditions_str] = self._match(conditions_str)
+        return hit
+
+    def _match(self, conditions_str: str) -> bool:
+        if not conditions_str:
+            return False
+        for cond in conditions_str.split("|"):
+            cond_lower = cond.strip().lower()
+            if not cond_lower:
+                continue
+            # Target condition found as whole word(s) in trial condition
+            if self._target_pattern.search(cond_lower):
+                return True
+            # Trial condition found as whole word(s) in target condition
+            # (for cases like trial="heart failure", target="congestive heart failure")
+            if len(cond_lower) >= 5 and re.search(r'\b' + re.escape(cond_lower) + r'\b',
+                                                  self.target_condition, re.IGNORECASE):
+                return True
+        return False
+
+    def match_series(self, values: pd.Series) -> np.ndarray:
+        """向量化匹配: 每个唯一字符串只计算一次"""
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        hits = np.array([self(u) for u in uniques], dtype=bool)
+        return hits[codes] if len(codes) else np.zeros(0, dtype=bool)
+
+
+def _sequential_sum(group: np.ndarray, rank: np.ndarray, values: np.ndarray,
+                    n_groups: int, width: int) -> np.ndarray:
+    """按组内名次逐项累加 (与 Python 循环中 += 的舍入顺序一致)"""
+    mat = np.zeros((n_groups, max(width, 1)))
+    mat[group, rank] = values
+    out = np.zeros(n_groups)
+    for j in range(mat.shape[1]):
+        out = out + mat[:, j]
+    return out
+
+
+class PenaltyTables:
+    """
+    预计算的药物/疾病级惩罚与加成
+
+    Attributes:
+        safety: drug(小写) → FAERS 安全惩罚
+        trial: drug(小写) → 失败试验惩罚
+        phenotype_boost: diseaseId → 表型加成
+    """
+
+    def __init__(
+        self,
+        ae_df: pd.DataFrame | None,
+        trial_ae_df: pd.DataFrame | None,
+        phe_df: pd.DataFrame | None,
+        *,
+        has_prr: bool,
+        serious_keywords: list[str],
+        min_prr: float,
+        condition: str,
+        phenotype_cap: int,
+        phenotype_boost_w: float,
+    ):
+        self.has_prr = has_prr
+        self.serious_keywords = serious_keywords
+        self.matcher = ConditionMatcher(condition)
+        self.phenotype_cap = max(int(phenotype_cap), 0)
+
+        self.safety = pd.Series(dtype=float)
+        self.trial = pd.Series(dtype=float)
+        self.phenotype_boost = pd.Series(dtype=float)
+        self._ae_top: pd.DataFrame | None = None
+        self._trials: pd.DataFrame | None = None
+        self._phe_top: pd.DataFrame | None = None
+        self._ae_groups: dict = {}
+        self._trial_groups: dict = {}
+        self._phe_groups: dict = {}
+
+        if ae_df is not None:
+            self._build_safety(ae_df, min_prr)
+        if trial_ae_df is not None:
+            self._build_trial(trial_ae_df)
+        if phe_df is not None:
+            self._build_phenotype(phe_df, phenotype_boost_w)
+
+    # ── FAERS 安全惩罚 ──
+
+    def _build_safety(self, ae_df: pd.DataFrame, min_prr: float) -> None:
+        """PRR-driven 惩罚, report_count 仅做置信度加权
+
+        v2 rationale: Old formula used log1p(report_count) as the penalty
+        base, which over-penalised well-studied drugs (aspirin, metformin)
+        simply because they had more FAERS exposure years.  PRR already
+        normalises for background reporting rate, so it should drive the
+        penalty magnitude.  report_count is kept as a *confidence* weight:
+        a PRR=5 signal from 3 reports is less trustworthy than from 300.
+        """
+        has_prr = self.has_prr
+        # Sort by PRR DESC (strongest signals first) for top-10 selection
+        sort_col = "prr" if has_prr else "report_count"
+        top = (ae_df.dropna(subset=["drug_normalized"])
+               .sort_values(sort_col, ascending=False, kind="stable")
+               .groupby("drug_normalized", sort=False).head(SAFETY_TOP_N))
+        top = top.copy()
+        terms = top["ae_term"] if "ae_term" in top.columns else pd.Series("", index=top.index)
+        top["ae_term"] = terms
+        codes, uniques = pd.factorize(terms)
+        serious = np.array([isinstance(t, str) and is_serious_ae(t, self.serious_keywords) for t in uniques],
+                           dtype=bool)
+        top["_is_serious"] = serious[codes] if len(uniques) else np.zeros(len(top), dtype=bool)
+
+        count = top["report_count"].to_numpy(dtype=float)
+        prr = top["prr"].to_numpy(dtype=float) if has_prr else np.zeros(len(top))
+
+        # PRR-driven penalty:
+        #   log1p(PRR) / 5  maps  PRR=2 → 0.22,  PRR=10 → 0.48,  PRR=50 → 0.78
+        # Confidence weight: saturates quickly so count doesn't dominate
+        #   min(1.0, log1p(count) / log1p(100))  →  count=3: 0.30, count=100: 1.0
+        # Fallback when PRR is unavailable: mild count-based penalty
+        with np.errstate(invalid="ignore", divide="ignore"):
+            confidence = np.minimum(1.0, np.log1p(count) / np.log1p(100))
+            ae_penalty = np.where(has_prr & (prr > 0),
+                                  (np.log1p(prr) / 5.0) * confidence,
+                                  np.log1p(count) / 20.0)
+        ae_penalty = np.where(top["_is_serious"].to_numpy(), ae_penalty * 2.0, ae_penalty)
+        # PRR 信号门槛: 低于阈值的不视为真实信号，跳过
+        kept = ~(has_prr & (min_prr > 0) & (prr < min_prr))
+        top["_kept"] = kept
+
+        drug_codes, drugs = pd.factorize(top["drug_normalized"])
+        rank = top.groupby("drug_normalized", sort=False).cumcount().to_numpy()
+        penalty = _sequential_sum(drug_codes, rank, np.where(kept, ae_penalty, 0.0),
+                                  len(drugs), SAFETY_TOP_N)
+
+        # v2 FIX: Use CUMULATIVE penalty with saturation, NOT averaging.
+        # Rationale: averaging masked multi-toxicity profiles — a drug with
+        # 10 serious AEs was penalized the same as one with 1 AE of identical PRR.
+        # Now: cumulative sum, capped at 1.0 via tanh for smooth saturation.
+        # tanh maps: penalty=0.5→0.46, 1.0→0.76, 2.0→0.96, 3.0→0.995
+        self.safety = pd.Series(np.minimum(np.tanh(penalty), 1.0), index=drugs)
+        self._ae_top = top
+        self._ae_groups = top.groupby("drug_normalized", sort=False).indices
+
+    def safety_evidence(self, drug: str) -> list[dict]:
+        """药物的 FAERS 信号明细 (top-10 中通过 PRR 门槛的)"""
+        idx = self._ae_groups.get(str(drug).lower().strip())
+        if idx is None:
+            return []
+        rows = self._ae_top.iloc[idx]
+        rows = rows[rows["_kept"]]
+        return [
+            {
+                "ae_term": r["ae_term"],
+                "report_count": int(float(r["report_count"])),
+                "prr": round(float(r["prr"]), 4) if self.has_prr else 0.0,
+                "is_serious": bool(r["_is_serious"]),
+            }
+            for r in rows.to_dict("records")
+        ]
+
+    # ── 失败试验惩罚 ──
+
+    def _build_trial(self, trial_ae_df: pd.DataFrame) -> None:
+        """试验失败惩罚 (v2: efficacy stops 仅计入目标疾病相关)
+
+        Rationale: drug repurposing 的意义就是在新适应症上试，一个药在
+        适应症 A 上 efficacy failure 不应该惩罚它在适应症 B 上的得分。
+        但 safety stops 是跨适应症通用的 (肝毒性在任何适应症都是风险)。
+        """
+        trials = trial_ae_df.dropna(subset=["drug_normalized"])
+        # Safety stops: count ALL (safety risk is indication-agnostic)
+        safety = (trials["is_safety_stop"].astype(str) == "1").to_numpy()
+        eff = (trials["is_efficacy_stop"].astype(str) == "1").to_numpy()
+        if "conditions" in trials.columns:
+            # Efficacy stops: only count trials whose condition matches target disease
+            relevant = self.matcher.match_series(trials["conditions"].fillna(""))
+        else:
+            # Fallback: no conditions column → count all (backward compat)
+            relevant = np.ones(len(trials), dtype=bool)
+
+        counts = pd.DataFrame({
+            "drug": trials["drug_normalized"].to_numpy(),
+            "safety": safety.astype(np.int64),
+            "efficacy": (eff & relevant).astype(np.int64),
+            "efficacy_skipped": (eff & ~relevant).astype(np.int64),
+        }).groupby("drug", sort=False).sum()
+
+        # v2: Use log-saturating penalty to avoid over-penalizing well-studied drugs.
+        # Old formula (0.1 * safety + 0.05 * efficacy) was linear — drugs with many
+        # historical trials (aspirin, metformin) accumulated penalty proportional to
+        # their data volume, not their actual risk.
+        # log1p saturation: 1 stop→0.069, 3 stops→0.139, 10 stops→0.240
+        penalty = (0.1 * np.log1p(counts["safety"].to_numpy())
+                   + 0.05 * np.log1p(counts["efficacy"].to_numpy()))
+        self.trial = pd.Series(np.minimum(penalty, 1.0), index=counts.index)
+
+        n_skipped = int(counts["efficacy_skipped"].sum())
+        if n_skipped:
+            logger.debug("Skipped %d off-target efficacy stops (target=%s)",
+                         n_skipped, self.matcher.target_condition)
+        self._trials = trials
+        self._trial_groups = trials.groupby("drug_normalized", sort=False).indices
+
+    def trial_evidence(self, drug: str) -> list[dict]:
+        """药物的前 5 条试验明细"""
+        idx = self._trial_groups.get(drug.lower().strip())
+        if idx is None:
+            return []
+        has_conditions = "conditions" in self._trials.columns
+        evidence = []
+        for _, t in self._trials.iloc[idx[:TRIAL_EVIDENCE_N]].iterrows():
+            evidence.append({
+                "nctId": t.get("nctId", ""),
+                "status": t.get("overallStatus", ""),
+                "whyStopped": t.get("whyStopped", ""),
+                "conditions": t.get("conditions", ""),
+                "is_safety_stop": str(t.get("is_safety_stop", "0")) == "1",
+                "is_efficacy_stop": str(t.get("is_efficacy_stop", "0")) == "1",
+                "efficacy_relevant": self.matcher(str(t.get("conditions", ""))) if has_conditions else True,
+            })
+        return evidence
+
+    # ── 表型加成 ──
+
+    def _build_phenotype(self, phe_df: pd.DataFrame, phenotype_boost_w: float) -> None:
+        """v2 phenotype boost: use AVERAGE phenotype score (quality), not just count.
+
+        Old formula rewarded diseases with many phenotypes regardless of relevance.
+        New formula: boost = weight * mean(phenotype_scores) * log1p(n_pheno)
+        This rewards both having many phenotypes AND high-quality associations.
+        """
+        cap = self.phenotype_cap
+        top = phe_df.dropna(subset=["diseaseId"]).groupby("diseaseId", sort=False).head(cap)
+        scores = (top["score"].astype(float).to_numpy() if "score" in top.columns
+                  else np.zeros(len(top)))
+        codes, diseases = pd.factorize(top["diseaseId"])
+        rank = top.groupby("diseaseId", sort=False).cumcount().to_numpy()
+        total = _sequential_sum(codes, rank, scores, len(diseases), cap)
+        n_pheno = np.bincount(codes, minlength=len(diseases))
+        avg = total / np.maximum(n_pheno, 1)
+        self.phenotype_boost = pd.Series(phenotype_boost_w * avg * np.log1p(n_pheno), index=diseases)
+        self._phe_top = top
+        self._phe_groups = top.groupby("diseaseId", sort=False).indices
+
+    def phenotypes(self, disease_id: str) -> list[dict]:
+        """疾病的表型明细 (最多 phenotype_cap 条)"""
+        idx = self._phe_groups.get(disease_id)
+        if idx is None:
+            return []
+        return [
+            {"id": p.get("phenotypeId", ""), "name": p.get("phenotypeName", ""), "score": float(p.get("score", 0))}
+            for _, p in self._phe_top.iloc[idx].iterrows()
+        ]
+
+    # ── 持久化 (增量重排) ──
+
+    def to_frames(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        导出惩罚/加成表
+
+        Returns:
+            (drug, safety_penalty, trial_penalty), (diseaseId, phenotype_boost);
+            药物只出现在一张表中时另一列为 NaN (apply 时按 0 处理)
+        """
+        drugs = pd.concat({"safety_penalty": self.safety, "trial_penalty": self.trial}, axis=1)
+        drugs = drugs.rename_axis("drug").reset_index()
+        diseases = self.phenotype_boost.rename("phenotype_boost").rename_axis("diseaseId").reset_index()
+        return drugs, diseases
+
+    @classmethod
+    def from_frames(cls, drugs: pd.DataFrame, diseases: pd.DataFrame) -> "PenaltyTables":
+        """
+        由 to_frames 的输出恢复, 只用于 apply (证据明细为空, 需要时重新构建完整表)
+        """
+        obj = cls(None, None, None, has_prr=False, serious_keywords=[], min_prr=0.0,
+                  condition="", phenotype_cap=0, phenotype_boost_w=0.0)
+        obj.safety = drugs.set_index("drug")["safety_penalty"].dropna().astype(float)
+        obj.trial = drugs.set_index("drug")["trial_penalty"].dropna().astype(float)
+        obj.phenotype_boost = diseases.set_index("diseaseId")["phenotype_boost"].astype(float)
+        return obj
+
+    # ── 应用到 pair 表 ──
+
+    def apply(self, drugs: pd.Series, diseases: pd.Series, base_score: pd.Series,
+              safety_penalty_w: float, trial_penalty_w: float) -> pd.DataFrame:
+        """
+        计算每对的惩罚/加成与 final_score
+
+        Returns:
+            与 drugs 同索引的 DataFrame: safety_penalty, trial_penalty, risk_multiplier,
+            phenotype_boost, phenotype_multiplier, final_score (均已按原实现舍入)
+        """
+        key = drugs.str.lower().str.strip()
+        safety_pen = key.map(self.safety).fillna(0.0).to_numpy(dtype=float)
+        trial_pen = key.map(self.trial).fillna(0.0).to_numpy(dtype=float)
+        boost = diseases.map(self.phenotype_boost).fillna(0.0).to_numpy(dtype=float)
+
+        # Risk decay keeps score positive and monotonic w.r.t. penalties.
+        risk_multiplier = np.exp(-safety_penalty_w * safety_pen - trial_penalty_w * trial_pen)
+        phenotype_multiplier = 1.0 + boost
+        final_score = base_score.to_numpy(dtype=float) * risk_multiplier * phenotype_multiplier
+
+        # 舍入方式与逐行实现一致: Python float 用 round(), numpy 标量用 np.round
+        def _py_round(a: np.ndarray) -> list[float]:
+            return [round(float(x), 4) for x in a]
+
+        return pd.DataFrame({
+            "safety_penalty": _py_round(safety_pen),
+            "trial_penalty": np.round(trial_pen, 4),
+            "risk_multiplier": _py_round(risk_multiplier),
+            "phenotype_boost": _py_round(boost),
+            "phenotype_multiplier": _py_round(phenotype_multiplier),
+            "final_score": np.round(final_score, 4),
+        }, index=drugs.index)
@@ -16,32 +16,32 @@ Drug Repurposing Ranker — 完整可解释路径排名
   - drug_disease_rank.csv: 排序结果
   - evidence_paths.jsonl: 所有证据
   - evidence_pack/: 每对的完整证据包 JSON
+    (或 evidence_paths.idx.json / evidence_pack.sqlite, 见 rank.evidence_pack_format)
+  - rank_state/: 增量重排的组件哈希与中间表 (rank.incremental, 见 incremental.py)
 """
 from __future__ import annotations
 import hashlib
 import json
 from pathlib import Path
+from typing import Any
 
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 from ..config import Config, ensure_dir
-from ..utils import read_csv, write_jsonl, safe_str
+from ..evidence_pack import PACK_DIR, pack_filename, pack_key, write_evidence_packs
+from ..utils import get_table_format, read_csv, read_table, resolve_table, write_jsonl, write_table, safe_str
 from ..cache import HTTPCache
-from .dtpd import run_dtpd
+from .dtpd import path_record, run_dtpd
+from .incremental import DOWNSTREAM_RANK_KEYS, RankState, json_digest, pair_path_hashes
+from .penalties import PenaltyTables
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def _is_serious_ae(ae_term: str, serious_keywords: list[str]) -> bool:
-    """判断是否为严重不良事件"""
-    ae_lower = ae_term.lower()
-    return any(kw.lower() in ae_lower for kw in serious_keywords)
-
-
 def _build_drug_target_map(data_dir: Path) -> dict[str, list[dict]]:
     """Build drug → target list mapping from KG data files.
 
@@ -54,11 +54,11 @@ def _build_drug_target_map(data_dir: Path) -> dict[str, list[dict]]:
     nt_path = data_dir / "node_target.csv"
     xref_path = data_dir / "target_xref.csv"
 
-    if not dt_path.exists():
+    if resolve_table(dt_path) is None:
         logger.warning("edge_drug_target.csv not found, skipping target enrichment")
         return {}
 
-    dt = pd.read_csv(dt_path, dtype=str).fillna("")
+    dt = read_table(dt_path, typed=False).fillna("")
 
     # target_chembl_id → pref_name
     target_names: dict[str, str] = {}
@@ -167,45 +167,19 @@ def _generate_path_explanation(path_row) -> str:
     )
 
 
-def run_ranker(cfg: Config) -> dict[str, Path]:
-    """
-    运行排名: DTPD 基础分 + FAERS 安全 + 表型加成 + Bootstrap CI
-
-    Returns:
-        输出文件路径字典
-    """
-    # 先运行V3获取基础路径
-    run_dtpd(cfg)
-
-    output_dir = ensure_dir(cfg.output_dir)
+def _load_penalty_tables(cfg: Config, phenotype_cap: int, phenotype_boost_w: float) -> PenaltyTables:
+    """加载 FAERS / 试验 AE / 表型数据 (均可选) 并预计算惩罚/加成表"""
     data_dir = cfg.data_dir
-    rank_cfg = cfg.rank
-
-    # 加载配置参数 (范围校验: 权重必须在 [0, 1])
-    safety_penalty_w = max(0.0, min(1.0, float(rank_cfg.get("safety_penalty_weight", 0.3))))
-    trial_penalty_w = max(0.0, min(1.0, float(rank_cfg.get("trial_failure_penalty", 0.2))))
-    phenotype_boost_w = max(0.0, min(1.0, float(rank_cfg.get("phenotype_overlap_boost", 0.1))))
-    phenotype_cap = int(cfg.phenotype.get("max_phenotypes_per_disease", 10))
-    serious_ae_kw = cfg.serious_ae_keywords
-    min_prr = float(cfg.faers.get("min_prr", 0))
-
-    # 加载V3结果
-    pair_dtpd = read_csv(output_dir / "dtpd_rank.csv", dtype=str)
-    ev_jsonl = output_dir / "dtpd_paths.jsonl"
-    if ev_jsonl.exists() and ev_jsonl.stat().st_size > 0:
-        paths_dtpd = pd.read_json(ev_jsonl, lines=True)
-    else:
-        paths_dtpd = pd.DataFrame(columns=["drug", "diseaseId", "path_score", "nodes", "edges"])
 
     # 加载FAERS数据 (可选)
     ae_df = None
     has_prr = False
-    ae_path = data_dir / "edge_drug_ae_faers.csv"
-    if ae_path.exists() and ae_path.stat().st_size > 10:
-        ae_df = read_csv(ae_path, dtype=str)
-        ae_df["report_count"] = pd.to_numeric(ae_df["report_count"], errors="coerce").fillna(0)
+    ae_path = resolve_table(data_dir / "edge_drug_ae_faers.csv")
+    if ae_path is not None and ae_path.stat().st_size > 10:
+        ae_df = read_table(data_dir / "edge_drug_ae_faers.csv")
+        ae_df["report_count"] = ae_df["report_count"].fillna(0)
         if "prr" in ae_df.columns:
-            ae_df["prr"] = pd.to_numeric(ae_df["prr"], errors="coerce").fillna(0.0)
+            ae_df["prr"] = ae_df["prr"].fillna(0.0)
             has_prr = True
 
     # 加载表型数据 (可选)
@@ -220,223 +194,205 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
     if trial_path.exists() and trial_path.stat().st_size > 1:
         trial_ae_df = read_csv(trial_path, dtype=str)
 
-    def calc_safety_penalty(drug: str) -> tuple[float, list[dict]]:
-        """计算安全惩罚 (PRR-driven, report_count 仅做置信度加权)
-
-        v2 rationale: Old formula used log1p(report_count) as the penalty
-        base, which over-penalised well-studied drugs (aspirin, metformin)
-        simply because they had more FAERS exposure years.  PRR already
-        normalises for background reporting rate, so it should drive the
-        penalty magnitude.  report_count is kept as a *confidence* weight:
-        a PRR=5 signal from 3 reports is less trustworthy than from 300.
-        """
-        if ae_df is None:
-            return 0.0, []
-        # v2 FIX: lowercase the drug name for FAERS lookup (ae_df stores lowercased names)
-        drug_aes = ae_df[ae_df["drug_normalized"] == str(drug).lower().strip()]
-        if drug_aes.empty:
-            return 0.0, []
-
-        penalty = 0.0
-        ae_evidence = []
-        # Sort by PRR DESC (strongest signals first) for top-10 selection
-        sort_col = "prr" if has_prr else "report_count"
-        for _, ae in drug_aes.sort_values(sort_col, ascending=False).head(10).iterrows():
-            term = ae.get("ae_term", "")
-            count = float(ae.get("report_count", 0))
-            prr = float(ae.get("prr", 0)) if has_prr else 0.0
-            is_serious = _is_serious_ae(term, serious_ae_kw)
-
-            # PRR 信号门槛: 低于阈值的不视为真实信号，跳过
-            if has_prr and min_prr > 0 and prr < min_prr:
-                continue
+    # 惩罚/加成按药物、疾病一次性预计算, 再映射回 pair 表
+    return PenaltyTables(
+        ae_df, trial_ae_df, phe_df,
+        has_prr=has_prr,
+        serious_keywords=cfg.serious_ae_keywords,
+        min_prr=float(cfg.faers.get("min_prr", 0)),
+        condition=cfg.condition.lower().strip(),
+        phenotype_cap=phenotype_cap,
+        phenotype_boost_w=phenotype_boost_w,
+    )
 
-            if has_prr and prr > 0:
-                # PRR-driven penalty:
-                #   log1p(PRR) / 5  maps  PRR=2 → 0.22,  PRR=10 → 0.48,  PRR=50 → 0.78
-                # Confidence weight: saturates quickly so count doesn't dominate
-                #   min(1.0, log1p(count) / log1p(100))  →  count=3: 0.30, count=100: 1.0
-                confidence = min(1.0, np.log1p(count) / np.log1p(100))
-                ae_penalty = (np.log1p(prr) / 5.0) * confidence
-            else:
-                # Fallback when PRR is unavailable: mild count-based penalty
-                ae_penalty = np.log1p(count) / 20.0
-
-            if is_serious:
-                ae_penalty *= 2.0
-            penalty += ae_penalty
-
-            ae_evidence.append({
-                "ae_term": term,
-                "report_count": int(count),
-                "prr": round(prr, 4),
-                "is_serious": is_serious,
-            })
 
-        # v2 FIX: Use CUMULATIVE penalty with saturation, NOT averaging.
-        # Rationale: averaging masked multi-toxicity profiles — a drug with
-        # 10 serious AEs was penalized the same as one with 1 AE of identical PRR.
-        # Now: cumulative sum, capped at 1.0 via tanh for smooth saturation.
-        # tanh maps: penalty=0.5→0.46, 1.0→0.76, 2.0→0.96, 3.0→0.995
-        return min(float(np.tanh(penalty)), 1.0), ae_evidence
-
-    # Target disease condition for filtering disease-relevant efficacy stops
-    target_condition = cfg.condition.lower().strip()
-
-    def _trial_condition_matches(conditions_str: str) -> bool:
-        """Check if any trial condition is relevant to the target disease.
-
-        v2: Uses word-boundary matching instead of bi-directional substring.
-        Old bi-directional substring was too permissive:
-        - "heart" matched any cardiac condition
-        - "failure" matched any trial with "failure" in its name
-        Now: target_condition must appear as a whole-word match within the
-        trial condition string, or vice versa for multi-word conditions.
-        """
-        import re
-        if not conditions_str:
-            return False
-        # Build regex pattern with word boundaries
-        target_pattern = re.compile(r'\b' + re.escape(target_condition) + r'\b', re.IGNORECASE)
-        for cond in conditions_str.split("|"):
-            cond_lower = cond.strip().lower()
-            if not cond_lower:
-                continue
-            # Target condition found as whole word(s) in trial condition
-            if target_pattern.search(cond_lower):
-                return True
-            # Trial condition found as whole word(s) in target condition
-            # (for cases like trial="heart failure", target="congestive heart failure")
-            cond_pattern = re.compile(r'\b' + re.escape(cond_lower) + r'\b', re.IGNORECASE)
-            if len(cond_lower) >= 5 and cond_pattern.search(target_condition):
-                return True
-        return False
-
-    def calc_trial_penalty(drug: str) -> tuple[float, list[dict]]:
-        """计算试验失败惩罚 (v2: efficacy stops 仅计入目标疾病相关)
-
-        Rationale: drug repurposing 的意义就是在新适应症上试，一个药在
-        适应症 A 上 efficacy failure 不应该惩罚它在适应症 B 上的得分。
-        但 safety stops 是跨适应症通用的 (肝毒性在任何适应症都是风险)。
-        """
-        if trial_ae_df is None:
-            return 0.0, []
-        drug_trials = trial_ae_df[trial_ae_df["drug_normalized"] == drug.lower().strip()]
-        if drug_trials.empty:
-            return 0.0, []
-
-        # Safety stops: count ALL (safety risk is indication-agnostic)
-        safety_stops = len(drug_trials[drug_trials["is_safety_stop"].astype(str) == "1"])
-
-        # Efficacy stops: only count trials whose condition matches target disease
-        has_conditions = "conditions" in drug_trials.columns
-        if has_conditions:
-            eff_mask = drug_trials["is_efficacy_stop"].astype(str) == "1"
-            relevant_mask = drug_trials["conditions"].fillna("").apply(_trial_condition_matches)
-            efficacy_stops = int((eff_mask & relevant_mask).sum())
-            efficacy_stops_skipped = int(eff_mask.sum()) - efficacy_stops
-        else:
-            # Fallback: no conditions column → count all (backward compat)
-            efficacy_stops = len(drug_trials[drug_trials["is_efficacy_stop"].astype(str) == "1"])
-            efficacy_stops_skipped = 0
-
-        # v2: Use log-saturating penalty to avoid over-penalizing well-studied drugs.
-        # Old formula (0.1 * safety + 0.05 * efficacy) was linear — drugs with many
-        # historical trials (aspirin, metformin) accumulated penalty proportional to
-        # their data volume, not their actual risk.
-        # log1p saturation: 1 stop→0.069, 3 stops→0.139, 10 stops→0.240
-        penalty = 0.1 * np.log1p(safety_stops) + 0.05 * np.log1p(efficacy_stops)
-
-        trial_evidence = []
-        for _, t in drug_trials.head(5).iterrows():
-            trial_evidence.append({
-                "nctId": t.get("nctId", ""),
-                "status": t.get("overallStatus", ""),
-                "whyStopped": t.get("whyStopped", ""),
-                "conditions": t.get("conditions", ""),
-                "is_safety_stop": str(t.get("is_safety_stop", "0")) == "1",
-                "is_efficacy_stop": str(t.get("is_efficacy_stop", "0")) == "1",
-                "efficacy_relevant": _trial_condition_matches(str(t.get("conditions", ""))) if has_conditions else True,
-            })
+def _incremental_uncertainty(
+    state: RankState,
+    rank_df: pd.DataFrame,
+    paths_dtpd: pd.DataFrame,
+    path_hashes: dict[tuple[str, str], str],
+    n_jobs: int,
+    bootstrap: dict[str, Any],
+) -> pd.DataFrame:
+    """
+    只为路径哈希变化或新进入 Top-K 的对重算 Bootstrap CI, 其余读 rank_state/pair_ci.csv.
 
-        if efficacy_stops_skipped > 0:
-            logger.debug("Drug %s: skipped %d off-target efficacy stops (target=%s)",
-                         drug, efficacy_stops_skipped, target_condition)
+    bootstrap 为 add_uncertainty_to_ranking 的参数 (n_bootstrap / ci / seed), 同时计入缓存键.
+    """
+    from .uncertainty import add_uncertainty_to_ranking
+
+    keys = ["drug_normalized", "diseaseId"]
+    ci_cols = ["ci_lower", "ci_upper", "ci_width", "confidence_tier", "n_evidence_paths"]
+    ci_key = state.key([], bootstrap)
+    pairs = rank_df[keys].reset_index(drop=True)
+    pairs["paths_hash"] = [path_hashes.get((d.lower().strip(), s.strip()), "none")
+                           for d, s in zip(pairs["drug_normalized"], pairs["diseaseId"])]
+
+    prev = None
+    if state.reusable("uncertainty", ci_key, [state.table_path("pair_ci")]):
+        prev = state.load_table("pair_ci", keys + ["paths_hash", "confidence_tier"])
+    parts = []
+    hit = np.zeros(len(pairs), dtype=bool)
+    if prev is not None:
+        cached = pairs.merge(prev, on=keys + ["paths_hash"], how="left")
+        hit = cached["ci_lower"].notna().to_numpy()
+        parts.append(cached.loc[hit, keys + ci_cols])
+    todo = rank_df.loc[~hit, keys]
+    if len(todo):
+        want = set(zip(todo["drug_normalized"].str.lower().str.strip(), todo["diseaseId"].str.strip()))
+        sel = [(str(d).lower().strip(), str(s).strip()) in want
+               for d, s in zip(paths_dtpd["drug"], paths_dtpd["diseaseId"])]
+        ev_records = paths_dtpd.loc[sel, ["drug", "diseaseId", "path_score"]].to_dict("records")
+        parts.append(add_uncertainty_to_ranking(todo, ev_records, n_jobs=n_jobs, **bootstrap)[keys + ci_cols])
+
+    ci_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=keys + ci_cols)
+    result_df = rank_df.merge(ci_df, on=keys, how="left")
+    result_df["n_evidence_paths"] = result_df["n_evidence_paths"].astype(int)
+
+    ci_path = state.save_table("pair_ci", pd.concat([pairs, result_df[ci_cols]], axis=1))
+    n_reused = int(hit.sum())
+    state.commit("uncertainty", ci_key, [ci_path],
+                 status="reused" if not len(todo) else ("partial" if n_reused else "recomputed"),
+                 reused=n_reused, recomputed=int(len(todo)))
+    return result_df
+
+
+def run_ranker(cfg: Config, full: bool = False) -> dict[str, Path]:
+    """
+    运行排名: DTPD 基础分 + FAERS 安全 + 表型加成 + Bootstrap CI
 
-        return min(penalty, 1.0), trial_evidence
+    rank.incremental (默认开启) 时各组件的输入哈希与中间表保存在 output/rank_state/,
+    重跑只重算输入变化的组件 (见 rankers/incremental.py).
 
-    def get_phenotypes(disease_id: str) -> list[dict]:
-        """获取疾病表型"""
-        if phe_df is None:
-            return []
-        disease_phes = phe_df[phe_df["diseaseId"] == disease_id]
-        return [
-            {"id": p.get("phenotypeId", ""), "name": p.get("phenotypeName", ""), "score": float(p.get("score", 0))}
-            for _, p in disease_phes.head(phenotype_cap).iterrows()
-        ]
+    Args:
+        cfg: 配置
+        full: 忽略已有 rank_state, 全部重算 (仍写出新的 rank_state)
 
-    # ===== Pass 1: compute scores for ALL pairs =====
-    final_rows = []
+    Returns:
+        输出文件路径字典
+    """
+    output_dir = ensure_dir(cfg.output_dir)
+    data_dir = cfg.data_dir
+    rank_cfg = cfg.rank
+    files = cfg.files
+    state = RankState(output_dir, reset=full) if cfg.rank_incremental else None
+    ev_jsonl = output_dir / "dtpd_paths.jsonl"
+    sparse = cfg.dtpd_engine == "sparse"
+
+    # ===== DTPD 基础路径 (mechanism) =====
+    # sparse 引擎只写 dtpd_rank.csv, 证据路径在 Top-K 截断后按需提取
+    def _mechanism_outputs() -> list[Path | None]:
+        return [resolve_table(output_dir / "dtpd_rank.csv")] + ([] if sparse else [ev_jsonl])
+
+    mech_key = ""
+    if state is not None:
+        mech_key = state.key(
+            [resolve_table(data_dir / files.get("drug_target", "edge_drug_target.csv")),
+             resolve_table(data_dir / files.get("target_pathway", "edge_target_pathway_all.csv")),
+             resolve_table(data_dir / files.get("pathway_disease", "edge_pathway_disease.csv")),
+             data_dir / "edge_drug_target_affinity.csv"],
+            {"engine": cfg.dtpd_engine, "table_format": get_table_format(), "files": files,
+             "rank": {k: v for k, v in rank_cfg.items() if k not in DOWNSTREAM_RANK_KEYS}},
+        )
+    dtpd_engine = None
+    if state is not None and state.reusable("mechanism", mech_key, _mechanism_outputs()):
+        logger.info("DTPD 输入未变化, 复用 dtpd_rank (跳过路径枚举)")
+        mech_status = "reused"
+    else:
+        if sparse:
+            from .dtpd_sparse import run_dtpd_sparse
+            _, dtpd_engine = run_dtpd_sparse(cfg)
+        else:
+            run_dtpd(cfg)
+        mech_status = "recomputed"
+    if state is not None:
+        state.commit("mechanism", mech_key, _mechanism_outputs(), status=mech_status)
 
-    # Cache penalties per drug to avoid redundant computation
-    _safety_cache: dict[str, tuple[float, list[dict]]] = {}
-    _trial_cache: dict[str, tuple[float, list[dict]]] = {}
-    _pheno_cache: dict[str, list[dict]] = {}
+    # 加载配置参数 (范围校验: 权重必须在 [0, 1])
+    safety_penalty_w = max(0.0, min(1.0, float(rank_cfg.get("safety_penalty_weight", 0.3))))
+    trial_penalty_w = max(0.0, min(1.0, float(rank_cfg.get("trial_failure_penalty", 0.2))))
+    phenotype_boost_w = max(0.0, min(1.0, float(rank_cfg.get("phenotype_overlap_boost", 0.1))))
+    phenotype_cap = int(cfg.phenotype.get("max_phenotypes_per_disease", 10))
 
-    for _, pr in tqdm(pair_dtpd.iterrows(), total=len(pair_dtpd), desc="Ranking"):
-        drug = safe_str(pr.get("drug_normalized"))
-        disease_id = safe_str(pr.get("diseaseId"))
-        disease_name = safe_str(pr.get("diseaseName"))
-        base_score = float(pd.to_numeric(pr.get("final_score", 0), errors="coerce") or 0)
-
-        # Cached penalty lookups
-        if drug not in _safety_cache:
-            _safety_cache[drug] = calc_safety_penalty(drug)
-        if drug not in _trial_cache:
-            _trial_cache[drug] = calc_trial_penalty(drug)
-        if disease_id not in _pheno_cache:
-            _pheno_cache[disease_id] = get_phenotypes(disease_id)
-
-        safety_pen = _safety_cache[drug][0]
-        trial_pen = _trial_cache[drug][0]
-        phenotypes = _pheno_cache[disease_id]
-
-        # Risk decay keeps score positive and monotonic w.r.t. penalties.
-        risk_multiplier = np.exp(-safety_penalty_w * safety_pen - trial_penalty_w * trial_pen)
-
-        # v2 phenotype boost: use AVERAGE phenotype score (quality), not just count.
-        # Old formula rewarded diseases with many phenotypes regardless of relevance.
-        # New formula: boost = weight * mean(phenotype_scores) * log1p(n_pheno)
-        # This rewards both having many phenotypes AND high-quality associations.
-        if phenotypes:
-            n_pheno = min(len(phenotypes), phenotype_cap)
-            pheno_scores = [float(p.get("score", 0)) for p in phenotypes[:n_pheno]]
-            avg_pheno_score = sum(pheno_scores) / max(len(pheno_scores), 1)
-            phenotype_boost = phenotype_boost_w * avg_pheno_score * np.log1p(n_pheno)
-        else:
-            phenotype_boost = 0.0
-        phenotype_multiplier = 1.0 + phenotype_boost
-        final_score = base_score * risk_multiplier * phenotype_multiplier
-
-        final_rows.append({
-            "drug_normalized": drug,
-            "diseaseId": disease_id,
-            "diseaseName": disease_name,
-            "mechanism_score": base_score,
-            "safety_penalty": round(safety_pen, 4),
-            "trial_penalty": round(trial_pen, 4),
-            "risk_multiplier": round(float(risk_multiplier), 4),
-            "phenotype_boost": round(float(phenotype_boost), 4),
-            "phenotype_multiplier": round(float(phenotype_multiplier), 4),
-            "final_score": round(final_score, 4),
-        })
+    # 加载V3结果
+    pair_dtpd = read_table(output_dir / "dtpd_rank.csv")
+    if not sparse and ev_jsonl.exists() and ev_jsonl.stat().st_size > 0:
+        paths_dtpd = pd.read_json(ev_jsonl, lines=True)
+    else:
+        paths_dtpd = pd.DataFrame(columns=["drug", "diseaseId", "path_score", "nodes", "edges"])
+
+    # ===== Pass 1: compute scores for ALL pairs =====
+    # 惩罚表输入未变化时直接读 rank_state 中的表; 证据明细 (完整表) 只在需要重写证据包时构建
+    penalty_names = ["penalties_drug", "penalties_disease", "evidence_drug", "evidence_disease"]
+    pen_key = ""
+    full_tables: PenaltyTables | None = None
+    if state is not None:
+        pen_key = state.key(
+            [resolve_table(data_dir / "edge_drug_ae_faers.csv"),
+             data_dir / "edge_trial_ae.csv", data_dir / "edge_disease_phenotype.csv"],
+            {"serious_keywords": cfg.serious_ae_keywords, "min_prr": float(cfg.faers.get("min_prr", 0)),
+             "condition": cfg.condition.lower().strip(), "phenotype_cap": phenotype_cap,
+             "phenotype_boost_w": phenotype_boost_w},
+        )
+    if state is not None and state.reusable("penalties", pen_key, [state.table_path(n) for n in penalty_names]):
+        tables = PenaltyTables.from_frames(state.load_table("penalties_drug", ["drug"]),
+                                           state.load_table("penalties_disease", ["diseaseId"]))
+        pen_status = "reused"
+    else:
+        tables = full_tables = _load_penalty_tables(cfg, phenotype_cap, phenotype_boost_w)
+        pen_status = "recomputed"
+        if state is not None:
+            drug_pen, disease_pen = tables.to_frames()
+            state.save_table("penalties_drug", drug_pen)
+            state.save_table("penalties_disease", disease_pen)
+
+    def _evidence_tables() -> PenaltyTables:
+        nonlocal full_tables
+        if full_tables is None:
+            full_tables = _load_penalty_tables(cfg, phenotype_cap, phenotype_boost_w)
+        return full_tables
+
+    drugs = pair_dtpd["drug_normalized"].map(safe_str)
+    disease_ids = pair_dtpd["diseaseId"].map(safe_str)
+    base_scores = pair_dtpd["final_score"]
+    scored = tables.apply(drugs, disease_ids, base_scores, safety_penalty_w, trial_penalty_w)
+    final_df = pd.concat([
+        pd.DataFrame({
+            "drug_normalized": drugs,
+            "diseaseId": disease_ids,
+            "diseaseName": pair_dtpd["diseaseName"].map(safe_str),
+            "mechanism_score": base_scores,
+        }),
+        scored,
+    ], axis=1)
+    logger.info("Ranking: %d pairs, %d drugs", len(final_df), drugs.nunique())
 
     # ===== Top-K filtering =====
-    final_df = pd.DataFrame(final_rows)
     final_df = final_df.sort_values(["drug_normalized", "final_score"], ascending=[True, False])
     topk = int(rank_cfg.get("topk_pairs_per_drug", 50))
     final_df = final_df.groupby("drug_normalized", as_index=False).head(topk)
 
+    if sparse:
+        # 存活对 (及顺序) 与 DTPD 结果都未变化时复用上次提取的证据路径
+        paths_key = ""
+        if state is not None:
+            paths_key = state.key([], {"mechanism": mech_key, "k": cfg.topk_paths_per_pair,
+                                       "pairs": final_df[["drug_normalized", "diseaseId"]].values.tolist()})
+        if dtpd_engine is None and state is not None and state.reusable("paths", paths_key, [ev_jsonl]):
+            paths_status = "reused"
+        else:
+            if dtpd_engine is None:
+                from .dtpd_sparse import SparseDTPD
+                dtpd_engine = SparseDTPD.from_config(cfg)
+            top_paths = dtpd_engine.topk_paths(final_df[["drug_normalized", "diseaseId"]], cfg.topk_paths_per_pair)
+            write_jsonl(ev_jsonl, [path_record(r) for _, r in top_paths.iterrows()])
+            logger.info("Sparse DTPD: 为 %d 个存活对提取 %d 条证据路径", len(final_df), len(top_paths))
+            paths_status = "recomputed"
+        if ev_jsonl.stat().st_size > 0:
+            paths_dtpd = pd.read_json(ev_jsonl, lines=True)
+        if state is not None:
+            state.commit("paths", paths_key, [ev_jsonl], status=paths_status)
+
     # ===== Join trial info for user context =====
     summ_path = data_dir / "failed_drugs_summary.csv"
     if summ_path.exists() and summ_path.stat().st_size > 1:
@@ -523,15 +479,34 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
             ).rename(columns={"canonical_name": "drug_normalized"})
             final_df = final_df.merge(sig_agg, on="drug_normalized", how="left")
 
+    # 排序结果始终导出 CSV (LLM+RAG / dashboard 读取); table_format=parquet 时另存带类型的 .parquet
     out_csv = output_dir / "drug_disease_rank.csv"
-    final_df.to_csv(out_csv, index=False)
+    write_table(final_df, out_csv, keep_csv=True)
+
+    # (drug 小写, disease) → 路径内容哈希: CI 与证据包按对判断是否需要重算
+    path_hashes: dict[tuple[str, str], str] = {}
+    if state is not None and len(paths_dtpd):
+        lines = [line for line in ev_jsonl.read_bytes().splitlines() if line.strip()]
+        if len(lines) != len(paths_dtpd):
+            lines = [json.dumps(r, ensure_ascii=False, default=str).encode("utf-8")
+                     for r in paths_dtpd.to_dict("records")]
+        path_hashes = pair_path_hashes(lines, paths_dtpd["drug"], paths_dtpd["diseaseId"])
 
     # ===== G1: Add uncertainty quantification (Bootstrap CI) =====
     try:
-        from .uncertainty import add_uncertainty_to_ranking
-        ev_records = paths_dtpd[["drug", "diseaseId", "path_score"]].to_dict("records")
-        final_df = add_uncertainty_to_ranking(final_df, ev_records)
-        final_df.to_csv(out_csv, index=False)
+        n_jobs = int(rank_cfg.get("uncertainty_workers", 1))
+        bootstrap = {
+            "n_bootstrap": int(rank_cfg.get("uncertainty_bootstrap", 1000)),
+            "ci": float(rank_cfg.get("uncertainty_ci", 0.95)),
+            "seed": int(rank_cfg.get("uncertainty_seed", 42)),
+        }
+        if state is not None:
+            final_df = _incremental_uncertainty(state, final_df, paths_dtpd, path_hashes, n_jobs, bootstrap)
+        else:
+            from .uncertainty import add_uncertainty_to_ranking
+            ev_records = paths_dtpd[["drug", "diseaseId", "path_score"]].to_dict("records")
+            final_df = add_uncertainty_to_ranking(final_df, ev_records, n_jobs=n_jobs, **bootstrap)
+        write_table(final_df, out_csv, keep_csv=True)
         logger.info("Uncertainty quantification added: %d pairs", len(final_df))
     except Exception as e:
         logger.warning("Uncertainty quantification skipped: %s", e)
@@ -541,7 +516,50 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
         final_df["drug_normalized"].astype(str) + "||" + final_df["diseaseId"].astype(str)
     )
 
+    # (drug, disease) → 路径行号, 一次分组代替每对一次全表布尔过滤; 组内保持文件顺序
+    path_index = paths_dtpd.groupby(["drug", "diseaseId"], sort=False).indices if len(paths_dtpd) else {}
+    path_rows = paths_dtpd.to_dict("records")
+    topk_paths = int(rank_cfg.get("topk_paths_per_pair", 10))
+    ev_path = output_dir / "evidence_paths.jsonl"
+    ep_fmt = cfg.evidence_pack_format
+
+    # 增量: 证据包指纹 = 分数 + 药物/疾病证据明细哈希 + 路径哈希; 指纹不变的包从上次
+    # evidence_paths.jsonl 原样读回, 只有变化的包重新构建 (files 格式下也只重写这些文件)
+    drug_ev: dict[str, str] = {}
+    disease_ev: dict[str, str] = {}
+    prev_packs: dict[tuple[str, str], tuple[str, int]] = {}
+    prev_lines: list[bytes] = []
+    pack_state_key = ""
+    if state is not None:
+        if pen_status == "reused":
+            for name, col, target in (("evidence_drug", "drug_normalized", drug_ev),
+                                      ("evidence_disease", "diseaseId", disease_ev)):
+                t = state.load_table(name, [col, "evidence_hash"])
+                target.update(zip(t[col], t["evidence_hash"]))
+        for drug in final_df["drug_normalized"].unique():
+            if drug not in drug_ev:
+                et = _evidence_tables()
+                drug_ev[drug] = json_digest([et.safety_evidence(drug), et.trial_evidence(drug)])
+        for disease_id in final_df["diseaseId"].unique():
+            if disease_id not in disease_ev:
+                disease_ev[disease_id] = json_digest(_evidence_tables().phenotypes(disease_id))
+        state.save_table("evidence_drug", pd.DataFrame(
+            {"drug_normalized": list(drug_ev), "evidence_hash": list(drug_ev.values())}))
+        state.save_table("evidence_disease", pd.DataFrame(
+            {"diseaseId": list(disease_ev), "evidence_hash": list(disease_ev.values())}))
+        state.commit("penalties", pen_key, [state.table_path(n) for n in penalty_names], status=pen_status)
+
+        pack_state_key = state.key([], {"format": ep_fmt, "topk_paths": topk_paths})
+        if state.reusable("evidence_packs", pack_state_key, [state.table_path("packs"), ev_path]):
+            t = state.load_table("packs", ["drug_normalized", "diseaseId", "pack_hash"])
+            prev_lines = ev_path.read_bytes().splitlines()
+            if len(prev_lines) == len(t):
+                prev_packs = {(d, s): (h, i) for i, (d, s, h) in
+                              enumerate(zip(t["drug_normalized"], t["diseaseId"], t["pack_hash"]))}
+
     evidence_packs = []
+    pack_hashes: list[str] = []
+    changed: set[str] = set()
     for _, pr in tqdm(final_df.iterrows(), total=len(final_df), desc="Evidence packs"):
         drug = safe_str(pr.get("drug_normalized"))
         disease_id = safe_str(pr.get("diseaseId"))
@@ -551,11 +569,25 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
         safety_pen = float(pr.get("safety_penalty", 0))
         trial_pen = float(pr.get("trial_penalty", 0))
 
-        ae_evidence = _safety_cache.get(drug, (0.0, []))[1]
-        trial_evidence = _trial_cache.get(drug, (0.0, []))[1]
-        phenotypes = _pheno_cache.get(disease_id, [])
+        if state is not None:
+            fingerprint = json_digest([
+                drug, disease_id, disease_name, base_score, final_score, safety_pen, trial_pen,
+                drug_ev.get(drug, ""), disease_ev.get(disease_id, ""),
+                path_hashes.get((drug.lower().strip(), disease_id.strip()), "none"),
+            ])
+            pack_hashes.append(fingerprint)
+            prev = prev_packs.get((drug, disease_id))
+            if prev is not None and prev[0] == fingerprint and (
+                ep_fmt != "files" or (output_dir / PACK_DIR / pack_filename(drug, disease_id)).exists()
+            ):
+                evidence_packs.append(json.loads(prev_lines[prev[1]]))
+                continue
+            changed.add(pack_key(drug, disease_id))
 
-        sub_paths = paths_dtpd[(paths_dtpd["drug"] == drug) & (paths_dtpd["diseaseId"] == disease_id)]
+        ev_tables = tables if state is None else _evidence_tables()
+        ae_evidence = ev_tables.safety_evidence(drug)
+        trial_evidence = ev_tables.trial_evidence(drug)
+        phenotypes = ev_tables.phenotypes(disease_id)
 
         pack = {
             "drug": drug,
@@ -572,7 +604,8 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
             "phenotypes": phenotypes,
         }
 
-        for _, row in sub_paths.head(int(rank_cfg.get("topk_paths_per_pair", 10))).iterrows():
+        for i in path_index.get((drug, disease_id), ())[:topk_paths]:
+            row = path_rows[i]
             pack["explainable_paths"].append({
                 "type": "DTPD",
                 "path_score": float(row.get("path_score", 0)),
@@ -583,21 +616,26 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
 
         evidence_packs.append(pack)
 
-    ev_path = output_dir / "evidence_paths.jsonl"
     write_jsonl(ev_path, evidence_packs)
+    ep_store = write_evidence_packs(
+        output_dir, evidence_packs, fmt=ep_fmt, max_workers=cfg.evidence_pack_workers,
+        changed=changed if state is not None else None,
+    )
 
-    ep_dir = ensure_dir(output_dir / "evidence_pack")
-    # Clear stale packs from previous runs to keep directory in sync with current ranking.
-    for old_pack in ep_dir.glob("*.json"):
-        try:
-            old_pack.unlink()
-        except OSError as e:
-            logger.warning("无法删除旧 evidence pack: %s (%s)", old_pack.name, e)
-    for pack in evidence_packs:
-        safe = (pack["drug"] + "__" + pack["disease"]["id"]).replace("/", "_").replace(":", "_")
-        (ep_dir / f"{safe}.json").write_text(
-            json.dumps(pack, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+    state_path = None
+    if state is not None:
+        packs_path = state.save_table("packs", pd.DataFrame({
+            "drug_normalized": final_df["drug_normalized"].to_numpy(),
+            "diseaseId": final_df["diseaseId"].to_numpy(),
+            "pack_hash": pack_hashes,
+        }))
+        n_rewritten = len(changed)
+        n_reused = len(evidence_packs) - n_rewritten
+        state.commit("evidence_packs", pack_state_key, [packs_path, ev_path],
+                     status="reused" if not n_rewritten else ("partial" if n_reused else "recomputed"),
+                     reused=n_reused, rewritten=n_rewritten)
+        state_path = state.save()
+        logger.info("增量排序组件: %s", state.summary())
 
     # ===== Generate bridge CSV for LLM+RAG =====
     def _stable_drug_id(name: str) -> str:
@@ -672,9 +710,13 @@ def run_ranker(cfg: Config) -> dict[str, Path]:
     bridge_path = output_dir / "bridge_repurpose_cross.csv"
     bridge_df.to_csv(bridge_path, index=False)
 
-    return {
+    result = {
         "rank_csv": out_csv,
         "evidence_paths": ev_path,
-        "evidence_pack_dir": ep_dir,
+        "evidence_pack_dir": output_dir / "evidence_pack",
+        "evidence_pack_store": ep_store,
         "bridge_csv": bridge_path,
     }
+    if state_path is not None:
+        result["rank_state"] = state_path
+    return result
@@ -8,6 +8,9 @@ Usage:
     ci = bootstrap_ci([0.8, 0.5, 0.3, 0.9], n_bootstrap=1000)
     print(f"Score: {ci['mean']:.3f} [{ci['ci_lower']:.3f}, {ci['ci_upper']:.3f}]")
     print(f"Confidence: {assign_confidence_tier(ci['ci_width'])}")
+
+    # Many pairs at once: one (n_bootstrap × K) index matrix per unit count K
+    results = batch_bootstrap_ci([[[0.8, 0.5]], [[0.3], [0.9, 0.4]]], n_jobs=4)
 """
 from __future__ import annotations
 
@@ -21,6 +24,165 @@ import pandas as pd
 logger = logging.getLogger(__name__)
 
 
+# 单批 gather (pairs × n_bootstrap × n) 的元素上限, 约 32 MB float64
+_MAX_GATHER = 1 << 22
+# 进程池模式下每个任务的 pair 数
+_POOL_CHUNK = 256
+
+
+def resample_indices(n: int, n_bootstrap: int, seed: int) -> np.ndarray:
+    """Draw all resample indices at once as an (n_bootstrap × n) matrix.
+
+    ``RandomState.choice(n, size=n, replace=True)`` is ``randint(0, n, n)``,
+    and MT19937 draws are consumed sequentially, so row i equals the i-th
+    ``rng.choice`` of the former per-iteration loop with the same seed.
+    """
+    return np.random.RandomState(seed).randint(0, n, size=(n_bootstrap, n))
+
+
+def _resample_counts(idx: np.ndarray) -> np.ndarray:
+    """(n_bootstrap × K) matrix: how often each unit is drawn in each resample."""
+    n_boot, k = idx.shape
+    flat = (idx + (np.arange(n_boot) * k)[:, None]).ravel()
+    return np.bincount(flat, minlength=n_boot * k).reshape(n_boot, k).astype(float)
+
+
+def _profile_bounds(
+    units: list,
+    block: bool,
+    n_bootstrap: int,
+    ci: float,
+    seed: int,
+    agg_fn: str,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Bootstrap CI bounds for a batch of pairs sharing one profile.
+
+    All pairs in ``units`` have the same number of resampling units K, so
+    they share a single index matrix.
+
+    Args:
+        units: path mode — (P × K) score array;
+               block mode — P lists of K per-group score arrays
+        block: True → resample groups (block bootstrap), False → resample paths
+
+    Returns:
+        (lower, upper) arrays of length P
+    """
+    n_pairs = len(units)
+    k = len(units[0])
+    idx = resample_indices(k, n_bootstrap, seed)
+
+    if not block:
+        values = np.asarray(units, dtype=float)
+        boot = np.empty((n_pairs, n_bootstrap), dtype=float)
+        step = max(1, _MAX_GATHER // (n_bootstrap * k))
+        for s in range(0, n_pairs, step):
+            sample = values[s:s + step][:, idx]  # (p, n_bootstrap, K)
+            boot[s:s + step] = sample.mean(axis=2) if agg_fn == "mean" else np.median(sample, axis=2)
+    elif agg_fn == "mean":
+        # 组和 / 组大小 × 抽中次数矩阵: 无需逐轮拼接
+        counts = _resample_counts(idx)
+        sums = np.array([[g.sum() for g in groups] for groups in units], dtype=float)
+        sizes = np.array([[len(g) for g in groups] for groups in units], dtype=float)
+        boot = (sums @ counts.T) / (sizes @ counts.T)
+    else:
+        boot = np.empty((n_pairs, n_bootstrap), dtype=float)
+        for p, groups in enumerate(units):
+            for i, chosen in enumerate(idx):
+                boot[p, i] = np.median(np.concatenate([groups[j] for j in chosen]))
+
+    alpha = 1.0 - ci
+    lower = np.percentile(boot, 100 * alpha / 2, axis=1)
+    upper = np.percentile(boot, 100 * (1 - alpha / 2), axis=1)
+    return lower, upper
+
+
+def batch_bootstrap_ci(
+    grouped: List[List[List[float]]],
+    n_bootstrap: int = 1000,
+    ci: float = 0.95,
+    seed: int = 42,
+    agg_fn: str = "mean",
+    n_jobs: int = 1,
+) -> List[Dict[str, float]]:
+    """Bootstrap CIs for many drug-disease pairs at once.
+
+    Each pair is a list of score groups (one per target).  A pair with a
+    single group gets the standard path bootstrap (as ``bootstrap_ci``),
+    a pair with several groups gets the block bootstrap (as
+    ``block_bootstrap_ci``).  Every pair uses a fresh ``RandomState(seed)``,
+    exactly like calling those functions one pair at a time; pairs with the
+    same number of resampling units therefore share one index matrix and are
+    computed together.
+
+    Args:
+        grouped: per pair, list of per-group path scores
+        n_bootstrap: Number of bootstrap resamples
+        ci: Confidence level
+        seed: Random seed
+        agg_fn: "mean" or "median"
+        n_jobs: >1 → spread the batches over a process pool
+
+    Returns:
+        One dict per pair: {"mean", "ci_lower", "ci_upper", "ci_width",
+        "n_paths", "n_groups"}
+    """
+    results: List[Optional[Dict[str, float]]] = [None] * len(grouped)
+    # (block, K) → [(pair index, units)]
+    profiles: Dict[tuple, list] = defaultdict(list)
+
+    for i, groups in enumerate(grouped):
+        arrays = [np.asarray(g, dtype=float) for g in groups]
+        all_arr = np.concatenate(arrays) if arrays else np.empty(0)
+        n_total, n_groups = len(all_arr), len(arrays)
+        if n_total == 0:
+            results[i] = {"mean": 0.0, "ci_lower": 0.0, "ci_upper": 0.0,
+                          "ci_width": 0.0, "n_paths": 0, "n_groups": 0}
+            continue
+        point_est = float(np.mean(all_arr)) if agg_fn == "mean" else float(np.median(all_arr))
+        if n_total == 1:
+            results[i] = {"mean": point_est, "ci_lower": point_est, "ci_upper": point_est,
+                          "ci_width": 0.0, "n_paths": 1, "n_groups": n_groups}
+            continue
+        results[i] = {"mean": round(point_est, 6), "n_paths": n_total, "n_groups": n_groups}
+        if n_groups > 1:
+            profiles[(True, n_groups)].append((i, arrays))
+        else:
+            profiles[(False, n_total)].append((i, all_arr))
+
+    tasks = []
+    for (block, _), members in profiles.items():
+        step = _POOL_CHUNK if n_jobs > 1 else len(members)
+        for s in range(0, len(members), step):
+            chunk = members[s:s + step]
+            tasks.append(([i for i, _ in chunk], [u for _, u in chunk], block))
+
+    def _collect(pair_ids, bounds):
+        for i, lo, hi in zip(pair_ids, *bounds):
+            lower, upper = float(lo), float(hi)
+            results[i].update({
+                "ci_lower": round(lower, 6),
+                "ci_upper": round(upper, 6),
+                "ci_width": round(upper - lower, 6),
+            })
+
+    if n_jobs > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [
+                (ids, pool.submit(_profile_bounds, units, block, n_bootstrap, ci, seed, agg_fn))
+                for ids, units, block in tasks
+            ]
+            for ids, fut in futures:
+                _collect(ids, fut.result())
+    else:
+        for ids, units, block in tasks:
+            _collect(ids, _profile_bounds(units, block, n_bootstrap, ci, seed, agg_fn))
+
+    return results
+
+
 def bootstrap_ci(
     path_scores: List[float],
     n_bootstrap: int = 1000,
@@ -41,33 +203,9 @@ def bootstrap_ci(
         {"mean": float, "ci_lower": float, "ci_upper": float,
          "ci_width": float, "n_paths": int}
     """
-    n = len(path_scores)
-    if n == 0:
-        return {"mean": 0.0, "ci_lower": 0.0, "ci_upper": 0.0, "ci_width": 0.0, "n_paths": 0}
-
-    scores = np.array(path_scores, dtype=float)
-    point_est = float(np.mean(scores)) if agg_fn == "mean" else float(np.median(scores))
-
-    if n == 1:
-        return {"mean": point_est, "ci_lower": point_est, "ci_upper": point_est, "ci_width": 0.0, "n_paths": 1}
-
-    rng = np.random.RandomState(seed)
-    boot_stats = np.empty(n_bootstrap, dtype=float)
-    for i in range(n_bootstrap):
-        sample = rng.choice(scores, size=n, replace=True)
-        boot_stats[i] = np.mean(sample) if agg_fn == "mean" else np.median(sample)
-
-    alpha = 1.0 - ci
-    lower = float(np.percentile(boot_stats, 100 * alpha / 2))
-    upper = float(np.percentile(boot_stats, 100 * (1 - alpha / 2)))
-
-    return {
-        "mean": round(point_est, 6),
-        "ci_lower": round(lower, 6),
-        "ci_upper": round(upper, 6),
-        "ci_width": round(upper - lower, 6),
-        "n_paths": n,
-    }
+    result = batch_bootstrap_ci([[path_scores]], n_bootstrap, ci, seed, agg_fn)[0]
+    result.pop("n_groups")
+    return result
 
 
 def block_bootstrap_ci(
@@ -84,6 +222,8 @@ def block_bootstrap_ci(
     entire target groups instead of individual paths, producing wider and
     more honest confidence intervals.
 
+    With only one group this falls back to the standard path bootstrap.
+
     Args:
         grouped_scores: target_id → list of path scores for that target
         n_bootstrap: Number of bootstrap resamples
@@ -95,52 +235,7 @@ def block_bootstrap_ci(
         {"mean": float, "ci_lower": float, "ci_upper": float,
          "ci_width": float, "n_paths": int, "n_groups": int}
     """
-    all_scores = []
-    for scores in grouped_scores.values():
-        all_scores.extend(scores)
-    n_total = len(all_scores)
-
-    if n_total == 0:
-        return {"mean": 0.0, "ci_lower": 0.0, "ci_upper": 0.0,
-                "ci_width": 0.0, "n_paths": 0, "n_groups": 0}
-
-    all_arr = np.array(all_scores, dtype=float)
-    point_est = float(np.mean(all_arr)) if agg_fn == "mean" else float(np.median(all_arr))
-
-    n_groups = len(grouped_scores)
-    if n_groups <= 1:
-        # Only one target → fallback to standard bootstrap on paths
-        return {
-            **bootstrap_ci(all_scores, n_bootstrap, ci, seed, agg_fn),
-            "n_groups": n_groups,
-        }
-
-    # Block bootstrap: resample target groups with replacement
-    group_keys = list(grouped_scores.keys())
-    group_arrays = [np.array(grouped_scores[k], dtype=float) for k in group_keys]
-
-    rng = np.random.RandomState(seed)
-    boot_stats = np.empty(n_bootstrap, dtype=float)
-    agg = np.mean if agg_fn == "mean" else np.median
-
-    for i in range(n_bootstrap):
-        # Resample n_groups groups with replacement
-        chosen = rng.choice(n_groups, size=n_groups, replace=True)
-        resampled = np.concatenate([group_arrays[j] for j in chosen])
-        boot_stats[i] = agg(resampled)
-
-    alpha = 1.0 - ci
-    lower = float(np.percentile(boot_stats, 100 * alpha / 2))
-    upper = float(np.percentile(boot_stats, 100 * (1 - alpha / 2)))
-
-    return {
-        "mean": round(point_est, 6),
-        "ci_lower": round(lower, 6),
-        "ci_upper": round(upper, 6),
-        "ci_width": round(upper - lower, 6),
-        "n_paths": n_total,
-        "n_groups": n_groups,
-    }
+    return batch_bootstrap_ci([list(grouped_scores.values())], n_bootstrap, ci, seed, agg_fn)[0]
 
 
 def assign_confidence_tier(
@@ -198,6 +293,7 @@ def add_uncertainty_to_ranking(
     n_bootstrap: int = 1000,
     ci: float = 0.95,
     seed: int = 42,
+    n_jobs: int = 1,
 ) -> pd.DataFrame:
     """Add bootstrap CI columns to a ranking DataFrame.
 
@@ -212,6 +308,7 @@ def add_uncertainty_to_ranking(
         n_bootstrap: Number of bootstrap resamples
         ci: Confidence level
         seed: Random seed
+        n_jobs: Worker processes for the bootstrap (1 = in-process)
 
     Returns:
         rank_df with added columns: ci_lower, ci_upper, ci_width, confidence_tier, n_evidence_paths
@@ -246,26 +343,21 @@ def add_uncertainty_to_ranking(
     if n_dropped > 0:
         logger.warning("Uncertainty: dropped %d paths with invalid/missing scores", n_dropped)
 
-    # Compute CI for each pair using block bootstrap
-    ci_records = []
-    for (drug, disease), target_groups in pair_target_scores.items():
+    # Compute CI for all pairs at once (block bootstrap where target info exists)
+    pair_keys = list(pair_target_scores.keys())
+    grouped = []
+    for key in pair_keys:
+        target_groups = pair_target_scores[key]
         has_target_info = not (len(target_groups) == 1 and "unknown" in target_groups)
-
         if has_target_info and len(target_groups) > 1:
-            # Block bootstrap: resample by target group
-            result = block_bootstrap_ci(
-                target_groups, n_bootstrap=n_bootstrap, ci=ci, seed=seed,
-            )
+            grouped.append(list(target_groups.values()))
         else:
             # Standard bootstrap (no target grouping or single target)
-            all_scores = []
-            for scores in target_groups.values():
-                all_scores.extend(scores)
-            result = bootstrap_ci(
-                all_scores, n_bootstrap=n_bootstrap, ci=ci, seed=seed,
-            )
-            result["n_groups"] = len(target_groups)
+            grouped.append([[s for scores in target_groups.values() for s in scores]])
+    results = batch_bootstrap_ci(grouped, n_bootstrap=n_bootstrap, ci=ci, seed=seed, n_jobs=n_jobs)
 
+    ci_records = []
+    for (drug, disease), result in zip(pair_keys, results):
         ci_records.append({
             "drug_normalized": drug,
             "diseaseId": disease,
@@ -276,7 +368,7 @@ def add_uncertainty_to_ranking(
                 result["ci_width"],
                 n_paths=result["n_paths"],
                 mean_score=result["mean"],
-                n_groups=result.get("n_groups", 0),
+                n_groups=result["n_groups"],
             ),
             "n_evidence_paths": result["n_paths"],
         })
@@ -9,6 +9,8 @@ Improvements (v0.6.0):
     - write_jsonl/write_json: NaN 安全序列化
     - require_cols: 更好的错误信息 (显示可用列)
     - safe_str: 增加 max_length 截断
+    - read_table/write_table: 中间表 CSV / Parquet 存储抽象 (带类型与分类 ID 列)
+    - peak_rss_mb/reset_peak_rss: 进程峰值内存 (步骤级性能记录)
 """
 from __future__ import annotations
 
@@ -24,6 +26,16 @@ from tqdm import tqdm
 
 from .config import ensure_dir
 
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # 可选依赖: 未安装时中间表只能用 CSV
+    pyarrow = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
@@ -133,6 +145,165 @@ def require_cols(df: pd.DataFrame, cols: set[str], name: str) -> None:
         )
 
 
+# ── 中间表存储 (CSV / Parquet) ──
+
+TABLE_FORMATS = ("csv", "parquet")
+
+# 可存为 Parquet 的中间表及其列类型, 按文件名 (不含后缀); 其余文件始终为 CSV.
+#   numeric: 读取后为数值列 (CSV 读回后 to_numeric, Parquet 原生存储)
+#   ids:     Parquet 中以 category (字典编码) 存储的 ID 列
+TABLE_SCHEMAS: dict[str, dict[str, list[str]]] = {
+    "edge_drug_target": {
+        "numeric": [],
+        "ids": ["drug_normalized", "molecule_chembl_id", "target_chembl_id"],
+    },
+    "edge_target_pathway_all": {
+        "numeric": [],
+        "ids": ["target_chembl_id", "reactome_stid"],
+    },
+    "edge_pathway_disease": {
+        "numeric": ["pathway_score", "support_genes"],
+        "ids": ["reactome_stid", "diseaseId"],
+    },
+    "edge_drug_ae_faers": {
+        "numeric": ["report_count", "prr"],
+        "ids": ["drug_normalized", "ae_term"],
+    },
+    "dtpd_rank": {
+        "numeric": ["mechanism_score", "final_score"],
+        "ids": ["drug_normalized", "diseaseId"],
+    },
+    "drug_disease_rank": {
+        "numeric": ["mechanism_score", "safety_penalty", "trial_penalty", "risk_multiplier",
+                    "phenotype_boost", "phenotype_multiplier", "final_score",
+                    "ci_lower", "ci_upper", "ci_width", "n_evidence_paths"],
+        "ids": ["drug_normalized", "diseaseId"],
+    },
+}
+
+# 由 shell 脚本 / 其他项目直接按 CSV 读取的表 (ops/internal/runner.sh, LLM+RAG bridge):
+# parquet 格式时始终同时导出 CSV
+CSV_EXPORT_TABLES = frozenset({"dtpd_rank", "drug_disease_rank"})
+
+_table_format = "csv"
+
+
+def set_table_format(fmt: str) -> str:
+    """
+    设置中间表默认写入格式 (cli 按 storage.table_format 调用一次).
+
+    parquet 需要 pyarrow; 未安装时回退为 csv 并告警. 返回实际生效的格式.
+    """
+    global _table_format
+    fmt = str(fmt).strip().lower()
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"table_format='{fmt}' 不合法, 可选: {list(TABLE_FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        logger.warning("未安装 pyarrow, 中间表格式回退为 csv")
+        fmt = "csv"
+    _table_format = fmt
+    return fmt
+
+
+def get_table_format() -> str:
+    return _table_format
+
+
+def resolve_table(path: Path) -> Path | None:
+    """
+    中间表的实际文件: 同名 .parquet 优先, 其次 path 本身 (.csv); 都不存在时返回 None.
+    """
+    path = Path(path)
+    pq = path.with_suffix(".parquet")
+    if pq.exists():
+        return pq
+    return path if path.exists() else None
+
+
+def write_table(df: pd.DataFrame, path: Path, fmt: str | None = None, keep_csv: bool = False) -> Path:
+    """
+    写中间表.
+
+    Args:
+        df: 数据.
+        path: 逻辑路径 (.csv 文件名; parquet 格式写到同名 .parquet).
+        fmt: csv / parquet, 默认取 set_table_format 的设置; 不在 TABLE_SCHEMAS 中的表始终写 CSV.
+        keep_csv: parquet 格式时同时导出 CSV (CSV_EXPORT_TABLES 中的表总是导出).
+
+    Returns:
+        主文件路径. 另一格式的旧文件会被删除, 避免 read_table 读到过期数据.
+    """
+    path = Path(path)
+    fmt = fmt or _table_format
+    if path.stem not in TABLE_SCHEMAS:
+        fmt = "csv"
+    ensure_dir(path.parent)
+    csv_path, pq_path = path.with_suffix(".csv"), path.with_suffix(".parquet")
+    if fmt == "parquet":
+        schema = TABLE_SCHEMAS[path.stem]
+        out = df.copy()
+        for col in schema.get("numeric", []):
+            if col in out.columns:
+                out[col] = pd.to_numeric(out[col], errors="coerce")
+        for col in schema.get("ids", []):
+            if col in out.columns:
+                out[col] = out[col].astype("category")
+        out.to_parquet(pq_path, index=False)
+        if keep_csv or path.stem in CSV_EXPORT_TABLES:
+            df.to_csv(csv_path, index=False)
+        elif csv_path.exists():
+            csv_path.unlink()
+        logger.debug("写入 Parquet: %s (%d 行)", pq_path.name, len(df))
+        return pq_path
+    df.to_csv(csv_path, index=False)
+    if pq_path.exists():
+        pq_path.unlink()
+    return csv_path
+
+
+def read_table(path: Path, typed: bool = True, columns: list[str] | None = None,
+               categorical: bool = False) -> pd.DataFrame:
+    """
+    读中间表 (.parquet 优先, 否则 .csv).
+
+    Args:
+        path: 逻辑路径 (.csv 文件名).
+        typed: True 时 TABLE_SCHEMAS 中的数值列为数值类型; False 时全部为字符串
+               (与 read_csv(dtype=str) 一致, 缺失值为 NaN).
+        columns: 只读取这些列.
+        categorical: Parquet 中的 ID 列保持 category (默认转为普通字符串列).
+
+    Raises:
+        FileNotFoundError: 两种格式都不存在.
+    """
+    path = Path(path)
+    actual = resolve_table(path)
+    if actual is None:
+        return read_csv(path)  # 抛出统一的 FileNotFoundError
+    schema = TABLE_SCHEMAS.get(path.stem, {})
+    numeric = [c for c in schema.get("numeric", []) if columns is None or c in columns]
+
+    if actual.suffix == ".parquet":
+        if pyarrow is None:
+            raise ImportError(f"{actual} 为 Parquet 格式, 读取需要安装 pyarrow")
+        df = pd.read_parquet(actual, columns=columns)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                if not categorical:
+                    df[col] = df[col].astype(df[col].cat.categories.dtype)
+            elif not typed and not pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].astype(str).mask(df[col].isna())
+        logger.debug("读取 Parquet: %s (%d 行, %d 列)", actual.name, len(df), len(df.columns))
+        return df
+
+    df = read_csv(actual, dtype=str, usecols=columns)
+    if typed:
+        for col in numeric:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
 def _sanitize_for_json(obj: Any) -> Any:
     """递归替换 NaN/Inf 为 None, 确保 JSON 合法."""
     if isinstance(obj, float):
@@ -192,12 +363,11 @@ def load_canonical_map(data_dir: Path) -> dict[str, str]:
         logger.debug("规范名称映射不存在, 跳过: %s", path)
         return {}
     df = read_csv(path, dtype=str)
-    mapping = {}
-    for _, r in df.iterrows():
-        raw = r.get("drug_raw")
-        canon = r.get("canonical_name")
-        if pd.notna(raw) and pd.notna(canon):
-            mapping[str(raw).lower().strip()] = str(canon).lower().strip()
+    if "drug_raw" not in df.columns or "canonical_name" not in df.columns:
+        return {}
+    df = df.dropna(subset=["drug_raw", "canonical_name"])
+    mapping = dict(zip(df["drug_raw"].str.lower().str.strip(),
+                       df["canonical_name"].str.lower().str.strip()))
     logger.debug("加载规范名称映射: %d 条", len(mapping))
     return mapping
 
@@ -227,3 +397,29 @@ def safe_str(value: Any, default: str = "", max_length: int = 0) -> str:
     if max_length > 0 and len(result) > max_length:
         result = result[:max_length]
     return result
+
+
+def reset_peak_rss() -> None:
+    """重置进程峰值 RSS 高水位 (Linux clear_refs); 其它平台无操作"""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """
+    进程峰值 RSS (MB).
+
+    Linux 读 /proc/self/status 的 VmHWM (可被 reset_peak_rss 重置, 可得到单个步骤的峰值);
+    其它平台用 ru_maxrss (进程生命周期峰值); 都不可用时返回 0.0.
+    """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
@@ -0,0 +1,185 @@
+"""Unit tests for kg_explain.batch (multi-disease batch mode, shared entity store).
+
+Tests cover:
+    - disease list parsing (comments, optional columns, duplicate keys)
+    - EntityStore versioning, sqlite cache and manifest merge
+    - universe union across diseases (dedup)
+    - prefetch_entities step order and failure tolerance
+    - run_batch_cmd end to end with stubbed fetch/pipeline steps
+"""
+import argparse
+import json
+
+import pandas as pd
+import pytest
+
+from kg_explain import batch, cli
+from kg_explain.batch import (
+    DiseaseEntry,
+    EntityStore,
+    build_universe,
+    prefetch_entities,
+    read_disease_list,
+)
+from kg_explain.config import Config
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+class TestDiseaseList:
+    def test_parse(self, tmp_path):
+        p = _write(tmp_path / "list.txt", (
+            "# disease_key|disease_query|origin_disease_ids|inject_yaml\n"
+            "\n"
+            "gout|gout|EFO_0004274, MONDO_0005393|\n"
+            "psoriasis|psoriasis\n"
+            "gout|duplicate\n"
+            "asthma|asthma||kg_explain/configs/inject_asthma.yaml\n"
+        ))
+        entries = read_disease_list(p)
+        assert entries == [DiseaseEntry("gout"), DiseaseEntry("psoriasis"), DiseaseEntry("asthma")]
+
+
+class TestEntityStore:
+    def test_default_version(self):
+        a = EntityStore.default_version([DiseaseEntry("a"), DiseaseEntry("b")])
+        b = EntityStore.default_version([DiseaseEntry("b"), DiseaseEntry("a")])
+        c = EntityStore.default_version([DiseaseEntry("a")])
+        assert a == b
+        assert a != c
+
+    def test_cache_is_sqlite_without_ttl(self, tmp_path):
+        store = EntityStore(tmp_path, "v1")
+        cache = store.cache()
+        cache.set("k", {"x": 1})
+        assert cache.summary()["backend"] == "sqlite"
+        assert cache.ttl_seconds == 0
+        cache.close()
+        assert store.cache().get("k") == {"x": 1}
+
+    def test_manifest_merge(self, tmp_path):
+        store = EntityStore(tmp_path, "v1")
+        assert store.load_manifest() == {}
+        store.update_manifest(diseases=["a"])
+        m = store.update_manifest(last_batch={"n": 1})
+        assert m["diseases"] == ["a"] and m["last_batch"] == {"n": 1}
+        assert m["version"] == "v1"
+        assert json.loads(store.manifest_path.read_text())["diseases"] == ["a"]
+
+
+class TestUniverse:
+    def test_ctgov_dedup(self, tmp_path):
+        a = _write(tmp_path / "a" / "failed_trials_drug_rows.csv",
+                   "nctId,drug_raw\nNCT1,aspirin\nNCT2,metformin\n").parent
+        b = _write(tmp_path / "b" / "failed_trials_drug_rows.csv",
+                   "nctId,drug_raw\nNCT3,aspirin\nNCT4,statin\n").parent
+        out = tmp_path / "u"
+        out.mkdir()
+        counts = build_universe([a, b, tmp_path / "missing"], out)
+        assert counts == {"failed_trials_drug_rows": 3}
+        df = pd.read_csv(out / "failed_trials_drug_rows.csv")
+        assert sorted(df["drug_raw"]) == ["aspirin", "metformin", "statin"]
+
+    def test_signature(self, tmp_path):
+        a = tmp_path / "a"
+        _write(a / "drug_chembl_map.csv", "drug_raw,chembl_id\nx,M1\ny,M2\n")
+        _write(a / "edge_drug_target.csv",
+               "drug_normalized,molecule_chembl_id,target_chembl_id\nx,M1,T1\n")
+        b = tmp_path / "b"
+        _write(b / "drug_chembl_map.csv", "drug_raw,chembl_id\nx,M1\n")
+        _write(b / "edge_drug_target.csv",
+               "drug_normalized,molecule_chembl_id,target_chembl_id\nx,M1,T1\nx,M1,T2\n")
+        out = tmp_path / "u"
+        out.mkdir()
+        counts = build_universe([a, b], out, drug_source="signature")
+        assert counts == {"drug_chembl_map": 2, "edge_drug_target": 2}
+
+
+class TestPrefetch:
+    def _stub_sources(self, monkeypatch, calls, fail=()):
+        def make(name):
+            def fn(*args, **kwargs):
+                calls.append(name)
+                if name in fail:
+                    raise RuntimeError("boom")
+            return fn
+
+        for name in ["rxnorm_map", "build_drug_canonical", "chembl_map", "fetch_drug_targets",
+                     "fetch_drug_target_affinities", "fetch_target_xrefs", "target_to_ensembl",
+                     "fetch_target_pathways", "fetch_gene_diseases", "fetch_drug_ae",
+                     "fetch_disease_phenotypes", "fetch_known_indications"]:
+            monkeypatch.setattr(batch.datasources, name, make(name))
+
+    def test_steps_and_failures(self, tmp_path, monkeypatch):
+        calls = []
+        self._stub_sources(monkeypatch, calls, fail={"fetch_target_xrefs"})
+        _write(tmp_path / "drug_chembl_map.csv", "drug_raw,canonical_name,chembl_id\na,A,M1\nb,B,M2\n")
+        _write(tmp_path / "edge_target_disease_ot.csv", "targetId,diseaseId\nE1,D1\n")
+        cache = EntityStore(tmp_path / "store", "v1").cache()
+        timings = prefetch_entities(tmp_path, cache, core_disease_ids=["D2"])
+
+        assert calls[:4] == ["rxnorm_map", "build_drug_canonical", "chembl_map", "fetch_drug_targets"]
+        assert "fetch_drug_ae" in calls and "fetch_disease_phenotypes" in calls
+        assert calls.count("fetch_known_indications") == 2
+        by_step = {t["step"]: t for t in timings}
+        assert by_step["target_xrefs"]["status"] == "error"
+        assert by_step["pathways"]["status"] == "ok"
+
+    def test_signature_skips_drug_mapping(self, tmp_path, monkeypatch):
+        calls = []
+        self._stub_sources(monkeypatch, calls)
+        cache = EntityStore(tmp_path / "store", "v1").cache()
+        prefetch_entities(tmp_path, cache, drug_source="signature")
+        assert "rxnorm_map" not in calls and "chembl_map" not in calls
+        assert calls[0] == "fetch_drug_target_affinities"
+
+
+class TestRunBatch:
+    def test_inline_flow(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        _write(tmp_path / "configs" / "base.yaml", "paths:\n  data_dir: ./data\n  output_dir: ./output\n")
+        _write(tmp_path / "list.txt", "gout|gout\npsoriasis|psoriasis\n")
+        drugs = {"gout": "colchicine", "psoriasis": "methotrexate"}
+
+        def fake_discover(cfg, cache):
+            disease = cfg.data_dir.parent.name
+            _write(cfg.data_dir / "failed_trials_drug_rows.csv",
+                   f"nctId,drug_raw\nNCT1,{drugs[disease]}\nNCT2,aspirin\n")
+
+        prefetched = []
+        ran = []
+        monkeypatch.setattr(cli, "_fetch_ctgov_drugs", fake_discover)
+        monkeypatch.setattr(cli, "prefetch_entities",
+                            lambda universe_dir, cache, drug_source, **kw: prefetched.append(
+                                pd.read_csv(universe_dir / "failed_trials_drug_rows.csv")) or [])
+        monkeypatch.setattr(cli, "run_pipeline",
+                            lambda a, cfg, cache: ran.append((a.disease, a.entity_store,
+                                                              cache.summary()["backend"])))
+
+        args = argparse.Namespace(
+            disease_list=str(tmp_path / "list.txt"), version="v5", drug_source="ctgov",
+            signature_template=None, max_drugs=0, workers=1, store_dir=str(tmp_path / "store"),
+            store_version="t1", skip_prefetch=False,
+        )
+        results = cli.run_batch_cmd(args, Config(raw={}))
+
+        assert sorted(prefetched[0]["drug_raw"]) == ["aspirin", "colchicine", "methotrexate"]
+        assert [r[0] for r in ran] == ["gout", "psoriasis"]
+        assert ran[0][1] == {"dir": str(tmp_path / "store"), "version": "t1"}
+        assert ran[0][2] == "sqlite"
+        assert [r["status"] for r in results] == ["ok", "ok"]
+        manifest = EntityStore(tmp_path / "store", "t1").load_manifest()
+        assert manifest["diseases"] == ["gout", "psoriasis"]
+        assert manifest["universe"] == {"failed_trials_drug_rows": 3}
+        assert len(manifest["last_batch"]["results"]) == 2
+
+    def test_signature_requires_template(self, tmp_path):
+        _write(tmp_path / "list.txt", "gout|gout\n")
+        args = argparse.Namespace(disease_list=str(tmp_path / "list.txt"), drug_source="signature",
+                                  signature_template=None)
+        with pytest.raises(ValueError):
+            cli.run_batch_cmd(args, Config(raw={}))
@@ -7,16 +7,22 @@ Tests cover:
     - Cache summary (disk usage)
     - Corrupt file handling
     - sha1 determinism
-    - Thread safety basics
+    - Thread safety basics (files backend: atomic writes, no partial reads)
+    - SQLite backend: TTL via stored timestamps, indexed cleanup, compression, bounded connection pool
+    - migrate_file_cache: import of the http_json/ directory cache
 """
 import json
+import os
+import sqlite3
 import time
 import pytest
 from pathlib import Path
 
 import requests
 
-from kg_explain.cache import HTTPCache, sha1, _is_retryable
+from kg_explain.cache import HTTPCache, SQLITE_NAME, migrate_file_cache, sha1, _is_retryable
+from kg_explain.config import Config
+from kg_explain.utils import concurrent_map
 
 
 class TestSha1:
@@ -69,6 +75,22 @@ class TestHTTPCacheBasic:
         cache.set("key1", {"v": 2})
         assert cache.get("key1") == {"v": 2}
 
+    def test_concurrent_overwrite_never_partial(self, tmp_path):
+        cache = HTTPCache(tmp_path, ttl_seconds=0, max_workers=8)
+        payloads = [{"v": i, "pad": "x" * 200_000} for i in range(4)]
+        cache.set("key1", payloads[0])
+
+        def work(i):
+            if i % 2 == 0:
+                cache.set("key1", payloads[i % 4])
+                return None
+            return cache.get("key1")
+
+        results = concurrent_map(work, range(200), max_workers=8)
+        assert all(r in payloads for r in results if r is not None)
+        assert cache.stats["errors"] == 0
+        assert [p.name for p in tmp_path.rglob("*.tmp")] == []
+
 
 class TestHTTPCacheTTL:
     def test_not_expired(self, tmp_path):
@@ -264,3 +286,152 @@ class TestIsRetryable:
     def test_value_error_not_retryable(self):
         """Non-network errors should not be retryable."""
         assert _is_retryable(ValueError("bad json")) is False
+
+
+def _backdate(cache: HTTPCache, key: str, seconds: float) -> None:
+    """把 sqlite 条目的写入时间戳往前推"""
+    con = sqlite3.connect(cache.root / SQLITE_NAME)
+    with con:
+        con.execute("UPDATE entries SET created = created - ? WHERE key = ?", (seconds, sha1(key)))
+    con.close()
+
+
+class TestSQLiteBackend:
+    def test_put_get_overwrite(self, tmp_path):
+        cache = HTTPCache(tmp_path, backend="sqlite")
+        cache.set("k", {"v": 1, "name": "阿司匹林"})
+        cache.set("k", {"v": 2, "name": "阿司匹林"})
+        assert cache.get("k") == {"v": 2, "name": "阿司匹林"}
+        assert cache.get("missing") is None
+        assert (tmp_path / SQLITE_NAME).exists()
+        assert not (tmp_path / "http_json").exists()
+
+    def test_has_and_invalidate(self, tmp_path):
+        cache = HTTPCache(tmp_path, backend="sqlite")
+        cache.set("k", [1, 2])
+        assert cache.has("k") is True
+        assert cache.invalidate("k") is True
+        assert cache.invalidate("k") is False
+        assert cache.has("k") is False
+
+    def test_ttl_uses_stored_timestamp(self, tmp_path):
+        cache = HTTPCache(tmp_path, ttl_seconds=10, backend="sqlite")
+        cache.set("old", {"v": 1})
+        cache.set("fresh", {"v": 2})
+        _backdate(cache, "old", 100)
+        assert cache.get("old") is None
+        assert cache.has("old") is False
+        assert cache.stats["expired"] == 1
+        assert cache.cleanup_expired() == 1
+        assert cache.get("fresh") == {"v": 2}
+        assert cache.summary()["n_cached_files"] == 1
+
+    @pytest.mark.parametrize("compress", ["none", "zlib", "zstd"])
+    def test_compression_roundtrip(self, tmp_path, compress):
+        cache = HTTPCache(tmp_path, backend="sqlite", compress=compress)
+        payload = {"molecules": [{"id": f"CHEMBL{i}", "desc": "x" * 50} for i in range(100)]}
+        cache.set("k", payload)
+        assert cache.get("k") == payload
+        if compress != "none":
+            assert cache.summary()["total_size_mb"] < len(json.dumps(payload)) / (1024 * 1024)
+
+    def test_reopen_reads_other_codec(self, tmp_path):
+        HTTPCache(tmp_path, backend="sqlite", compress="zlib").set("k", {"v": 1})
+        assert HTTPCache(tmp_path, backend="sqlite").get("k") == {"v": 1}
+
+    def test_corrupt_body_counts_error(self, tmp_path):
+        cache = HTTPCache(tmp_path, backend="sqlite", compress="zlib")
+        cache.set("k", {"v": 1})
+        con = sqlite3.connect(tmp_path / SQLITE_NAME)
+        with con:
+            con.execute("UPDATE entries SET body = ?", (b"garbage",))
+        con.close()
+        assert cache.get("k") is None
+        assert cache.stats["errors"] == 1
+
+    def test_summary_backend(self, tmp_path):
+        cache = HTTPCache(tmp_path, backend="sqlite")
+        cache.set("k1", {"v": 1})
+        cache.set("k2", {"v": 2})
+        summary = cache.summary()
+        assert summary["backend"] == "sqlite"
+        assert summary["n_cached_files"] == 2
+
+    def test_concurrent_readers_and_writers(self, tmp_path):
+        cache = HTTPCache(tmp_path, backend="sqlite", max_workers=8)
+        for i in range(50):
+            cache.set(f"k{i}", {"i": i})
+
+        def work(i):
+            if i % 5 == 0:
+                cache.set(f"new{i}", {"i": i})
+            return cache.get(f"k{i % 50}")
+
+        results = concurrent_map(work, range(400), max_workers=8)
+        assert results == [{"i": i % 50} for i in range(400)]
+        assert cache.stats["hits"] == 400
+        assert cache.stats["puts"] == 50 + 80
+
+    def test_connections_bounded_across_rounds(self, tmp_path):
+        cache = HTTPCache(tmp_path, backend="sqlite", max_workers=8)
+        cache.set("k", {"v": 1})
+        fd_dir = Path("/proc/self/fd")
+        n_fds = len(os.listdir(fd_dir)) if fd_dir.is_dir() else 0
+
+        # 每轮 concurrent_map 都是新线程; 连接数受池大小约束, 不随轮数增长
+        for _ in range(50):
+            concurrent_map(lambda i: cache.get("k"), range(32), max_workers=8)
+        assert cache._store.open_connections() <= cache._store.pool_size == 8
+        if fd_dir.is_dir():
+            # 每个连接至多占用数据库 + WAL 两个 fd
+            assert len(os.listdir(fd_dir)) - n_fds <= 2 * cache._store.pool_size
+        cache.close()
+        assert cache._store.open_connections() == 0
+
+    def test_invalid_backend(self, tmp_path):
+        with pytest.raises(ValueError):
+            HTTPCache(tmp_path, backend="redis")
+
+
+class TestMigrateFileCache:
+    def test_import_keeps_timestamps(self, tmp_path):
+        files = HTTPCache(tmp_path, ttl_seconds=10)
+        files.set("old", {"v": 1})
+        files.set("fresh", {"v": 2})
+        os.utime(files._path("old"), (time.time() - 100, time.time() - 100))
+        files._path("bad").write_text("not json", encoding="utf-8")
+
+        counts = migrate_file_cache(tmp_path, compress="zlib")
+        assert counts == {"imported": 2, "skipped": 1, "removed": 0}
+
+        cache = HTTPCache(tmp_path, ttl_seconds=10, backend="sqlite")
+        assert cache.get("fresh") == {"v": 2}
+        assert cache.get("old") is None
+        assert cache.stats["expired"] == 1
+
+    def test_idempotent_and_remove(self, tmp_path):
+        files = HTTPCache(tmp_path)
+        for i in range(5):
+            files.set(f"k{i}", {"i": i})
+        migrate_file_cache(tmp_path)
+        counts = migrate_file_cache(tmp_path, remove_files=True)
+        assert counts["imported"] == 5 and counts["removed"] == 5
+        assert list(files.root.glob("*.json")) == []
+        assert HTTPCache(tmp_path, backend="sqlite").summary()["n_cached_files"] == 5
+
+    def test_no_directory(self, tmp_path):
+        assert migrate_file_cache(tmp_path)["imported"] == 0
+
+
+class TestCacheConfig:
+    def test_defaults(self):
+        cfg = Config(raw={})
+        assert cfg.cache_backend == "files"
+        assert cfg.cache_compress == "none"
+
+    def test_invalid_values(self):
+        cfg = Config(raw={"disease": {"condition": "x"},
+                          "http": {"cache_backend": "lmdb", "cache_compress": "lz4"}})
+        errors = cfg.validate()
+        assert any("cache_backend" in e for e in errors)
+        assert any("cache_compress" in e for e in errors)
@@ -0,0 +1,207 @@
+"""Unit tests for ChEMBL request batching (datasources.chembl.chembl_prefetch).
+
+Tests cover:
+    - __in batching + pagination, split back into per-ID cache entries
+    - per-ID limit truncation (activity)
+    - cold batched run == per-ID run (edge_drug_target / target_xref / affinity CSVs)
+    - warm per-ID cache is reused by the batched path (no requests) and vice versa
+    - parent-molecule fallback and failed batches falling back to per-ID calls
+"""
+import pandas as pd
+import pytest
+
+from kg_explain import cache as cache_mod
+from kg_explain.cache import HTTPCache
+from kg_explain.datasources import chembl
+from kg_explain.datasources.chembl import CHEMBL_API, chembl_prefetch
+
+
+MECHANISMS = [
+    {"molecule_chembl_id": "M1", "target_chembl_id": "T1", "mechanism_of_action": "T1 inhibitor"},
+    {"molecule_chembl_id": "M1", "target_chembl_id": "T2", "mechanism_of_action": "T2 agonist"},
+    {"molecule_chembl_id": "M2", "target_chembl_id": "T2", "mechanism_of_action": "T2 agonist"},
+    {"molecule_chembl_id": "M4", "target_chembl_id": "T3", "mechanism_of_action": "T3 blocker"},
+    {"molecule_chembl_id": "M5", "target_chembl_id": "T1", "mechanism_of_action": "T1 inhibitor"},
+]
+MOLECULES = [
+    {"molecule_chembl_id": f"M{i}",
+     "molecule_hierarchy": {"parent_chembl_id": "M4" if i == 3 else f"M{i}"}}
+    for i in range(1, 6)
+]
+TARGETS = [
+    {"target_chembl_id": f"T{i}", "target_type": "SINGLE PROTEIN", "pref_name": f"Target {i}",
+     "organism": "Homo sapiens",
+     "target_components": [{"component_id": i, "accession": f"P0000{i}",
+                            "target_component_xrefs": [{"xref_src_db": "EnsemblGene",
+                                                        "xref_id": f"ENSG0000000000{i}"}]}]}
+    for i in range(1, 4)
+]
+ACTIVITIES = [
+    {"molecule_chembl_id": mol, "target_chembl_id": tid, "standard_type": st,
+     "standard_value": 10.0, "standard_units": "nM", "pchembl_value": pv, "assay_type": "B"}
+    for mol, tid, st, pv in [
+        ("M1", "T1", "IC50", "7.5"), ("M1", "T1", "Ki", "8.2"), ("M1", "T2", "Kd", "5.1"),
+        ("M1", "T2", "Potency", "9.9"), ("M2", "T2", "EC50", "6.3"), ("M4", "T3", "IC50", None),
+        ("M5", "T1", "IC50", "4.4"),
+    ]
+]
+DATA = {"mechanism": MECHANISMS, "molecule": MOLECULES, "target": TARGETS, "activity": ACTIVITIES}
+
+
+def _match(rec: dict, key: str, val) -> bool:
+    if key.endswith("__in"):
+        return rec.get(key[:-4]) in str(val).split(",")
+    if key.endswith("__isnull"):
+        return (rec.get(key[:-8]) is None) == (str(val) == "true")
+    return rec.get(key) == val
+
+
+class FakeChEMBL:
+    """模拟 ChEMBL REST: 列表端点 (过滤 + limit/offset 分页) 与详情端点"""
+
+    def __init__(self, fail_batches: bool = False):
+        self.calls: list[tuple[str, dict]] = []
+        self.fail_batches = fail_batches
+
+    def __call__(self, url, params=None, headers=None, timeout=60):
+        params = dict(params or {})
+        self.calls.append((url, params))
+        resource = url[len(CHEMBL_API) + 1:].split("/")[0].replace(".json", "")
+        records = DATA[resource]
+        if "/" in url[len(CHEMBL_API) + 1:]:
+            ident = url.rsplit("/", 1)[1][:-5]
+            for rec in records:
+                if rec.get(f"{resource}_chembl_id") == ident:
+                    return rec
+            raise cache_mod.requests.HTTPError("404")
+        if self.fail_batches and any(k.endswith("_chembl_id__in") for k in params):
+            raise cache_mod.requests.ConnectionError("boom")
+        limit, offset = int(params.pop("limit", 20)), int(params.pop("offset", 0))
+        hits = [r for r in records if all(_match(r, k, v) for k, v in params.items())]
+        page = hits[offset:offset + limit]
+        more = offset + limit < len(hits)
+        return {chembl._RESULT_KEYS[resource]: page,
+                "page_meta": {"limit": limit, "offset": offset, "total_count": len(hits),
+                              "next": "next" if more else None}}
+
+    @property
+    def batched(self) -> int:
+        return sum(any(k.endswith("__in") and k != "standard_type__in" for k in p) for _, p in self.calls)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    def install(**kw):
+        api = FakeChEMBL(**kw)
+        monkeypatch.setattr(cache_mod, "http_get_json", api)
+        monkeypatch.setattr(chembl, "http_get_json", api)
+        return api
+    return install
+
+
+def _write_map(data_dir):
+    data_dir.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        "drug_raw": ["Drug1", "Drug2", "Drug3 HCl", "Drug5"],
+        "canonical_name": ["drug1", "drug2", "drug3", "drug5"],
+        "chembl_id": ["M1", "M2", "M3", "M5"],
+    }).to_csv(data_dir / "drug_chembl_map.csv", index=False)
+
+
+def _run_all(data_dir, cache):
+    chembl.fetch_drug_targets(data_dir, cache)
+    chembl.fetch_target_xrefs(data_dir, cache)
+    chembl.fetch_drug_target_affinities(data_dir, cache)
+    return {name: (data_dir / name).read_text() for name in
+            ["edge_drug_target.csv", "node_target.csv", "target_xref.csv",
+             "edge_drug_target_affinity.csv"]}
+
+
+class TestPrefetch:
+    def test_batches_and_splits(self, tmp_path, fake_api):
+        api = fake_api()
+        cache = HTTPCache(tmp_path)
+        stats = chembl_prefetch(cache, "mechanism", "molecule_chembl_id",
+                                [({"limit": 1000}, ["M1", "M2", "M3"])])
+        assert stats == {"ids": 3, "cached": 0, "batches": 1, "requests": 1}
+        assert [m["target_chembl_id"] for m in chembl._chembl_mechanisms(cache, "M1")] == ["T1", "T2"]
+        assert chembl._chembl_mechanisms(cache, "M3") == []
+        assert len(api.calls) == 1
+
+    def test_pagination(self, tmp_path, fake_api, monkeypatch):
+        api = fake_api()
+        monkeypatch.setattr(chembl, "_CHEMBL_PAGE_LIMIT", 2)
+        cache = HTTPCache(tmp_path)
+        stats = chembl_prefetch(cache, "mechanism", "molecule_chembl_id",
+                                [({"limit": 1000}, ["M1", "M2", "M4", "M5"])])
+        assert stats["requests"] == 3
+        assert len(chembl._chembl_mechanisms(cache, "M5")) == 1
+        assert len(api.calls) == 3
+
+    def test_batch_size_and_cached_ids(self, tmp_path, fake_api):
+        fake_api()
+        cache = HTTPCache(tmp_path)
+        chembl_prefetch(cache, "target", "target_chembl_id", [(None, ["T1"])], detail=True)
+        stats = chembl_prefetch(cache, "target", "target_chembl_id",
+                                [(None, ["T1", "T2", "T3", "T2"])], detail=True, batch_size=1)
+        assert stats == {"ids": 3, "cached": 1, "batches": 2, "requests": 2}
+
+    def test_per_id_limit(self, tmp_path, fake_api):
+        fake_api()
+        cache = HTTPCache(tmp_path)
+        params = {"limit": 1, "pchembl_value__isnull": "false"}
+        stats = chembl_prefetch(cache, "activity", ("molecule_chembl_id", "target_chembl_id"),
+                                [(params, [("M1", "T1"), ("M1", "T2"), ("M2", "T2")])])
+        assert stats["requests"] == 1
+        url = f"{CHEMBL_API}/activity.json"
+        hit = cache.get(cache_mod.cache_key(url, {**params, "molecule_chembl_id": "M1",
+                                                  "target_chembl_id": "T1"}))
+        assert [a["standard_type"] for a in hit["activities"]] == ["IC50"]
+        assert hit["page_meta"]["total_count"] == 2
+        # 交叉积中未请求的 (M2, T1) 不写缓存
+        assert not cache.has(cache_mod.cache_key(url, {**params, "molecule_chembl_id": "M2",
+                                                       "target_chembl_id": "T1"}))
+
+    def test_missing_detail_not_cached(self, tmp_path, fake_api):
+        fake_api()
+        cache = HTTPCache(tmp_path)
+        chembl_prefetch(cache, "target", "target_chembl_id", [(None, ["T1", "T404"])], detail=True)
+        assert cache.has(f"{CHEMBL_API}/target/T1.json")
+        assert not cache.has(f"{CHEMBL_API}/target/T404.json")
+
+
+class TestBatchedPipeline:
+    def test_matches_per_id_and_fewer_requests(self, tmp_path, fake_api, monkeypatch):
+        _write_map(tmp_path / "a")
+        _write_map(tmp_path / "b")
+        batched_api = fake_api()
+        batched = _run_all(tmp_path / "a", HTTPCache(tmp_path / "cache_a"))
+        n_batched = len(batched_api.calls)
+
+        per_id_api = fake_api()
+        monkeypatch.setattr(chembl, "chembl_prefetch", lambda *a, **k: None)
+        per_id = _run_all(tmp_path / "b", HTTPCache(tmp_path / "cache_b"))
+        assert batched == per_id
+        assert n_batched < len(per_id_api.calls)
+        # 盐 → parent 回退仍生效
+        assert "M3,T3" in batched["edge_drug_target.csv"]
+
+    def test_warm_per_id_cache_is_reused(self, tmp_path, fake_api, monkeypatch):
+        _write_map(tmp_path / "data")
+        cache = HTTPCache(tmp_path / "cache")
+        fake_api()
+        with monkeypatch.context() as m:
+            m.setattr(chembl, "chembl_prefetch", lambda *a, **k: None)
+            per_id = _run_all(tmp_path / "data", cache)
+        api = fake_api()
+        assert _run_all(tmp_path / "data", cache) == per_id
+        assert api.calls == []
+
+    def test_failed_batch_falls_back(self, tmp_path, fake_api):
+        _write_map(tmp_path / "a")
+        _write_map(tmp_path / "b")
+        fake_api()
+        expected = _run_all(tmp_path / "a", HTTPCache(tmp_path / "cache_a"))
+        api = fake_api(fail_batches=True)
+        assert _run_all(tmp_path / "b", HTTPCache(tmp_path / "cache_b")) == expected
+        assert api.batched > 0
@@ -0,0 +1,152 @@
+"""Unit tests for kg_explain.compact_graph (integer-indexed CSR backend).
+
+Tests cover:
+    - build_compact_kg: node typing, CSR layout and PATHWAY_DISEASE in-edge (CSC) index
+    - graph_stats / find_dtpd_paths / drug_summary parity with NetworkX
+    - save/load round trip (memory-mapped)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.config import Config
+from kg_explain.graph import build_kg, graph_stats, find_dtpd_paths, drug_summary
+from kg_explain.compact_graph import CompactGraph, StringColumn, build_compact_kg
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    pd.DataFrame({
+        "drug_normalized": ["drugA", "drugA", "drugB", "drugA"],
+        "target_chembl_id": ["T1", "T2", "T3", "T1"],
+        "mechanism_of_action": ["mech1", "mech2", "mech3", "mech1b"],
+    }).to_csv(data_dir / "edge_drug_target.csv", index=False)
+    pd.DataFrame({
+        "target_chembl_id": ["T1", "T1", "T2", "T3"],
+        "reactome_stid": ["P1", "P2", "P2", "P3"],
+        "reactome_name": ["Pathway1", "Pathway2", "Pathway2", "Pathway3"],
+    }).to_csv(data_dir / "edge_target_pathway_all.csv", index=False)
+    pd.DataFrame({
+        "reactome_stid": ["P1", "P2", "P3"],
+        "diseaseId": ["D001", "D001", "D002"],
+        "pathway_score": [0.8, 0.6, 0.9],
+        "support_genes": [5, 3, 2],
+        "diseaseName": ["Disease1", "Disease1", "Disease2"],
+    }).to_csv(data_dir / "edge_pathway_disease.csv", index=False)
+    pd.DataFrame({
+        "drug_normalized": ["drugA", "drugA"],
+        "ae_term": ["headache", "nausea"],
+        "report_count": [100, 7],
+        "prr": [2.5, 1.2],
+    }).to_csv(data_dir / "edge_drug_ae_faers.csv", index=False)
+    pd.DataFrame({
+        "drug_normalized": ["drugA"],
+        "nctId": ["NCT001"],
+        "is_safety_stop": ["1"],
+        "is_efficacy_stop": ["0"],
+        "overallStatus": ["TERMINATED"],
+    }).to_csv(data_dir / "edge_trial_ae.csv", index=False)
+    return Config(raw={"paths": {"data_dir": str(data_dir)}})
+
+
+class TestStringColumn:
+    def test_round_trip(self):
+        col = StringColumn.from_values(["a", "", "药物", "xyz"])
+        assert len(col) == 4
+        assert col[2] == "药物"
+        assert col.tolist() == ["a", "", "药物", "xyz"]
+
+    def test_empty(self):
+        col = StringColumn.from_values([])
+        assert len(col) == 0
+        assert col.tolist() == []
+
+
+class TestBuildCompact:
+    def test_node_index(self, cfg):
+        C = build_compact_kg(cfg)
+        assert "drugA" in C
+        assert "missing" not in C
+        assert C.type_of(C.index("T1")) == "Target"
+        assert C.type_of(C.index("D001")) == "Disease"
+
+    def test_compact_dtypes(self, cfg):
+        C = build_compact_kg(cfg)
+        blk = C.blocks["DRUG_TARGET"]
+        assert blk.indices.dtype == np.int32
+        assert C.node_type.dtype == np.int8
+        assert len(blk.indptr) == C.n_nodes + 1
+
+    def test_duplicate_edge_last_attr_wins(self, cfg):
+        C = build_compact_kg(cfg)
+        targets = drug_summary(C, "drugA")["targets"]
+        assert targets == [{"id": "T1", "mechanism": "mech1b"}, {"id": "T2", "mechanism": "mech2"}]
+
+
+class TestInEdgeIndex:
+    def test_incoming_matches_scan(self, cfg):
+        blk = build_compact_kg(cfg).blocks["PATHWAY_DISEASE"]
+        assert blk.in_indptr is not None
+        for j in range(len(blk.indptr) - 1):
+            src, pos = blk.incoming(j)
+            want = np.flatnonzero(np.asarray(blk.indices) == j)
+            assert pos.tolist() == want.tolist()
+            assert src.tolist() == blk.sources()[want].tolist()
+
+    def test_other_types_not_indexed(self, cfg):
+        assert build_compact_kg(cfg).blocks["DRUG_TARGET"].in_indptr is None
+
+
+class TestParityWithNetworkx:
+    def test_stats(self, cfg):
+        assert graph_stats(build_compact_kg(cfg)) == graph_stats(build_kg(cfg))
+
+    @pytest.mark.parametrize("drug,disease", [
+        ("drugA", "D001"), ("drugB", "D002"), ("drugB", "D001"), ("nope", "D001"),
+    ])
+    def test_paths(self, cfg, drug, disease):
+        G, C = build_kg(cfg), build_compact_kg(cfg)
+        assert find_dtpd_paths(C, drug, disease) == find_dtpd_paths(G, drug, disease)
+
+    def test_max_paths(self, cfg):
+        G, C = build_kg(cfg), build_compact_kg(cfg)
+        assert find_dtpd_paths(C, "drugA", "D001", max_paths=1) == \
+            find_dtpd_paths(G, "drugA", "D001", max_paths=1)
+
+    @pytest.mark.parametrize("drug", ["drugA", "drugB", "nope"])
+    def test_drug_summary(self, cfg, drug):
+        assert drug_summary(build_compact_kg(cfg), drug) == drug_summary(build_kg(cfg), drug)
+
+
+class TestSaveLoad:
+    def test_round_trip_mmap(self, cfg, tmp_path):
+        C = build_compact_kg(cfg)
+        out = C.save(tmp_path / "kg_compact")
+        assert (out / "meta.json").exists()
+
+        L = CompactGraph.load(out)
+        assert isinstance(L.blocks["PATHWAY_DISEASE"].indices, np.memmap)
+        assert isinstance(L.blocks["PATHWAY_DISEASE"].in_pos, np.memmap)
+        assert graph_stats(L) == graph_stats(C)
+        assert find_dtpd_paths(L, "drugA", "D001") == find_dtpd_paths(C, "drugA", "D001")
+        assert drug_summary(L, "drugA") == drug_summary(C, "drugA")
+
+    def test_load_without_mmap(self, cfg, tmp_path):
+        out = build_compact_kg(cfg).save(tmp_path / "kg_compact")
+        L = CompactGraph.load(out, mmap=False)
+        assert not isinstance(L.node_type, np.memmap)
+        assert "drugB" in L
+
+    def test_missing_dir(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            CompactGraph.load(tmp_path / "nope")
+
+    def test_empty_graph(self, tmp_path):
+        cfg = Config(raw={"paths": {"data_dir": str(tmp_path)}})
+        C = build_compact_kg(cfg)
+        assert C.n_nodes == 0
+        L = CompactGraph.load(C.save(tmp_path / "empty"))
+        assert graph_stats(L)["total_edges"] == 0
+        assert find_dtpd_paths(L, "a", "b") == []
@@ -0,0 +1,176 @@
+"""Unit tests for the sharded CT.gov fetch (datasources.ctgov, fetch_mode="sharded").
+
+Tests cover:
+    - date_ranges: open-ended StartDate ranges + missing-date shard
+    - sharded fetch == serial fetch (same rows / summary, incl. also_completed)
+    - interrupted fetch resumes from the cursor (only remaining pages requested)
+    - changed query parameters discard the old cursor
+    - Config.trial_fetch_mode / trial_date_shards
+"""
+import pandas as pd
+import pytest
+
+from kg_explain import cache as cache_mod
+from kg_explain.cache import HTTPCache
+from kg_explain.config import Config
+from kg_explain.datasources.ctgov import FETCH_STATE_DIR, date_ranges, fetch_failed_trials
+
+STATUSES = ["TERMINATED", "WITHDRAWN", "SUSPENDED", "COMPLETED"]
+RESULTS = ["The study failed to meet its primary endpoint.",
+           "Treatment met the primary endpoint with significant reduction in events."]
+
+
+def _study(i):
+    year = 1996 + (i * 7) % 30
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": f"NCT{i:08d}", "briefTitle": f"Trial {i}"},
+            "statusModule": {
+                "overallStatus": STATUSES[i % 4],
+                "whyStopped": "low enrollment" if i % 3 else None,
+                "startDateStruct": None if i % 11 == 0 else {"date": f"{year}-0{1 + i % 9}"},
+            },
+            "conditionsModule": {"conditions": ["Atherosclerosis"]},
+            "designModule": {"phases": ["PHASE2"] if i % 2 else []},
+            "armsInterventionsModule": {"interventions": [
+                {"name": f"Drug{i % 17}", "type": "DRUG"},
+                {"name": "Stent", "type": "DEVICE"},
+            ] if i % 5 else []},
+        },
+        "resultsSection": {"text": RESULTS[i % 2]},
+    }
+
+
+STUDIES = [_study(i) for i in range(160)]
+
+
+def _start(study):
+    struct = study["protocolSection"]["statusModule"]["startDateStruct"]
+    return struct["date"] if struct else None
+
+
+def _in_range(study, expr):
+    start = _start(study)
+    if expr.endswith("MISSING"):
+        return start is None
+    lo, hi = expr[expr.index("RANGE[") + 6:-1].split(", ")
+    return start is not None and (lo == "MIN" or start >= lo[:7]) and (hi == "MAX" or start <= hi[:7])
+
+
+class FakeCTGov:
+    """模拟 CT.gov v2: overallStatus / filter.advanced (StartDate) 过滤 + pageToken 分页"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, url, params=None, headers=None, timeout=60):
+        params = dict(params or {})
+        self.calls.append(params)
+        if self.fail_on and self.fail_on(params):
+            raise cache_mod.requests.ConnectionError("boom")
+        statuses = params.get("filter.overallStatus", "").split(",")
+        hits = [s for s in STUDIES
+                if s["protocolSection"]["statusModule"]["overallStatus"] in statuses
+                and ("filter.advanced" not in params or _in_range(s, params["filter.advanced"]))]
+        offset, size = int(params.get("pageToken", 0)), int(params["pageSize"])
+        out = {"studies": hits[offset:offset + size], "totalCount": len(hits)}
+        if offset + size < len(hits):
+            out["nextPageToken"] = str(offset + size)
+        return out
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    def install(**kw):
+        api = FakeCTGov(**kw)
+        monkeypatch.setattr(cache_mod, "http_get_json", api)
+        return api
+    return install
+
+
+def _fetch(tmp_path, name, **kw):
+    data_dir = tmp_path / name
+    cache = HTTPCache(tmp_path / (name + "_cache"), max_workers=4)
+    kw.setdefault("page_size", 7)
+    rows, summ = fetch_failed_trials("atherosclerosis", data_dir, cache,
+                                     exclude_types=["DEVICE"], **kw)
+    return pd.read_csv(rows, dtype=str), pd.read_csv(summ, dtype=str)
+
+
+def _sorted(df):
+    return df.sort_values(list(df.columns), na_position="first").reset_index(drop=True)
+
+
+def test_date_ranges():
+    assert date_ranges([]) == [None]
+    assert date_ranges([2020, 2010]) == [
+        "AREA[StartDate]RANGE[MIN, 2009-12-31]",
+        "AREA[StartDate]RANGE[2010-01-01, 2019-12-31]",
+        "AREA[StartDate]RANGE[2020-01-01, MAX]",
+        "AREA[StartDate]MISSING",
+    ]
+
+
+class TestShardedFetch:
+    @pytest.mark.parametrize("date_shards", [None, [2005, 2012, 2018]])
+    @pytest.mark.parametrize("also_completed", [False, True])
+    def test_same_as_serial(self, tmp_path, fake_api, date_shards, also_completed):
+        fake_api()
+        rows, summ = _fetch(tmp_path, "serial", also_completed=also_completed)
+        api = fake_api()
+        s_rows, s_summ = _fetch(tmp_path, "sharded", also_completed=also_completed,
+                                fetch_mode="sharded", date_shards=date_shards)
+        assert len(rows) > 50 and list(s_rows.columns) == list(rows.columns)
+        pd.testing.assert_frame_equal(_sorted(s_rows), _sorted(rows))
+        pd.testing.assert_frame_equal(s_summ, summ)
+        n_shards = (3 + also_completed) * len(date_ranges(date_shards))
+        assert len({(p["filter.overallStatus"], p.get("filter.advanced")) for p in api.calls}) == n_shards
+        assert not (tmp_path / "sharded" / FETCH_STATE_DIR).exists()
+
+    def test_resume_after_interruption(self, tmp_path, fake_api):
+        fake_api()
+        want, _ = _fetch(tmp_path, "serial")
+        fake_api(fail_on=lambda p: p["filter.overallStatus"] == "TERMINATED" and p.get("pageToken") == "21")
+        with pytest.raises(RuntimeError, match="cursor.json"):
+            _fetch(tmp_path, "sharded", fetch_mode="sharded")
+        state_dir = tmp_path / "sharded" / FETCH_STATE_DIR
+        assert (state_dir / "cursor.json").exists()
+        # 游标之后写入的残留行在续抓时被截掉
+        with open(state_dir / "shard_000.csv", "a", encoding="utf-8") as f:
+            f.write("NCT_partial,x,TERMINATED,,,,,,STOPPED\n")
+
+        # 换新缓存目录: 请求数只反映续抓的页, 不是缓存命中
+        api = fake_api()
+        data_dir = tmp_path / "sharded"
+        rows, _ = fetch_failed_trials("atherosclerosis", data_dir, HTTPCache(tmp_path / "c2"),
+                                      exclude_types=["DEVICE"], page_size=7, fetch_mode="sharded")
+        got = pd.read_csv(rows, dtype=str)
+        pd.testing.assert_frame_equal(_sorted(got), _sorted(want))
+        assert {p["filter.overallStatus"] for p in api.calls} == {"TERMINATED"}
+        assert api.calls[0]["pageToken"] == "21"
+
+    def test_changed_query_restarts(self, tmp_path, fake_api):
+        fake_api(fail_on=lambda p: p["filter.overallStatus"] == "WITHDRAWN")
+        with pytest.raises(RuntimeError):
+            _fetch(tmp_path, "sharded", fetch_mode="sharded")
+        api = fake_api()
+        _fetch(tmp_path, "sharded", fetch_mode="sharded", page_size=50)
+        assert {p["filter.overallStatus"] for p in api.calls} == {"TERMINATED", "WITHDRAWN", "SUSPENDED"}
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            fetch_failed_trials("x", tmp_path, HTTPCache(tmp_path / "c"), fetch_mode="bulk")
+
+
+class TestConfig:
+    def test_defaults(self):
+        cfg = Config(raw={})
+        assert cfg.trial_fetch_mode == "serial" and cfg.trial_date_shards == []
+
+    def test_invalid(self):
+        cfg = Config(raw={"disease": {"condition": "x"},
+                          "trial_filter": {"fetch_mode": "bulk", "date_shards": ["abc"]}})
+        errors = cfg.validate()
+        assert any("fetch_mode" in e for e in errors)
+        assert any("date_shards" in e for e in errors)
@@ -0,0 +1,144 @@
+"""Unit tests for kg_explain.rankers.dtpd chunked mode.
+
+Tests cover:
+    - _drug_blocks: block sizes and prefix-sharing drug names
+    - run_dtpd(dtpd_engine=chunked) is byte-identical to the default engine for any block size
+    - LegacyTopK: per-block top-K equals select_topk over all paths
+    - default engine tie order (pinned dtpd_rank.csv)
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.config import Config
+from kg_explain.rankers import dtpd
+from kg_explain.rankers.dtpd import (
+    LegacyTopK, _block_dtp, _block_paths, _drug_blocks, _target_degree, load_dtpd_inputs, run_dtpd, select_topk,
+)
+
+
+class TestDrugBlocks:
+    def test_sizes(self):
+        drugs = [f"d{i:02d}" for i in range(10)]
+        blocks = _drug_blocks(drugs, 4)
+        assert [len(b) for b in blocks] == [4, 4, 2]
+        assert sum(blocks, []) == drugs
+
+    def test_prefix_names_share_block(self):
+        # "aspirin lysine||..." < "aspirin||..." 但 "aspirin" < "aspirin lysine"
+        blocks = _drug_blocks(["aspirin", "aspirin lysine", "aspirin-c", "b"], 1)
+        assert blocks == [["aspirin", "aspirin lysine", "aspirin-c"], ["b"]]
+
+    def test_empty(self):
+        assert _drug_blocks([], 10) == [[]]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    rng = np.random.default_rng(7)
+    drugs = ["aspirin", "aspirin lysine", "drug1", "drug10", "drug2", "drug1+drug2", "zeta"]
+    pd.DataFrame({
+        "drug_normalized": rng.choice(drugs, 60),
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 15, 60)],
+    }).to_csv(tmp_path / "edge_drug_target.csv", index=False)
+    pd.DataFrame({
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 15, 40)],
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 10, 40)],
+        "reactome_name": "pw",
+    }).to_csv(tmp_path / "edge_target_pathway_all.csv", index=False)
+    pd.DataFrame({
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 10, 30)],
+        "diseaseId": [f"EFO_{i}" for i in rng.integers(0, 12, 30)],
+        "diseaseName": "disease",
+        # 粗粒度分数: 制造同分路径, 检验 top-K 截断的确定性
+        "pathway_score": rng.choice([0.2, 0.5, 0.8], 30),
+        "support_genes": rng.integers(1, 80, 30),
+    }).to_csv(tmp_path / "edge_pathway_disease.csv", index=False)
+    return tmp_path
+
+
+def _cfg(data_dir, out_dir, **rank):
+    return Config(raw={
+        "paths": {"data_dir": str(data_dir), "output_dir": str(out_dir)},
+        "rank": {"topk_paths_per_pair": 2, **rank},
+    })
+
+
+def _run(data_dir, out_dir, **rank):
+    out = run_dtpd(_cfg(data_dir, out_dir, **rank))
+    return out["rank_csv"].read_bytes(), out["evidence_paths"].read_bytes()
+
+
+class TestChunkedMode:
+    @pytest.mark.parametrize("block_size", [1, 2, 100])
+    def test_byte_identical(self, data_dir, tmp_path, block_size):
+        default = _run(data_dir, tmp_path / "default")
+        chunked = _run(data_dir, tmp_path / f"chunked{block_size}",
+                       dtpd_engine="chunked", dtpd_block_size=block_size)
+        assert chunked == default
+        assert default[1].count(b"\n") > 0
+
+    def test_path_batches(self, data_dir, tmp_path, monkeypatch):
+        default = _run(data_dir, tmp_path / "default")
+        monkeypatch.setattr(dtpd, "_PATH_BATCH_ROWS", 1)
+        assert _run(data_dir, tmp_path / "batched", dtpd_engine="chunked", dtpd_block_size=2) == default
+
+    def test_empty_input(self, tmp_path):
+        pd.DataFrame(columns=["drug_normalized", "target_chembl_id"]).to_csv(
+            tmp_path / "edge_drug_target.csv", index=False)
+        pd.DataFrame(columns=["target_chembl_id", "reactome_stid", "reactome_name"]).to_csv(
+            tmp_path / "edge_target_pathway_all.csv", index=False)
+        pd.DataFrame(columns=["reactome_stid", "diseaseId", "diseaseName", "pathway_score", "support_genes"]).to_csv(
+            tmp_path / "edge_pathway_disease.csv", index=False)
+        assert _run(tmp_path, tmp_path / "a") == _run(tmp_path, tmp_path / "b", dtpd_engine="chunked")
+
+
+class TestLegacyTopK:
+    def test_matches_select_topk(self, data_dir, tmp_path, monkeypatch):
+        cfg = _cfg(data_dir, tmp_path)
+        dt, tp_core, pd_edge, aff_merge = load_dtpd_inputs(cfg)
+        dt_core = dt[["drug_normalized", "target_chembl_id"]].drop_duplicates()
+        paths = _block_paths(_block_dtp(dt_core, tp_core, _target_degree(dt_core, tp_core), cfg.rank),
+                             pd_edge, aff_merge, cfg.rank)
+        expected = select_topk(paths, 2).reset_index(drop=True)
+
+        monkeypatch.setattr(dtpd, "_PATH_BATCH_ROWS", 3)
+        legacy = LegacyTopK(dt_core, tp_core, pd_edge, aff_merge, cfg.rank, 2)
+        assert legacy.n_paths == len(paths)
+        drugs = sorted(expected["drug_normalized"].unique())
+        got = pd.concat([legacy.block_topk(b) for b in _drug_blocks(drugs, 2)], ignore_index=True)
+        pd.testing.assert_frame_equal(got, expected)
+        assert (legacy.rank >= 0).sum() == len(expected)
+
+
+TIES_EXPECTED = Path(__file__).parent / "fixtures" / "dtpd_ties" / "expected_dtpd_rank.csv"
+
+
+class TestDefaultTieOrder:
+    def test_matches_pinned_baseline(self, tmp_path):
+        """200 路径、三档分数: 大量同分路径落在 top-K 截断处; 默认模式输出须与历史版本逐字节一致."""
+        rng = np.random.default_rng(3)
+        n = 200
+        drugs = [f"drug{i}" for i in range(n // 8)]
+        pd.DataFrame({
+            "drug_normalized": rng.choice(drugs, n),
+            "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 40, n)],
+        }).to_csv(tmp_path / "edge_drug_target.csv", index=False)
+        pd.DataFrame({
+            "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 40, n)],
+            "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 25, n)],
+            "reactome_name": "pw",
+        }).to_csv(tmp_path / "edge_target_pathway_all.csv", index=False)
+        pd.DataFrame({
+            "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 25, n)],
+            "diseaseId": [f"EFO_{i}" for i in rng.integers(0, 6, n)],
+            "diseaseName": "disease",
+            "pathway_score": rng.choice([0.2, 0.5, 0.8], n),
+            "support_genes": rng.integers(1, 5, n),
+        }).to_csv(tmp_path / "edge_pathway_disease.csv", index=False)
+        rank_csv, _ = _run(tmp_path, tmp_path / "out")
+        assert rank_csv == TIES_EXPECTED.read_bytes()
+        chunked_csv, _ = _run(tmp_path, tmp_path / "chunked", dtpd_engine="chunked", dtpd_block_size=3)
+        assert chunked_csv == rank_csv
@@ -0,0 +1,150 @@
+"""Unit tests for kg_explain.rankers.dtpd_sparse (SciPy sparse DTPD engine).
+
+Tests cover:
+    - pair_stats: path counts / distinct targets vs explicit enumeration
+    - pair_scores parity with the pandas engine (run_dtpd)
+    - topk_paths parity with dtpd_paths.jsonl
+    - run_ranker with rank.dtpd_engine = sparse
+    - Config.dtpd_engine validation
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.config import Config
+from kg_explain.rankers.dtpd import run_dtpd
+from kg_explain.rankers.dtpd_sparse import SparseDTPD, run_dtpd_sparse
+from kg_explain.rankers.ranker import run_ranker
+
+
+def _write_inputs(data_dir, seed=0, n_drugs=40, n_targets=30, n_pathways=25, n_diseases=12, coarse=False):
+    """随机 DTPD 输入 (含经不同靶点到达同一通路的同分路径; coarse 时通路分数只取三档, 第 K 名大量同分)"""
+    rng = np.random.default_rng(seed)
+    drugs = [f"drug{i}" for i in range(n_drugs)] + ["drug1+drug2"]
+    dt = pd.DataFrame({
+        "drug_normalized": rng.choice(drugs, 150),
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, n_targets, 150)],
+    })
+    dt.to_csv(data_dir / "edge_drug_target.csv", index=False)
+    pd.DataFrame({
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, n_targets, 80)],
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, n_pathways, 80)],
+        "reactome_name": "pw",
+    }).to_csv(data_dir / "edge_target_pathway_all.csv", index=False)
+    pd.DataFrame({
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, n_pathways, 90)],
+        "diseaseId": [f"EFO_{i:04d}" for i in rng.integers(0, n_diseases, 90)],
+        "diseaseName": "disease",
+        "pathway_score": rng.choice([0.2, 0.5, 0.8], 90) if coarse else rng.random(90),
+        "support_genes": rng.integers(1, 120, 90),
+    }).to_csv(data_dir / "edge_pathway_disease.csv", index=False)
+    pairs = dt.drop_duplicates().sample(frac=0.5, random_state=seed)
+    pd.DataFrame({
+        "drug_normalized": pairs["drug_normalized"],
+        "target_chembl_id": pairs["target_chembl_id"],
+        "pchembl_value": rng.uniform(4, 10, len(pairs)),
+    }).to_csv(data_dir / "edge_drug_target_affinity.csv", index=False)
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _write_inputs(data_dir)
+    return Config(raw={
+        "paths": {"data_dir": str(data_dir), "output_dir": str(tmp_path / "out")},
+        "rank": {"topk_paths_per_pair": 3, "topk_pairs_per_drug": 4},
+        "disease": {"condition": "atherosclerosis"},
+    })
+
+
+class TestPairStats:
+    def test_counts_match_enumeration(self, cfg):
+        E = SparseDTPD.from_config(cfg)
+        stats = E.pair_stats().set_index(["drug_normalized", "diseaseId"])
+        every = E.topk_paths(stats.index.to_frame(index=False), k=10**6)
+        g = every.groupby(["drug_normalized", "diseaseId"])
+        assert len(stats) == g.ngroups
+        assert (g.size() == stats["n_paths"].reindex(g.size().index)).all()
+        assert (g["target_chembl_id"].nunique() == stats["n_targets"].reindex(g.size().index)).all()
+        np.testing.assert_allclose(stats["max_score"].reindex(g.size().index), g["path_score"].max())
+        np.testing.assert_allclose(stats["score_sum"].reindex(g.size().index), g["path_score"].sum())
+
+    def test_block_size_invariant(self, cfg):
+        default = SparseDTPD.from_config(cfg)
+        small = SparseDTPD.from_config(Config(raw={**cfg.raw, "rank": {**cfg.rank, "dtpd_block_size": 3}}))
+        pd.testing.assert_frame_equal(default.pair_stats(), small.pair_stats())
+
+
+class TestParityWithPandas:
+    def test_pair_scores(self, cfg):
+        run_dtpd(cfg)
+        base = pd.read_csv(cfg.output_dir / "dtpd_rank.csv")
+        run_dtpd_sparse(cfg)
+        sparse_rank = pd.read_csv(cfg.output_dir / "dtpd_rank.csv")
+
+        assert list(sparse_rank.columns) == list(base.columns)
+        assert list(zip(sparse_rank["drug_normalized"], sparse_rank["diseaseId"])) == \
+            list(zip(base["drug_normalized"], base["diseaseId"]))
+        np.testing.assert_allclose(sparse_rank["final_score"], base["final_score"], rtol=1e-12)
+        assert "drug1+drug2" in set(sparse_rank["drug_normalized"])
+
+    def test_pair_scores_ties_at_k(self, cfg):
+        _write_inputs(cfg.data_dir, seed=1, coarse=True)
+        (cfg.data_dir / "edge_drug_target_affinity.csv").unlink()
+        run_dtpd(cfg)
+        base = pd.read_csv(cfg.output_dir / "dtpd_rank.csv")
+        run_dtpd_sparse(cfg)
+        sparse_rank = pd.read_csv(cfg.output_dir / "dtpd_rank.csv")
+
+        pd.testing.assert_frame_equal(sparse_rank, base, check_exact=False, rtol=1e-12)
+
+    def test_topk_paths(self, cfg):
+        out = run_dtpd(cfg)
+        base = [json.loads(line) for line in out["evidence_paths"].read_text().splitlines()]
+        E = SparseDTPD.from_config(cfg)
+        pairs = pd.DataFrame({"drug_normalized": [r["drug"] for r in base],
+                              "diseaseId": [r["diseaseId"] for r in base]}).drop_duplicates()
+        top = E.topk_paths(pairs, k=3)
+        got = list(zip(top["drug_normalized"], top["diseaseId"], top["target_chembl_id"],
+                       top["reactome_stid"], top["path_score"]))
+        want = [(r["drug"], r["diseaseId"], r["nodes"][1]["id"], r["nodes"][2]["id"], r["path_score"])
+                for r in base]
+        assert got == want
+
+    def test_unknown_pairs_ignored(self, cfg):
+        E = SparseDTPD.from_config(cfg)
+        top = E.topk_paths(pd.DataFrame({"drug_normalized": ["nope"], "diseaseId": ["EFO_0000"]}), k=3)
+        assert top.empty
+
+
+class TestRankerSparseEngine:
+    def test_same_ranking(self, cfg, tmp_path):
+        run_ranker(cfg)
+        base = pd.read_csv(cfg.output_dir / "drug_disease_rank.csv")
+        base_packs = sorted(p.name for p in (cfg.output_dir / "evidence_pack").glob("*.json"))
+
+        sparse_cfg = Config(raw={**cfg.raw,
+                                 "paths": {**cfg.raw["paths"], "output_dir": str(tmp_path / "out_sparse")},
+                                 "rank": {**cfg.rank, "dtpd_engine": "sparse"}})
+        run_ranker(sparse_cfg)
+        got = pd.read_csv(sparse_cfg.output_dir / "drug_disease_rank.csv")
+
+        pd.testing.assert_frame_equal(got, base)
+        assert sorted(p.name for p in (sparse_cfg.output_dir / "evidence_pack").glob("*.json")) == base_packs
+
+        # dtpd_paths.jsonl 只包含存活对
+        lines = (sparse_cfg.output_dir / "dtpd_paths.jsonl").read_text().splitlines()
+        pairs = {(json.loads(line)["drug"], json.loads(line)["diseaseId"]) for line in lines}
+        assert pairs == set(zip(got["drug_normalized"], got["diseaseId"]))
+
+
+class TestConfigEngine:
+    def test_default(self):
+        assert Config(raw={}).dtpd_engine == "pandas"
+
+    def test_invalid(self):
+        cfg = Config(raw={"disease": {"condition": "x"}, "rank": {"dtpd_engine": "gpu"}})
+        assert any("dtpd_engine" in e for e in cfg.validate())
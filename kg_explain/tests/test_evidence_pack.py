@@ -0,0 +1,153 @@
+"""Unit tests for kg_explain.evidence_pack (evidence pack storage).
+
+Tests cover:
+    - write_evidence_packs: files / jsonl index / sqlite, stale cleanup, changed-only rewrite
+    - EvidencePackStore: format detection, get / keys / iteration / iter_disease
+    - run_ranker with rank.evidence_pack_format = jsonl / sqlite
+    - Config.evidence_pack_format validation
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.config import Config
+from kg_explain.evidence_pack import EvidencePackStore, pack_filename, write_evidence_packs
+from kg_explain.rankers.ranker import run_ranker
+from kg_explain.utils import write_jsonl
+
+
+def _pack(drug, disease_id, score=0.5):
+    return {
+        "drug": drug,
+        "disease": {"id": disease_id, "name": "disease " + disease_id},
+        "scores": {"final": score},
+        "explainable_paths": [{"type": "DTPD", "path_score": score}],
+    }
+
+
+PACKS = [_pack("aspirin", "EFO_1"), _pack("aspirin", "EFO_2", 0.25),
+         _pack("5-fu/leucovorin", "MONDO:0001", 0.75), _pack("药物", "EFO_1", 0.1)]
+
+
+def _write(out_dir, fmt):
+    write_jsonl(out_dir / "evidence_paths.jsonl", PACKS)
+    return write_evidence_packs(out_dir, PACKS, fmt=fmt, max_workers=4)
+
+
+@pytest.mark.parametrize("fmt", ["files", "jsonl", "sqlite"])
+class TestRoundTrip:
+    def test_get(self, tmp_path, fmt):
+        loc = _write(tmp_path, fmt)
+        with EvidencePackStore.open(tmp_path) as store:
+            assert store.fmt == fmt and store.path == loc
+            assert len(store) == len(PACKS)
+            for p in PACKS:
+                assert store.get(p["drug"], p["disease"]["id"]) == p
+            assert store.get("aspirin", "EFO_9") is None
+
+    def test_keys_and_iter(self, tmp_path, fmt):
+        _write(tmp_path, fmt)
+        store = EvidencePackStore.open(tmp_path)
+        want = sorted((p["drug"], p["disease"]["id"]) for p in PACKS)
+        assert sorted(store.keys()) == want
+        assert sorted((p["drug"], p["disease"]["id"]) for p in store) == want
+        assert sorted(p["drug"] for p in store.iter_disease(["EFO_1"])) == ["aspirin", "药物"]
+        assert store.nbytes > 0
+        store.close()
+
+
+class TestWrite:
+    def test_files_layout_unchanged(self, tmp_path):
+        ep_dir = _write(tmp_path, "files")
+        assert (ep_dir / "5-fu_leucovorin__MONDO_0001.json").exists()
+        assert pack_filename("a/b", "X:1") == "a_b__X_1.json"
+        text = (ep_dir / "aspirin__EFO_1.json").read_text(encoding="utf-8")
+        assert text == json.dumps(PACKS[0], ensure_ascii=False, indent=2)
+
+    def test_switching_format_clears_stale(self, tmp_path):
+        _write(tmp_path, "files")
+        _write(tmp_path, "sqlite")
+        assert not list((tmp_path / "evidence_pack").glob("*.json"))
+        assert EvidencePackStore.open(tmp_path).fmt == "sqlite"
+        _write(tmp_path, "jsonl")
+        assert not (tmp_path / "evidence_pack.sqlite").exists()
+        assert EvidencePackStore.open(tmp_path).fmt == "jsonl"
+
+    def test_changed_only(self, tmp_path):
+        ep_dir = _write(tmp_path, "files")
+        (ep_dir / "aspirin__EFO_1.json").write_text("old", encoding="utf-8")
+        packs = [_pack("aspirin", "EFO_1"), _pack("aspirin", "EFO_2", 0.3)]
+        write_evidence_packs(tmp_path, packs, fmt="files", changed={"aspirin||EFO_2"})
+        assert sorted(p.name for p in ep_dir.glob("*.json")) == ["aspirin__EFO_1.json", "aspirin__EFO_2.json"]
+        assert (ep_dir / "aspirin__EFO_1.json").read_text(encoding="utf-8") == "old"
+        assert EvidencePackStore.open(tmp_path).get("aspirin", "EFO_2") == packs[1]
+
+    def test_missing_store(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            EvidencePackStore.open(tmp_path)
+
+
+class TestRankerFormats:
+    @pytest.fixture
+    def cfg(self, tmp_path):
+        data_dir = tmp_path / "data"
+        data_dir.mkdir()
+        rng = np.random.default_rng(3)
+        pd.DataFrame({
+            "drug_normalized": rng.choice([f"drug{i}" for i in range(15)] + ["a/b"], 60),
+            "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 12, 60)],
+        }).to_csv(data_dir / "edge_drug_target.csv", index=False)
+        pd.DataFrame({
+            "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 12, 40)],
+            "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 10, 40)],
+            "reactome_name": "pw",
+        }).to_csv(data_dir / "edge_target_pathway_all.csv", index=False)
+        pd.DataFrame({
+            "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 10, 40)],
+            "diseaseId": [f"EFO:{i:04d}" for i in rng.integers(0, 8, 40)],
+            "diseaseName": "disease",
+            "pathway_score": rng.random(40),
+            "support_genes": rng.integers(1, 120, 40),
+        }).to_csv(data_dir / "edge_pathway_disease.csv", index=False)
+        return Config(raw={
+            "paths": {"data_dir": str(data_dir), "output_dir": str(tmp_path / "out")},
+            "rank": {"topk_paths_per_pair": 3, "topk_pairs_per_drug": 4},
+            "disease": {"condition": "atherosclerosis"},
+        })
+
+    @pytest.mark.parametrize("fmt", ["jsonl", "sqlite"])
+    def test_same_packs_as_files(self, cfg, tmp_path, fmt):
+        out = run_ranker(cfg)
+        files = EvidencePackStore.open(out["evidence_pack_store"])
+        assert files.fmt == "files" and len(files) > 0
+
+        fmt_cfg = Config(raw={**cfg.raw,
+                              "paths": {**cfg.raw["paths"], "output_dir": str(tmp_path / fmt)},
+                              "rank": {**cfg.rank, "evidence_pack_format": fmt}})
+        out = run_ranker(fmt_cfg)
+        assert not (fmt_cfg.output_dir / "evidence_pack").exists()
+        with EvidencePackStore.open(fmt_cfg.output_dir) as store:
+            assert store.path == out["evidence_pack_store"]
+            assert sorted(store.keys()) == sorted(files.keys())
+            for key in files.keys():
+                assert store.get(*key) == files.get(*key)
+
+    def test_paths_grouped_per_pair(self, cfg):
+        run_ranker(cfg)
+        dtpd = [json.loads(line) for line in (cfg.output_dir / "dtpd_paths.jsonl").read_text().splitlines()]
+        for pack in EvidencePackStore.open(cfg.output_dir):
+            want = [r["path_score"] for r in dtpd
+                    if r["drug"] == pack["drug"] and r["diseaseId"] == pack["disease"]["id"]][:3]
+            # pd.read_json 的浮点解析与 json.loads 可差 1 ulp
+            assert [p["path_score"] for p in pack["explainable_paths"]] == pytest.approx(want, rel=1e-12)
+
+
+class TestConfigFormat:
+    def test_default(self):
+        assert Config(raw={}).evidence_pack_format == "files"
+
+    def test_invalid(self):
+        cfg = Config(raw={"disease": {"condition": "x"}, "rank": {"evidence_pack_format": "parquet"}})
+        assert any("evidence_pack_format" in e for e in cfg.validate())
@@ -0,0 +1,202 @@
+"""Unit tests for kg_explain.datasources.faers_bulk (local FAERS bulk store).
+
+Tests cover:
+    - build_faers_store from quarterly ASCII (zip) and openFDA JSON: per-report
+      dedup, multi-ingredient split, salt-stripped keys, background counts,
+      latest case version only (across quarters)
+    - calc_prr_array == _calc_prr element-wise (incl. degenerate denominators)
+    - fetch_drug_ae(bulk_store=...) makes no network calls and matches the API path
+      when the API returns the same (untruncated) counts
+    - Config.faers_bulk_store
+"""
+import json
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain import cache as cache_mod
+from kg_explain.cache import HTTPCache
+from kg_explain.config import Config
+from kg_explain.datasources.faers import FAERS_API, _calc_prr, fetch_drug_ae
+from kg_explain.datasources.faers_bulk import FAERSStore, build_faers_store, calc_prr_array
+
+DRUG_ROWS = [
+    # primaryid, caseid, drug_seq, role_cod, drugname, prod_ai
+    ("101", "1", "1", "PS", "LIPITOR", "ATORVASTATIN CALCIUM"),
+    ("101", "1", "2", "C", "ASPIRIN", "ASPIRIN"),
+    ("102", "2", "1", "PS", "ATORVASTATIN", "ATORVASTATIN CALCIUM"),
+    ("103", "3", "1", "PS", "PLAVIX", "CLOPIDOGREL BISULFATE"),
+    ("104", "4", "1", "PS", "DUOPLAVIN", "ASPIRIN\\CLOPIDOGREL"),
+    ("105", "5", "1", "PS", "ASPIRIN.", "ASPIRIN"),
+]
+REAC_ROWS = [
+    ("101", "1", "Myalgia"), ("101", "1", "Nausea"),
+    ("102", "2", "Myalgia"), ("102", "2", "myalgia"),           # 同一报告重复术语只计一次
+    ("103", "3", "Haemorrhage"), ("104", "4", "Haemorrhage"), ("104", "4", "Nausea"),
+    ("105", "5", "Nausea"), ("106", "6", "Rash"),                 # 106 无药物记录, 只进背景
+]
+
+
+def _write_ascii_zip(path, drug_rows=DRUG_ROWS, reac_rows=REAC_ROWS, quarter="24Q1"):
+    drug = "primaryid$caseid$drug_seq$role_cod$drugname$prod_ai\n" + "".join(
+        "$".join(r) + "\n" for r in drug_rows)
+    reac = "primaryid$caseid$pt\n" + "".join("$".join(r) + "\n" for r in reac_rows)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(f"ASCII/DRUG{quarter}.txt", drug)
+        zf.writestr(f"ASCII/REAC{quarter}.txt", reac)
+        zf.writestr("ASCII/Readme.pdf", "x")
+
+
+def _counts(store):
+    """计数表全部行 (按 _meta.json 的 format 读取 Parquet 或 CSV)"""
+    meta = json.loads((store / "_meta.json").read_text(encoding="utf-8"))
+    if meta["format"] == "parquet":
+        df = pd.read_parquet(store / "drug_ae_counts.parquet")
+    else:
+        df = pd.read_csv(store / "drug_ae_counts.csv")
+    return {(r.drug, r.ae_term): r.report_count for r in df.itertuples()}
+
+
+class TestBuild:
+    def test_ascii(self, tmp_path):
+        src = tmp_path / "faers"
+        src.mkdir()
+        _write_ascii_zip(src / "faers_ascii_2024Q1.zip")
+        meta = build_faers_store(src, tmp_path / "store")
+        counts = _counts(tmp_path / "store")
+        assert counts[("atorvastatin", "MYALGIA")] == 2        # 盐型去除后合并 101 / 102
+        assert counts[("atorvastatin calcium", "MYALGIA")] == 2
+        assert counts[("lipitor", "NAUSEA")] == 1
+        assert counts[("aspirin", "NAUSEA")] == 3              # 101 / 104 (多成分) / 105 ("ASPIRIN.")
+        assert counts[("clopidogrel", "HAEMORRHAGE")] == 2
+        assert meta["background_total"] == 8 and meta["sources"] == ["24Q1 (ASCII)"]
+        bg = FAERSStore(tmp_path / "store").background
+        assert bg["NAUSEA"] == 3 and bg["RASH"] == 1
+
+    def test_latest_case_version(self, tmp_path):
+        src = tmp_path / "faers"
+        src.mkdir()
+        # 病例 20: 24Q1 初始报告 (2001) 与 24Q2 随访 (2002); 病例 30 同季度两个版本
+        _write_ascii_zip(src / "faers_ascii_2024Q1.zip", quarter="24Q1",
+                         drug_rows=[("2001", "20", "1", "PS", "ASPIRIN", "ASPIRIN"),
+                                    ("3001", "30", "1", "PS", "PLAVIX", "CLOPIDOGREL"),
+                                    ("3002", "30", "1", "PS", "PLAVIX", "CLOPIDOGREL")],
+                         reac_rows=[("2001", "20", "Nausea"), ("3001", "30", "Rash"),
+                                    ("3002", "30", "Rash"), ("3002", "30", "Haemorrhage")])
+        _write_ascii_zip(src / "faers_ascii_2024Q2.zip", quarter="24Q2",
+                         drug_rows=[("2002", "20", "1", "PS", "ASPIRIN", "ASPIRIN")],
+                         reac_rows=[("2002", "20", "Nausea"), ("2002", "20", "Vomiting")])
+        meta = build_faers_store(src, tmp_path / "store")
+        counts = _counts(tmp_path / "store")
+        assert counts[("aspirin", "NAUSEA")] == 1
+        assert counts[("aspirin", "VOMITING")] == 1
+        assert counts[("clopidogrel", "RASH")] == 1
+        assert counts[("clopidogrel", "HAEMORRHAGE")] == 1
+        assert meta["background_total"] == 4
+
+    def test_openfda_json(self, tmp_path):
+        src = tmp_path / "faers"
+        src.mkdir()
+        reports = [
+            {"safetyreportid": "9001", "patient": {
+                "drug": [{"medicinalproduct": "Lipitor",
+                          "openfda": {"generic_name": ["ATORVASTATIN CALCIUM"], "brand_name": ["LIPITOR"]}}],
+                "reaction": [{"reactionmeddrapt": "Myalgia"}, {"reactionmeddrapt": "MYALGIA"}]}},
+            {"safetyreportid": "9002", "patient": {
+                "drug": [{"medicinalproduct": "ASPIRIN"}],
+                "reaction": [{"reactionmeddrapt": "Nausea"}]}},
+        ]
+        with zipfile.ZipFile(src / "drug-event-0001-of-0001.json.zip", "w") as zf:
+            zf.writestr("drug-event-0001-of-0001.json", json.dumps({"results": reports}))
+        build_faers_store(src, tmp_path / "store")
+        counts = _counts(tmp_path / "store")
+        assert counts == {("aspirin", "NAUSEA"): 1, ("atorvastatin", "MYALGIA"): 1,
+                          ("atorvastatin calcium", "MYALGIA"): 1, ("lipitor", "MYALGIA"): 1}
+
+    def test_empty_source(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            build_faers_store(tmp_path, tmp_path / "store")
+
+
+def test_prr_array_matches_scalar():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 50, 400)
+    drug_total = a + rng.integers(0, 200, 400)
+    bg_ae = a + rng.integers(0, 300, 400)
+    bg_total = 5000
+    drug_total[:5] = [0, bg_total, bg_total + 1, 10, 10]
+    bg_ae[3:5] = a[3:5]                                         # c = 0
+    want = [_calc_prr(int(x), int(t), int(b), bg_total) for x, t, b in zip(a, drug_total, bg_ae)]
+    assert calc_prr_array(a, drug_total, bg_ae, bg_total).tolist() == want
+
+
+class FakeOpenFDA:
+    """openFDA count 查询: 由同一批量库返回 (按报告数降序) 的完整计数"""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = 0
+
+    def __call__(self, url, params=None, headers=None, timeout=60):
+        self.calls += 1
+        assert url == FAERS_API
+        if "search" not in params:
+            bg = self.store.background.sort_values(ascending=False, kind="stable")
+            return {"results": [{"term": t, "count": int(c)} for t, c in bg.items()]}
+        name = params["search"].split('"')[1].lower()
+        df = self.store.counts([name]).sort_values(["report_count", "ae_term"], ascending=[False, True])
+        return {"results": [{"term": t, "count": int(c)} for t, c in zip(df["ae_term"], df["report_count"])]}
+
+
+class TestFetchFromStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        rng = np.random.default_rng(4)
+        drugs = [f"drug{i}" for i in range(30)] + ["tofacitinib"]
+        terms = [f"AE {i}" for i in range(40)] + ["DEATH"]
+        drug_rows, reac_rows = [], []
+        for rid in range(3000):
+            for d in rng.choice(drugs, rng.integers(1, 3), replace=False):
+                drug_rows.append((str(rid), str(rid), "1", "PS", d.upper(), d.upper()))
+            for t in rng.choice(terms, rng.integers(1, 4), replace=False):
+                reac_rows.append((str(rid), str(rid), t))
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "DRUG23Q4.txt").write_text("primaryid$caseid$drug_seq$role_cod$drugname$prod_ai\n" + "".join(
+            "$".join(r) + "\n" for r in drug_rows), encoding="latin-1")
+        (src / "REAC23Q4.txt").write_text("primaryid$caseid$pt\n" + "".join(
+            "$".join(r) + "\n" for r in reac_rows), encoding="latin-1")
+        build_faers_store(src, tmp_path / "store")
+        return tmp_path / "store"
+
+    def test_matches_api(self, store, tmp_path, monkeypatch):
+        drug_list = ["drug1", "Drug2+drug3", "tofacitinib citrate", "unknown", "drug1"]
+        kw = dict(min_count=8, min_prr=1.2, top_ae=15, max_drugs=10)
+
+        api = FakeOpenFDA(FAERSStore(store))
+        monkeypatch.setattr(cache_mod, "http_get_json", api)
+        via_api = pd.read_csv(fetch_drug_ae(tmp_path / "api", HTTPCache(tmp_path / "c"), drug_list, **kw))
+        assert api.calls > 5
+
+        api.calls = 0
+        out = fetch_drug_ae(tmp_path / "bulk", HTTPCache(tmp_path / "c2"), drug_list, bulk_store=store, **kw)
+        assert api.calls == 0
+        bulk = pd.read_csv(out)
+        assert len(bulk) > 20 and bulk["prr"].min() >= 1.2
+        assert set(bulk["drug_normalized"]) == {"drug1", "drug2", "drug3", "tofacitinib citrate"}
+        pd.testing.assert_frame_equal(bulk, via_api)
+
+    def test_no_filters(self, store, tmp_path):
+        out = pd.read_csv(fetch_drug_ae(tmp_path, None, ["drug5"], min_count=0, top_ae=100,
+                                        bulk_store=store))
+        counts = FAERSStore(store).counts(["drug5"])
+        assert len(out) == len(counts)
+        assert (out["drug_total_reports"] == counts["report_count"].sum()).all()
+        assert out["report_count"].is_monotonic_decreasing
+
+
+def test_config_bulk_store():
+    assert Config(raw={}).faers_bulk_store is None
+    assert str(Config(raw={"faers": {"bulk_store": "/data/faers"}}).faers_bulk_store) == "/data/faers"
@@ -7,7 +7,7 @@ from pathlib import Path
 import pandas as pd
 import pytest
 
-from kg_explain.governance.registry import ModelVersion, ModelRegistry
+from kg_explain.governance.registry import ModelVersion, ModelRegistry, performance_from_manifest
 from kg_explain.governance.quality_gate import QualityGate, QualityGateResult
 from kg_explain.governance.regression import (
     RegressionSuite,
@@ -284,6 +284,109 @@ class TestQualityGate:
         assert "not found" in result.warnings[0]
 
 
+# ===================================================================
+# Performance baselines (registry snapshot + gate rule)
+# ===================================================================
+
+MANIFEST = {
+    "pipeline_elapsed_sec": 120.0,
+    "peak_rss_mb": 800.0,
+    "step_timings": [
+        {"step": "[2/10] ChEMBL", "elapsed_sec": 60.0, "status": "ok", "peak_rss_mb": 500.0},
+        {"step": "[Final] v5 排序", "elapsed_sec": 40.0, "status": "ok", "peak_rss_mb": 800.0},
+        {"step": "[3/10] tiny", "elapsed_sec": 0.2, "status": "ok"},
+    ],
+    "http_stats": {"requests": 1500, "coalesced": 3},
+    "cache_stats": {"hits": 900, "misses": 100, "hit_rate": 0.9},
+}
+
+
+def _perf(scale: float = 1.0, rss: float = 800.0) -> dict:
+    perf = performance_from_manifest(MANIFEST)
+    perf["step_seconds"] = {k: v * scale for k, v in perf["step_seconds"].items()}
+    perf["pipeline_elapsed_sec"] *= scale
+    perf["peak_rss_mb"] = rss
+    return perf
+
+
+class TestPerformanceBaseline:
+    def test_performance_from_manifest(self):
+        perf = performance_from_manifest(MANIFEST)
+        assert perf["step_seconds"]["[Final] v5 排序"] == 40.0
+        assert perf["step_peak_rss_mb"] == {"[2/10] ChEMBL": 500.0, "[Final] v5 排序": 800.0}
+        assert perf["http_requests"] == 1500
+        assert perf["cache_hit_rate"] == 0.9 and perf["cache_misses"] == 100
+        assert performance_from_manifest({}) == {}
+
+    def test_register_and_diff(self, tmp_path: Path):
+        reg_path = tmp_path / "registry.json"
+        registry = ModelRegistry(reg_path)
+        cfg = _write_config(tmp_path / "c.yaml")
+        data = _make_data_dir(tmp_path / "data")
+        va = registry.register("v5", cfg, data, {"mrr": 0.3}, performance=_perf())
+        vb = registry.register("v5", cfg, data, {"mrr": 0.3}, performance=_perf(1.5, rss=1000.0))
+
+        reloaded = ModelRegistry(reg_path)
+        assert reloaded.get(va.version_id).performance == _perf()
+        diff = reloaded.diff(vb.version_id, va.version_id)["performance_diff"]
+        step = diff["step_seconds/[2/10] ChEMBL"]
+        assert step == {"a": 90.0, "b": 60.0, "delta": 30.0, "pct": 0.5}
+        assert diff["peak_rss_mb"]["pct"] == 0.25
+        assert diff["http_requests"]["delta"] == 0.0
+
+    def test_legacy_registry_without_performance(self, tmp_path: Path):
+        reg_path = tmp_path / "registry.json"
+        reg_path.write_text(json.dumps({"versions": [{
+            "version_id": "v5-1", "ranker_version": "v5", "config_hash": "x",
+            "data_hashes": {}, "metrics": {}, "created_at": "2026-01-01",
+        }]}), encoding="utf-8")
+        assert ModelRegistry(reg_path).get("v5-1").performance == {}
+
+    def test_step_regression_blocks(self):
+        gate = QualityGate({}, performance_tolerance=0.20)
+        slow = _perf()
+        slow["step_seconds"]["[2/10] ChEMBL"] = 75.0   # +25%
+        slow["step_seconds"]["[3/10] tiny"] = 5.0      # baseline < 1s: not gated
+        result = gate.check({}, performance=slow, baseline_performance=_perf())
+        assert not result.passed
+        assert len(result.performance_regressions) == 1
+        assert "[2/10] ChEMBL" in result.performance_regressions[0]
+        assert "Performance:" in result.summary()
+
+    def test_within_tolerance_and_memory(self):
+        gate = QualityGate({}, performance_tolerance=0.20)
+        assert gate.check({}, performance=_perf(1.15), baseline_performance=_perf()).passed
+        result = gate.check({}, performance=_perf(rss=1200.0), baseline_performance=_perf())
+        assert result.performance_regressions[0].startswith("peak_rss_mb")
+        # 未配置 performance_tolerance 时不检查性能
+        assert QualityGate({}).check({}, performance=_perf(3.0), baseline_performance=_perf()).passed
+
+    def test_missing_step_is_warning(self):
+        gate = QualityGate({}, performance_tolerance=0.20)
+        perf = _perf()
+        del perf["step_seconds"]["[Final] v5 排序"]
+        result = gate.check({}, performance=perf, baseline_performance=_perf())
+        assert result.passed and any("not found" in w for w in result.warnings)
+
+    def test_from_config_and_check_release(self, tmp_path: Path):
+        gate = QualityGate.from_config({"thresholds": {"mrr": 0.25}, "performance_tolerance": 0.1,
+                                        "performance_min_seconds": 50})
+        assert gate.performance_tolerance == 0.1 and gate.performance_min_seconds == 50
+        assert QualityGate.from_config({}).performance_tolerance is None
+
+        registry = ModelRegistry(tmp_path / "registry.json")
+        cfg = _write_config(tmp_path / "c.yaml")
+        data = _make_data_dir(tmp_path / "data")
+        base = registry.register("v5", cfg, data, {"mrr": 0.3}, performance=_perf())
+        cand = registry.register("v5", cfg, data, {"mrr": 0.3}, performance=_perf(1.3))
+        # 无已批准基线: 只检查阈值
+        assert gate.check_release(registry, cand.version_id).passed
+        registry.approve(base.version_id)
+        result = gate.check_release(registry, cand.version_id)
+        # min_seconds=50: 只有 60s 的步骤和 120s 总耗时参与比较
+        assert not result.passed and len(result.performance_regressions) == 2
+
+
 # ===================================================================
 # RegressionSuite tests
 # ===================================================================
@@ -446,3 +549,114 @@ class TestRegressionSuite:
 
         # The fixture should also be discoverable now
         assert any(f.name == "snapshot_v5" for f in suite.fixtures)
+
+
+# ===================================================================
+# RegressionSuite rerun mode (isolated ranker runs, memo, reports)
+# ===================================================================
+
+
+def _ranker_data(base: Path, seed: int = 3) -> Path:
+    """Small but complete ranker input (drug→target→pathway→disease)."""
+    import numpy as np
+
+    base.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        "drug_normalized": rng.choice([f"drug{i}" for i in range(10)], 40),
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 8, 40)],
+    }).to_csv(base / "edge_drug_target.csv", index=False)
+    pd.DataFrame({
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 8, 30)],
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 6, 30)],
+        "reactome_name": "pw",
+    }).to_csv(base / "edge_target_pathway_all.csv", index=False)
+    pd.DataFrame({
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 6, 30)],
+        "diseaseId": [f"EFO_{i:04d}" for i in rng.integers(0, 4, 30)],
+        "diseaseName": "disease",
+        "pathway_score": rng.random(30).round(4),
+        "support_genes": rng.integers(1, 60, 30),
+    }).to_csv(base / "edge_pathway_disease.csv", index=False)
+    return base
+
+
+class TestRegressionRerun:
+    CONFIG = {"rank": {"topk_paths_per_pair": 3, "topk_pairs_per_drug": 3},
+              "disease": {"condition": "atherosclerosis"}}
+
+    @pytest.fixture
+    def suite(self, tmp_path: Path) -> RegressionSuite:
+        from kg_explain.config import Config
+        from kg_explain.rankers.ranker import run_ranker
+
+        suite = RegressionSuite(tmp_path / "fixtures")
+        for name, seed in (("case_a", 3), ("case_b", 4)):
+            data = _ranker_data(tmp_path / f"src_{name}", seed)
+            out = run_ranker(Config(raw={**self.CONFIG, "paths": {
+                "data_dir": str(data), "output_dir": str(tmp_path / f"out_{name}")}}))
+            suite.create_fixture(name, data, out["rank_csv"], config=self.CONFIG)
+        return suite
+
+    def test_rerun_memoized(self, suite: RegressionSuite, tmp_path: Path):
+        cache = tmp_path / "cache"
+        first = suite.run_all(rerun=True, cache_dir=cache)
+        assert [r.passed for r in first] == [True, True]
+        assert not any(r.cached for r in first)
+        assert all(r.runtime_s > 0 and r.peak_rss_mb > 0 for r in first)
+
+        second = suite.run_all(rerun=True, cache_dir=cache)
+        assert all(r.cached and r.passed for r in second)
+        assert [r.runtime_s for r in second] == [r.runtime_s for r in first]
+
+        # 输入变化 → 该 fixture 重新排序, 且与快照不一致
+        data_b = suite.fixtures[1].data_dir
+        pe = pd.read_csv(data_b / "edge_pathway_disease.csv")
+        pe["pathway_score"] = (pe["pathway_score"] * 0.5).round(4)
+        pe.to_csv(data_b / "edge_pathway_disease.csv", index=False)
+        third = suite.run_all(rerun=True, cache_dir=cache)
+        assert third[0].cached and not third[1].cached
+        assert not third[1].passed
+
+    def test_pool_matches_in_process(self, suite: RegressionSuite):
+        seq = suite.run_all(rerun=True, use_cache=False)
+        pooled = suite.run_all(rerun=True, workers=2, use_cache=False)
+        strip = lambda rs: [(r.fixture_name, r.passed, r.max_score_delta, r.rank_changes) for r in rs]
+        assert strip(pooled) == strip(seq)
+        assert not (suite.fixtures_dir / ".rerun_cache").exists()
+
+    def test_performance_budget(self, suite: RegressionSuite, tmp_path: Path):
+        suite.fixtures[0].max_runtime_s = 0.0
+        result = suite.rerun_one("case_a", cache_dir=tmp_path / "cache")
+        assert not result.passed
+        assert "exceeds budget" in result.details[0]
+
+    def test_ranker_failure(self, tmp_path: Path):
+        suite = RegressionSuite(tmp_path / "fixtures")
+        output_csv = _make_ranking_csv(tmp_path / "rank.csv", [
+            {"drug_normalized": "aspirin", "diseaseId": "D001", "final_score": "0.85"}])
+        suite.create_fixture("broken", _make_data_dir(tmp_path / "stub"), output_csv)
+        result = suite.run_all(rerun=True)[0]
+        assert not result.passed and result.details[0].startswith("Ranker failed")
+
+    def test_reports(self, suite: RegressionSuite, tmp_path: Path):
+        import xml.etree.ElementTree as ET
+        from kg_explain.governance import write_reports
+
+        results = suite.run_all(rerun=True, cache_dir=tmp_path / "cache")
+        results[1].passed = False
+        results[1].details = ["1 pairs exceed tolerance 0.001"]
+        paths = write_reports(results, tmp_path / "reports")
+
+        root = ET.parse(paths["junit"]).getroot()
+        assert root.get("tests") == "2" and root.get("failures") == "1"
+        cases = root.findall("testcase")
+        assert [c.get("name") for c in cases] == ["case_a", "case_b"]
+        assert float(cases[0].get("time")) == pytest.approx(results[0].runtime_s, abs=1e-3)
+        assert cases[1].find("failure").get("message") == "1 pairs exceed tolerance 0.001"
+        props = {p.get("name"): p.get("value") for p in cases[0].iter("property")}
+        assert float(props["peak_rss_mb"]) > 0
+
+        report = json.loads(paths["json"].read_text(encoding="utf-8"))
+        assert report["n_fixtures"] == 2 and report["n_failed"] == 1
+        assert report["results"][0]["peak_rss_mb"] == results[0].peak_rss_mb
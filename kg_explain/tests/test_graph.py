@@ -2,6 +2,7 @@
 
 Tests cover:
     - build_kg: from CSV data
+    - build_kg vs _build_kg_rowwise: bulk/row-wise parity
     - graph_stats: node/edge type counting
     - find_dtpd_paths: path enumeration
     - drug_summary: neighbor aggregation
@@ -19,6 +20,7 @@ from kg_explain.graph import (
     drug_summary,
     export_graphml,
     _load_csv,
+    _build_kg_rowwise,
 )
 
 
@@ -127,6 +129,55 @@ class TestBuildKg:
         assert G.edges["drugA", "T1"]["mechanism"] == "mech1"
 
 
+class TestBulkParity:
+    """Bulk builder must reproduce the row-wise graph exactly."""
+
+    @staticmethod
+    def _assert_same(a, b):
+        assert list(a.nodes(data=True)) == list(b.nodes(data=True))
+        assert list(a.edges(data=True)) == list(b.edges(data=True))
+
+    def test_mini_data(self, mini_data):
+        cfg, _ = mini_data
+        self._assert_same(_build_kg_rowwise(cfg), build_kg(cfg))
+
+    def test_duplicates_and_missing_values(self, mini_data):
+        cfg, data_dir = mini_data
+        pd.DataFrame({
+            "drug_normalized": ["drugA", "drugA", " drugB ", None, "drugC"],
+            "target_chembl_id": ["T1", "T1", "T3", "T4", ""],
+            "mechanism_of_action": ["old", "new", None, "x", "y"],
+        }).to_csv(data_dir / "edge_drug_target.csv", index=False)
+        pd.DataFrame({
+            "reactome_stid": ["P1", "P1", "P2"],
+            "diseaseId": ["D001", "D001", "D002"],
+            "pathway_score": ["0.8", "bad", None],
+            "support_genes": ["5", "2.9", None],
+            "reactome_name": ["Pathway1", None, "Pathway2"],
+            "diseaseName": ["Disease1", "Disease1b", None],
+        }).to_csv(data_dir / "edge_pathway_disease.csv", index=False)
+        a, b = _build_kg_rowwise(cfg), build_kg(cfg)
+        self._assert_same(a, b)
+        # last duplicate wins for edge attributes
+        assert b.edges["drugA", "T1"]["mechanism"] == "new"
+        assert b.edges["P1", "D001"]["pathway_score"] == 0.0
+        assert b.edges["P1", "D001"]["support_genes"] == 2
+        assert "drugB" in b and "T4" not in b
+
+    def test_attribute_python_types(self, mini_data):
+        """Attributes are plain Python scalars (GraphML-safe)."""
+        cfg, _ = mini_data
+        G = build_kg(cfg)
+        assert type(G.edges["drugA", "headache"]["report_count"]) is int
+        assert type(G.edges["drugA", "NCT001"]["is_safety_stop"]) is bool
+        assert type(G.edges["P1", "D001"]["pathway_score"]) is float
+
+    def test_missing_files(self, tmp_path):
+        cfg = Config(raw={"paths": {"data_dir": str(tmp_path)}})
+        G = build_kg(cfg)
+        assert G.number_of_nodes() == 0
+
+
 class TestGraphStats:
     def test_stats_structure(self, mini_data):
         cfg, _ = mini_data
@@ -0,0 +1,196 @@
+"""Unit tests for kg_explain.http_client (pooled HTTP client).
+
+Tests cover:
+    - keep-alive connection reuse against a local stub server
+    - per-host concurrency limit
+    - TokenBucket pacing
+    - request coalescing (shared result, copies, error propagation)
+    - cached_get_json / cached_post_json through the shared client
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from kg_explain import http_client
+from kg_explain.cache import HTTPCache, cached_get_json, cached_post_json
+from kg_explain.http_client import PooledHTTPClient, TokenBucket, configure_client
+from kg_explain.utils import concurrent_map
+
+
+class _Stub(BaseHTTPRequestHandler):
+    """JSON 回显; ?delay=秒 模拟慢接口, /fail 返回 404."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self, body: dict, status: int = 200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.n_requests += 1
+            srv.connections.add(self.client_address)
+            srv.active += 1
+            srv.max_active = max(srv.max_active, srv.active)
+        try:
+            if "delay=" in self.path:
+                time.sleep(float(self.path.split("delay=")[1].split("&")[0]))
+            if self.path.startswith("/fail"):
+                self._reply({"error": "nope"}, 404)
+            else:
+                self._reply({"path": self.path, "n": srv.n_requests})
+        finally:
+            with srv.lock:
+                srv.active -= 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.n_requests += 1
+        self._reply({"echo": body})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    srv.lock = threading.Lock()
+    srv.n_requests, srv.active, srv.max_active = 0, 0, 0
+    srv.connections = set()
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def shared_client():
+    """每个测试独立的共享客户端, 结束后恢复默认"""
+    client = configure_client(per_host_limit=4)
+    yield client
+    client.close()
+    http_client._client = None
+
+
+class TestPooledClient:
+    def test_keep_alive_reuses_connection(self, stub):
+        srv, base = stub
+        client = PooledHTTPClient(per_host_limit=1)
+        for i in range(10):
+            assert client.request("GET", f"{base}/x{i}", timeout=5).json()["path"] == f"/x{i}"
+        assert srv.n_requests == 10
+        assert len(srv.connections) == 1
+        assert client.stats["requests"] == 10
+
+    def test_per_host_limit(self, stub):
+        srv, base = stub
+        client = PooledHTTPClient(per_host_limit=3)
+        concurrent_map(lambda i: client.request("GET", f"{base}/s{i}?delay=0.05", timeout=5),
+                       range(12), max_workers=12)
+        assert srv.n_requests == 12
+        assert srv.max_active <= 3
+
+    def test_status_not_raised(self, stub):
+        _, base = stub
+        r = PooledHTTPClient().request("GET", f"{base}/fail", timeout=5)
+        assert r.status_code == 404
+
+
+class TestTokenBucket:
+    def test_pacing(self):
+        bucket = TokenBucket(rate=50, burst=1)
+        t0 = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # 首个令牌立即可用, 其余 5 个间隔 1/50 秒
+        assert time.monotonic() - t0 >= 5 / 50 * 0.9
+
+    def test_burst_is_free(self):
+        bucket = TokenBucket(rate=1, burst=5)
+        assert sum(bucket.acquire() for _ in range(5)) == 0.0
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_rate_limited_host(self, stub):
+        _, base = stub
+        client = PooledHTTPClient(rate_limits={base.split("//")[1]: 20})
+        t0 = time.monotonic()
+        for i in range(30):
+            client.request("GET", f"{base}/r{i}", timeout=5)
+        # 突发 20 个之后按 20/s 放行
+        assert time.monotonic() - t0 >= 0.4
+        assert client.stats["throttled_seconds"] > 0
+
+
+class TestCoalesce:
+    def test_identical_calls_run_once(self):
+        client = PooledHTTPClient()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {"v": [1, 2]}
+
+        threads = [threading.Thread(target=lambda: out.append(client.coalesce("k", fetch))) for _ in range(8)]
+        out = []
+        for t in threads:
+            t.start()
+        while client.stats["coalesced"] < 7:
+            time.sleep(0.005)
+        release.set()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert out == [{"v": [1, 2]}] * 8
+        # 每个调用方拿到独立对象
+        assert len({id(o) for o in out}) == 8
+
+    def test_error_propagates_and_key_released(self):
+        client = PooledHTTPClient()
+        with pytest.raises(RuntimeError):
+            client.coalesce("k", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+        assert client.coalesce("k", lambda: 42) == 42
+
+
+class TestCachedThroughClient:
+    def test_concurrent_misses_fetch_once(self, stub, tmp_path, shared_client):
+        srv, base = stub
+        cache = HTTPCache(tmp_path)
+        results = concurrent_map(lambda _: cached_get_json(cache, f"{base}/same", params={"delay": 0.2}),
+                                 range(6), max_workers=6)
+        assert srv.n_requests == 1
+        assert all(r == results[0] for r in results)
+        assert cache.stats["puts"] == 1
+        # 第二轮全部命中缓存
+        cached_get_json(cache, f"{base}/same", params={"delay": 0.2})
+        assert srv.n_requests == 1
+
+    def test_post(self, stub, tmp_path, shared_client):
+        srv, base = stub
+        cache = HTTPCache(tmp_path)
+        assert cached_post_json(cache, f"{base}/gql", {"q": 1}) == {"echo": {"q": 1}}
+        assert cached_post_json(cache, f"{base}/gql", {"q": 1}) == {"echo": {"q": 1}}
+        assert srv.n_requests == 1
+
+    def test_client_error_not_cached(self, stub, tmp_path, shared_client):
+        _, base = stub
+        cache = HTTPCache(tmp_path)
+        with pytest.raises(requests.HTTPError):
+            cached_get_json(cache, f"{base}/fail")
+        assert cache.stats["puts"] == 0
@@ -0,0 +1,220 @@
+"""Unit tests for kg_explain.rankers.incremental (component-level incremental re-ranking).
+
+Tests cover:
+    - RankState: input keys, output digest checks, table round trip
+    - PenaltyTables.to_frames / from_frames: identical apply()
+    - run_ranker rerun: every component reused, outputs unchanged
+    - FAERS-only change: DTPD / CI reused, only affected evidence packs rewritten,
+      outputs identical to a full (rank.incremental = false) run
+    - pathway-disease change: DTPD recomputed; sparse engine; --full reset; tampered outputs
+    - bootstrap parameter change: every CI recomputed; empty ranking
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.config import Config
+from kg_explain.rankers.incremental import RankState, pair_path_hashes
+from kg_explain.rankers.penalties import PenaltyTables
+from kg_explain.rankers.ranker import _incremental_uncertainty, run_ranker
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    d = tmp_path / "data"
+    d.mkdir()
+    rng = np.random.default_rng(7)
+    drugs = [f"drug{i}" for i in range(12)]
+    pd.DataFrame({
+        "drug_normalized": rng.choice(drugs, 50),
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 10, 50)],
+    }).to_csv(d / "edge_drug_target.csv", index=False)
+    pd.DataFrame({
+        "target_chembl_id": [f"CHEMBL{i}" for i in rng.integers(0, 10, 40)],
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 8, 40)],
+        "reactome_name": "pw",
+    }).to_csv(d / "edge_target_pathway_all.csv", index=False)
+    pd.DataFrame({
+        "reactome_stid": [f"R-HSA-{i}" for i in rng.integers(0, 8, 40)],
+        "diseaseId": [f"EFO_{i:04d}" for i in rng.integers(0, 6, 40)],
+        "diseaseName": "disease",
+        "pathway_score": rng.random(40).round(4),
+        "support_genes": rng.integers(1, 80, 40),
+    }).to_csv(d / "edge_pathway_disease.csv", index=False)
+    pd.DataFrame({
+        "drug_normalized": np.repeat(drugs, 3),
+        "ae_term": ["headache", "death", "rash"] * len(drugs),
+        "report_count": rng.integers(5, 300, 3 * len(drugs)),
+        "prr": rng.random(3 * len(drugs)).round(3) * 6,
+    }).to_csv(d / "edge_drug_ae_faers.csv", index=False)
+    pd.DataFrame({
+        "diseaseId": [f"EFO_{i:04d}" for i in rng.integers(0, 6, 20)],
+        "phenotypeId": [f"HP_{i}" for i in range(20)],
+        "phenotypeName": "ph",
+        "score": rng.random(20).round(3),
+    }).to_csv(d / "edge_disease_phenotype.csv", index=False)
+    return d
+
+
+def _cfg(data_dir, out, **rank):
+    return Config(raw={
+        "paths": {"data_dir": str(data_dir), "output_dir": str(out)},
+        "rank": {"topk_paths_per_pair": 3, "topk_pairs_per_drug": 4, **rank},
+        "disease": {"condition": "atherosclerosis"},
+    })
+
+
+def _outputs(out_dir):
+    return {p.relative_to(out_dir).as_posix(): p.read_bytes()
+            for p in sorted(out_dir.rglob("*")) if p.is_file() and "rank_state" not in p.parts}
+
+
+def _last_run(out_dir):
+    return json.loads((out_dir / "rank_state" / "state.json").read_text(encoding="utf-8"))["last_run"]
+
+
+class TestRankState:
+    def test_reusable(self, tmp_path):
+        f = tmp_path / "in.csv"
+        f.write_text("a\n1\n")
+        out = tmp_path / "out.csv"
+        out.write_text("x\n")
+        state = RankState(tmp_path)
+        key = state.key([f, None], {"k": 1})
+        assert key != state.key([f, None], {"k": 2})
+        assert not state.reusable("c", key, [out])
+        state.commit("c", key, [out], status="recomputed")
+        state.save()
+
+        state = RankState(tmp_path)
+        assert state.reusable("c", key, [out])
+        out.write_text("y\n")
+        assert not state.reusable("c", key, [out])
+        assert not RankState(tmp_path, reset=True).reusable("c", key, [out])
+
+    def test_table_roundtrip(self, tmp_path):
+        state = RankState(tmp_path)
+        df = pd.DataFrame({"drug": ["a", "NA"], "v": [0.1 + 0.2, np.nan]})
+        state.save_table("t", df)
+        back = state.load_table("t", ["drug"])
+        assert back["drug"].tolist() == ["a", "NA"]
+        assert back["v"].iloc[0] == 0.1 + 0.2 and np.isnan(back["v"].iloc[1])
+
+    def test_pair_path_hashes(self):
+        h = pair_path_hashes([b"1", b"2", b"3"], ["A", "a", "b"], ["X", "X", "X"])
+        assert set(h) == {("a", "X"), ("b", "X")}
+        assert h[("a", "X")] != pair_path_hashes([b"1", b"9"], ["a", "a"], ["X", "X"])[("a", "X")]
+
+
+def test_penalty_frames_roundtrip(data_dir):
+    ae = pd.read_csv(data_dir / "edge_drug_ae_faers.csv")
+    phe = pd.read_csv(data_dir / "edge_disease_phenotype.csv", dtype=str)
+    t = PenaltyTables(ae, None, phe, has_prr=True, serious_keywords=["death"], min_prr=0.0,
+                      condition="x", phenotype_cap=10, phenotype_boost_w=0.1)
+    back = PenaltyTables.from_frames(*t.to_frames())
+    drugs = pd.Series(["drug1", "Drug2", "none"])
+    diseases = pd.Series(["EFO_0001", "EFO_0002", "EFO_9999"])
+    base = pd.Series([0.5, 0.25, 1.0])
+    pd.testing.assert_frame_equal(back.apply(drugs, diseases, base, 0.3, 0.2),
+                                  t.apply(drugs, diseases, base, 0.3, 0.2))
+    assert back.safety_evidence("drug1") == []
+
+
+class TestIncrementalRanker:
+    def test_rerun_reuses_everything(self, data_dir, tmp_path):
+        cfg = _cfg(data_dir, tmp_path / "out")
+        res = run_ranker(cfg)
+        first = _outputs(cfg.output_dir)
+        assert {r["status"] for r in _last_run(cfg.output_dir).values()} == {"recomputed"}
+
+        run_ranker(cfg)
+        report = _last_run(cfg.output_dir)
+        assert {r["status"] for r in report.values()} == {"reused"}
+        assert report["evidence_packs"]["rewritten"] == 0
+        assert _outputs(cfg.output_dir) == first
+        assert res["rank_state"] == cfg.output_dir / "rank_state" / "state.json"
+
+    def test_faers_change(self, data_dir, tmp_path):
+        cfg = _cfg(data_dir, tmp_path / "out")
+        run_ranker(cfg)
+        dtpd_mtime = (cfg.output_dir / "dtpd_rank.csv").stat().st_mtime_ns
+
+        ae = pd.read_csv(data_dir / "edge_drug_ae_faers.csv")
+        ae.loc[ae["drug_normalized"] == "drug3", "prr"] *= 4
+        ae.to_csv(data_dir / "edge_drug_ae_faers.csv", index=False)
+        run_ranker(cfg)
+
+        report = _last_run(cfg.output_dir)
+        assert report["mechanism"]["status"] == "reused"
+        assert report["penalties"]["status"] == "recomputed"
+        assert report["uncertainty"]["status"] == "reused"
+        assert report["evidence_packs"]["status"] == "partial"
+        n_drug3 = (pd.read_csv(cfg.output_dir / "drug_disease_rank.csv")["drug_normalized"] == "drug3").sum()
+        assert report["evidence_packs"]["rewritten"] == n_drug3
+        assert (cfg.output_dir / "dtpd_rank.csv").stat().st_mtime_ns == dtpd_mtime
+
+        full = _cfg(data_dir, tmp_path / "full", incremental=False)
+        run_ranker(full)
+        assert not (full.output_dir / "rank_state").exists()
+        assert _outputs(cfg.output_dir) == _outputs(full.output_dir)
+
+    @pytest.mark.parametrize("engine", ["pandas", "sparse"])
+    def test_mechanism_change(self, data_dir, tmp_path, engine):
+        cfg = _cfg(data_dir, tmp_path / "out", dtpd_engine=engine)
+        run_ranker(cfg)
+        run_ranker(cfg)
+        assert _last_run(cfg.output_dir)["mechanism"]["status"] == "reused"
+
+        pe = pd.read_csv(data_dir / "edge_pathway_disease.csv")
+        pe.loc[:4, "pathway_score"] = 0.99
+        pe.to_csv(data_dir / "edge_pathway_disease.csv", index=False)
+        run_ranker(cfg)
+        report = _last_run(cfg.output_dir)
+        assert report["mechanism"]["status"] == "recomputed"
+        assert report["penalties"]["status"] == "reused"
+
+        full = _cfg(data_dir, tmp_path / "full", dtpd_engine=engine, incremental=False)
+        run_ranker(full)
+        assert _outputs(cfg.output_dir) == _outputs(full.output_dir)
+
+    def test_full_and_tampered(self, data_dir, tmp_path):
+        cfg = _cfg(data_dir, tmp_path / "out")
+        run_ranker(cfg)
+        run_ranker(cfg, full=True)
+        assert {r["status"] for r in _last_run(cfg.output_dir).values()} == {"recomputed"}
+
+        (cfg.output_dir / "dtpd_rank.csv").write_text("drug_normalized,diseaseId\n")
+        pack = next((cfg.output_dir / "evidence_pack").glob("*.json"))
+        pack.unlink()
+        run_ranker(cfg)
+        assert _last_run(cfg.output_dir)["mechanism"]["status"] == "recomputed"
+        assert pack.exists()
+
+    def test_bootstrap_param_change(self, data_dir, tmp_path):
+        cfg = _cfg(data_dir, tmp_path / "out")
+        run_ranker(cfg)
+        before = pd.read_csv(cfg.output_dir / "drug_disease_rank.csv")
+
+        cfg = _cfg(data_dir, tmp_path / "out", uncertainty_bootstrap=200, uncertainty_ci=0.5)
+        run_ranker(cfg)
+        report = _last_run(cfg.output_dir)
+        assert report["mechanism"]["status"] == "reused"
+        assert report["uncertainty"]["status"] == "recomputed"
+        assert report["uncertainty"]["reused"] == 0
+        after = pd.read_csv(cfg.output_dir / "drug_disease_rank.csv")
+        assert not np.allclose(after["ci_lower"], before["ci_lower"])
+
+        full = _cfg(data_dir, tmp_path / "full", uncertainty_bootstrap=200, uncertainty_ci=0.5,
+                    incremental=False)
+        run_ranker(full)
+        assert _outputs(cfg.output_dir) == _outputs(full.output_dir)
+
+    def test_uncertainty_empty_ranking(self, tmp_path):
+        rank_df = pd.DataFrame(columns=["drug_normalized", "diseaseId", "final_score"])
+        paths = pd.DataFrame(columns=["drug", "diseaseId", "path_score"])
+        out = _incremental_uncertainty(RankState(tmp_path), rank_df, paths, {}, 1,
+                                       {"n_bootstrap": 100, "ci": 0.95, "seed": 42})
+        assert out.empty
+        assert "ci_lower" in out.columns
@@ -0,0 +1,90 @@
+"""Unit tests for kg_explain.normalize (shared drug-name normalization).
+
+Tests cover:
+    - scalar cleaners keep the rxnorm / faers behaviour (dosage, combos, salts, non-drug)
+    - combined non-drug regex == any() over the individual patterns
+    - Series API == element-wise map, NaN preserved, each unique value computed once
+    - rxnorm / faers / chembl re-export the shared functions
+    - load_canonical_map (vectorized) keeps lowercase/strip keys and skips missing values
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain import normalize as nz
+from kg_explain.utils import load_canonical_map
+
+NAMES = [
+    "Cilostazol 100 mg", "aspirin 25 mg bid", "ezetimibe 10mg", "Fentanyl injection",
+    "dipyridamole 200mg and aspirin 25mg bid:", "atorvastatin, aspirin, losartan, amlodipine",
+    "Matching Placebo", "drug X/placebo", "10 x 10^6 cells", "0.9% Sodium Chloride",
+    "Standard of care", "sham procedure", "observation", "Tofacitinib Citrate",
+    "metformin hydrochloride 500 mg tablet", "  Aspirin  ", "saline", "alirocumab 150 mg/ml subcutaneous injection",
+]
+
+
+class TestScalar:
+    @pytest.mark.parametrize("raw,want", [
+        ("cilostazol 100 mg", "cilostazol"),
+        ("nitroglycerin 0.4 mg sublingual", "nitroglycerin"),
+        ("aspirin tablet", "aspirin"),
+        ("dipyridamole 200mg and aspirin 25mg bid:", "dipyridamole + aspirin"),
+        ("atorvastatin, aspirin, losartan, amlodipine", "atorvastatin + aspirin + losartan + amlodipine"),
+        (" 100 mg ", "100 mg"),
+    ])
+    def test_clean_drug_name(self, raw, want):
+        assert nz.clean_drug_name(raw) == want
+
+    def test_strip_salt_form(self):
+        assert nz.strip_salt_form("Tofacitinib  Citrate") == "Tofacitinib"
+        assert nz.strip_salt_form("metformin hydrochloride monohydrate") == "metformin"
+
+    @pytest.mark.parametrize("name", NAMES + ["cellulose", "Comparator arm", "normal saline flush"])
+    def test_non_drug_matches_pattern_list(self, name):
+        s = name.strip().lower()
+        assert nz.is_non_drug(name) == any(p.search(s) for p in nz._NON_DRUG_PATTERNS)
+
+    def test_cache(self):
+        nz.clear_cache()
+        for _ in range(3):
+            nz.clean_drug_name("aspirin 25 mg bid")
+        info = nz.cache_info()["clean_drug_name"]
+        assert info.misses == 1 and info.hits == 2
+
+
+class TestSeries:
+    def test_matches_scalar(self):
+        s = pd.Series(NAMES * 3, index=range(100, 100 + 3 * len(NAMES)), name="drug_raw")
+        pd.testing.assert_series_equal(nz.clean_drug_names(s), s.map(nz.clean_drug_name))
+        pd.testing.assert_series_equal(nz.strip_salt_forms(s), s.map(nz.strip_salt_form))
+        pd.testing.assert_series_equal(nz.non_drug_mask(s), s.map(nz.is_non_drug).astype(bool))
+
+    def test_missing_values(self):
+        s = pd.Series(["Placebo", None, "aspirin 10 mg", np.nan])
+        assert nz.non_drug_mask(s).tolist() == [True, False, False, False]
+        out = nz.clean_drug_names(s)
+        assert out[2] == "aspirin" and out[[1, 3]].isna().all()
+
+    def test_unique_values_computed_once(self):
+        calls = []
+        out = nz.map_unique(pd.Series(["a", "b", "a", None, "b"]), lambda x: calls.append(x) or x.upper())
+        assert calls == ["a", "b"]
+        assert out.tolist()[:3] == ["A", "B", "A"] and pd.isna(out[3])
+
+    def test_empty(self):
+        assert nz.clean_drug_names(pd.Series([], dtype=object)).empty
+        assert nz.non_drug_mask(pd.Series([], dtype=object)).dtype == bool
+
+
+def test_datasources_share_implementation():
+    from kg_explain.datasources import chembl, faers, rxnorm
+    assert rxnorm._clean_drug_name is nz.clean_drug_name
+    assert rxnorm._is_non_drug is nz.is_non_drug
+    assert faers._strip_salt_form is nz.strip_salt_form
+    assert chembl.is_non_drug is nz.is_non_drug
+
+
+def test_load_canonical_map(tmp_path):
+    (tmp_path / "drug_canonical.csv").write_text(
+        "drug_raw,canonical_name,rxnorm_rxcui\n Aspirin ,ASPIRIN,1191\nTylenol,acetaminophen,\n,orphan,\nfoo,,\n")
+    assert load_canonical_map(tmp_path) == {"aspirin": "aspirin", "tylenol": "acetaminophen"}
@@ -7,15 +7,25 @@ Covers:
 - Resume after failure: first run fails step 2, second resumes from step 2
 - force_steps: force re-run of a specific step
 - State persistence: state file written/read correctly
+- Parallel execution: independent steps overlap, dependencies respected
+- FileDigestCache: unchanged files are not re-read, racy rewrites are
+- OutputStore: outputs restored across directories from identical inputs (only when resuming)
+- Chrome trace export
 """
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
+from kg_explain import orchestrator
 from kg_explain.orchestrator import (
+    FileDigestCache,
+    OutputStore,
     PipelineOrchestrator,
     StepDefinition,
     StepResult,
@@ -481,3 +491,223 @@ class TestStatePersistence:
         results = orch.run()
         assert results[0].timestamp != ""
         assert "T" in results[0].timestamp  # ISO format
+
+
+# ---------------------------------------------------------------------------
+# Tests: Parallel execution
+# ---------------------------------------------------------------------------
+
+class TestParallelExecution:
+    """Tests for concurrent execution of independent steps."""
+
+    def test_independent_steps_overlap(self, tmp_path):
+        """Two independent steps with max_workers=2 run at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+        orch = PipelineOrchestrator(tmp_path / "state.json", max_workers=2)
+        orch.add_step(_make_step("A", [], fn=barrier.wait))
+        orch.add_step(_make_step("B", [], fn=barrier.wait))
+
+        results = orch.run()
+        assert [r.status for r in results] == ["completed", "completed"]
+
+    def test_dependencies_respected(self, tmp_path):
+        """Diamond A -> (B, C) -> D: D starts only after B and C finished."""
+        events: list[str] = []
+        lock = threading.Lock()
+
+        def make_fn(name):
+            def fn():
+                with lock:
+                    events.append(f"start:{name}")
+                time.sleep(0.05)
+                with lock:
+                    events.append(f"end:{name}")
+            return fn
+
+        orch = PipelineOrchestrator(tmp_path / "state.json", max_workers=3)
+        orch.add_step(_make_step("A", [], fn=make_fn("A")))
+        orch.add_step(_make_step("B", ["A"], fn=make_fn("B")))
+        orch.add_step(_make_step("C", ["A"], fn=make_fn("C")))
+        orch.add_step(_make_step("D", ["B", "C"], fn=make_fn("D")))
+
+        results = orch.run()
+        assert [r.name for r in results] == orch._topological_sort()
+        assert events.index("end:A") < events.index("start:B")
+        assert events.index("end:A") < events.index("start:C")
+        assert events.index("start:D") > max(events.index("end:B"), events.index("end:C"))
+        # B and C overlap
+        assert events.index("start:C") < events.index("end:B") or \
+            events.index("start:B") < events.index("end:C")
+
+    def test_failure_cascades_in_parallel(self, tmp_path):
+        """A failing branch skips its dependents; the other branch still runs."""
+        counter = _Counter()
+
+        def boom():
+            raise RuntimeError("boom")
+
+        orch = PipelineOrchestrator(tmp_path / "state.json", max_workers=4)
+        orch.add_step(_make_step("bad", [], fn=boom))
+        orch.add_step(_make_step("after_bad", ["bad"], fn=counter.make_fn("after_bad")))
+        orch.add_step(_make_step("good", [], fn=counter.make_fn("good")))
+
+        status = {r.name: r.status for r in orch.run()}
+        assert status == {"bad": "failed", "after_bad": "skipped", "good": "completed"}
+        assert counter.calls == ["good"]
+
+
+# ---------------------------------------------------------------------------
+# Tests: File digest cache
+# ---------------------------------------------------------------------------
+
+def _write_old(path: Path, text: str, age_sec: float = 100.0) -> None:
+    """Write a file and backdate its mtime (outside the racy window)."""
+    path.write_text(text, encoding="utf-8")
+    t = time.time() - age_sec
+    os.utime(path, (t, t))
+
+
+class TestFileDigestCache:
+    def test_unchanged_file_not_reread(self, tmp_path, monkeypatch):
+        f = tmp_path / "big.csv"
+        _write_old(f, "a,b\n1,2\n")
+        reads = []
+        real = orchestrator._sha256_file
+        monkeypatch.setattr(orchestrator, "_sha256_file", lambda p: reads.append(p) or real(p))
+
+        cache = FileDigestCache(tmp_path / "digests.json")
+        d1 = cache.digest(str(f))
+        cache.save()
+        # 新实例从磁盘加载, 不再读取文件
+        d2 = FileDigestCache(tmp_path / "digests.json").digest(str(f))
+        assert d1 == d2
+        assert len(reads) == 1
+
+    def test_changed_file_rehashed(self, tmp_path):
+        f = tmp_path / "x.txt"
+        _write_old(f, "version1", age_sec=200)
+        cache = FileDigestCache()
+        d1 = cache.digest(str(f))
+        _write_old(f, "version2", age_sec=100)
+        assert cache.digest(str(f)) != d1
+
+    def test_racy_same_size_rewrite_detected(self, tmp_path):
+        """Fresh files are always re-hashed, even if size/mtime look unchanged."""
+        f = tmp_path / "x.txt"
+        f.write_text("version1", encoding="utf-8")
+        st = f.stat()
+        cache = FileDigestCache()
+        d1 = cache.digest(str(f))
+        f.write_text("version2", encoding="utf-8")
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert cache.digest(str(f)) != d1
+        assert cache.misses == 2
+
+    def test_missing(self, tmp_path):
+        assert FileDigestCache().digest(str(tmp_path / "nope")) == "missing"
+
+    def test_orchestrator_persists_digests(self, tmp_path):
+        f = tmp_path / "in.txt"
+        _write_old(f, "data")
+        orch = PipelineOrchestrator(tmp_path / "state.json")
+        orch.add_step(_make_step("s", [], inputs=[str(f)]))
+        orch.run()
+        assert (tmp_path / "state.digests.json").exists()
+
+        orch2 = PipelineOrchestrator(tmp_path / "state.json")
+        orch2.add_step(_make_step("s", [], inputs=[str(f)]))
+        assert orch2.run()[0].status == "skipped"
+        assert orch2.digests.misses == 0
+
+
+# ---------------------------------------------------------------------------
+# Tests: Content-addressed output store
+# ---------------------------------------------------------------------------
+
+class TestOutputStore:
+    def _orch(self, run_dir: Path, store: OutputStore, counter: _Counter, **kw):
+        src = run_dir / "input.csv"
+        out = run_dir / "out" / "result.csv"
+        orch = PipelineOrchestrator(run_dir / "state.json", output_store=store, **kw)
+
+        def fn():
+            counter.calls.append(str(run_dir))
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_text(src.read_text(encoding="utf-8").upper(), encoding="utf-8")
+
+        orch.add_step(StepDefinition("build", fn, [str(src)], [str(out)], []))
+        return orch, out
+
+    def test_restore_in_other_directory(self, tmp_path):
+        store = OutputStore(tmp_path / "store")
+        counter = _Counter()
+        for d in ("disease_a", "disease_b"):
+            (tmp_path / d).mkdir()
+            (tmp_path / d / "input.csv").write_text("same inputs", encoding="utf-8")
+
+        orch_a, out_a = self._orch(tmp_path / "disease_a", store, counter)
+        assert orch_a.run()[0].status == "completed"
+
+        orch_b, out_b = self._orch(tmp_path / "disease_b", store, counter)
+        result = orch_b.run()[0]
+        assert result.status == "restored"
+        assert out_b.read_text(encoding="utf-8") == "SAME INPUTS"
+        assert counter.calls == [str(tmp_path / "disease_a")]
+        # restored 视为完成: 再次运行直接跳过
+        orch_b2, _ = self._orch(tmp_path / "disease_b", store, counter)
+        assert orch_b2.run()[0].status == "skipped"
+        assert orch_b2.status()["completed"] == 1
+
+    def test_different_inputs_not_restored(self, tmp_path):
+        store = OutputStore(tmp_path / "store")
+        counter = _Counter()
+        for d, text in (("a", "one"), ("b", "two")):
+            (tmp_path / d).mkdir()
+            (tmp_path / d / "input.csv").write_text(text, encoding="utf-8")
+        self._orch(tmp_path / "a", store, counter)[0].run()
+        orch_b, out_b = self._orch(tmp_path / "b", store, counter)
+        assert orch_b.run()[0].status == "completed"
+        assert out_b.read_text(encoding="utf-8") == "TWO"
+
+    def test_force_bypasses_store(self, tmp_path):
+        store = OutputStore(tmp_path / "store")
+        counter = _Counter()
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "input.csv").write_text("x", encoding="utf-8")
+        self._orch(tmp_path / "a", store, counter)[0].run()
+        (tmp_path / "a" / "out" / "result.csv").unlink()
+        orch, _ = self._orch(tmp_path / "a", store, counter)
+        assert orch.run(force_steps={"build"})[0].status == "completed"
+        assert len(counter.calls) == 2
+
+    def test_no_resume_bypasses_store(self, tmp_path):
+        store = OutputStore(tmp_path / "store")
+        counter = _Counter()
+        for d in ("a", "b"):
+            (tmp_path / d).mkdir()
+            (tmp_path / d / "input.csv").write_text("x", encoding="utf-8")
+        self._orch(tmp_path / "a", store, counter)[0].run()
+        orch_b, _ = self._orch(tmp_path / "b", store, counter)
+        assert orch_b.run(resume=False)[0].status == "completed"
+        assert counter.calls == [str(tmp_path / "a"), str(tmp_path / "b")]
+
+
+# ---------------------------------------------------------------------------
+# Tests: Chrome trace
+# ---------------------------------------------------------------------------
+
+class TestTrace:
+    def test_trace_events(self, tmp_path):
+        orch = PipelineOrchestrator(tmp_path / "state.json", max_workers=2)
+        orch.add_step(_make_step("A", [], fn=lambda: time.sleep(0.01)))
+        orch.add_step(_make_step("B", ["A"]))
+        trace_path = tmp_path / "trace.json"
+        orch.run(trace_path=trace_path)
+
+        trace = json.loads(trace_path.read_text(encoding="utf-8"))
+        slices = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+        assert set(slices) == {"A", "B"}
+        assert slices["A"]["dur"] >= 10_000
+        assert slices["B"]["ts"] >= slices["A"]["ts"] + slices["A"]["dur"] - 1
+        assert slices["A"]["args"]["status"] == "completed"
+        assert any(e["ph"] == "M" for e in trace["traceEvents"])
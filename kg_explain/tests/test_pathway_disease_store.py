@@ -0,0 +1,156 @@
+"""Unit tests for the Pathway→Disease aggregation and the global pathway×disease store.
+
+Tests cover:
+    - vectorized top-3 mean == groupby lambda (nlargest(3).mean()), diseaseName first non-null
+    - disease-prefix allowlist and zero-score filtering
+    - store build from gene_pathway or target_pathway + ensembl mapping
+    - partition pruning by diseaseId (incl. IDs needing quoting) and pathway filtering
+    - build_pathway_disease slicing from the store, and fallback when it is missing
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.builders import build_pathway_disease, pathway_disease_store as pds
+from kg_explain.builders.edges import _group_top_k_mean, aggregate_pathway_disease
+from kg_explain.builders.pathway_disease_store import build_pathway_disease_store, read_pathway_disease_store
+from kg_explain.config import Config
+
+
+GP = pd.DataFrame({
+    "ensembl_gene_id": ["G1", "G2", "G3", "G4", "G1", "G5"],
+    "reactome_stid": ["P1", "P1", "P1", "P1", "P2", "P2"],
+    "reactome_name": ["Path 1"] * 4 + ["Path 2"] * 2,
+})
+OT = pd.DataFrame({
+    "targetId": ["G1", "G2", "G3", "G4", "G1", "G5", "G2", "G1", "G1"],
+    "diseaseId": ["EFO_1", "EFO_1", "EFO_1", "EFO_1", "OMIM:7", "OMIM:7", "MONDO_2", "GO_9", "EFO_3"],
+    "diseaseName": [None, "d1", "d1-alt", "d1", "d7", None, "d2", "go", "d3"],
+    "score": ["0.9", "0.5", "0.7", "0.1", "0.4", "bad", "0.3", "0.8", "0"],
+})
+
+
+def _lambda_reference(gp, ot):
+    ot = ot.copy()
+    ot["score_f"] = pd.to_numeric(ot["score"], errors="coerce").fillna(0.0)
+    ot = ot[ot["diseaseId"].str.startswith(("EFO_", "MONDO_", "OMIM:"))]
+    j = gp.merge(ot, left_on="ensembl_gene_id", right_on="targetId", how="inner")
+    agg = j.groupby(["reactome_stid", "diseaseId"], as_index=False).agg(
+        pathway_score=("score_f", lambda s: s.nlargest(3).mean()),
+        support_genes=("ensembl_gene_id", "nunique"),
+        diseaseName=("diseaseName", lambda x: x.dropna().iloc[0] if len(x.dropna()) else np.nan),
+    )
+    return agg[agg["pathway_score"] > 0].reset_index(drop=True)
+
+
+class TestAggregate:
+    def test_top_k_mean(self):
+        codes = np.array([1, 0, 1, 1, 1, 0])
+        vals = np.array([1.0, 5.0, 4.0, 3.0, 2.0, 1.0])
+        assert _group_top_k_mean(codes, vals, 2, 3).tolist() == [3.0, 3.0]
+
+    def test_matches_lambda(self):
+        out = aggregate_pathway_disease(GP, OT)
+        pd.testing.assert_frame_equal(out, _lambda_reference(GP, OT), check_exact=True)
+
+    def test_filters(self):
+        out = aggregate_pathway_disease(GP, OT)
+        assert "GO_9" not in set(out["diseaseId"])
+        assert "EFO_3" not in set(out["diseaseId"])  # 零分边
+        row = out[(out["reactome_stid"] == "P1") & (out["diseaseId"] == "EFO_1")].iloc[0]
+        assert row["pathway_score"] == pytest.approx((0.9 + 0.7 + 0.5) / 3)
+        assert row["support_genes"] == 4
+        assert row["diseaseName"] == "d1"
+
+    def test_random_matches_lambda(self):
+        rng = np.random.default_rng(1)
+        gp = pd.DataFrame({"ensembl_gene_id": [f"G{i}" for i in rng.integers(0, 40, 200)],
+                           "reactome_stid": [f"P{i}" for i in rng.integers(0, 15, 200)]}).drop_duplicates()
+        ot = pd.DataFrame({"targetId": [f"G{i}" for i in rng.integers(0, 40, 600)],
+                           "diseaseId": [f"EFO_{i}" for i in rng.integers(0, 20, 600)],
+                           "diseaseName": "x",
+                           "score": rng.choice([0.0, 0.25, 0.5, 0.75], 600).astype(str)})
+        pd.testing.assert_frame_equal(aggregate_pathway_disease(gp, ot), _lambda_reference(gp, ot),
+                                      check_exact=True)
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def store_format(request, monkeypatch):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(pds, "pyarrow", None)
+    return request.param
+
+
+class TestStore:
+    def _source(self, tmp_path, name="src", gp=GP, ot=OT):
+        d = tmp_path / name
+        d.mkdir()
+        gp.to_csv(d / "edge_gene_pathway.csv", index=False)
+        ot.to_csv(d / "edge_target_disease_ot.csv", index=False)
+        return d
+
+    def test_roundtrip(self, tmp_path, store_format):
+        meta = build_pathway_disease_store([self._source(tmp_path)], tmp_path / "store")
+        assert meta["format"] == store_format
+        full = read_pathway_disease_store(tmp_path / "store")
+        expected = aggregate_pathway_disease(GP, OT)
+        pd.testing.assert_frame_equal(full.drop(columns=["reactome_name"]), expected, check_dtype=False)
+        assert set(full["reactome_name"]) == {"Path 1", "Path 2"}
+
+    def test_slicing(self, tmp_path, store_format):
+        build_pathway_disease_store([self._source(tmp_path)], tmp_path / "store")
+        one = read_pathway_disease_store(tmp_path / "store", diseases=["OMIM:7", "EFO_404"])
+        assert set(one["diseaseId"]) == {"OMIM:7"} and len(one) == 2
+        p2 = read_pathway_disease_store(tmp_path / "store", pathways=["P2"])
+        assert set(p2["reactome_stid"]) == {"P2"}
+
+    def test_from_target_mapping(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pds, "pyarrow", None)
+        d = tmp_path / "u"
+        d.mkdir()
+        pd.DataFrame({"target_chembl_id": ["T1", "T2"], "reactome_stid": ["P1", "P1"],
+                      "reactome_name": ["Path 1"] * 2}).to_csv(d / "edge_target_pathway_all.csv", index=False)
+        pd.DataFrame({"target_chembl_id": ["T1", "T2"], "ensembl_gene_id": ["G1", "G3"]}).to_csv(
+            d / "target_chembl_to_ensembl_all.csv", index=False)
+        OT.to_csv(d / "edge_target_disease_ot.csv", index=False)
+        meta = build_pathway_disease_store([d, tmp_path / "missing"], tmp_path / "store")
+        assert meta["n_genes"] == 2
+        row = read_pathway_disease_store(tmp_path / "store", diseases=["EFO_1"]).iloc[0]
+        assert row["pathway_score"] == pytest.approx(0.8)
+
+    def test_union_of_sources(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pds, "pyarrow", None)
+        a = self._source(tmp_path, "a", GP.iloc[:2], OT)
+        b = self._source(tmp_path, "b", GP.iloc[2:], OT)
+        build_pathway_disease_store([a, b], tmp_path / "store")
+        full = read_pathway_disease_store(tmp_path / "store")
+        pd.testing.assert_frame_equal(full.drop(columns=["reactome_name"]), aggregate_pathway_disease(GP, OT))
+
+
+class TestBuildFromStore:
+    def _cfg(self, tmp_path, store=None):
+        data = tmp_path / "data"
+        data.mkdir(exist_ok=True)
+        return Config(raw={"paths": {"data_dir": str(data),
+                                     "pathway_disease_store": str(store) if store else ""}})
+
+    def test_slice_matches_per_run(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pds, "pyarrow", None)
+        cfg = self._cfg(tmp_path)
+        GP.to_csv(cfg.data_dir / "edge_gene_pathway.csv", index=False)
+        OT.to_csv(cfg.data_dir / "edge_target_disease_ot.csv", index=False)
+        per_run = pd.read_csv(build_pathway_disease(cfg))
+
+        build_pathway_disease_store([cfg.data_dir], tmp_path / "store")
+        (cfg.data_dir / "edge_target_disease_ot.csv").unlink()
+        sliced = pd.read_csv(build_pathway_disease(self._cfg(tmp_path, tmp_path / "store")))
+        pd.testing.assert_frame_equal(sliced, per_run)
+
+    def test_missing_store_falls_back(self, tmp_path):
+        cfg = self._cfg(tmp_path, tmp_path / "nope")
+        GP.to_csv(cfg.data_dir / "edge_gene_pathway.csv", index=False)
+        OT.to_csv(cfg.data_dir / "edge_target_disease_ot.csv", index=False)
+        out = pd.read_csv(build_pathway_disease(cfg))
+        assert len(out) == len(aggregate_pathway_disease(GP, OT))
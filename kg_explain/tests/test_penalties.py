@@ -0,0 +1,137 @@
+"""Unit tests for kg_explain.rankers.penalties (precomputed ranker penalties).
+
+Tests cover:
+    - ConditionMatcher: word-boundary matching in both directions, memo
+    - PenaltyTables: FAERS top-10 / PRR gate / serious weighting,
+      trial stop counting, phenotype boost, evidence lists, apply()
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.rankers.penalties import ConditionMatcher, PenaltyTables
+
+SERIOUS = ["death", "fatal"]
+
+
+class TestConditionMatcher:
+    @pytest.mark.parametrize("target,conditions,expected", [
+        ("atherosclerosis", "Atherosclerosis", True),
+        ("atherosclerosis", "Breast Cancer|Coronary Atherosclerosis", True),
+        ("atherosclerosis", "arteriosclerosis", False),
+        ("atherosclerosis", "", False),
+        ("congestive heart failure", "heart failure", True),   # trial 条件完整出现在目标中
+        ("congestive heart failure", "CHF", False),            # 太短, 不反向匹配
+    ])
+    def test_match(self, target, conditions, expected):
+        assert ConditionMatcher(target)(conditions) is expected
+
+    def test_match_series_once_per_unique(self):
+        m = ConditionMatcher("atherosclerosis")
+        hits = m.match_series(pd.Series(["Atherosclerosis", "Asthma", "Atherosclerosis", ""]))
+        assert hits.tolist() == [True, False, True, False]
+        assert len(m._memo) == 3
+
+
+def _tables(ae_df=None, trial_ae_df=None, phe_df=None, min_prr=0.0, cap=10):
+    return PenaltyTables(ae_df, trial_ae_df, phe_df, has_prr=True, serious_keywords=SERIOUS,
+                         min_prr=min_prr, condition="atherosclerosis",
+                         phenotype_cap=cap, phenotype_boost_w=0.1)
+
+
+class TestSafety:
+    @pytest.fixture
+    def ae_df(self):
+        return pd.DataFrame({
+            "drug_normalized": ["aspirin", "aspirin", "aspirin", "metformin"],
+            "ae_term": ["headache", "Death", "nausea", "rash"],
+            "report_count": [100.0, 100.0, 3.0, 0.0],
+            "prr": [2.0, 1.0, 0.0, 0.0],
+        })
+
+    def test_penalty(self, ae_df):
+        t = _tables(ae_df)
+        expected = np.log1p(2.0) / 5.0 + 2.0 * np.log1p(1.0) / 5.0 + np.log1p(3.0) / 20.0
+        assert t.safety["aspirin"] == pytest.approx(np.tanh(expected))
+        assert t.safety["metformin"] == 0.0
+
+    def test_prr_gate(self, ae_df):
+        t = _tables(ae_df, min_prr=1.5)
+        assert t.safety["aspirin"] == pytest.approx(np.tanh(np.log1p(2.0) / 5.0))
+        assert [e["ae_term"] for e in t.safety_evidence("Aspirin ")] == ["headache"]
+
+    def test_top10_by_prr(self):
+        ae_df = pd.DataFrame({
+            "drug_normalized": ["x"] * 12,
+            "ae_term": [f"ae{i}" for i in range(12)],
+            "report_count": [100.0] * 12,
+            "prr": [float(i) for i in range(12)],
+        })
+        evidence = _tables(ae_df).safety_evidence("x")
+        assert [e["ae_term"] for e in evidence] == [f"ae{i}" for i in range(11, 1, -1)]
+        assert evidence[0] == {"ae_term": "ae11", "report_count": 100, "prr": 11.0, "is_serious": False}
+
+    def test_unknown_drug(self, ae_df):
+        assert _tables(ae_df).safety_evidence("nope") == []
+
+
+class TestTrial:
+    @pytest.fixture
+    def trial_ae_df(self):
+        return pd.DataFrame({
+            "drug_normalized": ["aspirin"] * 3 + ["statin"],
+            "nctId": ["NCT1", "NCT2", "NCT3", "NCT4"],
+            "is_safety_stop": ["1", "0", "0", "0"],
+            "is_efficacy_stop": ["0", "1", "1", "1"],
+            "overallStatus": "TERMINATED",
+            "conditions": ["Asthma", "Atherosclerosis", "Breast Cancer", np.nan],
+        })
+
+    def test_penalty_counts_relevant_efficacy_only(self, trial_ae_df):
+        t = _tables(trial_ae_df=trial_ae_df)
+        assert t.trial["aspirin"] == pytest.approx(0.1 * np.log1p(1) + 0.05 * np.log1p(1))
+        assert t.trial["statin"] == 0.0
+
+    def test_without_conditions_counts_all(self, trial_ae_df):
+        t = _tables(trial_ae_df=trial_ae_df.drop(columns=["conditions"]))
+        assert t.trial["aspirin"] == pytest.approx(0.1 * np.log1p(1) + 0.05 * np.log1p(2))
+
+    def test_evidence(self, trial_ae_df):
+        ev = _tables(trial_ae_df=trial_ae_df).trial_evidence("aspirin")
+        assert [e["nctId"] for e in ev] == ["NCT1", "NCT2", "NCT3"]
+        assert [e["efficacy_relevant"] for e in ev] == [False, True, False]
+
+
+class TestPhenotype:
+    def test_boost_and_cap(self):
+        phe_df = pd.DataFrame({
+            "diseaseId": ["D1", "D1", "D1", "D2"],
+            "phenotypeId": ["HP1", "HP2", "HP3", "HP4"],
+            "phenotypeName": ["a", "b", "c", "d"],
+            "score": ["0.5", "1.0", "0.0", "0.2"],
+        })
+        t = _tables(phe_df=phe_df, cap=2)
+        assert t.phenotype_boost["D1"] == pytest.approx(0.1 * 0.75 * np.log1p(2))
+        assert [p["id"] for p in t.phenotypes("D1")] == ["HP1", "HP2"]
+        assert t.phenotypes("D9") == []
+
+
+class TestApply:
+    def test_no_data(self):
+        t = _tables()
+        out = t.apply(pd.Series(["a", "b"]), pd.Series(["D1", "D2"]), pd.Series([0.5, 0.25]), 0.3, 0.2)
+        assert out["final_score"].tolist() == [0.5, 0.25]
+        assert out["risk_multiplier"].tolist() == [1.0, 1.0]
+        assert out["safety_penalty"].tolist() == [0.0, 0.0]
+
+    def test_scores(self):
+        ae_df = pd.DataFrame({"drug_normalized": ["a"], "ae_term": ["fatal x"],
+                              "report_count": [100.0], "prr": [4.0]})
+        phe_df = pd.DataFrame({"diseaseId": ["D1"], "phenotypeId": ["HP1"],
+                               "phenotypeName": ["p"], "score": ["0.8"]})
+        t = _tables(ae_df, phe_df=phe_df)
+        out = t.apply(pd.Series(["A"]), pd.Series(["D1"]), pd.Series([0.6]), 0.3, 0.2)
+        sp = np.tanh(2.0 * np.log1p(4.0) / 5.0)
+        boost = 0.1 * 0.8 * np.log1p(1)
+        assert out["safety_penalty"].iloc[0] == round(sp, 4)
+        assert out["final_score"].iloc[0] == pytest.approx(0.6 * np.exp(-0.3 * sp) * (1 + boost), abs=1e-4)
@@ -0,0 +1,123 @@
+"""Unit tests for kg_explain.evaluation.rank_matrix (array-based ranking metrics).
+
+Tests cover:
+    - RankedLists.evaluate: bit-identical to the scalar metrics.py functions
+      (duplicate drugs, case mismatches, missing diseases, K > list length)
+    - run_benchmark with CSV paths vs in-memory frames / RankedLists
+    - run_temporal_sweep / run_holdout_sweep: process pool == in-process == single runs
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from kg_explain.evaluation.benchmark import run_benchmark
+from kg_explain.evaluation.metrics import (
+    auroc, average_precision, hit_at_k, ndcg_at_k, precision_at_k, reciprocal_rank,
+)
+from kg_explain.evaluation.rank_matrix import RankedLists, gold_sets
+from kg_explain.evaluation.temporal_split import (
+    run_cross_disease_validation, run_holdout_sweep, run_temporal_sweep, run_temporal_validation,
+)
+
+KS = [1, 3, 5, 10, 50]
+
+
+def _scalar_metrics(ranked, positives, ks):
+    """原逐疾病实现 (metrics.py 纯函数)"""
+    m = {
+        "n_ranked": float(len(ranked)),
+        "n_positive": float(len(positives)),
+        "n_found": float(len(positives & set(ranked))),
+        "mrr": reciprocal_rank(ranked, positives),
+        "map": average_precision(ranked, positives),
+        "auroc": auroc(ranked, positives),
+    }
+    for k in ks:
+        m[f"hit@{k}"] = hit_at_k(ranked, positives, k)
+        m[f"p@{k}"] = precision_at_k(ranked, positives, k)
+        m[f"ndcg@{k}"] = ndcg_at_k(ranked, positives, k)
+    return m
+
+
+@pytest.fixture
+def rank_df():
+    rng = np.random.default_rng(11)
+    n = 900
+    drugs = [f"drug{i}" for i in range(120)] + ["Aspirin"]
+    return pd.DataFrame({
+        "drug_normalized": rng.choice(drugs, n),          # 含重复 (同一疾病同一药物多行)
+        "diseaseId": [f"EFO_{i}" for i in rng.integers(0, 12, n)],
+        "final_score": rng.permutation(n) / n,             # 无并列分数
+    })
+
+
+@pytest.fixture
+def gold_df():
+    rng = np.random.default_rng(5)
+    n = 150
+    return pd.DataFrame({
+        "drug_normalized": rng.choice([f"Drug{i} " for i in range(140)] + ["aspirin"], n),
+        "diseaseId": [f"EFO_{i}" for i in rng.integers(0, 14, n)],   # EFO_12/13 不在 rank 表中
+        "approval_year": rng.integers(2005, 2025, n),
+    })
+
+
+class TestRankedLists:
+    def test_matches_scalar_metrics(self, rank_df, gold_df):
+        gold = gold_sets(gold_df)
+        per_disease, n_found = RankedLists(rank_df).evaluate(gold, KS)
+
+        want, want_found = {}, 0
+        for did, positives in gold.items():
+            sub = rank_df[rank_df["diseaseId"] == did].sort_values("final_score", ascending=False)
+            ranked = sub["drug_normalized"].tolist()
+            if ranked:
+                want[did] = _scalar_metrics(ranked, positives, KS)
+                want_found += int(want[did]["n_found"])
+        assert list(per_disease) == list(want)
+        assert per_disease == want  # 逐位相等
+        assert n_found == want_found
+        assert any(m["n_found"] > 1 for m in per_disease.values())
+
+    def test_ties_keep_file_order(self):
+        df = pd.DataFrame({"drug_normalized": ["c", "a", "b", "d"], "diseaseId": "E",
+                           "final_score": ["0.5", "0.9", "0.5", "x"]})
+        ranked = RankedLists(df)
+        assert ranked.ranked("E") == ["a", "c", "b", "d"]
+        assert ranked.ranked("missing") == []
+        per, _ = ranked.evaluate({"E": {"b"}}, [2])
+        assert per["E"]["mrr"] == 1 / 3 and per["E"]["hit@2"] == 0.0
+
+    def test_invalid_k(self, rank_df):
+        with pytest.raises(ValueError):
+            RankedLists(rank_df).evaluate({"EFO_1": {"drug1"}}, [0])
+
+    def test_no_overlap(self, rank_df):
+        per, n_found = RankedLists(rank_df).evaluate({"EFO_1": {"nope"}, "EFO_99": {"x"}}, [5])
+        assert list(per) == ["EFO_1"] and n_found == 0
+        assert all(v == 0.0 for k, v in per["EFO_1"].items() if k not in ("n_ranked", "n_positive"))
+
+
+def test_run_benchmark_inputs(rank_df, gold_df, tmp_path):
+    rank_df.to_csv(tmp_path / "rank.csv", index=False)
+    gold_df.to_csv(tmp_path / "gold.csv", index=False)
+    from_csv = run_benchmark(tmp_path / "rank.csv", tmp_path / "gold.csv", ks=KS)
+    assert from_csv["n_diseases_evaluated"] == 12
+    assert run_benchmark(rank_df, gold_df, ks=KS) == from_csv
+    assert run_benchmark(RankedLists(rank_df), gold_df, ks=KS) == from_csv
+
+
+class TestSweeps:
+    def test_temporal_sweep(self, rank_df, gold_df):
+        years = [2010, 2015, 2020]
+        pooled = run_temporal_sweep(rank_df, gold_df, years, ks=[5, 10], workers=2)
+        assert list(pooled) == years
+        assert pooled == run_temporal_sweep(rank_df, gold_df, years, ks=[5, 10], workers=1)
+        assert pooled[2015] == run_temporal_validation(rank_df, gold_df, 2015, ks=[5, 10])
+
+    def test_holdout_sweep(self, rank_df, gold_df, tmp_path):
+        holdouts = [["EFO_0", "EFO_1"], ["EFO_2"], ["EFO_3", "EFO_13"]]
+        pooled = run_holdout_sweep(rank_df, gold_df, holdouts, ks=[5], workers=3)
+        assert pooled == run_holdout_sweep(rank_df, gold_df, holdouts, ks=[5])
+        rank_df.to_csv(tmp_path / "rank.csv", index=False)
+        assert pooled[1] == run_cross_disease_validation(tmp_path / "rank.csv", gold_df, ["EFO_2"], ks=[5])
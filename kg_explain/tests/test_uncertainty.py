@@ -4,6 +4,7 @@ Tests cover:
 - bootstrap_ci: known distributions, edge cases, determinism, aggregation
 - assign_confidence_tier: boundary conditions
 - add_uncertainty_to_ranking: DataFrame integration, column validation, missing data
+- batch_bootstrap_ci: parity with the per-iteration loop, seed semantics, process pool
 """
 from __future__ import annotations
 
@@ -14,7 +15,10 @@ import pytest
 from kg_explain.rankers.uncertainty import (
     add_uncertainty_to_ranking,
     assign_confidence_tier,
+    batch_bootstrap_ci,
+    block_bootstrap_ci,
     bootstrap_ci,
+    resample_indices,
 )
 
 
@@ -278,3 +282,73 @@ class TestAddUncertaintyToRanking:
         assert "final_score" in result.columns
         assert "drug_normalized" in result.columns
         assert "diseaseId" in result.columns
+
+
+# ---------------------------------------------------------------------------
+# TestBatchBootstrap
+# ---------------------------------------------------------------------------
+def _loop_ci(groups, n_bootstrap, seed, agg_fn="mean", ci=0.95):
+    """Reference: the former per-iteration rng.choice + concatenate loop."""
+    rng = np.random.RandomState(seed)
+    arrays = [np.asarray(g, dtype=float) for g in groups]
+    agg = np.mean if agg_fn == "mean" else np.median
+    boot = np.empty(n_bootstrap)
+    for i in range(n_bootstrap):
+        if len(arrays) > 1:
+            chosen = rng.choice(len(arrays), size=len(arrays), replace=True)
+            boot[i] = agg(np.concatenate([arrays[j] for j in chosen]))
+        else:
+            boot[i] = agg(rng.choice(arrays[0], size=len(arrays[0]), replace=True))
+    alpha = 1.0 - ci
+    return (np.percentile(boot, 100 * alpha / 2), np.percentile(boot, 100 * (1 - alpha / 2)))
+
+
+class TestBatchBootstrap:
+    """Tests for the vectorized batch_bootstrap_ci."""
+
+    @pytest.fixture
+    def grouped(self):
+        rng = np.random.default_rng(0)
+        pairs = [[list(rng.random(rng.integers(2, 9)))] for _ in range(20)]          # path mode
+        pairs += [[list(rng.random(rng.integers(1, 4))) for _ in range(rng.integers(2, 5))]
+                  for _ in range(20)]                                               # block mode
+        return pairs
+
+    def test_resample_indices_match_choice_loop(self):
+        rng = np.random.RandomState(7)
+        loop = np.array([rng.choice(5, size=5, replace=True) for _ in range(50)])
+        np.testing.assert_array_equal(resample_indices(5, 50, seed=7), loop)
+
+    @pytest.mark.parametrize("agg_fn", ["mean", "median"])
+    def test_matches_loop(self, grouped, agg_fn):
+        results = batch_bootstrap_ci(grouped, n_bootstrap=200, seed=3, agg_fn=agg_fn)
+        for groups, r in zip(grouped, results):
+            lower, upper = _loop_ci(groups, 200, seed=3, agg_fn=agg_fn)
+            assert r["ci_lower"] == pytest.approx(lower, abs=2e-6)
+            assert r["ci_upper"] == pytest.approx(upper, abs=2e-6)
+            assert r["n_groups"] == len(groups)
+
+    def test_path_mode_exact(self, grouped):
+        """Path bootstrap gathers the same samples as the loop → identical bounds."""
+        path_pairs = [g for g in grouped if len(g) == 1]
+        for groups, r in zip(path_pairs, batch_bootstrap_ci(path_pairs, n_bootstrap=300, seed=42)):
+            lower, upper = _loop_ci(groups, 300, seed=42)
+            assert r["ci_lower"] == round(lower, 6)
+            assert r["ci_upper"] == round(upper, 6)
+
+    def test_batch_equals_single_pair_calls(self, grouped):
+        batch = batch_bootstrap_ci(grouped, n_bootstrap=100, seed=5)
+        for groups, r in zip(grouped, batch):
+            if len(groups) == 1:
+                assert {**bootstrap_ci(groups[0], 100, seed=5), "n_groups": 1} == r
+            else:
+                assert block_bootstrap_ci(dict(enumerate(groups)), 100, seed=5) == r
+
+    def test_process_pool_same_result(self, grouped):
+        assert batch_bootstrap_ci(grouped * 20, n_bootstrap=100, n_jobs=2) == \
+            batch_bootstrap_ci(grouped * 20, n_bootstrap=100)
+
+    def test_edge_cases(self):
+        empty, single = batch_bootstrap_ci([[[]], [[0.4]]])
+        assert empty["n_paths"] == 0 and empty["ci_width"] == 0.0
+        assert single["ci_lower"] == single["ci_upper"] == 0.4
@@ -8,14 +8,20 @@ Tests cover:
     - write_jsonl / write_json: basic, NaN safety
     - safe_str: None, NaN, max_length, normal values
     - load_canonical_map: valid, missing file
+    - read_table / write_table: typed CSV, format resolution, stale-file cleanup, Parquet round trip
+    - Parquet dtpd_rank still readable by ops/internal/runner.sh (derive_matched_ids_from_dtpd)
 """
 import json
 import math
+import os
+import shutil
+import subprocess
 import pytest
 from pathlib import Path
 
 import pandas as pd
 
+from kg_explain import utils
 from kg_explain.utils import (
     concurrent_map,
     read_csv,
@@ -25,6 +31,12 @@ from kg_explain.utils import (
     write_json,
     safe_str,
     load_canonical_map,
+    read_table,
+    resolve_table,
+    set_table_format,
+    write_table,
+    peak_rss_mb,
+    reset_peak_rss,
 )
 
 
@@ -242,3 +254,112 @@ class TestLoadCanonicalMap:
         p.write_text("drug_raw,canonical_name\nAspirin,aspirin\n,\n")
         mapping = load_canonical_map(tmp_path)
         assert len(mapping) == 1
+
+
+PD_EDGE = pd.DataFrame({
+    "reactome_stid": ["R-1", "R-2", "R-3"],
+    "diseaseId": ["EFO_1", "EFO_1", "MONDO_2"],
+    "pathway_score": [0.5, 0.123456789012345, None],
+    "support_genes": [3, 12, 1],
+    "diseaseName": ["a", None, "c"],
+})
+
+
+RUNNER_SH = Path(__file__).resolve().parents[2] / "ops" / "internal" / "runner.sh"
+
+
+@pytest.fixture
+def csv_format():
+    yield set_table_format("csv")
+    set_table_format("csv")
+
+
+class TestTables:
+    def test_csv_typed(self, tmp_path, csv_format):
+        out = write_table(PD_EDGE, tmp_path / "edge_pathway_disease.csv")
+        assert out.suffix == ".csv"
+        df = read_table(out)
+        assert pd.api.types.is_float_dtype(df["pathway_score"])
+        assert df["support_genes"].tolist() == [3, 12, 1]
+        assert df["pathway_score"].iloc[1] == 0.123456789012345
+        assert pd.isna(df["diseaseName"].iloc[1])
+
+    def test_csv_untyped_matches_read_csv(self, tmp_path, csv_format):
+        out = write_table(PD_EDGE, tmp_path / "edge_pathway_disease.csv")
+        pd.testing.assert_frame_equal(read_table(out, typed=False), read_csv(out, dtype=str))
+
+    def test_unknown_table_stays_csv(self, tmp_path):
+        out = write_table(PD_EDGE, tmp_path / "other.csv", fmt="parquet")
+        assert out == tmp_path / "other.csv"
+        assert read_table(out)["support_genes"].tolist() == ["3", "12", "1"]
+
+    def test_resolve_and_missing(self, tmp_path):
+        assert resolve_table(tmp_path / "edge_drug_target.csv") is None
+        with pytest.raises(FileNotFoundError):
+            read_table(tmp_path / "edge_drug_target.csv")
+        (tmp_path / "edge_drug_target.parquet").write_bytes(b"")
+        (tmp_path / "edge_drug_target.csv").write_text("a\n")
+        assert resolve_table(tmp_path / "edge_drug_target.csv").suffix == ".parquet"
+
+    def test_csv_write_removes_stale_parquet(self, tmp_path, csv_format):
+        stale = tmp_path / "dtpd_rank.parquet"
+        stale.write_bytes(b"old")
+        write_table(PD_EDGE, tmp_path / "dtpd_rank.csv")
+        assert not stale.exists()
+
+    def test_invalid_format(self):
+        with pytest.raises(ValueError):
+            set_table_format("feather")
+
+    def test_parquet_fallback_without_pyarrow(self, monkeypatch, csv_format):
+        monkeypatch.setattr(utils, "pyarrow", None)
+        assert set_table_format("parquet") == "csv"
+
+    def test_parquet_roundtrip(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        out = write_table(PD_EDGE, tmp_path / "edge_pathway_disease.csv", fmt="parquet")
+        assert out.suffix == ".parquet"
+        assert not (tmp_path / "edge_pathway_disease.csv").exists()
+        typed = read_table(tmp_path / "edge_pathway_disease.csv")
+        assert typed["pathway_score"].iloc[1] == 0.123456789012345
+        assert not isinstance(typed["diseaseId"].dtype, pd.CategoricalDtype)
+        assert isinstance(read_table(out, categorical=True)["diseaseId"].dtype, pd.CategoricalDtype)
+        # typed=False 与 CSV 读回的字符串表一致
+        csv = write_table(PD_EDGE, tmp_path / "csv" / "edge_pathway_disease.csv", fmt="csv")
+        pd.testing.assert_frame_equal(read_table(out, typed=False), read_csv(csv, dtype=str),
+                                      check_dtype=False)
+
+    def test_parquet_keep_csv(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        write_table(PD_EDGE, tmp_path / "drug_disease_rank.csv", fmt="parquet", keep_csv=True)
+        assert (tmp_path / "drug_disease_rank.csv").exists()
+        assert (tmp_path / "drug_disease_rank.parquet").exists()
+
+    def test_parquet_dtpd_rank_read_by_runner(self, tmp_path):
+        """runner.sh 的 derive_matched_ids_from_dtpd 直接读 dtpd_rank.csv"""
+        pytest.importorskip("pyarrow")
+        if not RUNNER_SH.exists() or shutil.which("bash") is None:
+            pytest.skip("需要 ops/internal/runner.sh 和 bash")
+        out = write_table(PD_EDGE, tmp_path / "output" / "gout" / "ctgov" / "dtpd_rank.csv", fmt="parquet")
+        assert out.suffix == ".parquet"
+        lines = RUNNER_SH.read_text(encoding="utf-8").splitlines(keepends=True)
+        start = lines.index("derive_matched_ids_from_dtpd() {\n")
+        func = "".join(lines[start:lines.index("}\n", start) + 1])
+        res = subprocess.run(
+            ["bash", "-c", func + 'derive_matched_ids_from_dtpd "$@"', "runner", "a", "gout", "ctgov"],
+            env={**os.environ, "KG_DIR": str(tmp_path)}, capture_output=True, text=True, check=True,
+        )
+        assert res.stdout.strip() == "EFO_1"
+
+
+# ===== peak_rss_mb =====
+
+
+def test_peak_rss_tracks_allocation():
+    reset_peak_rss()
+    base = peak_rss_mb()
+    assert base > 0
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b"x" * len(block[::4096])  # 触碰每一页
+    assert peak_rss_mb() >= base + 32
+    del block
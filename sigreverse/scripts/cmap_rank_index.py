@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Build or query the precomputed CMap rank index (sigreverse.rank_index).
+
+build: rank every signature of a LINCS Level 5 GCTx matrix once and store the
+       uint16 gene ranks (memory-mapped, row groups by cell line).
+query: KS enrichment (es_up / es_down) of one or more disease signatures
+       against the index in a single pass; one CSV per signature.
+
+Usage:
+    python scripts/cmap_rank_index.py build --gctx data/lincs/level5.gctx \\
+        --sig-info data/lincs/siginfo_beta.txt --gene-info data/lincs/geneinfo_beta.txt \\
+        --out data/lincs/rank_index
+    python scripts/cmap_rank_index.py query --index data/lincs/rank_index \\
+        --signature data/input/disease_a.json --signature data/input/disease_b.json \\
+        --out data/output/rank_index_es [--cell-line MCF7 --cell-line HEPG2]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+_project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_project_root))
+
+from sigreverse.io import ensure_dir, read_disease_signature, sanitize_genes, write_csv
+from sigreverse.rank_index import RankIndex, build_rank_index
+
+logger = logging.getLogger("sigreverse.cmap_rank_index")
+
+
+def cmd_build(args) -> int:
+    pert_types = tuple(args.pert_type) if args.pert_type else None
+    build_rank_index(
+        args.gctx, args.out,
+        sig_info_path=args.sig_info,
+        gene_info_path=args.gene_info,
+        pert_types=pert_types,
+        landmark_only=args.landmark_only,
+        chunk_size=args.chunk_size,
+    )
+    return 0
+
+
+def cmd_query(args) -> int:
+    index = RankIndex(args.index)
+    queries = {}
+    for path in args.signature:
+        sig = read_disease_signature(path)
+        name = sig.get("name") or Path(path).stem
+        queries[name] = (sanitize_genes(sig.get("up", [])), sanitize_genes(sig.get("down", [])))
+
+    t0 = time.time()
+    results = index.query_batch(queries, cell_lines=args.cell_line or None)
+    logger.info(f"{len(queries)} signature(s) x {index.n_signatures} indexed signatures "
+                f"in {time.time() - t0:.1f}s")
+
+    ensure_dir(args.out)
+    for name, df in results.items():
+        fname = re.sub(r"[^\w.-]+", "_", name) + "_es.csv"
+        write_csv(os.path.join(args.out, fname), df)
+        logger.info(f"{name}: {len(df)} rows -> {fname}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="Build a rank index from a Level 5 GCTx file")
+    p.add_argument("--gctx", required=True, help="Level 5 .gctx file")
+    p.add_argument("--out", required=True, help="Index directory")
+    p.add_argument("--sig-info", default=None, help="LINCS siginfo file")
+    p.add_argument("--gene-info", default=None, help="LINCS geneinfo file")
+    p.add_argument("--pert-type", action="append", default=None,
+                   help="Keep this pert_type (repeatable; default trt_cp when --sig-info is given)")
+    p.add_argument("--landmark-only", action="store_true", help="Index landmark genes only")
+    p.add_argument("--chunk-size", type=int, default=4096, help="Signatures ranked per block")
+    p.set_defaults(func=cmd_build)
+
+    q = sub.add_parser("query", help="Score disease signatures against a rank index")
+    q.add_argument("--index", required=True, help="Index directory")
+    q.add_argument("--signature", action="append", required=True,
+                   help="Disease signature JSON (repeatable; answered in one pass)")
+    q.add_argument("--out", required=True, help="Output directory")
+    q.add_argument("--cell-line", action="append", default=None,
+                   help="Restrict to this cell line (repeatable)")
+    q.set_defaults(func=cmd_query)
+
+    args = parser.parse_args()
+    if args.command == "build" and args.pert_type is None and args.sig_info:
+        args.pert_type = ["trt_cp"]
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
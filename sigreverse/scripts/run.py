@@ -50,7 +50,10 @@ from sigreverse.qc import (
     apply_toxicity_flags,
 )
 from sigreverse.statistics import compute_drug_significance
-from sigreverse.cmap_algorithms import CMapPipeline, LDP3ESProvider, load_touchstone_reference
+from sigreverse.cmap_algorithms import (
+    CMapPipeline, GCTxESProvider, LDP3ESProvider, load_touchstone_reference,
+)
+from sigreverse.rank_index import RankIndex, RankIndexESProvider
 from sigreverse.dose_response import analyze_dose_response
 
 logger = logging.getLogger("sigreverse.run")
@@ -479,6 +482,8 @@ def step_statistical_significance(df_detail, df_drug, stats_cfg, robustness_cfg=
         n_cap=int(robustness_cfg.get("n_cap", 8)),
         cl_diversity_bonus=float(robustness_cfg.get("cl_diversity_bonus", 0.1)),
         n_factor_mode=robustness_cfg.get("n_factor_mode", "log"),
+        engine=stats_cfg.get("permutation_engine", "vectorized"),
+        n_jobs=int(stats_cfg.get("n_jobs", 1)),
     )
 
     # Merge statistics into drug table
@@ -635,13 +640,34 @@ def _safe_float(val) -> float | None:
 # Main
 # ---------------------------------------------------------------------------
 
-def step_cmap_pipeline(df_detail, cmap_cfg) -> pd.DataFrame:
-    """Step 8: Run CMap 4-stage pipeline (ES → WTCS → NCS → Tau)."""
+def step_cmap_pipeline(df_detail, cmap_cfg, up=None, down=None) -> pd.DataFrame:
+    """Step 8: Run CMap 4-stage pipeline (ES → WTCS → NCS → Tau).
+
+    ES source: LDP3 z-scores of df_detail (default) or, with es_source: gctx,
+    two-sided KS on a local Level 5 GCTx matrix for the disease up/down genes;
+    es_source: rank_index answers the same from a prebuilt rank index.
+    """
     if not cmap_cfg.get("enabled", True):
         logger.info("CMap pipeline disabled in config, skipping.")
         return pd.DataFrame()
 
-    provider = LDP3ESProvider(df_detail)
+    if cmap_cfg.get("es_source", "ldp3") == "gctx":
+        gctx_cfg = cmap_cfg.get("gctx", {})
+        provider = GCTxESProvider(
+            gctx_cfg["path"], up, down,
+            sig_info_path=gctx_cfg.get("sig_info_path"),
+            gene_info_path=gctx_cfg.get("gene_info_path"),
+            landmark_only=bool(gctx_cfg.get("landmark_only", False)),
+            chunk_size=int(gctx_cfg.get("chunk_size", 4096)),
+        )
+    elif cmap_cfg.get("es_source") == "rank_index":
+        index_cfg = cmap_cfg.get("rank_index", {})
+        provider = RankIndexESProvider(
+            RankIndex(index_cfg["path"]), up, down,
+            cell_lines=index_cfg.get("cell_lines"),
+        )
+    else:
+        provider = LDP3ESProvider(df_detail)
 
     # Load optional Touchstone reference
     reference_ncs = None
@@ -937,7 +963,7 @@ def main():
     if args.no_cmap:
         cmap_cfg["enabled"] = False
     df_tau, timing = _timed_step(8, total_steps, "Run CMap 4-stage pipeline (Tau scoring)",
-                                  step_cmap_pipeline, df_detail, cmap_cfg)
+                                  step_cmap_pipeline, df_detail, cmap_cfg, up, down)
     step_timings.append(timing)
     if len(df_tau) > 0:
         if "n_cell_lines" in df_tau.columns and "n_cell_lines" in df_drug.columns:
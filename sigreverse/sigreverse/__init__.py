@@ -3,7 +3,7 @@ import logging
 __all__ = [
     "io", "ldp3_client", "scoring", "robustness", "qc", "statistics",
     "cmap_algorithms", "drug_standardization", "dose_response", "fusion",
-    "cache",
+    "cache", "rank_index",
 ]
 __version__ = "0.4.0"
 
@@ -13,7 +13,10 @@ LDP3 z-score proxy:
 Architecture:
     - ESProvider (abstract): pluggable enrichment score source
     - LDP3ESProvider: wraps LDP3 z-scores as ES (current default)
-    - GCTxESProvider: stub for future local Level 5 GCTx data
+    - GCTxESProvider: local Level 5 GCTx matrix, two-sided KS enrichment
+    - SignatureArrays: struct-of-arrays Stage 1 output; WTCS/NCS/Tau run as
+      array ops on its columns (compute_*_arrays), the list-based
+      compute_wtcs/compute_ncs/compute_tau wrap the same code
     - CMapPipeline: orchestrates the 4-stage computation
 
 References:
@@ -32,6 +35,11 @@ from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 
+try:
+    import h5py
+except ImportError:  # optional: only needed for GCTxESProvider
+    h5py = None
+
 logger = logging.getLogger("sigreverse.cmap_algorithms")
 
 
@@ -84,6 +92,97 @@ class TauResult:
     cell_line_ncs: Dict[str, float] = field(default_factory=dict)
 
 
+@dataclass
+class SignatureArrays:
+    """Stage 1 output as columns (struct-of-arrays), one entry per signature.
+
+    The pipeline stages work on these NumPy columns instead of lists of
+    EnrichmentResult. Cell lines and drugs are factorized once into integer
+    codes (first-appearance order, so drug-level output keeps the order the
+    per-object implementation produced). When a sig_id occurs more than once
+    its metadata resolves to the last occurrence, as the sig_id lookups did.
+    """
+    sig_id: np.ndarray
+    es_up: np.ndarray
+    es_down: np.ndarray
+    cell_line: np.ndarray
+    pert_name: np.ndarray
+    pert_dose: np.ndarray
+    pert_time: np.ndarray
+    fdr_up: Optional[np.ndarray] = None       # NaN = missing
+    fdr_down: Optional[np.ndarray] = None
+    logp_fisher: Optional[np.ndarray] = None
+    ldp3_type: Optional[np.ndarray] = None
+    cell_codes: np.ndarray = field(init=False, repr=False)
+    cell_lines: np.ndarray = field(init=False, repr=False)
+    drug_codes: np.ndarray = field(init=False, repr=False)
+    drugs: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        for name in ("sig_id", "cell_line", "pert_name", "pert_dose", "pert_time"):
+            setattr(self, name, np.asarray(getattr(self, name), dtype=object))
+        self.es_up = np.asarray(self.es_up, dtype=np.float64)
+        self.es_down = np.asarray(self.es_down, dtype=np.float64)
+        meta = _last_occurrence(self.sig_id)
+        self.cell_codes, self.cell_lines = _factorize(self.cell_line[meta])
+        self.drug_codes, self.drugs = _factorize(self.pert_name[meta])
+
+    def __len__(self) -> int:
+        return len(self.sig_id)
+
+    @classmethod
+    def from_enrichments(cls, enrichments: List[EnrichmentResult]) -> "SignatureArrays":
+        def optional(values):
+            return None if all(v is None for v in values) else \
+                np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return cls(
+            sig_id=[er.sig_id for er in enrichments],
+            es_up=[er.es_up for er in enrichments],
+            es_down=[er.es_down for er in enrichments],
+            cell_line=[er.cell_line for er in enrichments],
+            pert_name=[er.pert_name for er in enrichments],
+            pert_dose=[er.pert_dose for er in enrichments],
+            pert_time=[er.pert_time for er in enrichments],
+            fdr_up=optional([er.fdr_up for er in enrichments]),
+            fdr_down=optional([er.fdr_down for er in enrichments]),
+            logp_fisher=optional([er.logp_fisher for er in enrichments]),
+            ldp3_type=None if all(er.ldp3_type is None for er in enrichments)
+            else np.array([er.ldp3_type for er in enrichments], dtype=object),
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SignatureArrays":
+        """From a (sig_id, pert_name, cell_line, pert_dose, pert_time, es_up, es_down) DataFrame."""
+        return cls(
+            sig_id=df["sig_id"].to_numpy(dtype=object),
+            es_up=df["es_up"].to_numpy(dtype=np.float64),
+            es_down=df["es_down"].to_numpy(dtype=np.float64),
+            cell_line=df["cell_line"].to_numpy(dtype=object),
+            pert_name=df["pert_name"].to_numpy(dtype=object),
+            pert_dose=df["pert_dose"].to_numpy(dtype=object),
+            pert_time=df["pert_time"].to_numpy(dtype=object),
+        )
+
+    def to_enrichments(self) -> List[EnrichmentResult]:
+        n = len(self)
+
+        def optional(values):
+            return [None] * n if values is None else [None if math.isnan(v) else v for v in values.tolist()]
+        ldp3_type = [None] * n if self.ldp3_type is None else self.ldp3_type.tolist()
+        return [
+            EnrichmentResult(
+                sig_id=sid, es_up=up, es_down=down, cell_line=cl, pert_name=pn,
+                pert_dose=dose, pert_time=t, fdr_up=fu, fdr_down=fd, logp_fisher=lf, ldp3_type=lt,
+            )
+            for sid, up, down, cl, pn, dose, t, fu, fd, lf, lt in zip(
+                self.sig_id.tolist(), self.es_up.tolist(), self.es_down.tolist(),
+                self.cell_line.tolist(), self.pert_name.tolist(), self.pert_dose.tolist(),
+                self.pert_time.tolist(), optional(self.fdr_up), optional(self.fdr_down),
+                optional(self.logp_fisher), ldp3_type,
+            )
+        ]
+
+
 # ---------------------------------------------------------------------------
 # Stage 1: Enrichment Score providers
 # ---------------------------------------------------------------------------
@@ -93,13 +192,21 @@ class ESProvider(ABC):
     
     Subclass this to plug in different enrichment data sources:
     - LDP3ESProvider: uses LDP3 API z-scores (current)
-    - GCTxESProvider: uses local Level 5 GCTx data (future)
+    - GCTxESProvider: uses local Level 5 GCTx data
     """
     
     @abstractmethod
     def get_enrichment_scores(self) -> List[EnrichmentResult]:
         """Return enrichment scores for all signatures."""
         ...
+
+    def get_enrichment_arrays(self) -> SignatureArrays:
+        """Return enrichment scores as columns (what CMapPipeline consumes).
+
+        Override when the source is already columnar; the default converts
+        get_enrichment_scores().
+        """
+        return SignatureArrays.from_enrichments(self.get_enrichment_scores())
     
     @abstractmethod
     def source_name(self) -> str:
@@ -128,68 +235,414 @@ class LDP3ESProvider(ESProvider):
         self.df = df_detail
     
     def get_enrichment_scores(self) -> List[EnrichmentResult]:
-        results = []
-        for _, row in self.df.iterrows():
-            results.append(EnrichmentResult(
-                sig_id=str(row.get("uuid", row.name)),
-                es_up=float(row.get("z-up", 0.0)),
-                es_down=float(row.get("z-down", 0.0)),
-                cell_line=str(row.get("meta.cell_line", "")),
-                pert_name=str(row.get("meta.pert_name", "")),
-                pert_dose=str(row.get("meta.pert_dose", "")),
-                pert_time=str(row.get("meta.pert_time", "")),
-                fdr_up=_safe_float(row.get("fdr-up")),
-                fdr_down=_safe_float(row.get("fdr-down")),
-                logp_fisher=_safe_float(row.get("logp-fisher")),
-                ldp3_type=str(row.get("type", "")) if "type" in row.index else None,
-            ))
-        return results
+        return self.get_enrichment_arrays().to_enrichments()
+
+    def get_enrichment_arrays(self) -> SignatureArrays:
+        """Columns straight from df_detail (no per-row iteration)."""
+        df = self.df
+
+        def text(col, default=""):
+            if col not in df.columns:
+                return np.full(len(df), default, dtype=object)
+            return np.array([str(v) for v in df[col].tolist()], dtype=object)
+
+        def number(col, default):
+            if col not in df.columns:
+                return np.full(len(df), default, dtype=np.float64)
+            return df[col].to_numpy(dtype=np.float64)
+
+        def optional_number(col):
+            if col not in df.columns:
+                return None
+            return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+
+        sig_id = text("uuid") if "uuid" in df.columns else \
+            np.array([str(v) for v in df.index.tolist()], dtype=object)
+        return SignatureArrays(
+            sig_id=sig_id,
+            es_up=number("z-up", 0.0),
+            es_down=number("z-down", 0.0),
+            cell_line=text("meta.cell_line"),
+            pert_name=text("meta.pert_name"),
+            pert_dose=text("meta.pert_dose"),
+            pert_time=text("meta.pert_time"),
+            fdr_up=optional_number("fdr-up"),
+            fdr_down=optional_number("fdr-down"),
+            logp_fisher=optional_number("logp-fisher"),
+            ldp3_type=text("type") if "type" in df.columns else None,
+        )
     
     def source_name(self) -> str:
         return "LDP3_API_z-scores"
 
 
-class GCTxESProvider(ESProvider):
-    """Stub for local Level 5 GCTx data (future implementation).
-    
-    When Level 5 LINCS data is available locally:
-        1. Load .gctx file using cmapPy or h5py
-        2. Extract drug perturbation z-score profiles
-        3. Compute enrichment score using GSEA-like running sum
-        4. Return EnrichmentResult for each signature
-    
-    Data requirements:
-        - Level 5 moderated z-scores (.gctx, ~3GB per plate)
-        - Gene info file (.txt) for landmark gene mapping
-        - Signature metadata (.txt) for cell line / dose / time
-    
-    Implementation notes:
-        - Use cmapPy.pandasGEXpress for .gctx I/O
-        - Implement KS-like running sum statistic for ES
-        - Weight by gene expression variance (L1000 landmark genes)
+def ks_enrichment(positions: np.ndarray, n_genes: int) -> np.ndarray:
+    """Kolmogorov-Smirnov enrichment score of a gene set, for many signatures at once.
+
+    CMap (Lamb et al. 2006) statistic: with the set's 1-based positions
+    p_1 < ... < p_s in a signature's gene list ranked by decreasing z-score,
+        a = max_j ( j/s - p_j/n ),   b = max_j ( p_j/n - (j-1)/s )
+        ES = a if a > b else -b
+    ES > 0: set concentrated at the top (induced); ES < 0: at the bottom.
+
+    Args:
+        positions: (n_signatures, s) 1-based ranks of the set genes (any order).
+        n_genes: Number of ranked genes n.
+
+    Returns:
+        (n_signatures,) ES in [-1, 1].
     """
-    
-    def __init__(self, gctx_path: str, sig_info_path: str, gene_info_path: str):
+    # Scaled by n*s so a/b are exact integers (a == b ties resolve deterministically)
+    p = np.sort(positions, axis=1).astype(np.int64)
+    s = p.shape[1]
+    j = np.arange(1, s + 1, dtype=np.int64)
+    a = (j * n_genes - p * s).max(axis=1)
+    b = (p * s - (j - 1) * n_genes).max(axis=1)
+    return np.where(a > b, a, -b) / float(n_genes * s)
+
+
+# Column names across LINCS releases (2020 beta first, then 2017 GSE70138/GSE92742)
+_SIG_INFO_COLUMNS = {
+    "pert_name": ("cmap_name", "pert_iname", "pert_name"),
+    "cell_line": ("cell_iname", "cell_id", "cell_line"),
+    "pert_dose": ("pert_idose", "pert_dose"),
+    "pert_time": ("pert_itime", "pert_time"),
+    "pert_type": ("pert_type",),
+}
+_GENE_ID_COLUMNS = ("gene_id", "pr_gene_id")
+_GENE_SYMBOL_COLUMNS = ("gene_symbol", "pr_gene_symbol")
+
+_GCTX_MATRIX = "0/DATA/0/matrix"
+_GCTX_ROW_IDS = "0/META/ROW/id"
+_GCTX_COL_IDS = "0/META/COL/id"
+
+
+def _first_column(df: pd.DataFrame, candidates: Tuple[str, ...]) -> Optional[str]:
+    return next((c for c in candidates if c in df.columns), None)
+
+
+def _decode_ids(values: np.ndarray) -> np.ndarray:
+    return np.array([v.decode() if isinstance(v, bytes) else str(v) for v in values], dtype=object)
+
+
+def match_gene_positions(
+    genes: List[str],
+    gene_ids: List[str],
+    gene_symbols: Optional[List[str]],
+    label: str,
+) -> np.ndarray:
+    """Positions of ``genes`` in a ranked gene space (sorted, unique).
+
+    Genes are matched case-insensitively against ``gene_symbols`` when given,
+    else exactly against ``gene_ids``. Missing genes are logged and dropped.
+
+    Raises:
+        ValueError: None of the genes are in the gene space.
+    """
+    if gene_symbols is not None:
+        lookup = {str(sym).upper(): i for i, sym in enumerate(gene_symbols)}
+        idx = [lookup.get(str(g).upper()) for g in genes]
+    else:
+        lookup = {gid: i for i, gid in enumerate(gene_ids)}
+        idx = [lookup.get(str(g)) for g in genes]
+    found = np.array(sorted({i for i in idx if i is not None}), dtype=np.int64)
+    if len(found) < len(genes):
+        logger.warning(f"{len(genes) - len(found)}/{len(genes)} {label} genes not in the ranked gene space")
+    if len(found) == 0:
+        raise ValueError(f"None of the {label} genes are in the ranked gene space")
+    return found
+
+
+class GCTxMatrix:
+    """Reader for a LINCS Level 5 GCTx matrix (cmapPy HDF5 layout).
+
+    ``/0/DATA/0/matrix`` has shape (n_signatures, n_genes), one row per
+    signature. Contiguous, uncompressed matrices (the LINCS release format) are
+    memory-mapped directly; chunked/compressed ones are read through h5py.
+
+    Attributes:
+        gene_ids: Row ids of the ranked gene space (all genes or landmark only).
+        gene_symbols: Matching symbols from gene info, or None.
+        sig_meta: Selected signatures (sig_id, pert_name, cell_line, pert_dose,
+            pert_time) in file order.
+    """
+
+    def __init__(
+        self,
+        gctx_path: str,
+        sig_info_path: Optional[str] = None,
+        gene_info_path: Optional[str] = None,
+        pert_types: Optional[Tuple[str, ...]] = ("trt_cp",),
+        landmark_only: bool = False,
+    ):
+        if h5py is None:
+            raise ImportError("Reading GCTx files requires h5py: pip install h5py")
         self.gctx_path = gctx_path
         self.sig_info_path = sig_info_path
         self.gene_info_path = gene_info_path
-        raise NotImplementedError(
-            "GCTxESProvider requires local Level 5 LINCS data. "
-            "Download from https://clue.io/data/CMap2020#LINCS2020 "
-            "Install: pip install cmapPy"
-        )
-    
+
+        with h5py.File(gctx_path, "r") as f:
+            row_ids = _decode_ids(f[_GCTX_ROW_IDS][()])
+            col_ids = _decode_ids(f[_GCTX_COL_IDS][()])
+            shape = f[_GCTX_MATRIX].shape
+        if shape != (len(col_ids), len(row_ids)):
+            raise ValueError(f"Unexpected GCTx matrix shape {shape} for "
+                             f"{len(col_ids)} signatures x {len(row_ids)} genes")
+        self._select_genes(row_ids, landmark_only)
+        self._select_signatures(col_ids, pert_types)
+
+    def _select_genes(self, row_ids: np.ndarray, landmark_only: bool) -> None:
+        gene_rows = np.arange(len(row_ids))
+        symbols = None
+        if self.gene_info_path:
+            gi = pd.read_csv(self.gene_info_path, sep="\t", dtype=str)
+            id_col = _first_column(gi, _GENE_ID_COLUMNS)
+            sym_col = _first_column(gi, _GENE_SYMBOL_COLUMNS)
+            if id_col is None or sym_col is None:
+                raise ValueError(f"Gene info needs one of {_GENE_ID_COLUMNS} and {_GENE_SYMBOL_COLUMNS}")
+            gi = gi.drop_duplicates(id_col).set_index(id_col)
+            if landmark_only:
+                if "feature_space" in gi.columns:
+                    is_lm = gi["feature_space"].str.lower() == "landmark"
+                elif "pr_is_lm" in gi.columns:
+                    is_lm = gi["pr_is_lm"].astype(str) == "1"
+                else:
+                    raise ValueError("landmark_only needs 'feature_space' or 'pr_is_lm' in gene info")
+                gene_rows = np.flatnonzero(is_lm.reindex(row_ids, fill_value=False).to_numpy())
+            symbols = gi[sym_col].reindex(row_ids[gene_rows]).fillna("").tolist()
+        elif landmark_only:
+            raise ValueError("landmark_only requires gene_info_path")
+
+        self._gene_rows = gene_rows
+        self._full_gene_space = len(gene_rows) == len(row_ids)
+        self.gene_ids = list(row_ids[gene_rows])
+        self.gene_symbols = symbols
+        self.n_genes = len(gene_rows)
+
+    def _select_signatures(self, col_ids: np.ndarray, pert_types) -> None:
+        meta = pd.DataFrame({"sig_id": col_ids})
+        if self.sig_info_path:
+            si = pd.read_csv(self.sig_info_path, sep="\t", dtype=str)
+            rename = {}
+            for field_name, candidates in _SIG_INFO_COLUMNS.items():
+                col = _first_column(si, candidates)
+                if col is not None:
+                    rename[col] = field_name
+            si = si[["sig_id"] + list(rename)].rename(columns=rename).drop_duplicates("sig_id")
+            meta = meta.merge(si, on="sig_id", how="left")
+            if pert_types is not None and "pert_type" in meta.columns:
+                meta = meta[meta["pert_type"].isin(pert_types)]
+        for c in ("pert_name", "cell_line", "pert_dose", "pert_time"):
+            meta[c] = meta[c].fillna("") if c in meta.columns else ""
+        self._sig_rows = meta.index.to_numpy()
+        self.sig_meta = meta[["sig_id", "pert_name", "cell_line", "pert_dose", "pert_time"]].reset_index(drop=True)
+        logger.info(f"GCTx: {len(self._sig_rows)}/{len(col_ids)} signatures x {self.n_genes} genes")
+
+    def gene_positions(self, genes: List[str], label: str) -> np.ndarray:
+        return match_gene_positions(genes, self.gene_ids, self.gene_symbols, label)
+
+    def iter_blocks(self, chunk_size: int, signatures: Optional[np.ndarray] = None):
+        """Yield (offset, z-score block) over ``signatures`` (indices into sig_meta, ascending)."""
+        rows = self._sig_rows if signatures is None else self._sig_rows[signatures]
+        with h5py.File(self.gctx_path, "r") as f:
+            ds = f[_GCTX_MATRIX]
+            matrix = ds
+            offset = ds.id.get_offset()
+            if ds.chunks is None and ds.compression is None and offset is not None:
+                matrix = np.memmap(self.gctx_path, dtype=ds.dtype, mode="r",
+                                   offset=offset, shape=ds.shape)
+            for start in range(0, len(rows), chunk_size):
+                sel = rows[start:start + chunk_size]
+                if sel[-1] - sel[0] + 1 == len(sel):
+                    block = matrix[sel[0]:sel[-1] + 1]
+                else:
+                    block = matrix[sel]
+                block = np.asarray(block, dtype=np.float32)
+                if not self._full_gene_space:
+                    block = block[:, self._gene_rows]
+                yield start, block
+
+
+def gene_ranks(block: np.ndarray) -> np.ndarray:
+    """1-based rank of every gene in each signature (stable argsort of -z).
+
+    float32/float16 blocks (GCTx z-scores) sort one uint64 key per cell
+    instead of a stable float argsort (~2.5x faster): high 32 bits order z
+    descending (IEEE bit trick, -0.0 == 0.0, NaN last), low 32 bits are the
+    gene index, so keys are unique and the plain sort reproduces the stable
+    tie order. Wider dtypes are ranked on their float64 values (the same bit
+    trick on a 64-bit key, then a stable argsort) so that values distinct in
+    float64 never tie.
+    """
+    block = np.asarray(block)
+    n_genes = block.shape[1]
+    if block.dtype not in (np.float32, np.float16):
+        order = np.argsort(_descending_key64(block.astype(np.float64)), axis=1, kind="stable")
+    else:
+        key = _descending_key32(block).astype(np.uint64) << np.uint64(32)
+        key |= np.arange(n_genes, dtype=np.uint64)[None, :]
+        key.sort(axis=1)
+        order = (key & np.uint64(0xFFFFFFFF)).astype(np.intp)
+    ranks = np.empty(block.shape, dtype=np.int32)
+    np.put_along_axis(ranks, order, np.arange(1, n_genes + 1, dtype=np.int32)[None, :], axis=1)
+    return ranks
+
+
+def _descending_key32(values: np.ndarray) -> np.ndarray:
+    """uint32 key ordering float32 values descending (-0.0 == 0.0, NaN last)."""
+    bits = (values.astype(np.float32) + np.float32(0.0)).view(np.uint32)
+    ascending = np.where(bits & np.uint32(0x80000000), ~bits, bits | np.uint32(0x80000000))
+    descending = ~ascending
+    descending[np.isnan(values)] = np.uint32(0xFFFFFFFF)
+    return descending
+
+
+def _descending_key64(values: np.ndarray) -> np.ndarray:
+    """uint64 key ordering float64 values descending (-0.0 == 0.0, NaN last)."""
+    bits = (values + 0.0).view(np.uint64)
+    sign = np.uint64(0x8000000000000000)
+    ascending = np.where(bits & sign, ~bits, bits | sign)
+    descending = ~ascending
+    descending[np.isnan(values)] = np.uint64(0xFFFFFFFFFFFFFFFF)
+    return descending
+
+
+class GCTxESProvider(ESProvider):
+    """Enrichment scores computed locally from a LINCS Level 5 GCTx matrix.
+
+    For each block of ``chunk_size`` signatures (see GCTxMatrix) the profiles
+    are sorted once and the ranks of the disease UP and DOWN genes located by
+    binary search (same ranks as gene_ranks: stable argsort of -z, NaN last); both sets are then
+    scored with the two-sided KS statistic (ks_enrichment) for the whole block
+    in NumPy — all signatures in the file, no top-k cap. For repeated queries
+    build a rank index instead (sigreverse.rank_index).
+
+    Sign convention: output follows LDP3 (negative = reversed) so the WTCS →
+    NCS → Tau stages are unchanged:
+        es_up   =  ES(disease UP genes)    (< 0: UP genes pushed down)
+        es_down = -ES(disease DOWN genes)  (< 0: DOWN genes pushed up)
+
+    Data requirements:
+        - Level 5 moderated z-scores (.gctx), e.g. level5_beta_trt_cp_n720216x12328.gctx
+        - Gene info (.txt, tab-separated) to map gene symbols → matrix row ids;
+          without it the signature genes must match the matrix row ids
+        - Signature info (.txt) for cell line / compound / dose / time metadata
+    """
+
+    def __init__(
+        self,
+        gctx_path: str,
+        up_genes: List[str],
+        down_genes: List[str],
+        sig_info_path: Optional[str] = None,
+        gene_info_path: Optional[str] = None,
+        pert_types: Optional[Tuple[str, ...]] = ("trt_cp",),
+        landmark_only: bool = False,
+        chunk_size: int = 4096,
+    ):
+        """
+        Args:
+            gctx_path: Level 5 .gctx file.
+            up_genes: Disease UP gene symbols (or row ids without gene info).
+            down_genes: Disease DOWN gene symbols.
+            sig_info_path: LINCS siginfo file (optional; metadata + pert_type filter).
+            gene_info_path: LINCS geneinfo file (optional; symbol → row id).
+            pert_types: Keep only these pert_type values (needs sig info; None = all).
+            landmark_only: Rank within the 978 landmark genes only (needs gene info).
+            chunk_size: Signatures per block (block memory ~ chunk_size * n_genes * 8 bytes).
+        """
+        self.matrix = GCTxMatrix(gctx_path, sig_info_path=sig_info_path,
+                                 gene_info_path=gene_info_path, pert_types=pert_types,
+                                 landmark_only=landmark_only)
+        self.gctx_path = gctx_path
+        self.chunk_size = max(1, int(chunk_size))
+        self.n_genes = self.matrix.n_genes
+        self._up_idx = self.matrix.gene_positions(up_genes, "UP")
+        self._down_idx = self.matrix.gene_positions(down_genes, "DOWN")
+
+    def _set_positions(self, block: np.ndarray, genes: np.ndarray) -> np.ndarray:
+        """1-based rank (by decreasing z-score, NaN last) of ``genes`` in every signature of the block.
+
+        Equals gene_ranks(block)[:, genes] without building the full rank matrix:
+        each float32 cell becomes one uint64 key (block row | descending z | gene
+        index), so a row-wise sort leaves the whole block as a single sorted
+        array and every query rank is found by one searchsorted call. Blocks
+        whose key does not fit in 64 bits (float64 input) go through gene_ranks.
+        """
+        n_rows, n_genes = block.shape
+        gene_bits = max(1, (n_genes - 1).bit_length())
+        row_bits = max(1, (n_rows - 1).bit_length())
+        if block.dtype not in (np.float32, np.float16) or row_bits + 32 + gene_bits > 64:
+            return gene_ranks(block)[:, genes].astype(np.int64)
+        key = _descending_key32(block).astype(np.uint64) << np.uint64(gene_bits)
+        key |= np.arange(n_genes, dtype=np.uint64)[None, :]
+        key |= np.arange(n_rows, dtype=np.uint64)[:, None] << np.uint64(32 + gene_bits)
+        query = key[:, genes]
+        key.sort(axis=1)
+        return np.searchsorted(key.ravel(), query) - np.arange(n_rows, dtype=np.int64)[:, None] * n_genes + 1
+
+    def compute_es(self) -> pd.DataFrame:
+        """ES for all selected signatures as a DataFrame (sig_id, metadata, es_up, es_down)."""
+        n_sigs = len(self.matrix.sig_meta)
+        es_up = np.empty(n_sigs)
+        es_down = np.empty(n_sigs)
+        genes = np.concatenate([self._up_idx, self._down_idx])
+        n_up = len(self._up_idx)
+        for start, block in self.matrix.iter_blocks(self.chunk_size):
+            pos = self._set_positions(block, genes)
+            stop = start + len(block)
+            es_up[start:stop] = ks_enrichment(pos[:, :n_up], self.n_genes)
+            es_down[start:stop] = -ks_enrichment(pos[:, n_up:], self.n_genes)
+        out = self.matrix.sig_meta.copy()
+        out["es_up"] = es_up
+        out["es_down"] = es_down
+        return out
+
     def get_enrichment_scores(self) -> List[EnrichmentResult]:
-        raise NotImplementedError
-    
+        return enrichment_results_from_frame(self.compute_es())
+
+    def get_enrichment_arrays(self) -> SignatureArrays:
+        return SignatureArrays.from_frame(self.compute_es())
+
     def source_name(self) -> str:
         return "Level5_GCTx_local"
 
 
+def enrichment_results_from_frame(df: pd.DataFrame) -> List[EnrichmentResult]:
+    """EnrichmentResult list from a (sig_id, metadata, es_up, es_down) DataFrame."""
+    return SignatureArrays.from_frame(df).to_enrichments()
+
+
 # ---------------------------------------------------------------------------
 # Stage 2: WTCS (Weighted Tau Connectivity Score)
 # ---------------------------------------------------------------------------
 
+def compute_wtcs_arrays(
+    es_up: np.ndarray,
+    es_down: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stage 2 on columns: (wtcs, is_coherent, direction) per signature.
+
+    Same rules as compute_wtcs (LDP3 same-sign coherence gate, direction
+    classes), evaluated as array expressions.
+    """
+    es_up = np.asarray(es_up, dtype=np.float64)
+    es_down = np.asarray(es_down, dtype=np.float64)
+    same_sign = (es_up >= 0) == (es_down >= 0)
+    is_coherent = same_sign & ((es_up != 0) | (es_down != 0))
+    wtcs = np.where(is_coherent, (es_up + es_down) / 2.0, 0.0)
+    direction = np.select(
+        [
+            (es_up < 0) & (es_down < 0),
+            (es_up > 0) & (es_down > 0),
+            (np.abs(es_up) < 1e-10) & (np.abs(es_down) < 1e-10),
+        ],
+        ["reverser", "mimicker", "orthogonal"],
+        default="partial",
+    ).astype(object)
+    return wtcs, is_coherent, direction
+
+
 def compute_wtcs(enrichments: List[EnrichmentResult]) -> List[WTCSResult]:
     """Stage 2: Compute WTCS from enrichment scores.
     
@@ -207,42 +660,70 @@ def compute_wtcs(enrichments: List[EnrichmentResult]) -> List[WTCSResult]:
     Returns:
         List of WTCSResult.
     """
-    results = []
-    for er in enrichments:
-        sign_up = 1 if er.es_up >= 0 else -1
-        sign_down = 1 if er.es_down >= 0 else -1
-        
-        if sign_up == sign_down and (er.es_up != 0 or er.es_down != 0):
-            wtcs = (er.es_up + er.es_down) / 2.0
-            is_coherent = True
-        else:
-            wtcs = 0.0
-            is_coherent = False
-        
-        # Direction classification
-        if er.es_up < 0 and er.es_down < 0:
-            direction = "reverser"
-        elif er.es_up > 0 and er.es_down > 0:
-            direction = "mimicker"
-        elif abs(er.es_up) < 1e-10 and abs(er.es_down) < 1e-10:
-            direction = "orthogonal"
-        else:
-            direction = "partial"
-        
-        results.append(WTCSResult(
-            sig_id=er.sig_id,
-            wtcs=wtcs,
-            is_coherent=is_coherent,
-            direction=direction,
-        ))
-    
-    return results
+    wtcs, is_coherent, direction = compute_wtcs_arrays(
+        [er.es_up for er in enrichments], [er.es_down for er in enrichments]
+    )
+    return [
+        WTCSResult(sig_id=er.sig_id, wtcs=w, is_coherent=c, direction=d)
+        for er, w, c, d in zip(enrichments, wtcs.tolist(), is_coherent.tolist(), direction.tolist())
+    ]
 
 
 # ---------------------------------------------------------------------------
 # Stage 3: NCS (Normalized Connectivity Score)
 # ---------------------------------------------------------------------------
 
+def compute_ncs_arrays(
+    wtcs: np.ndarray,
+    cell_codes: np.ndarray,
+    method: str = "cell_line_null",
+) -> np.ndarray:
+    """Stage 3 on columns: NCS per signature from WTCS and cell-line codes.
+
+    Normalization factors are group means of |WTCS| over non-zero scores
+    (segments of the cell-line-sorted column); see compute_ncs for the
+    methods.
+    """
+    wtcs = np.asarray(wtcs, dtype=np.float64)
+    if method == "none":
+        return wtcs.copy()
+
+    cell_codes = np.asarray(cell_codes, dtype=np.intp)
+    n_groups = int(cell_codes.max()) + 1 if len(cell_codes) else 0
+    abs_wtcs = np.abs(wtcs)
+    nonzero = abs_wtcs > 1e-10
+
+    if method == "cell_line_null":
+        # For each cell line, normalization factor = mean(|WTCS|) for non-zero scores
+        order = np.argsort(cell_codes, kind="stable")
+        order = order[nonzero[order]]
+        counts = np.bincount(cell_codes[order], minlength=n_groups)
+        factors = np.ones(n_groups)
+        present = np.flatnonzero(counts)
+        if len(present):
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+            means = _segment_mean(abs_wtcs[order], starts, counts[present])
+            enough = counts[present] >= 3            # else: not enough data, skip normalization
+            factors[present[enough]] = means[enough]
+    elif method == "global_null":
+        all_abs = abs_wtcs[nonzero]
+        global_factor = float(np.mean(all_abs)) if len(all_abs) >= 3 else 1.0
+        factors = np.full(n_groups, global_factor)
+    else:
+        raise ValueError(f"Unknown NCS method: {method}")
+
+    factor = factors[cell_codes]
+    usable = factor > 1e-10
+    ncs = wtcs.copy()
+    np.divide(wtcs, factor, out=ncs, where=usable)
+
+    logger.info(
+        f"NCS normalization ({method}): {len(ncs)} signatures, "
+        f"{n_groups} cell lines"
+    )
+    return ncs
+
+
 def compute_ncs(
     enrichments: List[EnrichmentResult],
     wtcs_results: List[WTCSResult],
@@ -274,70 +755,91 @@ def compute_ncs(
     """
     # Build lookup for enrichment metadata
     er_lookup = {er.sig_id: er for er in enrichments}
-    
-    if method == "none":
-        return [
-            NCSResult(
-                sig_id=wr.sig_id,
-                ncs=wr.wtcs,
-                cell_line=er_lookup.get(wr.sig_id, EnrichmentResult(sig_id="", es_up=0, es_down=0)).cell_line,
-                pert_name=er_lookup.get(wr.sig_id, EnrichmentResult(sig_id="", es_up=0, es_down=0)).pert_name,
-            )
-            for wr in wtcs_results
-        ]
-    
-    # Group WTCS by cell line
-    cell_line_groups: Dict[str, List[Tuple[str, float]]] = {}
-    for wr in wtcs_results:
-        er = er_lookup.get(wr.sig_id)
-        cl = er.cell_line if er else "unknown"
-        if cl not in cell_line_groups:
-            cell_line_groups[cl] = []
-        cell_line_groups[cl].append((wr.sig_id, wr.wtcs))
-    
-    # Compute normalization factor per cell line
-    if method == "cell_line_null":
-        # For each cell line, normalization factor = mean(|WTCS|) for non-zero scores
-        cl_norm_factor: Dict[str, float] = {}
-        for cl, items in cell_line_groups.items():
-            abs_scores = [abs(s) for _, s in items if abs(s) > 1e-10]
-            if len(abs_scores) >= 3:
-                cl_norm_factor[cl] = float(np.mean(abs_scores))
-            else:
-                cl_norm_factor[cl] = 1.0  # not enough data, skip normalization
-    elif method == "global_null":
-        all_abs = [abs(wr.wtcs) for wr in wtcs_results if abs(wr.wtcs) > 1e-10]
-        global_factor = float(np.mean(all_abs)) if len(all_abs) >= 3 else 1.0
-        cl_norm_factor = {cl: global_factor for cl in cell_line_groups}
-    else:
-        raise ValueError(f"Unknown NCS method: {method}")
-    
-    # Normalize
-    results = []
-    for wr in wtcs_results:
-        er = er_lookup.get(wr.sig_id)
-        cl = er.cell_line if er else "unknown"
-        factor = cl_norm_factor.get(cl, 1.0)
-        ncs = wr.wtcs / factor if factor > 1e-10 else wr.wtcs
-        
-        results.append(NCSResult(
-            sig_id=wr.sig_id,
-            ncs=ncs,
-            cell_line=cl,
-            pert_name=er.pert_name if er else "",
-        ))
-    
-    logger.info(
-        f"NCS normalization ({method}): {len(results)} signatures, "
-        f"{len(cell_line_groups)} cell lines"
-    )
-    return results
+    missing_cell_line = "" if method == "none" else "unknown"
+    matched = [er_lookup.get(wr.sig_id) for wr in wtcs_results]
+    cell_line = [er.cell_line if er else missing_cell_line for er in matched]
+    pert_name = [er.pert_name if er else "" for er in matched]
+
+    cell_codes, _ = _factorize(np.asarray(cell_line, dtype=object))
+    ncs = compute_ncs_arrays([wr.wtcs for wr in wtcs_results], cell_codes, method=method)
+    return [
+        NCSResult(sig_id=wr.sig_id, ncs=x, cell_line=cl, pert_name=pn)
+        for wr, x, cl, pn in zip(wtcs_results, ncs.tolist(), cell_line, pert_name)
+    ]
 
 
 # ---------------------------------------------------------------------------
 # Stage 4: Tau (percentile rank score)
 # ---------------------------------------------------------------------------
 
+def compute_tau_arrays(
+    ncs: np.ndarray,
+    drug_codes: np.ndarray,
+    drugs: np.ndarray,
+    cell_codes: np.ndarray,
+    cell_lines: np.ndarray,
+    reference_ncs: Optional[np.ndarray] = None,
+    aggregation: str = "quantile_max",
+    reference_mode: str = "auto",
+    bootstrap_n: int = 5000,
+    seed: int = 42,
+) -> List[TauResult]:
+    """Stage 4 on columns: drug-level Tau from per-signature NCS and codes.
+
+    Signature Tau is one searchsorted of |NCS| against the sorted |reference|.
+    For leave_one_out the reference of each drug is "all signatures but its
+    own", so the rank is the global rank minus the count of the drug's own
+    |NCS| at or below the value (one grouped sort) — no per-drug arrays. The
+    cross-cell-line aggregation runs on drug-sorted segments. Arguments and
+    modes as compute_tau; drugs[drug_codes] / cell_lines[cell_codes] give the
+    names.
+    """
+    ncs = np.asarray(ncs, dtype=np.float64)
+    drug_codes = np.asarray(drug_codes, dtype=np.intp)
+    cell_codes = np.asarray(cell_codes, dtype=np.intp)
+    abs_ncs = np.abs(ncs)
+
+    if reference_mode == "external" and reference_ncs is not None:
+        logger.info(f"Tau: using external reference (n={len(reference_ncs)})")
+    elif reference_mode == "auto" and reference_ncs is not None:
+        logger.info(f"Tau: using external reference (n={len(reference_ncs)})")
+    elif reference_mode == "leave_one_out":
+        # Per-drug LOO reference: global rank minus the drug's own contribution
+        ref_sorted = np.sort(abs_ncs)
+        own_size = np.bincount(drug_codes, minlength=len(drugs))[drug_codes]
+        ref_len = len(ncs) - own_size
+        rank = np.searchsorted(ref_sorted, abs_ncs, side="right") - _count_le_within_group(abs_ncs, drug_codes)
+        keep = ref_len >= 5
+        percentile = 100.0 * rank[keep] / ref_len[keep]
+        tau = np.where(ncs[keep] >= 0, percentile, -percentile)
+        results = _aggregate_tau_arrays(tau, ncs[keep], drug_codes[keep], drugs,
+                                        cell_codes[keep], cell_lines, aggregation)
+        logger.info(f"Tau (LOO): {len(results)} drugs")
+        return results
+    else:
+        # Bootstrap reference (auto or bootstrap mode)
+        reference_ncs = _bootstrap_reference(ncs, n_bootstrap=bootstrap_n, seed=seed)
+        logger.info(f"Tau: using bootstrap reference (n={len(reference_ncs)})")
+
+    ref_abs_sorted = np.sort(np.abs(reference_ncs))
+    if len(ref_abs_sorted) == 0:
+        if len(ncs):
+            logger.warning("Empty reference distribution, skipping Tau for all signatures")
+        results = []
+    else:
+        # Percentile rank of |NCS| in |NCS_ref|; Tau = sign * percentile
+        rank = np.searchsorted(ref_abs_sorted, abs_ncs, side="right")
+        percentile = 100.0 * rank / len(ref_abs_sorted)
+        tau = np.where(ncs >= 0, percentile, -percentile)
+        results = _aggregate_tau_arrays(tau, ncs, drug_codes, drugs, cell_codes, cell_lines, aggregation)
+
+    logger.info(
+        f"Tau computation: {len(results)} drugs, "
+        f"reference distribution n={len(reference_ncs)}"
+    )
+    return results
+
+
 def compute_tau(
     ncs_results: List[NCSResult],
     reference_ncs: Optional[np.ndarray] = None,
@@ -377,118 +879,172 @@ def compute_tau(
     Returns:
         List of TauResult, one per drug (aggregated across cell lines).
     """
-    # Build reference distribution based on mode
-    all_ncs = np.array([nr.ncs for nr in ncs_results])
-
-    if reference_mode == "external" and reference_ncs is not None:
-        logger.info(f"Tau: using external reference (n={len(reference_ncs)})")
-    elif reference_mode == "auto" and reference_ncs is not None:
-        logger.info(f"Tau: using external reference (n={len(reference_ncs)})")
-    elif reference_mode == "leave_one_out":
-        # Special path: per-drug LOO reference
-        loo_refs = build_leave_one_out_reference(ncs_results)
-        return _compute_tau_loo(ncs_results, loo_refs, aggregation)
-    else:
-        # Bootstrap reference (auto or bootstrap mode)
-        reference_ncs = build_bootstrap_reference(ncs_results, n_bootstrap=bootstrap_n, seed=seed)
-        logger.info(f"Tau: using bootstrap reference (n={len(reference_ncs)})")
-
-    ref_abs = np.abs(reference_ncs)
-    ref_abs_sorted = np.sort(ref_abs)
-
-    # Compute signature-level Tau
-    sig_taus: Dict[str, List[Tuple[str, float, float]]] = {}  # drug -> [(cell_line, tau, ncs)]
-    for nr in ncs_results:
-        # Percentile rank of |NCS| in |NCS_ref|
-        abs_ncs = abs(nr.ncs)
-        if len(ref_abs_sorted) == 0:
-            logger.warning("Empty reference distribution, skipping Tau for %s", nr.pert_name)
-            continue
-        rank = np.searchsorted(ref_abs_sorted, abs_ncs, side="right")
-        percentile = 100.0 * rank / len(ref_abs_sorted)
-
-        # Tau = sign * percentile
-        tau = percentile if nr.ncs >= 0 else -percentile
-
-        if nr.pert_name not in sig_taus:
-            sig_taus[nr.pert_name] = []
-        sig_taus[nr.pert_name].append((nr.cell_line, tau, nr.ncs))
-
-    # Aggregate across cell lines per drug
-    results = _aggregate_tau_results(sig_taus, aggregation)
-
-    logger.info(
-        f"Tau computation: {len(results)} drugs, "
-        f"reference distribution n={len(reference_ncs)}"
+    drug_codes, drugs = _factorize(np.array([nr.pert_name for nr in ncs_results], dtype=object))
+    cell_codes, cell_lines = _factorize(np.array([nr.cell_line for nr in ncs_results], dtype=object))
+    return compute_tau_arrays(
+        np.array([nr.ncs for nr in ncs_results], dtype=np.float64),
+        drug_codes, drugs, cell_codes, cell_lines,
+        reference_ncs=reference_ncs,
+        aggregation=aggregation,
+        reference_mode=reference_mode,
+        bootstrap_n=bootstrap_n,
+        seed=seed,
     )
-    return results
 
 
-def _compute_tau_loo(
-    ncs_results: List[NCSResult],
-    loo_refs: Dict[str, np.ndarray],
+def _aggregate_tau_arrays(
+    tau: np.ndarray,
+    ncs: np.ndarray,
+    drug_codes: np.ndarray,
+    drugs: np.ndarray,
+    cell_codes: np.ndarray,
+    cell_lines: np.ndarray,
     aggregation: str,
 ) -> List[TauResult]:
-    """Compute Tau with leave-one-out reference (removes self-referencing bias)."""
-    sig_taus: Dict[str, List[Tuple[str, float, float]]] = {}
-
-    for nr in ncs_results:
-        ref = loo_refs.get(nr.pert_name)
-        if ref is None or len(ref) < 5:
-            continue
-        ref_abs_sorted = np.sort(np.abs(ref))
-        if len(ref_abs_sorted) == 0:
-            continue
-        abs_ncs = abs(nr.ncs)
-        rank = np.searchsorted(ref_abs_sorted, abs_ncs, side="right")
-        percentile = 100.0 * rank / len(ref_abs_sorted)
-        tau = percentile if nr.ncs >= 0 else -percentile
+    """Aggregate signature-level Tau to drug-level on drug-sorted segments.
 
-        if nr.pert_name not in sig_taus:
-            sig_taus[nr.pert_name] = []
-        sig_taus[nr.pert_name].append((nr.cell_line, tau, nr.ncs))
+    Drugs are emitted in code (= first appearance) order and then stably
+    sorted by Tau. Segment means/percentiles keep each drug's signatures in
+    their original order, so values equal np.mean / np.percentile per drug.
+    """
+    if len(tau) == 0:
+        return []
+    order = np.argsort(drug_codes, kind="stable")
+    counts_all = np.bincount(drug_codes, minlength=len(drugs))
+    present = np.flatnonzero(counts_all)
+    counts = counts_all[present]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    group = np.repeat(np.arange(len(present)), counts)      # segment id per sorted position
+
+    tau_g, ncs_g, cell_g = tau[order], ncs[order], cell_codes[order]
+    by_value = np.lexsort((tau_g, group))                   # tau sorted within each drug
+    tau_sorted = tau_g[by_value]
+    ncs_sorted = ncs_g[np.lexsort((ncs_g, group))]
+    ncs_has_nan = np.bincount(group, weights=np.isnan(ncs_g), minlength=len(present)) > 0
+
+    if aggregation == "quantile_max":
+        q_hi = _segment_percentile(tau_sorted, starts, counts, 67)
+        q_lo = _segment_percentile(tau_sorted, starts, counts, 33)
+        drug_tau = np.where(np.abs(q_hi) >= np.abs(q_lo), q_hi, q_lo)
+        drug_tau = np.where(counts == 1, tau_g[starts], drug_tau)
+    elif aggregation == "max_abs":
+        abs_tau = np.abs(tau_g)
+        group_max = np.maximum.reduceat(abs_tau, starts)
+        first = np.flatnonzero(abs_tau == group_max[group])
+        first = first[np.r_[True, group[first][1:] != group[first][:-1]]]
+        drug_tau = tau_g[first]
+    else:  # "median" and unknown methods
+        drug_tau = _segment_median(tau_sorted, starts, counts)
+
+    ncs_mean = _segment_mean(ncs_g, starts, counts)
+    ncs_q75 = _segment_percentile(ncs_sorted, starts, counts, 75)
+    ncs_q75[ncs_has_nan] = np.nan
+    ncs_q75 = np.where(counts > 1, ncs_q75, ncs_g[starts])
+
+    pairs = np.unique(group * (len(cell_lines) + 1) + cell_g)
+    n_cell_lines = np.bincount(pairs // (len(cell_lines) + 1), minlength=len(present))
+
+    cell_names = cell_lines[cell_g].tolist()
+    ncs_list = ncs_g.tolist()
+    results = [
+        TauResult(
+            pert_name=drugs[code],
+            tau=t,
+            ncs_mean=m,
+            ncs_q75=q,
+            n_cell_lines=n_cl,
+            cell_line_ncs=dict(zip(cell_names[a:a + n], ncs_list[a:a + n])),
+        )
+        for code, t, m, q, n_cl, a, n in zip(
+            present.tolist(), drug_tau.tolist(), ncs_mean.tolist(), ncs_q75.tolist(),
+            n_cell_lines.tolist(), starts.tolist(), counts.tolist(),
+        )
+    ]
 
-    results = _aggregate_tau_results(sig_taus, aggregation)
-    logger.info(f"Tau (LOO): {len(results)} drugs")
+    # Sort by tau ascending (most negative = strongest reverser)
+    results.sort(key=lambda x: x.tau)
     return results
 
 
-def _aggregate_tau_results(
-    sig_taus: Dict[str, List[Tuple[str, float, float]]],
-    aggregation: str,
-) -> List[TauResult]:
-    """Aggregate signature-level Tau to drug-level."""
-    results = []
-    for drug, cell_data in sig_taus.items():
-        taus = np.array([t for _, t, _ in cell_data])
-        ncs_vals = np.array([n for _, _, n in cell_data])
-        cell_ncs = {cl: n for cl, _, n in cell_data}
-
-        if len(taus) == 0:
-            continue
-
-        if aggregation == "quantile_max":
-            drug_tau = _quantile_max(taus)
-        elif aggregation == "median":
-            drug_tau = float(np.median(taus))
-        elif aggregation == "max_abs":
-            idx = np.argmax(np.abs(taus))
-            drug_tau = float(taus[idx])
-        else:
-            drug_tau = float(np.median(taus))
+def _segment_mean(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """np.mean of every segment, bit-identical to calling it per segment.
 
-        results.append(TauResult(
-            pert_name=drug,
-            tau=drug_tau,
-            ncs_mean=float(np.mean(ncs_vals)),
-            ncs_q75=float(np.percentile(ncs_vals, 75)) if len(ncs_vals) > 1 else float(ncs_vals[0]),
-            n_cell_lines=len(set(cl for cl, _, _ in cell_data)),
-            cell_line_ncs=cell_ncs,
-        ))
+    Segments of equal length are gathered into one 2-D block and reduced
+    along rows, which uses NumPy's pairwise summation exactly like the 1-D
+    call (np.add.reduceat sums sequentially and would differ in the last bits).
+    """
+    out = np.empty(len(counts))
+    for length in np.unique(counts):
+        sel = np.flatnonzero(counts == length)
+        block = values[starts[sel][:, None] + np.arange(length)]
+        out[sel] = np.add.reduce(block, axis=1) / length
+    return out
 
-    # Sort by tau ascending (most negative = strongest reverser)
-    results.sort(key=lambda x: x.tau)
-    return results
+
+def _segment_percentile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """np.percentile(segment, q) (linear method) for every sorted segment.
+
+    Reproduces NumPy's virtual index and lerp arithmetic so the result is
+    bit-identical to calling np.percentile per segment (NaN-free segments).
+    """
+    quantile = np.true_divide(q, 100)
+    virtual = (counts - 1) * quantile
+    previous = np.floor(virtual)
+    gamma = virtual - previous
+    last = starts + counts - 1
+    lo = np.minimum(starts + previous.astype(np.intp), last)
+    hi = np.minimum(lo + 1, last)
+    a, b = sorted_values[lo], sorted_values[hi]
+    diff = b - a
+    out = a + diff * gamma
+    out = np.where(gamma >= 0.5, b - diff * (1 - gamma), out)
+    above = virtual >= counts - 1
+    out[above] = sorted_values[last[above]]
+    return out
+
+
+def _segment_median(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """np.median of every sorted segment (mean of the two middle values for even sizes)."""
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    return np.where(lo == hi, sorted_values[lo], (sorted_values[lo] + sorted_values[hi]) / 2.0)
+
+
+def _count_le_within_group(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """For each element, how many elements of its own group are <= it (NaN sorts last)."""
+    n = len(values)
+    if n == 0:
+        return np.zeros(0, dtype=np.intp)
+    order = np.lexsort((values, codes))
+    v, c = values[order], codes[order]
+    sizes = np.bincount(c)
+    group_start = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    run_last = np.ones(n, dtype=bool)                     # last element of a run of equal values
+    run_last[:-1] = (c[1:] != c[:-1]) | (v[1:] != v[:-1])
+    ends = np.flatnonzero(run_last)
+    count = ends[np.searchsorted(ends, np.arange(n))] - group_start[c] + 1
+    nan = np.isnan(v)
+    count[nan] = sizes[c[nan]]                            # NaN is >= every value of its group
+    out = np.empty(n, dtype=np.intp)
+    out[order] = count
+    return out
+
+
+def _factorize(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer codes (first-appearance order) and the unique values."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return codes.astype(np.intp), np.asarray(uniques, dtype=object)
+
+
+def _last_occurrence(sig_id: np.ndarray) -> np.ndarray:
+    """Index of the last row with the same sig_id, per row (identity when unique)."""
+    codes, uniques = _factorize(sig_id)
+    n = len(codes)
+    if len(uniques) == n:
+        return np.arange(n)
+    last = np.full(len(uniques), -1, dtype=np.intp)
+    np.maximum.at(last, codes, np.arange(n))
+    return last[codes]
 
 
 def _quantile_max(values: np.ndarray) -> float:
@@ -530,37 +1086,62 @@ class CMapPipeline:
         self.reference_ncs = reference_ncs
         self.tau_reference_mode = tau_reference_mode
 
-        # Pipeline state
-        self.enrichments: List[EnrichmentResult] = []
-        self.wtcs_results: List[WTCSResult] = []
-        self.ncs_results: List[NCSResult] = []
+        # Pipeline state (struct-of-arrays; list views below)
+        self.signatures: Optional[SignatureArrays] = None
+        self.wtcs: Optional[np.ndarray] = None
+        self.is_coherent: Optional[np.ndarray] = None
+        self.direction: Optional[np.ndarray] = None
+        self.ncs: Optional[np.ndarray] = None
         self.tau_results: List[TauResult] = []
 
+    @property
+    def enrichments(self) -> List[EnrichmentResult]:
+        return self.signatures.to_enrichments() if self.signatures is not None else []
+
+    @property
+    def wtcs_results(self) -> List[WTCSResult]:
+        if self.wtcs is None:
+            return []
+        return [
+            WTCSResult(sig_id=sid, wtcs=w, is_coherent=c, direction=d)
+            for sid, w, c, d in zip(self.signatures.sig_id.tolist(), self.wtcs.tolist(),
+                                    self.is_coherent.tolist(), self.direction.tolist())
+        ]
+
+    @property
+    def ncs_results(self) -> List[NCSResult]:
+        if self.ncs is None:
+            return []
+        sigs = self.signatures
+        return [
+            NCSResult(sig_id=sid, ncs=x, cell_line=cl, pert_name=pn)
+            for sid, x, cl, pn in zip(sigs.sig_id.tolist(), self.ncs.tolist(),
+                                      sigs.cell_lines[sigs.cell_codes].tolist(),
+                                      sigs.drugs[sigs.drug_codes].tolist())
+        ]
+
     def run(self) -> List[TauResult]:
         """Execute the full 4-stage pipeline."""
         logger.info(f"CMap Pipeline: source={self.es_provider.source_name()}")
 
         # Stage 1: ES
         logger.info("Stage 1/4: Enrichment Scores...")
-        self.enrichments = self.es_provider.get_enrichment_scores()
-        logger.info(f"  -> {len(self.enrichments)} signatures")
+        sigs = self.signatures = self.es_provider.get_enrichment_arrays()
+        logger.info(f"  -> {len(sigs)} signatures")
 
         # Stage 2: WTCS
         logger.info("Stage 2/4: WTCS (sign-coherence gated)...")
-        self.wtcs_results = compute_wtcs(self.enrichments)
-        n_coherent = sum(1 for w in self.wtcs_results if w.is_coherent)
-        logger.info(f"  -> {n_coherent}/{len(self.wtcs_results)} coherent")
+        self.wtcs, self.is_coherent, self.direction = compute_wtcs_arrays(sigs.es_up, sigs.es_down)
+        logger.info(f"  -> {int(self.is_coherent.sum())}/{len(self.wtcs)} coherent")
 
         # Stage 3: NCS
         logger.info(f"Stage 3/4: NCS (method={self.ncs_method})...")
-        self.ncs_results = compute_ncs(
-            self.enrichments, self.wtcs_results, method=self.ncs_method
-        )
+        self.ncs = compute_ncs_arrays(self.wtcs, sigs.cell_codes, method=self.ncs_method)
 
         # Stage 4: Tau (with bootstrap reference by default)
         logger.info(f"Stage 4/4: Tau (aggregation={self.tau_aggregation}, ref={self.tau_reference_mode})...")
-        self.tau_results = compute_tau(
-            self.ncs_results,
+        self.tau_results = compute_tau_arrays(
+            self.ncs, sigs.drug_codes, sigs.drugs, sigs.cell_codes, sigs.cell_lines,
             reference_ncs=self.reference_ncs,
             aggregation=self.tau_aggregation,
             reference_mode=self.tau_reference_mode,
@@ -586,33 +1167,27 @@ class CMapPipeline:
         return pd.DataFrame(rows)
     
     def get_signature_details(self) -> pd.DataFrame:
-        """Get detailed signature-level results from all 4 stages."""
-        if not self.enrichments:
+        """Get detailed signature-level results from all 4 stages (one row per sig_id)."""
+        if self.signatures is None or len(self.signatures) == 0:
             return pd.DataFrame()
-        
-        er_dict = {er.sig_id: er for er in self.enrichments}
-        wtcs_dict = {wr.sig_id: wr for wr in self.wtcs_results}
-        ncs_dict = {nr.sig_id: nr for nr in self.ncs_results}
-        
-        rows = []
-        for sig_id in er_dict:
-            er = er_dict[sig_id]
-            wr = wtcs_dict.get(sig_id)
-            nr = ncs_dict.get(sig_id)
-            rows.append({
-                "sig_id": sig_id,
-                "pert_name": er.pert_name,
-                "cell_line": er.cell_line,
-                "pert_dose": er.pert_dose,
-                "pert_time": er.pert_time,
-                "es_up": er.es_up,
-                "es_down": er.es_down,
-                "wtcs": wr.wtcs if wr else None,
-                "is_coherent": wr.is_coherent if wr else None,
-                "direction": wr.direction if wr else None,
-                "ncs": nr.ncs if nr else None,
-            })
-        return pd.DataFrame(rows)
+
+        sigs = self.signatures
+        codes, _ = _factorize(sigs.sig_id)
+        first = np.unique(codes, return_index=True)[1]     # first row of each sig_id (codes are ordered)
+        rows = _last_occurrence(sigs.sig_id)[first]
+        return pd.DataFrame({
+            "sig_id": sigs.sig_id[first].tolist(),
+            "pert_name": sigs.pert_name[rows].tolist(),
+            "cell_line": sigs.cell_line[rows].tolist(),
+            "pert_dose": sigs.pert_dose[rows].tolist(),
+            "pert_time": sigs.pert_time[rows].tolist(),
+            "es_up": sigs.es_up[rows],
+            "es_down": sigs.es_down[rows],
+            "wtcs": self.wtcs[rows] if self.wtcs is not None else None,
+            "is_coherent": self.is_coherent[rows] if self.is_coherent is not None else None,
+            "direction": self.direction[rows].tolist() if self.direction is not None else None,
+            "ncs": self.ncs[rows] if self.ncs is not None else None,
+        })
 
 
 # ---------------------------------------------------------------------------
@@ -670,7 +1245,11 @@ def build_bootstrap_reference(
     Returns:
         Array of bootstrapped reference NCS values.
     """
-    all_ncs = np.array([nr.ncs for nr in ncs_results])
+    return _bootstrap_reference(np.array([nr.ncs for nr in ncs_results]), n_bootstrap, seed)
+
+
+def _bootstrap_reference(all_ncs: np.ndarray, n_bootstrap: int = 5000, seed: int = 42) -> np.ndarray:
+    """build_bootstrap_reference on an NCS column."""
     if len(all_ncs) < 10:
         logger.warning("Too few NCS values for bootstrap reference, using raw values")
         return all_ncs
@@ -708,17 +1287,8 @@ def build_leave_one_out_reference(
         Dict mapping drug_name -> reference NCS array (excluding that drug).
     """
     all_ncs = np.array([nr.ncs for nr in ncs_results])
-    drug_indices: Dict[str, List[int]] = {}
-    for i, nr in enumerate(ncs_results):
-        if nr.pert_name not in drug_indices:
-            drug_indices[nr.pert_name] = []
-        drug_indices[nr.pert_name].append(i)
-
-    loo_refs = {}
-    for drug, indices in drug_indices.items():
-        mask = np.ones(len(all_ncs), dtype=bool)
-        mask[indices] = False
-        loo_refs[drug] = all_ncs[mask]
+    codes, drugs = _factorize(np.array([nr.pert_name for nr in ncs_results], dtype=object))
+    loo_refs = {drug: all_ncs[codes != k] for k, drug in enumerate(drugs.tolist())}
 
     logger.info(f"Leave-one-out references: {len(loo_refs)} drugs")
     return loo_refs
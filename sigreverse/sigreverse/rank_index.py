@@ -0,0 +1,270 @@
+"""Precomputed gene-rank index for the local CMap engine.
+
+Building (once per Level 5 release):
+    For every signature in a LINCS Level 5 GCTx matrix, the rank of each gene
+    (1-based, decreasing z-score, stable for ties) is stored as uint16 in a
+    memory-mapped .npy file. Signatures are ordered by cell line, so each cell
+    line is a contiguous row group.
+
+Querying (per disease signature):
+    The file is gene-major (n_genes x n_signatures): the ranks of the query
+    genes are |query genes| contiguous reads per row group, and the KS
+    enrichment needs nothing else — O(query_genes x sigs) instead of ranking
+    every gene of every signature again. Several disease signatures are
+    answered in one pass over the union of their genes (query_batch).
+
+Index layout (directory):
+    ranks.npy        uint16 (n_genes, n_signatures), gene-major
+    signatures.csv   sig_id, pert_name, cell_line, pert_dose, pert_time (index order)
+    genes.csv        gene_id [, gene_symbol]
+    _meta.json       source, counts, row groups (cell_line, start, stop), build time
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cmap_algorithms import (
+    ESProvider,
+    EnrichmentResult,
+    GCTxMatrix,
+    SignatureArrays,
+    enrichment_results_from_frame,
+    gene_ranks,
+    ks_enrichment,
+    match_gene_positions,
+)
+from .io import ensure_dir, write_json
+
+logger = logging.getLogger("sigreverse.rank_index")
+
+RANK_DTYPE = np.uint16
+RANKS_FILE = "ranks.npy"
+SIGNATURES_FILE = "signatures.csv"
+GENES_FILE = "genes.csv"
+META_FILE = "_meta.json"
+INDEX_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_rank_index(
+    gctx_path: str,
+    index_dir: str,
+    sig_info_path: Optional[str] = None,
+    gene_info_path: Optional[str] = None,
+    pert_types: Optional[Tuple[str, ...]] = ("trt_cp",),
+    landmark_only: bool = False,
+    chunk_size: int = 4096,
+) -> dict:
+    """Build a rank index from a Level 5 GCTx matrix.
+
+    Args:
+        gctx_path: Level 5 .gctx file.
+        index_dir: Output directory (created; existing index files are replaced).
+        sig_info_path: LINCS siginfo file (metadata, pert_type filter, cell-line groups).
+        gene_info_path: LINCS geneinfo file (gene symbols for queries).
+        pert_types: Keep only these pert_type values (needs sig info; None = all).
+        landmark_only: Index the landmark gene space only.
+        chunk_size: Signatures ranked per block.
+
+    Returns:
+        The index metadata (also written to _meta.json).
+    """
+    t0 = time.time()
+    matrix = GCTxMatrix(gctx_path, sig_info_path=sig_info_path, gene_info_path=gene_info_path,
+                        pert_types=pert_types, landmark_only=landmark_only)
+    if matrix.n_genes > np.iinfo(RANK_DTYPE).max:
+        raise ValueError(f"{matrix.n_genes} genes do not fit {np.dtype(RANK_DTYPE).name} ranks")
+
+    # Row groups: signatures ordered by cell line (file order within a cell line)
+    order = np.argsort(matrix.sig_meta["cell_line"].to_numpy(dtype=str), kind="stable")
+    sigs = matrix.sig_meta.iloc[order].reset_index(drop=True)
+    bounds = np.flatnonzero(sigs["cell_line"].to_numpy()[1:] != sigs["cell_line"].to_numpy()[:-1]) + 1
+    starts = np.concatenate([[0], bounds]).astype(int) if len(sigs) else np.array([], dtype=int)
+    stops = np.concatenate([bounds, [len(sigs)]]).astype(int) if len(sigs) else np.array([], dtype=int)
+    row_groups = [{"cell_line": sigs["cell_line"].iat[a], "start": int(a), "stop": int(b)}
+                  for a, b in zip(starts, stops)]
+
+    ensure_dir(index_dir)
+    tmp_path = os.path.join(index_dir, RANKS_FILE + ".tmp")
+    ranks = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=RANK_DTYPE,
+                                      shape=(matrix.n_genes, len(sigs)))
+    for group in row_groups:
+        members = np.sort(order[group["start"]:group["stop"]])     # ascending file rows
+        for offset, block in matrix.iter_blocks(chunk_size, signatures=members):
+            col = group["start"] + offset
+            ranks[:, col:col + len(block)] = gene_ranks(block).T
+    ranks.flush()
+    del ranks
+    os.replace(tmp_path, os.path.join(index_dir, RANKS_FILE))
+
+    sigs.to_csv(os.path.join(index_dir, SIGNATURES_FILE), index=False)
+    genes = pd.DataFrame({"gene_id": matrix.gene_ids})
+    if matrix.gene_symbols is not None:
+        genes["gene_symbol"] = matrix.gene_symbols
+    genes.to_csv(os.path.join(index_dir, GENES_FILE), index=False)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "source": os.path.abspath(gctx_path),
+        "sig_info": sig_info_path,
+        "gene_info": gene_info_path,
+        "pert_types": list(pert_types) if pert_types is not None else None,
+        "landmark_only": bool(landmark_only),
+        "n_signatures": int(len(sigs)),
+        "n_genes": int(matrix.n_genes),
+        "dtype": np.dtype(RANK_DTYPE).name,
+        "layout": "gene_major",
+        "row_groups": row_groups,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    write_json(os.path.join(index_dir, META_FILE), meta)
+    logger.info(f"Rank index built: {len(sigs)} signatures x {matrix.n_genes} genes, "
+                f"{len(row_groups)} cell-line row groups -> {index_dir} ({time.time() - t0:.1f}s)")
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+class RankIndex:
+    """Read-only view of a rank index directory (ranks are memory-mapped)."""
+
+    def __init__(self, index_dir: str):
+        meta_path = os.path.join(index_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No rank index at {index_dir} (missing {META_FILE}); "
+                                    f"build it with scripts/cmap_rank_index.py build")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported rank index version {self.meta.get('version')}")
+        self.index_dir = index_dir
+        self.ranks = np.load(os.path.join(index_dir, RANKS_FILE), mmap_mode="r")
+        self.signatures = pd.read_csv(os.path.join(index_dir, SIGNATURES_FILE), dtype=str,
+                                      keep_default_na=False)
+        genes = pd.read_csv(os.path.join(index_dir, GENES_FILE), dtype=str, keep_default_na=False)
+        self.gene_ids = genes["gene_id"].tolist()
+        self.gene_symbols = genes["gene_symbol"].tolist() if "gene_symbol" in genes.columns else None
+        self.n_genes = int(self.meta["n_genes"])
+        self.row_groups = self.meta["row_groups"]
+
+    @property
+    def n_signatures(self) -> int:
+        return int(self.meta["n_signatures"])
+
+    def gene_positions(self, genes: List[str], label: str) -> np.ndarray:
+        return match_gene_positions(genes, self.gene_ids, self.gene_symbols, label)
+
+    def _column_ranges(self, cell_lines: Optional[Sequence[str]]) -> List[Tuple[int, int]]:
+        if cell_lines is None:
+            return [(0, self.n_signatures)] if self.n_signatures else []
+        wanted = set(cell_lines)
+        return [(g["start"], g["stop"]) for g in self.row_groups if g["cell_line"] in wanted]
+
+    def iter_ranks(
+        self,
+        genes: np.ndarray,
+        cell_lines: Optional[Sequence[str]] = None,
+        chunk_size: int = 65536,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first signature, (n_chunk, len(genes)) int32 ranks) over the selected row groups."""
+        genes = np.asarray(genes, dtype=np.int64)
+        for start, stop in self._column_ranges(cell_lines):
+            for a in range(start, stop, chunk_size):
+                b = min(a + chunk_size, stop)
+                yield a, np.asarray(self.ranks[genes, a:b], dtype=np.int32).T
+
+    def query_batch(
+        self,
+        queries: Dict[str, Tuple[List[str], List[str]]],
+        cell_lines: Optional[Sequence[str]] = None,
+        chunk_size: int = 65536,
+    ) -> Dict[str, pd.DataFrame]:
+        """ES of every indexed signature for several disease signatures in one pass.
+
+        Args:
+            queries: name -> (up_genes, down_genes).
+            cell_lines: Restrict to these cell-line row groups (None = all).
+            chunk_size: Signatures per gathered block.
+
+        Returns:
+            name -> DataFrame (sig_id, pert_name, cell_line, pert_dose, pert_time,
+            es_up, es_down), LDP3 sign convention as GCTxESProvider.
+        """
+        sets = {}
+        for name, (up, down) in queries.items():
+            sets[name] = (self.gene_positions(up, f"{name} UP"), self.gene_positions(down, f"{name} DOWN"))
+        union = np.unique(np.concatenate([np.concatenate(s) for s in sets.values()])) \
+            if sets else np.array([], dtype=np.int64)
+        # Column of each query gene inside the gathered (union) block
+        cols = {name: (np.searchsorted(union, up), np.searchsorted(union, down))
+                for name, (up, down) in sets.items()}
+
+        ranges = self._column_ranges(cell_lines)
+        n_sel = sum(b - a for a, b in ranges)
+        es = {name: (np.empty(n_sel), np.empty(n_sel)) for name in queries}
+        pos = 0
+        for _, block in self.iter_ranks(union, cell_lines, chunk_size):
+            end = pos + len(block)
+            for name, (up_cols, down_cols) in cols.items():
+                es[name][0][pos:end] = ks_enrichment(block[:, up_cols], self.n_genes)
+                es[name][1][pos:end] = -ks_enrichment(block[:, down_cols], self.n_genes)
+            pos = end
+
+        sel = np.concatenate([np.arange(a, b) for a, b in ranges]) if ranges else np.array([], dtype=int)
+        base = self.signatures.iloc[sel].reset_index(drop=True)
+        out = {}
+        for name, (up_es, down_es) in es.items():
+            df = base.copy()
+            df["es_up"] = up_es
+            df["es_down"] = down_es
+            out[name] = df
+        return out
+
+    def query(
+        self,
+        up_genes: List[str],
+        down_genes: List[str],
+        cell_lines: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """ES of every indexed signature for one disease signature."""
+        return self.query_batch({"query": (up_genes, down_genes)}, cell_lines=cell_lines)["query"]
+
+
+class RankIndexESProvider(ESProvider):
+    """ESProvider backed by a prebuilt RankIndex (same scores as GCTxESProvider)."""
+
+    def __init__(
+        self,
+        index: RankIndex,
+        up_genes: List[str],
+        down_genes: List[str],
+        cell_lines: Optional[Sequence[str]] = None,
+    ):
+        self.index = index
+        self.up_genes = up_genes
+        self.down_genes = down_genes
+        self.cell_lines = cell_lines
+
+    def get_enrichment_scores(self) -> List[EnrichmentResult]:
+        return enrichment_results_from_frame(
+            self.index.query(self.up_genes, self.down_genes, cell_lines=self.cell_lines))
+
+    def get_enrichment_arrays(self) -> SignatureArrays:
+        return SignatureArrays.from_frame(
+            self.index.query(self.up_genes, self.down_genes, cell_lines=self.cell_lines))
+
+    def source_name(self) -> str:
+        return "Level5_rank_index"
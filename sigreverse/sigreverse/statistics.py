@@ -7,6 +7,14 @@ Provides:
     4. Bootstrap confidence intervals for drug-level scores
     5. Effect size normalization (z-normalized scores)
 
+v0.4.2 performance:
+    - Permutation null "vectorized" engine (default): signatures are sorted by
+      drug once; each chunk of permutations is reduced for ALL drugs at once
+      (segment medians via one rank sort, reverser counts via np.add.reduceat).
+      Permutations are generated in memory-bounded chunks, optionally reduced in
+      a process pool. Same RNG stream as the per-drug "loop" engine, so null
+      scores and p-values are identical for a fixed seed.
+
 v0.4.1 fixes:
     - BUG FIX: permutation null now applies the SAME aggregation formula as the
       observed score (median * p_reverser * n_factor * cl_bonus), not just median.
@@ -24,8 +32,10 @@ from __future__ import annotations
 
 import logging
 import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -97,6 +107,161 @@ def _aggregate_one_drug_group(
     return median_score * p_rev * n_factor * cl_bonus
 
 
+PERMUTATION_ENGINES = ("vectorized", "loop")
+
+# Working-memory budget per permutation chunk (indices + gathered ranks + sort keys)
+_PERM_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class _NullLayout:
+    """Permutation-invariant per-drug structure, shared with pool workers.
+
+    Signature positions are ordered by drug (``order``) so that every drug is a
+    contiguous segment ``[starts[d], starts[d] + counts[d])`` of a permuted row.
+    """
+    order: np.ndarray           # (m,) signature positions grouped by drug
+    seg_key: np.ndarray         # (m,) segment id * n_sigs (int64 sort-key offset)
+    starts: np.ndarray          # (k,) segment start offsets (cumsum of counts)
+    counts: np.ndarray          # (k,) signatures per drug
+    score_rank: np.ndarray      # (n,) rank of each score in sorted_scores
+    sorted_scores: np.ndarray   # (n,) scores ascending (float64)
+    is_rev: np.ndarray          # (n,) int32 reverser flag
+    n_factor: np.ndarray        # (k,) per-drug n_factor
+    cl_bonus: np.ndarray        # (k,) per-drug cell-line bonus
+    is_nan: Optional[np.ndarray]  # (n,) int32 NaN-score flag, None if no NaN scores
+    use_full: bool
+
+
+def _build_null_layout(
+    scores: np.ndarray,
+    is_rev: np.ndarray,
+    codes: np.ndarray,
+    n_drugs: int,
+    n_cell_lines: np.ndarray,
+    use_full: bool,
+    n_cap: int,
+    cl_diversity_bonus: float,
+    n_factor_mode: str,
+) -> _NullLayout:
+    n = len(scores)
+    valid = np.flatnonzero(codes >= 0)
+    order = valid[np.argsort(codes[valid], kind="stable")]
+    counts = np.bincount(codes[valid], minlength=n_drugs).astype(np.int64)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+    by_score = np.argsort(scores, kind="stable")
+    score_rank = np.empty(n, dtype=np.int64)
+    score_rank[by_score] = np.arange(n)
+
+    # Scalar formula terms computed exactly as _aggregate_one_drug_group does
+    n_factor = np.empty(n_drugs)
+    for d, c in enumerate(counts.tolist()):
+        n_eff = min(c, n_cap)
+        if n_factor_mode == "sqrt":
+            n_factor[d] = math.sqrt(n_eff / n_cap)
+        else:
+            n_factor[d] = math.log(1 + n_eff) / math.log(1 + n_cap)
+    cl_bonus = np.array([1.0 + cl_diversity_bonus * max(0, int(c) - 1) for c in n_cell_lines])
+    nan_mask = np.isnan(scores.astype(np.float64))
+
+    return _NullLayout(
+        order=order,
+        seg_key=np.repeat(np.arange(n_drugs, dtype=np.int64) * n, counts),
+        starts=starts,
+        counts=counts,
+        score_rank=score_rank,
+        sorted_scores=scores[by_score].astype(np.float64),
+        is_rev=is_rev.astype(np.int32),
+        n_factor=n_factor,
+        cl_bonus=cl_bonus,
+        is_nan=nan_mask.astype(np.int32) if nan_mask.any() else None,
+        use_full=use_full,
+    )
+
+
+def _null_scores_chunk(layout: _NullLayout, perm_chunk: np.ndarray) -> np.ndarray:
+    """Drug-level null scores for a chunk of permutations → (n_chunk, n_drugs).
+
+    Row r applies ``perm_chunk[r]`` to (score, is_reverser) jointly, exactly as
+    the loop engine. Segment medians: sorting ``segment * n + rank`` orders every
+    segment in place (ranks are unique), so the middle element(s) sit at fixed
+    offsets ``starts + (counts - 1) // 2`` and ``starts + counts // 2``.
+    A segment holding a NaN score has a NaN median, as np.median in the loop.
+    """
+    if len(layout.counts) == 0:
+        return np.zeros((len(perm_chunk), 0))
+    idx = perm_chunk[:, layout.order]
+    keys = layout.score_rank[idx]
+    keys += layout.seg_key
+    keys.sort(axis=1)
+    keys -= layout.seg_key
+    lo = layout.sorted_scores[keys[:, layout.starts + (layout.counts - 1) // 2]]
+    hi = layout.sorted_scores[keys[:, layout.starts + layout.counts // 2]]
+    median = (lo + hi) / 2          # == np.median for odd and even group sizes
+    if layout.is_nan is not None:
+        has_nan = np.add.reduceat(layout.is_nan[idx], layout.starts, axis=1) > 0
+        median = np.where(has_nan, np.nan, median)
+    if not layout.use_full:
+        return median
+
+    n_rev = np.add.reduceat(layout.is_rev[idx], layout.starts, axis=1)
+    null = median * (n_rev / layout.counts) * layout.n_factor * layout.cl_bonus
+    return np.where(n_rev > 0, null, 0.0)
+
+
+_WORKER_LAYOUT: Optional[_NullLayout] = None
+
+
+def _init_null_worker(layout: _NullLayout) -> None:
+    global _WORKER_LAYOUT
+    _WORKER_LAYOUT = layout
+
+
+def _null_scores_chunk_worker(perm_chunk: np.ndarray) -> np.ndarray:
+    return _null_scores_chunk(_WORKER_LAYOUT, perm_chunk)
+
+
+def _iter_permutation_chunks(
+    rng: np.random.Generator, n: int, n_permutations: int, chunk_size: int,
+) -> Iterator[np.ndarray]:
+    """Yield (chunk, n) permutation matrices, same RNG stream as one-by-one generation."""
+    for start in range(0, n_permutations, chunk_size):
+        size = min(chunk_size, n_permutations - start)
+        yield np.stack([rng.permutation(n) for _ in range(size)])
+
+
+def _vectorized_null(
+    layout: _NullLayout,
+    rng: np.random.Generator,
+    n: int,
+    n_permutations: int,
+    chunk_size: Optional[int],
+    n_jobs: int,
+) -> np.ndarray:
+    if chunk_size is None:
+        chunk_size = _PERM_CHUNK_BYTES // max(1, 8 * (n + 3 * len(layout.order)))
+    chunk_size = max(1, int(chunk_size))
+    chunks = _iter_permutation_chunks(rng, n, n_permutations, chunk_size)
+
+    if n_jobs <= 1:
+        parts = [_null_scores_chunk(layout, c) for c in chunks]
+    else:
+        # Bounded in-flight window: at most 2 chunks per worker are materialized
+        parts, pending = [], deque()
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_null_worker,
+                                 initargs=(layout,)) as pool:
+            for c in chunks:
+                pending.append(pool.submit(_null_scores_chunk_worker, c))
+                if len(pending) >= 2 * n_jobs:
+                    parts.append(pending.popleft().result())
+            parts.extend(f.result() for f in pending)
+
+    if not parts:
+        return np.zeros((0, len(layout.counts)))
+    return np.concatenate(parts, axis=0)
+
+
 def permutation_null_distribution(
     df_detail: pd.DataFrame,
     score_col: str = "sig_score",
@@ -107,6 +272,9 @@ def permutation_null_distribution(
     n_cap: int = 8,
     cl_diversity_bonus: float = 0.1,
     n_factor_mode: str = "log",
+    engine: str = "vectorized",
+    chunk_size: Optional[int] = None,
+    n_jobs: int = 1,
 ) -> Dict[str, np.ndarray]:
     """Generate null distribution of drug-level scores by permuting signature scores.
 
@@ -127,10 +295,18 @@ def permutation_null_distribution(
         n_cap: Sample-size saturation cap (must match robustness config).
         cl_diversity_bonus: Cell-line diversity bonus (must match robustness config).
         n_factor_mode: 'log' or 'sqrt' (must match robustness config).
+        engine: 'vectorized' (default; all drugs per permutation chunk in NumPy)
+            or 'loop' (reference per-drug Python loop). Identical results.
+        chunk_size: Permutations per chunk (vectorized engine). Default: sized
+            to a ~64 MB working set.
+        n_jobs: Worker processes for the vectorized engine (1 = in-process).
 
     Returns:
         Dict mapping drug name -> array of n_permutations null scores.
     """
+    if engine not in PERMUTATION_ENGINES:
+        raise ValueError(f"Unknown permutation engine {engine!r}; expected one of {PERMUTATION_ENGINES}")
+
     rng = np.random.default_rng(seed)
 
     scores = df_detail[score_col].values.copy()
@@ -143,6 +319,51 @@ def permutation_null_distribution(
     else:
         is_rev = (scores < 0).copy()
 
+    use_full = (aggregation == "full_formula")
+
+    logger.info(
+        f"Running permutation test: {n_permutations} permutations, "
+        f"{len(unique_drugs)} drugs, {len(scores)} signatures, "
+        f"mode={'full_formula' if use_full else 'legacy_median'}, engine={engine}"
+    )
+
+    if engine == "loop":
+        return _loop_null(df_detail, rng, scores, drugs, unique_drugs, is_rev, n_permutations,
+                          use_full, n_cap, cl_diversity_bonus, n_factor_mode)
+
+    codes, uniques = pd.factorize(drugs)
+    # Cell-line count (fixed per drug, not shuffled)
+    n_cl = np.ones(len(uniques), dtype=np.int64)
+    if "meta.cell_line" in df_detail.columns and len(uniques):
+        per_drug = (pd.Series(df_detail["meta.cell_line"].values)[codes >= 0]
+                    .groupby(codes[codes >= 0]).nunique())
+        n_cl = np.maximum(1, per_drug.reindex(range(len(uniques)), fill_value=0).to_numpy())
+
+    layout = _build_null_layout(scores, is_rev, codes, len(uniques), n_cl, use_full,
+                                n_cap, cl_diversity_bonus, n_factor_mode)
+    null = _vectorized_null(layout, rng, len(scores), n_permutations, chunk_size, n_jobs)
+
+    out = {d: np.ascontiguousarray(null[:, i]) for i, d in enumerate(uniques)}
+    for d in unique_drugs:
+        if d not in out:    # missing drug name: empty group in the loop engine
+            out[d] = np.full(n_permutations, 0.0 if use_full else np.nan)
+    return {d: out[d] for d in unique_drugs}
+
+
+def _loop_null(
+    df_detail: pd.DataFrame,
+    rng: np.random.Generator,
+    scores: np.ndarray,
+    drugs: np.ndarray,
+    unique_drugs: np.ndarray,
+    is_rev: np.ndarray,
+    n_permutations: int,
+    use_full: bool,
+    n_cap: int,
+    cl_diversity_bonus: float,
+    n_factor_mode: str,
+) -> Dict[str, np.ndarray]:
+    """Reference engine: per-permutation, per-drug _aggregate_one_drug_group calls."""
     # Pre-compute per-drug metadata that stays fixed during permutation
     drug_meta: Dict[str, dict] = {}
     drug_indices: Dict[str, np.ndarray] = {}
@@ -159,15 +380,8 @@ def permutation_null_distribution(
 
     null_distributions: Dict[str, List[float]] = {d: [] for d in unique_drugs}
 
-    use_full = (aggregation == "full_formula")
     agg_fn = np.median if not use_full else None
 
-    logger.info(
-        f"Running permutation test: {n_permutations} permutations, "
-        f"{len(unique_drugs)} drugs, {len(scores)} signatures, "
-        f"mode={'full_formula' if use_full else 'legacy_median'}"
-    )
-
     # Vectorized: pre-generate all permutation indices
     perm_indices = np.array([rng.permutation(len(scores)) for _ in range(n_permutations)])
 
@@ -353,6 +567,8 @@ def compute_drug_significance(
     n_cap: int = 8,
     cl_diversity_bonus: float = 0.1,
     n_factor_mode: str = "log",
+    engine: str = "vectorized",
+    n_jobs: int = 1,
 ) -> pd.DataFrame:
     """Full significance pipeline: permutation + FDR + bootstrap + effect size.
 
@@ -372,6 +588,9 @@ def compute_drug_significance(
         n_cap: Sample-size saturation cap (must match robustness config).
         cl_diversity_bonus: Cell-line diversity bonus (must match robustness config).
         n_factor_mode: 'log' or 'sqrt' (must match robustness config).
+        engine: Permutation engine ('vectorized' or 'loop'), see
+            permutation_null_distribution.
+        n_jobs: Worker processes for the vectorized permutation engine.
 
     Returns:
         DataFrame with drug-level significance results, aligned with df_drug.
@@ -384,6 +603,8 @@ def compute_drug_significance(
         n_cap=n_cap,
         cl_diversity_bonus=cl_diversity_bonus,
         n_factor_mode=n_factor_mode,
+        engine=engine,
+        n_jobs=n_jobs,
     )
 
     # Step 2: Empirical p-values for each drug
@@ -7,7 +7,13 @@ Tests cover:
     - Stage 4: Tau computation and aggregation
     - Bootstrap and leave-one-out reference modes
     - Full CMapPipeline end-to-end
+    - ks_enrichment vs. per-signature reference; GCTxESProvider on a synthetic .gctx
+      (memory-mapped and chunked/compressed layouts, gene/sig info, landmark space)
+    - Struct-of-arrays stages: segment percentile/median == NumPy, masked LOO Tau ==
+      explicit LOO references, pipeline == list-based stage functions
 """
+from fractions import Fraction
+
 import pytest
 import numpy as np
 import pandas as pd
@@ -17,6 +23,9 @@ from sigreverse.cmap_algorithms import (
     compute_wtcs, compute_ncs, compute_tau,
     CMapPipeline, _quantile_max,
     build_bootstrap_reference, build_leave_one_out_reference,
+    GCTxESProvider, ks_enrichment,
+    SignatureArrays, compute_tau_arrays,
+    _segment_mean, _segment_percentile, _segment_median, _count_le_within_group,
 )
 
 
@@ -274,6 +283,119 @@ class TestCMapPipeline:
         assert len(results) > 0
 
 
+# ===== Local Level 5 GCTx provider =====
+
+def _ks_reference(z, genes):
+    """Per-signature KS (Lamb 2006), straightforward loop."""
+    order = list(np.argsort(-z, kind="stable"))
+    pos = sorted(order.index(g) + 1 for g in genes)
+    n, s = len(z), len(genes)
+    a = max(Fraction(j, s) - Fraction(p, n) for j, p in enumerate(pos, 1))
+    b = max(Fraction(p, n) - Fraction(j - 1, s) for j, p in enumerate(pos, 1))
+    return float(a if a > b else -b)
+
+
+N_GENES, N_SIGS = 60, 50
+UP, DOWN = [3, 7, 11, 19, 23], [30, 31, 40, 45, 52, 58]
+
+
+def _write_gctx(path, z, layout="contiguous"):
+    h5py = pytest.importorskip("h5py")
+    with h5py.File(path, "w") as f:
+        kw = {"chunks": (8, N_GENES), "compression": "gzip"} if layout == "chunked" else {}
+        f.create_dataset("0/DATA/0/matrix", data=z, **kw)
+        f.create_dataset("0/META/ROW/id", data=np.array([f"{1000 + g}" for g in range(N_GENES)], dtype="S"))
+        f.create_dataset("0/META/COL/id", data=np.array([f"SIG{i:03d}" for i in range(N_SIGS)], dtype="S"))
+
+
+@pytest.fixture
+def gctx_files(tmp_path):
+    rng = np.random.default_rng(3)
+    z = rng.normal(size=(N_SIGS, N_GENES)).astype(np.float32)
+    # SIG000-SIG003: drugX pushes disease-UP genes down and disease-DOWN genes up (reverser)
+    z[:4, UP] -= 6.0
+    z[:4, DOWN] += 6.0
+    z[10:14] = np.round(z[10:14])                    # tied z-scores: ranks follow gene order
+    _write_gctx(tmp_path / "l5.gctx", z)
+    _write_gctx(tmp_path / "l5_chunked.gctx", z, layout="chunked")
+    pd.DataFrame({
+        "gene_id": [f"{1000 + g}" for g in range(N_GENES)],
+        "gene_symbol": [f"G{g}" for g in range(N_GENES)],
+        "feature_space": ["landmark" if g % 2 else "inferred" for g in range(N_GENES)],
+    }).to_csv(tmp_path / "geneinfo.txt", sep="\t", index=False)
+    pd.DataFrame({
+        "sig_id": [f"SIG{i:03d}" for i in range(N_SIGS)],
+        "cmap_name": ["drugX"] * 4 + [f"drug{i % 9}" for i in range(4, N_SIGS)],
+        "cell_iname": ["MCF7", "PC3", "A549", "HA1E"] + ["VCAP"] * (N_SIGS - 4),
+        "pert_idose": "10 uM", "pert_itime": "24 h",
+        "pert_type": ["trt_cp"] * (N_SIGS - 5) + ["trt_sh"] * 5,
+    }).to_csv(tmp_path / "siginfo.txt", sep="\t", index=False)
+    return tmp_path, z
+
+
+class TestKSEnrichment:
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+        z = rng.normal(size=(30, 40))
+        genes = [1, 5, 6, 20, 33]
+        ranks = np.argsort(np.argsort(-z, axis=1, kind="stable"), axis=1) + 1
+        es = ks_enrichment(ranks[:, genes], 40)
+        np.testing.assert_allclose(es, [_ks_reference(row, genes) for row in z])
+
+    def test_extremes(self):
+        assert ks_enrichment(np.array([[1, 2, 3]]), 100)[0] == pytest.approx(0.97)
+        assert ks_enrichment(np.array([[98, 99, 100]]), 100)[0] == pytest.approx(-0.98)
+
+
+class TestGCTxESProvider:
+    @pytest.mark.parametrize("name", ["l5.gctx", "l5_chunked.gctx"])
+    def test_es_matches_reference(self, gctx_files, name):
+        tmp, z = gctx_files
+        prov = GCTxESProvider(str(tmp / name), [str(1000 + g) for g in UP],
+                              [str(1000 + g) for g in DOWN], chunk_size=7)
+        df = prov.compute_es()
+        assert list(df["sig_id"]) == [f"SIG{i:03d}" for i in range(N_SIGS)]
+        np.testing.assert_allclose(df["es_up"], [_ks_reference(r, UP) for r in z])
+        np.testing.assert_allclose(df["es_down"], [-_ks_reference(r, DOWN) for r in z])
+        # Reverser in LDP3 convention: both negative
+        assert (df["es_up"][:4] < -0.8).all() and (df["es_down"][:4] < -0.8).all()
+
+    def test_gene_and_sig_info(self, gctx_files):
+        tmp, z = gctx_files
+        prov = GCTxESProvider(str(tmp / "l5.gctx"), [f"g{g}" for g in UP] + ["NOTAGENE"],
+                              [f"G{g}" for g in DOWN],
+                              sig_info_path=str(tmp / "siginfo.txt"),
+                              gene_info_path=str(tmp / "geneinfo.txt"))
+        ers = prov.get_enrichment_scores()
+        assert len(ers) == N_SIGS - 5                   # trt_sh filtered
+        assert ers[0].pert_name == "drugX" and ers[1].cell_line == "PC3"
+        assert ers[0].pert_time == "24 h" and prov.source_name() == "Level5_GCTx_local"
+
+    def test_landmark_space(self, gctx_files):
+        tmp, z = gctx_files
+        lm = np.arange(1, N_GENES, 2)
+        prov = GCTxESProvider(str(tmp / "l5.gctx"), [f"G{g}" for g in UP], [f"G{g}" for g in DOWN],
+                              gene_info_path=str(tmp / "geneinfo.txt"), landmark_only=True)
+        df = prov.compute_es()
+        up_lm = [int(np.flatnonzero(lm == g)[0]) for g in UP if g % 2]
+        np.testing.assert_allclose(df["es_up"], [_ks_reference(r[lm], up_lm) for r in z])
+
+    def test_no_genes_found(self, gctx_files):
+        tmp, _ = gctx_files
+        with pytest.raises(ValueError):
+            GCTxESProvider(str(tmp / "l5.gctx"), ["nope"], ["1030"])
+
+    def test_feeds_pipeline(self, gctx_files):
+        tmp, _ = gctx_files
+        prov = GCTxESProvider(str(tmp / "l5.gctx"), [f"G{g}" for g in UP], [f"G{g}" for g in DOWN],
+                              sig_info_path=str(tmp / "siginfo.txt"),
+                              gene_info_path=str(tmp / "geneinfo.txt"))
+        pipeline = CMapPipeline(prov, ncs_method="global_null", tau_reference_mode="bootstrap")
+        results = pipeline.run()
+        assert results[0].pert_name == "drugX" and results[0].tau < -90
+        assert results[0].n_cell_lines == 4
+
+
 # ===== Quantile max helper =====
 
 class TestQuantileMax:
@@ -287,3 +409,82 @@ class TestQuantileMax:
 
     def test_empty(self):
         assert _quantile_max(np.array([])) == 0.0
+
+
+# ===== Struct-of-arrays stages =====
+
+def _segments(seed, n_groups=40):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 30, n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    values = np.round(rng.normal(0, 50, counts.sum()), 1)
+    groups = np.repeat(np.arange(n_groups), counts)
+    return np.sort(values + 1000 * groups) - 1000 * groups, starts, counts
+
+
+class TestSegmentHelpers:
+    @pytest.mark.parametrize("q", [33, 67, 75])
+    def test_percentile_matches_numpy(self, q):
+        values, starts, counts = _segments(q)
+        got = _segment_percentile(values, starts, counts, q)
+        expected = [np.percentile(values[a:a + n], q) for a, n in zip(starts, counts)]
+        np.testing.assert_array_equal(got, expected)
+
+    def test_mean_matches_numpy(self):
+        values, starts, counts = _segments(2)
+        values = values * 1.37 + 0.01                      # non-representable sums
+        expected = [np.mean(values[a:a + n]) for a, n in zip(starts, counts)]
+        np.testing.assert_array_equal(_segment_mean(values, starts, counts), expected)
+
+    def test_median_matches_numpy(self):
+        values, starts, counts = _segments(1)
+        expected = [np.median(values[a:a + n]) for a, n in zip(starts, counts)]
+        np.testing.assert_array_equal(_segment_median(values, starts, counts), expected)
+
+    def test_count_le_within_group(self):
+        values = np.array([1.0, 2.0, 2.0, np.nan, 0.5, 3.0, 2.0])
+        codes = np.array([0, 0, 0, 0, 1, 1, 0])
+        np.testing.assert_array_equal(_count_le_within_group(values, codes), [1, 4, 4, 5, 1, 2, 4])
+
+
+class TestArrayStages:
+    def test_loo_masked_search_matches_explicit_references(self):
+        ncs = _make_ncs_list() * 2
+        arrays = SignatureArrays(
+            sig_id=[f"x{i}" for i in range(len(ncs))], es_up=np.zeros(len(ncs)), es_down=np.zeros(len(ncs)),
+            cell_line=[nr.cell_line for nr in ncs], pert_name=[nr.pert_name for nr in ncs],
+            pert_dose=[""] * len(ncs), pert_time=[""] * len(ncs),
+        )
+        values = np.array([nr.ncs for nr in ncs])
+        results = compute_tau_arrays(values, arrays.drug_codes, arrays.drugs, arrays.cell_codes,
+                                     arrays.cell_lines, reference_mode="leave_one_out", aggregation="median")
+        loo = build_leave_one_out_reference(ncs)
+        for tr in results:
+            ref = np.sort(np.abs(loo[tr.pert_name]))
+            own = values[[nr.pert_name == tr.pert_name for nr in ncs]]
+            taus = [np.sign(x or 1) * 100.0 * np.searchsorted(ref, abs(x), side="right") / len(ref) for x in own]
+            assert tr.tau == np.median(taus)
+
+    @pytest.mark.parametrize("ncs_method", ["cell_line_null", "global_null", "none"])
+    @pytest.mark.parametrize("aggregation", ["quantile_max", "median", "max_abs"])
+    def test_pipeline_matches_list_stages(self, ncs_method, aggregation):
+        df = _make_df_detail()
+        provider = LDP3ESProvider(df)
+        pipeline = CMapPipeline(provider, ncs_method=ncs_method, tau_aggregation=aggregation,
+                                tau_reference_mode="bootstrap")
+        pipeline.run()
+        enrichments = provider.get_enrichment_scores()
+        wtcs = compute_wtcs(enrichments)
+        ncs = compute_ncs(enrichments, wtcs, method=ncs_method)
+        expected = compute_tau(ncs, aggregation=aggregation, reference_mode="bootstrap")
+        assert pipeline.tau_results == expected
+        assert pipeline.ncs_results == ncs and pipeline.wtcs_results == wtcs
+
+    def test_duplicate_sig_ids_use_last_metadata(self):
+        df = _make_df_detail()
+        df.loc[9, "uuid"] = "sig_0"
+        pipeline = CMapPipeline(LDP3ESProvider(df), ncs_method="none")
+        pipeline.run()
+        details = pipeline.get_signature_details()
+        assert len(details) == 9
+        assert details.loc[details.sig_id == "sig_0", "pert_name"].item() == "drugC"
@@ -0,0 +1,190 @@
+"""Unit tests for sigreverse.rank_index module.
+
+Tests cover:
+    - gene_ranks == stable argsort ranks (ties, NaN, signed zero; float32 and float64 input)
+    - build_rank_index: uint16 gene-major ranks, cell-line row groups, metadata
+    - GCTxESProvider._set_positions == gene_ranks (NaN, ties, signed zero)
+    - RankIndex.query == GCTxESProvider.compute_es (ties, NaN, chunking, landmark space)
+    - query_batch == individual queries; cell-line restriction
+    - RankIndexESProvider feeding the CMap pipeline
+"""
+import json
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from sigreverse.cmap_algorithms import CMapPipeline, GCTxESProvider, gene_ranks
+from sigreverse.rank_index import RankIndex, RankIndexESProvider, build_rank_index
+
+N_GENES, N_SIGS = 60, 40
+UP, DOWN = [3, 7, 11, 19, 23], [30, 31, 40, 45, 52, 58]
+CELL_LINES = ["MCF7", "PC3", "A549", "HA1E"]
+
+
+def _level5_z():
+    rng = np.random.default_rng(11)
+    z = rng.normal(size=(N_SIGS, N_GENES)).astype(np.float32)
+    z[:4, UP] -= 6.0                                 # drugX reverses the disease signature
+    z[:4, DOWN] += 6.0
+    z[20:24] = np.round(z[20:24])                    # tied z-scores
+    return z
+
+
+@pytest.fixture
+def level5(tmp_path):
+    return _write_level5(tmp_path, _level5_z())
+
+
+@pytest.fixture
+def level5_nan(tmp_path):
+    z = _level5_z()
+    z[5, [UP[0], 2, 50]] = np.nan                    # NaN query gene and NaN background genes
+    z[9, [DOWN[1], DOWN[2]]] = np.nan
+    z[21, 0] = np.nan                                # NaN among tied values
+    return _write_level5(tmp_path, z)
+
+
+def _write_level5(tmp_path, z):
+    h5py = pytest.importorskip("h5py")
+    with h5py.File(tmp_path / "l5.gctx", "w") as f:
+        f.create_dataset("0/DATA/0/matrix", data=z)
+        f.create_dataset("0/META/ROW/id", data=np.array([f"{1000 + g}" for g in range(N_GENES)], dtype="S"))
+        f.create_dataset("0/META/COL/id", data=np.array([f"SIG{i:03d}" for i in range(N_SIGS)], dtype="S"))
+    pd.DataFrame({
+        "gene_id": [f"{1000 + g}" for g in range(N_GENES)],
+        "gene_symbol": [f"G{g}" for g in range(N_GENES)],
+        "feature_space": ["landmark" if g % 2 else "inferred" for g in range(N_GENES)],
+    }).to_csv(tmp_path / "geneinfo.txt", sep="\t", index=False)
+    pd.DataFrame({
+        "sig_id": [f"SIG{i:03d}" for i in range(N_SIGS)],
+        "cmap_name": ["drugX"] * 4 + [f"drug{i % 7}" for i in range(4, N_SIGS)],
+        "cell_iname": [CELL_LINES[i % 4] for i in range(N_SIGS)],   # interleaved in the file
+        "pert_idose": "10 uM", "pert_itime": "24 h",
+        "pert_type": ["trt_cp"] * (N_SIGS - 3) + ["trt_sh"] * 3,
+    }).to_csv(tmp_path / "siginfo.txt", sep="\t", index=False)
+    return tmp_path
+
+
+def _paths(tmp):
+    return dict(sig_info_path=str(tmp / "siginfo.txt"), gene_info_path=str(tmp / "geneinfo.txt"))
+
+
+def _by_sig(df):
+    return df.sort_values("sig_id").reset_index(drop=True)
+
+
+class TestGeneRanks:
+    def test_matches_stable_argsort(self):
+        rng = np.random.default_rng(5)
+        block = np.round(rng.normal(size=(50, 80)), 1).astype(np.float32)
+        block[3, [5, 9, 70]] = np.nan
+        block[4, 7], block[4, 8] = -0.0, 0.0
+        expected = np.argsort(np.argsort(-block, axis=1, kind="stable"), axis=1, kind="stable") + 1
+        np.testing.assert_array_equal(gene_ranks(block), expected)
+
+    @pytest.mark.parametrize("dtype", [np.float32, np.float64])
+    def test_set_positions_match_gene_ranks(self, dtype):
+        rng = np.random.default_rng(8)
+        block = np.round(rng.normal(size=(40, 70)), 1).astype(dtype)
+        block[0, [4, 9]] = np.nan                      # NaN query gene and NaN background gene
+        block[1, :] = np.nan
+        block[2, 7], block[2, 8] = -0.0, 0.0
+        genes = np.array([4, 7, 8, 12, 33, 69, 0])
+        got = GCTxESProvider._set_positions(None, block, genes)
+        np.testing.assert_array_equal(got, gene_ranks(block)[:, genes])
+
+    def test_set_positions_nan_last(self):
+        block = np.array([[0.5, np.nan, 2.0, 1.0, -1.0, np.nan, 0.1, 3.0, -2.0, 0.0]], dtype=np.float32)
+        got = GCTxESProvider._set_positions(None, block, np.array([1, 2, 5, 9]))
+        assert got.tolist() == [[9, 2, 10, 6]]
+
+    def test_float64_no_spurious_ties(self):
+        rng = np.random.default_rng(6)
+        block = np.round(rng.normal(size=(30, 50)), 1)
+        block[:, 10] = block[:, 11] + 1e-12            # equal once cast to float32
+        block[2, [4, 8]] = np.nan
+        block[3, 5], block[3, 6] = -0.0, 0.0
+        expected = np.argsort(np.argsort(-block, axis=1, kind="stable"), axis=1, kind="stable") + 1
+        np.testing.assert_array_equal(gene_ranks(block), expected)
+        assert (gene_ranks(block)[:, 10] < gene_ranks(block)[:, 11]).all()
+
+
+class TestBuildRankIndex:
+    def test_layout_and_row_groups(self, level5):
+        meta = build_rank_index(str(level5 / "l5.gctx"), str(level5 / "idx"), chunk_size=3, **_paths(level5))
+        index = RankIndex(str(level5 / "idx"))
+        assert index.ranks.dtype == np.uint16
+        assert index.ranks.shape == (N_GENES, N_SIGS - 3)
+        assert meta["n_signatures"] == N_SIGS - 3 and meta["layout"] == "gene_major"
+        # Row groups are contiguous, sorted by cell line and cover every signature
+        groups = meta["row_groups"]
+        assert [g["cell_line"] for g in groups] == sorted(CELL_LINES)
+        assert groups[0]["start"] == 0 and groups[-1]["stop"] == N_SIGS - 3
+        for g in groups:
+            assert (index.signatures["cell_line"].iloc[g["start"]:g["stop"]] == g["cell_line"]).all()
+        # Each column is a permutation of 1..n_genes
+        assert (np.sort(np.asarray(index.ranks), axis=0) == np.arange(1, N_GENES + 1)[:, None]).all()
+        with open(level5 / "idx" / "_meta.json") as f:
+            assert json.load(f)["row_groups"] == groups
+
+    def test_missing_index(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            RankIndex(str(tmp_path / "nope"))
+
+
+class TestRankIndexQuery:
+    def test_matches_gctx_provider(self, level5):
+        build_rank_index(str(level5 / "l5.gctx"), str(level5 / "idx"), chunk_size=4, **_paths(level5))
+        up, down = [f"G{g}" for g in UP], [f"g{g}" for g in DOWN]
+        expected = GCTxESProvider(str(level5 / "l5.gctx"), up, down, **_paths(level5)).compute_es()
+        got = RankIndex(str(level5 / "idx")).query(up, down)
+        pd.testing.assert_frame_equal(_by_sig(got), _by_sig(expected), check_dtype=False)
+
+    def test_matches_gctx_provider_with_nan(self, level5_nan):
+        build_rank_index(str(level5_nan / "l5.gctx"), str(level5_nan / "idx"), chunk_size=4, **_paths(level5_nan))
+        up, down = [f"G{g}" for g in UP], [f"G{g}" for g in DOWN]
+        expected = GCTxESProvider(str(level5_nan / "l5.gctx"), up, down, chunk_size=3,
+                                  **_paths(level5_nan)).compute_es()
+        got = RankIndex(str(level5_nan / "idx")).query(up, down)
+        pd.testing.assert_frame_equal(_by_sig(got), _by_sig(expected), check_dtype=False)
+
+    def test_landmark_space(self, level5):
+        build_rank_index(str(level5 / "l5.gctx"), str(level5 / "idx"), pert_types=None,
+                         landmark_only=True, gene_info_path=str(level5 / "geneinfo.txt"))
+        up, down = [f"G{g}" for g in UP], [f"G{g}" for g in DOWN]
+        expected = GCTxESProvider(str(level5 / "l5.gctx"), up, down, pert_types=None, landmark_only=True,
+                                  gene_info_path=str(level5 / "geneinfo.txt")).compute_es()
+        got = RankIndex(str(level5 / "idx")).query(up, down)
+        assert RankIndex(str(level5 / "idx")).n_genes == N_GENES // 2
+        np.testing.assert_allclose(_by_sig(got)[["es_up", "es_down"]], _by_sig(expected)[["es_up", "es_down"]])
+
+    def test_batch_equals_single_queries(self, level5):
+        build_rank_index(str(level5 / "l5.gctx"), str(level5 / "idx"), **_paths(level5))
+        index = RankIndex(str(level5 / "idx"))
+        queries = {
+            "a": ([f"G{g}" for g in UP], [f"G{g}" for g in DOWN]),
+            "b": (["G0", "G1", "G2", "G30"], ["G59", "G7"]),
+        }
+        batch = index.query_batch(queries, chunk_size=5)
+        for name, (up, down) in queries.items():
+            pd.testing.assert_frame_equal(batch[name], index.query(up, down))
+
+    def test_cell_line_restriction(self, level5):
+        build_rank_index(str(level5 / "l5.gctx"), str(level5 / "idx"), **_paths(level5))
+        index = RankIndex(str(level5 / "idx"))
+        up, down = [f"G{g}" for g in UP], [f"G{g}" for g in DOWN]
+        full = index.query(up, down)
+        sub = index.query(up, down, cell_lines=["PC3", "MCF7"])
+        assert set(sub["cell_line"]) == {"PC3", "MCF7"}
+        expected = full[full["cell_line"].isin(["PC3", "MCF7"])].reset_index(drop=True)
+        pd.testing.assert_frame_equal(sub, expected)
+        assert index.query(up, down, cell_lines=["NOPE"]).empty
+
+    def test_provider_feeds_pipeline(self, level5):
+        build_rank_index(str(level5 / "l5.gctx"), str(level5 / "idx"), **_paths(level5))
+        prov = RankIndexESProvider(RankIndex(str(level5 / "idx")),
+                                   [f"G{g}" for g in UP], [f"G{g}" for g in DOWN])
+        assert prov.source_name() == "Level5_rank_index"
+        results = CMapPipeline(prov, ncs_method="global_null").run()
+        assert results[0].pert_name == "drugX" and results[0].tau < -90
@@ -2,6 +2,7 @@
 
 Tests cover:
     - Permutation null distribution
+    - Vectorized permutation engine == loop engine (chunking, process pool, legacy median, NaN scores)
     - Empirical p-value
     - Benjamini-Hochberg FDR
     - Bootstrap confidence interval
@@ -159,3 +160,59 @@ class TestPermutationNullDistribution:
         for drug in ["drugA", "drugB"]:
             null_mean = np.mean(null[drug])
             assert abs(null_mean - overall_median) < 2.0
+
+
+class TestVectorizedPermutationEngine:
+    def _make_df(self, n_drugs=40, seed=0):
+        rng = np.random.default_rng(seed)
+        sizes = rng.integers(1, 12, n_drugs)
+        n = int(sizes.sum())
+        return pd.DataFrame({
+            "meta.pert_name": np.repeat([f"d{i}" for i in range(n_drugs)], sizes),
+            "meta.cell_line": rng.choice(["MCF7", "PC3", "A549"], n),
+            "sig_score": np.round(rng.normal(size=n), 1),   # ties
+        }).sample(frac=1.0, random_state=1)
+
+    @pytest.mark.parametrize("kw", [
+        {},
+        {"chunk_size": 7},
+        {"aggregation": "median"},
+        {"n_factor_mode": "sqrt", "n_cap": 4, "cl_diversity_bonus": 0.2},
+    ])
+    def test_identical_to_loop(self, kw):
+        df = self._make_df()
+        ref = permutation_null_distribution(df, n_permutations=60, seed=7, engine="loop", **kw)
+        vec = permutation_null_distribution(df, n_permutations=60, seed=7, **kw)
+        assert list(vec) == list(ref)
+        for d in ref:
+            np.testing.assert_array_equal(vec[d], ref[d])
+
+    @pytest.mark.parametrize("aggregation", ["full_formula", "median"])
+    def test_nan_scores_identical_to_loop(self, aggregation):
+        df = self._make_df(n_drugs=60)
+        nan_rows = np.random.default_rng(3).random(len(df)) < 0.05
+        df.loc[nan_rows, "sig_score"] = np.nan
+        ref = permutation_null_distribution(df, n_permutations=40, seed=5, engine="loop",
+                                            aggregation=aggregation)
+        vec = permutation_null_distribution(df, n_permutations=40, seed=5, chunk_size=9,
+                                            aggregation=aggregation)
+        assert any(np.isnan(v).any() for v in ref.values())
+        for d in ref:
+            np.testing.assert_array_equal(vec[d], ref[d])
+
+    def test_explicit_reverser_column(self):
+        df = self._make_df()
+        df["is_reverser"] = df["sig_score"] < 0.5
+        ref = permutation_null_distribution(df, n_permutations=30, engine="loop")
+        vec = permutation_null_distribution(df, n_permutations=30)
+        assert all(np.array_equal(vec[d], ref[d]) for d in ref)
+
+    def test_process_pool(self):
+        df = self._make_df(n_drugs=15)
+        ref = permutation_null_distribution(df, n_permutations=20, engine="loop")
+        vec = permutation_null_distribution(df, n_permutations=20, chunk_size=3, n_jobs=2)
+        assert all(np.array_equal(vec[d], ref[d]) for d in ref)
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            permutation_null_distribution(self._make_df(), engine="gpu")